@@ -0,0 +1,45 @@
+"""Add trigram search indexes
+
+Revision ID: 4e8b2d6f1a93
+Revises: 9a4c1e7b3d52
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '4e8b2d6f1a93'
+down_revision: Union[str, Sequence[str], None] = '9a4c1e7b3d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (索引名, 表名, 列) —— 题库、调研库搜索使用的 ILIKE '%词%' 由 gin_trgm_ops 索引加速
+TRIGRAM_INDEXES = [
+    ('ix_questions_text_trgm', 'questions', 'text'),
+    ('ix_surveys_title_trgm', 'surveys', 'title'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 仅 PostgreSQL 需要；其他数据库由 search_service 的进程内索引兜底
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for name, table, column in TRIGRAM_INDEXES:
+            op.create_index(
+                name, table, [column], unique=False, if_not_exists=True,
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(TRIGRAM_INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,158 @@
+"""Add answer_items table
+
+Revision ID: 6c2e9d4f1a7b
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '6c2e9d4f1a7b'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _option_score(options, option_text) -> float:
+    for opt in options:
+        opt_text = opt.get('text') if isinstance(opt, dict) else opt
+        if opt_text != option_text:
+            continue
+        opt_score = opt.get('score', 0) if isinstance(opt, dict) else 0
+        opt_correct = opt.get('is_correct', False) if isinstance(opt, dict) else False
+        score = float(opt_score or 0)
+        if not opt_score and opt_correct:
+            score += 1.0
+        return score
+    return 0.0
+
+
+def _explode(question_type: str, options, value):
+    """与 answer_item_service.explode_answer 保持一致（迁移中不依赖应用代码）"""
+    if value is None or value == [] or (isinstance(value, str) and not value.strip()):
+        return []
+
+    def text_of(raw):
+        if isinstance(raw, dict) and 'text' in raw:
+            return str(raw['text'])
+        return raw if isinstance(raw, str) else str(raw)
+
+    rows = []
+    if question_type == 'SORT_ORDER' and isinstance(value, list):
+        for rank, raw in enumerate(value, 1):
+            rows.append((text_of(raw), float(rank), 0.0))
+    elif isinstance(value, list):
+        for raw in value:
+            text = text_of(raw)
+            score = _option_score(options, text) if question_type == 'MULTI_CHOICE' else 0.0
+            rows.append((text, None, score))
+    else:
+        text = text_of(value)
+        numeric_value = None
+        if question_type == 'NUMBER_INPUT':
+            try:
+                numeric_value = float(value)
+            except (TypeError, ValueError):
+                numeric_value = None
+        score = 0.0
+        if question_type == 'SINGLE_CHOICE' and isinstance(value, str):
+            score = _option_score(options, text)
+        rows.append((text, numeric_value, score))
+    return rows
+
+
+def _backfill(bind) -> None:
+    questions = {}
+    for qid, qtype, options in bind.execute(sa.text("SELECT id, type, options FROM questions")):
+        try:
+            parsed = json.loads(options) if options else []
+        except (TypeError, ValueError):
+            parsed = []
+        questions[qid] = (str(qtype or '').split('.')[-1].upper(), parsed if isinstance(parsed, list) else [])
+
+    answer_items = sa.table(
+        'answer_items',
+        sa.column('answer_id', sa.Integer),
+        sa.column('survey_id', sa.Integer),
+        sa.column('question_id', sa.Integer),
+        sa.column('option_text', sa.Text),
+        sa.column('numeric_value', sa.Float),
+        sa.column('score', sa.Float),
+    )
+
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.text(
+                "SELECT id, survey_id, answers FROM survey_answers "
+                "WHERE id > :last_id ORDER BY id LIMIT 1000"
+            ),
+            {"last_id": last_id},
+        ).fetchall()
+        if not batch:
+            break
+        rows = []
+        for answer_id, survey_id, answers in batch:
+            try:
+                data = json.loads(answers) if answers else {}
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(data, dict) or survey_id is None:
+                continue
+            for qid_raw, value in data.items():
+                try:
+                    qid = int(qid_raw)
+                except (TypeError, ValueError):
+                    continue
+                if qid not in questions:
+                    continue
+                qtype, options = questions[qid]
+                for option_text, numeric_value, score in _explode(qtype, options, value):
+                    rows.append({
+                        "answer_id": answer_id,
+                        "survey_id": survey_id,
+                        "question_id": qid,
+                        "option_text": option_text,
+                        "numeric_value": numeric_value,
+                        "score": score,
+                    })
+        if rows:
+            op.bulk_insert(answer_items, rows)
+        last_id = batch[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'answer_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('answer_id', sa.Integer(), nullable=False),
+        sa.Column('survey_id', sa.Integer(), nullable=False),
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('option_text', sa.Text(), nullable=True),
+        sa.Column('numeric_value', sa.Float(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['answer_id'], ['survey_answers.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_answer_items_id'), 'answer_items', ['id'], unique=False)
+    op.create_index(op.f('ix_answer_items_answer_id'), 'answer_items', ['answer_id'], unique=False)
+    op.create_index('ix_answer_items_survey_question', 'answer_items', ['survey_id', 'question_id'], unique=False)
+
+    # 回填历史答卷
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_answer_items_survey_question', table_name='answer_items')
+    op.drop_index(op.f('ix_answer_items_answer_id'), table_name='answer_items')
+    op.drop_index(op.f('ix_answer_items_id'), table_name='answer_items')
+    op.drop_table('answer_items')
@@ -0,0 +1,153 @@
+"""Add survey_stat_rollups table
+
+Revision ID: 7d3f0e5a2b8c
+Revises: 6c2e9d4f1a7b
+Create Date: 2026-10-18
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '7d3f0e5a2b8c'
+down_revision: Union[str, Sequence[str], None] = '6c2e9d4f1a7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHOICE_TYPES = ('SINGLE_CHOICE', 'MULTI_CHOICE')
+
+
+def _labels(department, position, organization_id, organization_name):
+    """与 answer_item_service.dimension_label 保持一致（迁移中不依赖应用代码）"""
+    if organization_name:
+        organization = organization_name
+    elif organization_id is not None:
+        organization = f"组织#{organization_id}"
+    else:
+        organization = "未知组织"
+    return {
+        'department': (department or "未知部门")[:255],
+        'position': (position or "未知职位")[:255],
+        'organization': organization[:255],
+    }
+
+
+def _backfill(bind) -> None:
+    question_types = {
+        qid: str(qtype or '').split('.')[-1].upper()
+        for qid, qtype in bind.execute(sa.text("SELECT id, type FROM questions"))
+    }
+    survey_questions = defaultdict(list)
+    for survey_id, question_id in bind.execute(sa.text("SELECT survey_id, question_id FROM survey_questions")):
+        survey_questions[survey_id].append(question_id)
+
+    deltas = defaultdict(lambda: [0, 0.0, 0])
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.text(
+                "SELECT id, survey_id, department, position, organization_id, organization_name, total_score "
+                "FROM survey_answers WHERE id > :last_id ORDER BY id LIMIT 1000"
+            ),
+            {"last_id": last_id},
+        ).fetchall()
+        if not batch:
+            break
+        items = defaultdict(lambda: defaultdict(list))
+        item_rows = bind.execute(
+            sa.text(
+                "SELECT answer_id, question_id, option_text, score FROM answer_items "
+                "WHERE answer_id > :first_id AND answer_id <= :last_id"
+            ),
+            {"first_id": last_id, "last_id": batch[-1][0]},
+        )
+        for answer_id, question_id, option_text, score in item_rows:
+            items[answer_id][question_id].append((option_text, float(score or 0.0)))
+
+        for answer_id, survey_id, department, position, organization_id, organization_name, total_score in batch:
+            if survey_id is None:
+                continue
+            org_key = organization_id or 0
+            for dimension, label in _labels(department, position, organization_id, organization_name).items():
+                survey_delta = deltas[(survey_id, 0, "", dimension, label, org_key)]
+                survey_delta[0] += 1
+                survey_delta[1] += float(total_score or 0.0)
+                for qid in survey_questions.get(survey_id, []):
+                    q_items = items[answer_id].get(qid)
+                    question_delta = deltas[(survey_id, qid, "", dimension, label, org_key)]
+                    if not q_items:
+                        question_delta[2] += 1
+                        continue
+                    question_delta[0] += 1
+                    question_delta[1] += sum(score for _, score in q_items)
+                    if question_types.get(qid) in CHOICE_TYPES:
+                        for option_text, score in q_items:
+                            option_delta = deltas[(survey_id, qid, (option_text or "")[:255], dimension, label, org_key)]
+                            option_delta[0] += 1
+                            option_delta[1] += score
+        last_id = batch[-1][0]
+
+    if not deltas:
+        return
+    rollups = sa.table(
+        'survey_stat_rollups',
+        sa.column('survey_id', sa.Integer),
+        sa.column('question_id', sa.Integer),
+        sa.column('option_text', sa.String),
+        sa.column('dimension', sa.String),
+        sa.column('dimension_value', sa.String),
+        sa.column('organization_id', sa.Integer),
+        sa.column('count', sa.Integer),
+        sa.column('score_sum', sa.Float),
+        sa.column('unanswered_count', sa.Integer),
+    )
+    op.bulk_insert(rollups, [
+        {
+            "survey_id": key[0],
+            "question_id": key[1],
+            "option_text": key[2],
+            "dimension": key[3],
+            "dimension_value": key[4],
+            "organization_id": key[5],
+            "count": delta[0],
+            "score_sum": delta[1],
+            "unanswered_count": delta[2],
+        }
+        for key, delta in deltas.items()
+    ])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'survey_stat_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('survey_id', sa.Integer(), nullable=False),
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('option_text', sa.String(length=255), nullable=False),
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('dimension_value', sa.String(length=255), nullable=False),
+        sa.Column('organization_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Float(), nullable=False),
+        sa.Column('unanswered_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'survey_id', 'question_id', 'option_text', 'dimension', 'dimension_value', 'organization_id',
+            name='uq_survey_stat_rollups_key'
+        ),
+    )
+    op.create_index(op.f('ix_survey_stat_rollups_id'), 'survey_stat_rollups', ['id'], unique=False)
+
+    # 基于已有答卷回填
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_survey_stat_rollups_id'), table_name='survey_stat_rollups')
+    op.drop_table('survey_stat_rollups')
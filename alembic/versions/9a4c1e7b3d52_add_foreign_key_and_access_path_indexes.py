@@ -0,0 +1,60 @@
+"""Add foreign key and access path indexes
+
+Revision ID: 9a4c1e7b3d52
+Revises: 7d3f0e5a2b8c
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '9a4c1e7b3d52'
+down_revision: Union[str, Sequence[str], None] = '7d3f0e5a2b8c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (索引名, 表名, 列) —— 与模型中的 index=True / __table_args__ 保持一致
+INDEXES = [
+    # 答卷：按问卷读取（趋势按提交时间、对比按组织过滤）、组织级趋势、参与者关联
+    ('ix_survey_answers_survey_submitted', 'survey_answers', ['survey_id', 'submitted_at']),
+    ('ix_survey_answers_survey_organization', 'survey_answers', ['survey_id', 'organization_id']),
+    ('ix_survey_answers_organization_submitted', 'survey_answers', ['organization_id', 'submitted_at']),
+    ('ix_survey_answers_participant_id', 'survey_answers', ['participant_id']),
+    # 问卷题目：按问卷加载并排序、按题目反查引用
+    ('ix_survey_questions_survey_order', 'survey_questions', ['survey_id', 'order']),
+    ('ix_survey_questions_question_id', 'survey_questions', ['question_id']),
+    # 题库
+    ('ix_questions_organization_id', 'questions', ['organization_id']),
+    ('ix_questions_category_id', 'questions', ['category_id']),
+    ('ix_questions_parent_question_id', 'questions', ['parent_question_id']),
+    ('ix_questions_usage_count_id', 'questions', [sa.text('coalesce(usage_count, 0)'), 'id']),
+    # 参与者、部门、分类
+    ('ix_participants_organization_id', 'participants', ['organization_id']),
+    ('ix_participants_department_id', 'participants', ['department_id']),
+    ('ix_departments_organization_parent', 'departments', ['organization_id', 'parent_id']),
+    ('ix_departments_parent_id', 'departments', ['parent_id']),
+    ('ix_categories_organization_id', 'categories', ['organization_id']),
+    ('ix_categories_parent_id', 'categories', ['parent_id']),
+    # 问卷、组织成员
+    ('ix_surveys_organization_created', 'surveys', ['organization_id', 'created_at']),
+    ('ix_surveys_created_by_user_id', 'surveys', ['created_by_user_id']),
+    ('ix_organization_members_user_id', 'organization_members', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PostgreSQL 上并发建索引，避免在大表上长时间阻塞写入；CONCURRENTLY 不能在事务内执行
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,72 @@
+"""Add materialized path to departments
+
+Revision ID: b7d41f9e2c06
+Revises: 4e8b2d6f1a93
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b7d41f9e2c06'
+down_revision: Union[str, Sequence[str], None] = '4e8b2d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _placements(parents):
+    """按 parent_id 计算每个部门的 (层级, 路径)；遇到环时把成环的部门视为顶级"""
+    placements = {}
+
+    def place(department_id, visiting):
+        if department_id in placements:
+            return placements[department_id]
+        parent_id = parents.get(department_id)
+        if parent_id is None or parent_id not in parents or parent_id in visiting:
+            placements[department_id] = (1, None)
+        else:
+            visiting.add(department_id)
+            parent_level, parent_path = place(parent_id, visiting)
+            visiting.discard(department_id)
+            path = f"{parent_path}/{parent_id}" if parent_path else str(parent_id)
+            placements[department_id] = (parent_level + 1, path)
+        return placements[department_id]
+
+    for department_id in parents:
+        place(department_id, set())
+    return placements
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('departments', sa.Column('path', sa.String(length=1000), nullable=True))
+
+    # 回填路径，同时修正历史数据中移动部门后未更新的层级
+    departments = sa.table(
+        'departments',
+        sa.column('id', sa.Integer),
+        sa.column('parent_id', sa.Integer),
+        sa.column('level', sa.Integer),
+        sa.column('path', sa.String),
+    )
+    bind = op.get_bind()
+    parents = dict(bind.execute(sa.select(departments.c.id, departments.c.parent_id)).all())
+    rows = [
+        {'department_id': department_id, 'new_level': level, 'new_path': path}
+        for department_id, (level, path) in _placements(parents).items()
+    ]
+    if rows:
+        bind.execute(
+            departments.update()
+            .where(departments.c.id == sa.bindparam('department_id'))
+            .values(level=sa.bindparam('new_level'), path=sa.bindparam('new_path')),
+            rows,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('departments', 'path')
@@ -0,0 +1,42 @@
+"""Add llm_cache_entries table
+
+Revision ID: c3e85a1f7d24
+Revises: b7d41f9e2c06
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c3e85a1f7d24'
+down_revision: Union[str, Sequence[str], None] = 'b7d41f9e2c06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'llm_cache_entries',
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('namespace', sa.String(length=50), nullable=False),
+        sa.Column('model', sa.String(length=255), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('cache_key'),
+    )
+    op.create_index(op.f('ix_llm_cache_entries_expires_at'), 'llm_cache_entries', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_llm_cache_entries_last_hit_at'), 'llm_cache_entries', ['last_hit_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_llm_cache_entries_last_hit_at'), table_name='llm_cache_entries')
+    op.drop_index(op.f('ix_llm_cache_entries_expires_at'), table_name='llm_cache_entries')
+    op.drop_table('llm_cache_entries')
@@ -0,0 +1,45 @@
+"""Add response_count and question_count counters to surveys
+
+Revision ID: e6b1c8d3f572
+Revises: d9f2a6c4e810
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e6b1c8d3f572'
+down_revision: Union[str, Sequence[str], None] = 'd9f2a6c4e810'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('surveys', sa.Column('response_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('surveys', sa.Column('question_count', sa.Integer(), server_default='0', nullable=False))
+
+    # 按现有答卷与题目关联回填计数
+    surveys = sa.table(
+        'surveys',
+        sa.column('id', sa.Integer),
+        sa.column('response_count', sa.Integer),
+        sa.column('question_count', sa.Integer),
+    )
+    answers = sa.table('survey_answers', sa.column('id', sa.Integer), sa.column('survey_id', sa.Integer))
+    links = sa.table('survey_questions', sa.column('id', sa.Integer), sa.column('survey_id', sa.Integer))
+    op.get_bind().execute(
+        surveys.update().values(
+            response_count=sa.select(sa.func.count(answers.c.id)).where(answers.c.survey_id == surveys.c.id).scalar_subquery(),
+            question_count=sa.select(sa.func.count(links.c.id)).where(links.c.survey_id == surveys.c.id).scalar_subquery(),
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('surveys', 'question_count')
+    op.drop_column('surveys', 'response_count')
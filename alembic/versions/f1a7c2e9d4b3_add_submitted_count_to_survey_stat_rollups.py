@@ -0,0 +1,100 @@
+"""Add submitted_count to survey_stat_rollups
+
+Revision ID: f1a7c2e9d4b3
+Revises: e6b1c8d3f572
+Create Date: 2026-10-18
+
+"""
+import json
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f1a7c2e9d4b3'
+down_revision: Union[str, Sequence[str], None] = 'e6b1c8d3f572'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _labels(department, position, organization_id, organization_name):
+    """与 answer_item_service.dimension_label 保持一致（迁移中不依赖应用代码）"""
+    if organization_name:
+        organization = organization_name
+    elif organization_id is not None:
+        organization = f"组织#{organization_id}"
+    else:
+        organization = "未知组织"
+    return {
+        'department': (department or "未知部门")[:255],
+        'position': (position or "未知职位")[:255],
+        'organization': organization[:255],
+    }
+
+
+def _backfill(bind) -> None:
+    """按答卷 JSON 统计每题的提交份数（含空回答），写入已有的题目级汇总行"""
+    survey_questions = defaultdict(list)
+    for survey_id, question_id in bind.execute(sa.text("SELECT survey_id, question_id FROM survey_questions")):
+        survey_questions[survey_id].append(question_id)
+
+    counts = defaultdict(int)
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.text(
+                "SELECT id, survey_id, department, position, organization_id, organization_name, answers "
+                "FROM survey_answers WHERE id > :last_id ORDER BY id LIMIT 1000"
+            ),
+            {"last_id": last_id},
+        ).fetchall()
+        if not batch:
+            break
+        for _, survey_id, department, position, organization_id, organization_name, answers in batch:
+            try:
+                data = json.loads(answers) if answers else {}
+            except (TypeError, ValueError):
+                continue
+            if survey_id is None or not isinstance(data, dict):
+                continue
+            submitted = [qid for qid in survey_questions.get(survey_id, []) if str(qid) in data]
+            for dimension, label in _labels(department, position, organization_id, organization_name).items():
+                for qid in submitted:
+                    counts[(survey_id, qid, dimension, label, organization_id or 0)] += 1
+        last_id = batch[-1][0]
+
+    if not counts:
+        return
+    bind.execute(
+        sa.text(
+            "UPDATE survey_stat_rollups SET submitted_count = :submitted_count "
+            "WHERE survey_id = :survey_id AND question_id = :question_id AND option_text = '' "
+            "AND dimension = :dimension AND dimension_value = :dimension_value AND organization_id = :organization_id"
+        ),
+        [
+            {
+                "survey_id": key[0],
+                "question_id": key[1],
+                "dimension": key[2],
+                "dimension_value": key[3],
+                "organization_id": key[4],
+                "submitted_count": count,
+            }
+            for key, count in counts.items()
+        ],
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('survey_stat_rollups', sa.Column('submitted_count', sa.Integer(), server_default='0', nullable=False))
+
+    # 基于已有答卷回填
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('survey_stat_rollups', 'submitted_count')
@@ -6,7 +6,7 @@ from typing import List, Dict, Any, Optional
 from app.api.deps import get_db
 from app.security import get_current_user
 from app.models.user import User as UserModel
-from app.services.statistics_service import get_survey_stats_by_dimension, get_per_question_scores, get_line_scores_by_dimension, get_pie_option_distribution
+from app.services.statistics_service import get_survey_stats_by_dimension, get_per_question_scores, get_line_scores_by_dimension, get_pie_option_distribution, get_analysis_bundle
 from app.services.chart_service import get_question_option_stats
 
 router = APIRouter(
@@ -142,3 +142,63 @@ def get_pie_distribution(
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     return result
+
+
+@router.get("/survey/{survey_id}/bundle", response_model=Dict[str, Any])
+def get_analysis_page_bundle(
+    survey_id: int,
+    dimension: str = "department",
+    scope: str = "survey",
+    question_ids: Optional[List[int]] = Query(None, description="折线图题目ID列表，scope=question/both 时生效"),
+    pies: Optional[List[str]] = Query(None, description="饼图请求，格式为'题目ID:选项文本'，可重复传入"),
+    include_unanswered: bool = True,
+    department: Optional[str] = None,
+    position: Optional[str] = None,
+    organizations: Optional[List[int]] = Query(None, description="按组织过滤/对比"),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    分析页合并接口：一次返回维度统计、每题得分、选项分布、折线图和饼图数据，
+    预聚合数据只读取一次。各部分与对应的单独接口返回结构一致：
+    stats / questions/scores / charts/options / line / pie
+    """
+    if dimension not in ["department", "position", "organization"]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid dimension")
+
+    if scope == "survey":
+        include_survey_total = True
+        question_ids = []
+    elif scope == "question":
+        include_survey_total = False
+    elif scope == "both":
+        include_survey_total = True
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid scope")
+
+    pie_requests = []
+    for pie in pies or []:
+        question_id, sep, option_text = pie.partition(":")
+        if not sep or not question_id.strip().isdigit():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid pie '{pie}'. Expected 'question_id:option_text'."
+            )
+        pie_requests.append((int(question_id), option_text))
+
+    try:
+        result = get_analysis_bundle(
+            db,
+            survey_id=survey_id,
+            dimension=dimension,
+            organization_ids=organizations,
+            line_question_ids=question_ids,
+            include_survey_total=include_survey_total,
+            pies=pie_requests,
+            include_unanswered=include_unanswered,
+            department=department,
+            position=position
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return result
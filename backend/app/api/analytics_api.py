@@ -1,19 +1,25 @@
 # backend/app/api/analytics_api.py
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy import func, and_, desc
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import copy
 import json
 import logging
 from datetime import datetime, timedelta
+from urllib.parse import quote
 
 logger = logging.getLogger(__name__)
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models.survey import Survey
 from app.models.survey_question import SurveyQuestion
 from app.models.answer import SurveyAnswer
+from app.models.answer_item import SurveyAnswerItem
 from app.models.question import Question, QuestionType
 from app.models.participant import Participant
 from app.models.department import Department
@@ -22,11 +28,37 @@ from app.models.organization_member import OrganizationMember
 from app.models.tag import Tag
 from app.models.category import Category
 
-from app.services import llm_service
+from app.api.job_api import enqueue_and_wait
+from app.services import export_service, job_service, llm_cache_service, llm_service
+from app.services.question_service import load_questions_for_surveys, load_survey_questions, parse_options
+from app.services.survey_analytics_cache_service import get_cached_analytics, store_analytics
 
 router = APIRouter()
 
 
+def _parse_answer_rows(rows) -> List[Dict[str, Any]]:
+    """把 (answers,) 查询结果解析为字典列表，无法解析的答卷跳过"""
+    parsed = []
+    for (raw,) in rows:
+        try:
+            data = json.loads(raw) if isinstance(raw, str) else raw
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if isinstance(data, dict):
+            parsed.append(data)
+    return parsed
+
+
+def _get_organization_survey(db: Session, organization_id: int, survey_id: int) -> Optional[Survey]:
+    """查询属于该组织的调研"""
+    return db.query(Survey).filter(
+        and_(
+            Survey.id == survey_id,
+            Survey.organization_id == organization_id
+        )
+    ).first()
+
+
 @router.get("/")
 async def get_analytics():
     """获取分析页面基础数据"""
@@ -34,7 +66,7 @@ async def get_analytics():
 
 
 @router.get("/surveys/{survey_id}/statistics")
-async def get_survey_statistics(
+def get_survey_statistics(
     survey_id: int,
     db: Session = Depends(get_db)
 ):
@@ -45,12 +77,6 @@ async def get_survey_statistics(
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
     
-    # 获取调研的问题数
-    question_count = db.query(SurveyQuestion).filter(SurveyQuestion.survey_id == survey_id).count()
-    
-    # 获取调研的答案数
-    answer_count = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey_id).count()
-    
     # 获取参与者数（去重）
     participants = db.query(SurveyAnswer.participant_id).filter(SurveyAnswer.survey_id == survey_id).distinct().count()
     
@@ -58,8 +84,8 @@ async def get_survey_statistics(
     return {
         "survey_id": survey_id,
         "survey_title": survey.title,
-        "question_count": question_count,
-        "answer_count": answer_count,
+        "question_count": survey.question_count,
+        "answer_count": survey.response_count,
         "participant_count": participants,
         "status": survey.status
     }
@@ -67,7 +93,7 @@ async def get_survey_statistics(
 
 
 @router.get("/organizations/{organization_id}/analytics/overview")
-async def get_survey_overview(
+def get_survey_overview(
     organization_id: int,
     db: Session = Depends(get_db)
 ):
@@ -118,7 +144,7 @@ async def get_survey_overview(
     }
 
 @router.get("/organizations/{organization_id}/surveys/{survey_id}/analytics")
-async def get_survey_analytics(
+def get_survey_analytics(
     organization_id: int,
     survey_id: int,
     db: Session = Depends(get_db)
@@ -136,63 +162,46 @@ async def get_survey_analytics(
     if not survey:
         raise HTTPException(status_code=404, detail="调研不存在")
     
-    # 获取调研的所有问题（通过SurveyQuestion关联表）
-    survey_questions = db.query(SurveyQuestion).filter(SurveyQuestion.survey_id == survey_id).order_by(SurveyQuestion.order).all()
-    questions = []
-    for sq in survey_questions:
-        question = db.query(Question).filter(Question.id == sq.question_id).first()
-        if question:
-            questions.append(question)
+    # 获取调研的所有问题（通过SurveyQuestion关联表单次联表查询）
+    questions = [question for question, _ in load_survey_questions(db, survey_id)]
     
-    # 获取所有回答
-    answers = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey_id).all()
+    # 只需答卷数和参与者ID，不加载答卷 JSON
+    total_answers = db.query(func.count(SurveyAnswer.id)).filter(SurveyAnswer.survey_id == survey_id).scalar() or 0
+    
+    # 基于答卷明细按 (题目, 选项) 聚合，避免逐条解析答卷 JSON
+    option_counts: Dict[int, Dict[str, int]] = {}
+    for qid, option_text, count in db.query(
+        SurveyAnswerItem.question_id, SurveyAnswerItem.option_text, func.count(SurveyAnswerItem.id)
+    ).filter(SurveyAnswerItem.survey_id == survey_id).group_by(
+        SurveyAnswerItem.question_id, SurveyAnswerItem.option_text
+    ).all():
+        option_counts.setdefault(qid, {})[option_text] = count
+    
+    answered_counts = dict(db.query(
+        SurveyAnswerItem.question_id, func.count(func.distinct(SurveyAnswerItem.answer_id))
+    ).filter(SurveyAnswerItem.survey_id == survey_id).group_by(SurveyAnswerItem.question_id).all())
     
     # 分析每个问题的回答
     question_analytics = []
     for question in questions:
+        answered = answered_counts.get(question.id, 0)
         question_data = {
             "question_id": question.id,
             "question_text": question.text,
             "question_type": question.type.value,
-            "total_responses": 0,
+            "total_responses": answered,
             "response_distribution": {},
-            "options": json.loads(question.options) if question.options else []
+            "options": parse_options(question.options)
         }
         
-        # 统计每个问题的回答
-        for answer in answers:
-            try:
-                answer_data = json.loads(answer.answers)
-                if str(question.id) in answer_data:
-                    question_data["total_responses"] += 1
-                    response = answer_data[str(question.id)]
-                    
-                    if question.type == QuestionType.SINGLE_CHOICE:
-                        if response in question_data["response_distribution"]:
-                            question_data["response_distribution"][response] += 1
-                        else:
-                            question_data["response_distribution"][response] = 1
-                    elif question.type == QuestionType.MULTI_CHOICE:
-                        if isinstance(response, list):
-                            for choice in response:
-                                if choice in question_data["response_distribution"]:
-                                    question_data["response_distribution"][choice] += 1
-                                else:
-                                    question_data["response_distribution"][choice] = 1
-                        else:
-                            # 处理字符串格式的多选答案
-                            if response in question_data["response_distribution"]:
-                                question_data["response_distribution"][response] += 1
-                            else:
-                                question_data["response_distribution"][response] = 1
-                    elif question.type in [QuestionType.TEXT_INPUT, QuestionType.NUMBER_INPUT]:
-                        # 对于文本和数字输入，统计非空回答
-                        if response and str(response).strip():
-                            question_data["response_distribution"]["有回答"] = question_data["response_distribution"].get("有回答", 0) + 1
-                        else:
-                            question_data["response_distribution"]["无回答"] = question_data["response_distribution"].get("无回答", 0) + 1
-            except (json.JSONDecodeError, KeyError):
-                continue
+        if question.type in [QuestionType.SINGLE_CHOICE, QuestionType.MULTI_CHOICE]:
+            question_data["response_distribution"] = dict(option_counts.get(question.id, {}))
+        elif question.type in [QuestionType.TEXT_INPUT, QuestionType.NUMBER_INPUT]:
+            # 对于文本和数字输入，统计非空回答
+            if answered:
+                question_data["response_distribution"]["有回答"] = answered
+            if total_answers - answered > 0:
+                question_data["response_distribution"]["无回答"] = total_answers - answered
         
         question_analytics.append(question_data)
     
@@ -203,141 +212,302 @@ async def get_survey_analytics(
         "total_participants": 0
     }
     
-    participant_ids = set()
-    for answer in answers:
-        if answer.participant_id:
-            participant_ids.add(answer.participant_id)
+    participant_ids = {
+        participant_id for (participant_id,) in db.query(SurveyAnswer.participant_id).filter(
+            SurveyAnswer.survey_id == survey_id,
+            SurveyAnswer.participant_id.isnot(None)
+        ).distinct()
+    }
     
-    for participant_id in participant_ids:
-        participant = db.query(Participant).filter(Participant.id == participant_id).first()
-        if participant:
-            participant_analysis["total_participants"] += 1
-            
-            # 按部门统计
-            if participant.department_id:
-                department = db.query(Department).filter(Department.id == participant.department_id).first()
-                if department:
-                    dept_name = department.name
-                    participant_analysis["by_department"][dept_name] = participant_analysis["by_department"].get(dept_name, 0) + 1
-            
-            # 按职位统计
-            if participant.position:
-                participant_analysis["by_position"][participant.position] = participant_analysis["by_position"].get(participant.position, 0) + 1
+    # 批量加载参与者及其部门
+    participants = db.query(Participant).filter(Participant.id.in_(participant_ids)).all() if participant_ids else []
+    department_ids = {p.department_id for p in participants if p.department_id}
+    department_names = dict(
+        db.query(Department.id, Department.name).filter(Department.id.in_(department_ids)).all()
+    ) if department_ids else {}
+    
+    for participant in participants:
+        participant_analysis["total_participants"] += 1
+        
+        # 按部门统计
+        if participant.department_id:
+            dept_name = department_names.get(participant.department_id)
+            if dept_name:
+                participant_analysis["by_department"][dept_name] = participant_analysis["by_department"].get(dept_name, 0) + 1
+        
+        # 按职位统计
+        if participant.position:
+            participant_analysis["by_position"][participant.position] = participant_analysis["by_position"].get(participant.position, 0) + 1
     
     return {
         "survey_id": survey_id,
         "survey_title": survey.title,
-        "total_answers": len(answers),
+        "total_answers": total_answers,
         "question_analytics": question_analytics,
         "participant_analysis": participant_analysis
     }
 
+SURVEY_SUMMARY_NAMESPACE = "survey-summary"
+
+
+def _survey_answers_fingerprint(db: Session, survey_id: int) -> tuple:
+    """调研答卷的 (数量, 最新答卷ID)，新增或删除答卷后会变化"""
+    count, latest_id = db.query(func.count(SurveyAnswer.id), func.max(SurveyAnswer.id)).filter(
+        SurveyAnswer.survey_id == survey_id
+    ).one()
+    return count or 0, latest_id or 0
+
+
+def _load_survey_analytics_snapshot(db: Session, organization_id: int, survey_id: int) -> Tuple[tuple, Dict[str, Any]]:
+    """返回 (答卷指纹, 调研分析数据)；分析数据为副本，调用方可以修改"""
+    fingerprint = _survey_answers_fingerprint(db, survey_id)
+    survey_data = get_cached_analytics(organization_id, survey_id, fingerprint)
+    if survey_data is None:
+        survey_data = get_survey_analytics(organization_id, survey_id, db)
+        store_analytics(organization_id, survey_id, fingerprint, survey_data)
+        survey_data = copy.deepcopy(survey_data)
+    return fingerprint, survey_data
+
+
+# 后台任务类型
+SURVEY_AI_SUMMARY_JOB = "survey_ai_summary"
+QUESTION_AI_INSIGHTS_JOB = "question_ai_insights"
+SURVEY_QUESTIONS_AI_INSIGHTS_JOB = "survey_questions_ai_insights"
+ENTERPRISE_COMPARISON_AI_JOB = "enterprise_comparison_ai"
+
+JOB_WAIT_QUERY = Query(
+    None, ge=0, le=55,
+    description="最多等待的秒数（默认 AI_JOB_WAIT_SECONDS）；超时返回 202 与任务地址，可轮询或订阅 SSE 获取进度"
+)
+
+
 @router.get("/organizations/{organization_id}/surveys/{survey_id}/analytics/ai-summary")
 async def get_survey_ai_summary(
     organization_id: int,
     survey_id: int,
+    reuse: bool = Query(False, description="答卷未变化（数量与最新答卷ID相同）时直接返回上次生成的总结"),
+    wait: Optional[float] = JOB_WAIT_QUERY,
     db: Session = Depends(get_db)
 ):
-    """获取调研的AI智能总结报告"""
+    """获取调研的AI智能总结报告（在后台任务中生成）"""
     
+    # 同步数据库查询放到线程池执行，避免阻塞事件循环
     # 验证调研属于该组织
-    survey = db.query(Survey).filter(
-        and_(
-            Survey.id == survey_id,
-            Survey.organization_id == organization_id
-        )
-    ).first()
+    survey = await run_in_threadpool(_get_organization_survey, db, organization_id, survey_id)
     
     if not survey:
         raise HTTPException(status_code=404, detail="调研不存在")
     
-    # 获取调研分析数据
-    survey_data = await get_survey_analytics(organization_id, survey_id, db)
-    
+    # 整份总结按答卷指纹缓存；每次生成都会写入，reuse=true 时才读取
+    if reuse:
+        fingerprint = await run_in_threadpool(_survey_answers_fingerprint, db, survey_id)
+        cached = await run_in_threadpool(
+            llm_cache_service.get_cached, _survey_summary_cache_key(organization_id, survey_id, fingerprint)
+        )
+        if cached is not None:
+            summary_data = json.loads(cached)
+            summary_data["from_cache"] = True
+            return summary_data
+    
+    return await enqueue_and_wait(
+        SURVEY_AI_SUMMARY_JOB,
+        {"organization_id": organization_id, "survey_id": survey_id},
+        organization_id=organization_id,
+        wait_seconds=wait,
+    )
+
+
+def _survey_summary_cache_key(organization_id: int, survey_id: int, fingerprint: tuple) -> str:
+    return llm_cache_service.make_cache_key(
+        SURVEY_SUMMARY_NAMESPACE, organization_id, survey_id, *fingerprint, llm_service.DEFAULT_MODEL
+    )
+
+
+@job_service.job_handler(SURVEY_AI_SUMMARY_JOB)
+async def _survey_ai_summary_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    organization_id = params["organization_id"]
+    survey_id = params["survey_id"]
+    db = SessionLocal()
     try:
-        # 添加调试信息
-        logger.info(f"开始生成AI总结，调研ID: {survey_id}, 组织ID: {organization_id}")
-        logger.info(f"调研数据: {survey_data}")
+        await job.progress(10, "汇总调研数据")
+        fingerprint, survey_data = await run_in_threadpool(_load_survey_analytics_snapshot, db, organization_id, survey_id)
         
-        # 调用LLM服务生成智能总结
+        logger.info(f"开始生成AI总结，调研ID: {survey_id}, 组织ID: {organization_id}")
+        await job.progress(30, "AI 生成总结")
         summary_data = await llm_service.generate_survey_summary(survey_data)
         
         # 添加参与率信息
-        participants = db.query(Participant).filter(Participant.organization_id == organization_id).all()
-        total_participants = len(participants)
+        await job.progress(90, "整理报告")
+        total_participants = await run_in_threadpool(
+            lambda: db.query(Participant).filter(Participant.organization_id == organization_id).count()
+        )
         active_participants = survey_data["participant_analysis"]["total_participants"]
         participation_rate = (active_participants / total_participants * 100) if total_participants > 0 else 0
         
         summary_data["participation_rate"] = participation_rate
         summary_data["generated_at"] = datetime.now().isoformat()
         
+        # 兜底文本（密钥缺失、重试耗尽等）不缓存，修复后可立即重新生成
+        if llm_service.last_completion_ok():
+            await run_in_threadpool(
+                llm_cache_service.store,
+                _survey_summary_cache_key(organization_id, survey_id, fingerprint),
+                json.dumps(summary_data, ensure_ascii=False, default=str),
+                llm_service.DEFAULT_MODEL,
+                SURVEY_SUMMARY_NAMESPACE,
+            )
+        
         logger.info(f"AI总结生成成功: {summary_data.get('summary', '')[:100]}...")
+        summary_data["from_cache"] = False
         return summary_data
-        
-    except RuntimeError as e:
-        logger.error(f"生成AI总结失败: {e}")
-        raise HTTPException(status_code=502, detail=f"AI服务暂时不可用: {str(e)}")
-    except Exception as e:
-        logger.error(f"生成AI总结失败: {e}")
-        logger.exception("详细错误信息:")
-        raise HTTPException(status_code=500, detail=f"生成总结失败: {str(e)}")
+    finally:
+        db.close()
 
 @router.get("/organizations/{organization_id}/surveys/{survey_id}/questions/{question_id}/ai-insights")
 async def get_question_ai_insights(
     organization_id: int,
     survey_id: int,
     question_id: int,
+    wait: Optional[float] = JOB_WAIT_QUERY,
     db: Session = Depends(get_db)
 ):
-    """获取单个问题的AI深度洞察分析"""
+    """获取单个问题的AI深度洞察分析（在后台任务中生成）"""
     
     # 验证调研属于该组织
-    survey = db.query(Survey).filter(
-        and_(
-            Survey.id == survey_id,
-            Survey.organization_id == organization_id
-        )
-    ).first()
+    survey = await run_in_threadpool(_get_organization_survey, db, organization_id, survey_id)
     
     if not survey:
         raise HTTPException(status_code=404, detail="调研不存在")
     
     # 获取问题
-    question = db.query(Question).filter(
-        and_(
-            Question.id == question_id,
-            Question.survey_id == survey_id
-        )
-    ).first()
+    question = await run_in_threadpool(
+        lambda: db.query(Question).join(
+            SurveyQuestion, SurveyQuestion.question_id == Question.id
+        ).filter(
+            and_(
+                Question.id == question_id,
+                SurveyQuestion.survey_id == survey_id
+            )
+        ).first()
+    )
     
     if not question:
         raise HTTPException(status_code=404, detail="问题不存在")
     
-    # 获取问题分析数据
-    survey_data = await get_survey_analytics(organization_id, survey_id, db)
+    return await enqueue_and_wait(
+        QUESTION_AI_INSIGHTS_JOB,
+        {"organization_id": organization_id, "survey_id": survey_id, "question_id": question_id},
+        organization_id=organization_id,
+        wait_seconds=wait,
+        failure_status=500,
+        failure_prefix="生成问题洞察失败",
+    )
+
+
+@job_service.job_handler(QUESTION_AI_INSIGHTS_JOB)
+async def _question_ai_insights_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        # 获取问题分析数据
+        await job.progress(10, "汇总问题数据")
+        _, survey_data = await run_in_threadpool(
+            _load_survey_analytics_snapshot, db, params["organization_id"], params["survey_id"]
+        )
+    finally:
+        db.close()
     
     # 找到对应的问题数据
     question_data = None
     for q in survey_data["question_analytics"]:
-        if q["question_id"] == question_id:
+        if q["question_id"] == params["question_id"]:
             question_data = q
             break
     
     if not question_data:
-        raise HTTPException(status_code=404, detail="问题分析数据不存在")
+        raise ValueError("问题分析数据不存在")
+    
+    # 调用LLM服务生成问题洞察
+    await job.progress(30, "AI 生成洞察")
+    insights_data = await llm_service.generate_question_insights(question_data)
+    insights_data["analysis_timestamp"] = datetime.now().isoformat()
+    
+    return insights_data
+
+
+@router.get("/organizations/{organization_id}/surveys/{survey_id}/analytics/ai-insights")
+async def get_survey_questions_ai_insights(
+    organization_id: int,
+    survey_id: int,
+    question_ids: Optional[List[int]] = Query(None, description="只分析这些问题，默认全部问题"),
+    wait: Optional[float] = JOB_WAIT_QUERY,
+    db: Session = Depends(get_db)
+):
+    """批量获取调研各问题的AI深度洞察（在后台任务中生成，调研数据只汇总一次，各问题并发调用 LLM）"""
+    
+    survey = await run_in_threadpool(_get_organization_survey, db, organization_id, survey_id)
+    
+    if not survey:
+        raise HTTPException(status_code=404, detail="调研不存在")
     
+    return await enqueue_and_wait(
+        SURVEY_QUESTIONS_AI_INSIGHTS_JOB,
+        {"organization_id": organization_id, "survey_id": survey_id, "question_ids": question_ids},
+        organization_id=organization_id,
+        wait_seconds=wait,
+        failure_status=500,
+        failure_prefix="生成问题洞察失败",
+    )
+
+
+@job_service.job_handler(SURVEY_QUESTIONS_AI_INSIGHTS_JOB)
+async def _survey_questions_ai_insights_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    db = SessionLocal()
     try:
-        # 调用LLM服务生成问题洞察
+        await job.progress(5, "汇总调研数据")
+        _, survey_data = await run_in_threadpool(
+            _load_survey_analytics_snapshot, db, params["organization_id"], params["survey_id"]
+        )
+    finally:
+        db.close()
+    
+    wanted = set(params.get("question_ids") or [])
+    questions = [q for q in survey_data["question_analytics"] if not wanted or q["question_id"] in wanted]
+    
+    # 各问题并发生成，实际并发由 LLM 网关的全局与组织配额限制
+    done = 0
+    
+    async def generate(question_data: Dict[str, Any]) -> Dict[str, Any]:
+        nonlocal done
         insights_data = await llm_service.generate_question_insights(question_data)
         insights_data["analysis_timestamp"] = datetime.now().isoformat()
-        
+        done += 1
+        await job.progress(10 + 85 * done // len(questions), f"已完成 {done}/{len(questions)} 个问题")
         return insights_data
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"生成问题洞察失败: {str(e)}")
+    
+    await job.progress(10, f"AI 生成 {len(questions)} 个问题的洞察")
+    results = await asyncio.gather(*(generate(q) for q in questions), return_exceptions=True)
+    
+    insights, failed = [], []
+    for question_data, result in zip(questions, results):
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+        if isinstance(result, Exception):
+            logger.error(f"问题 {question_data['question_id']} 洞察生成失败: {result}")
+            failed.append({"question_id": question_data["question_id"], "error": str(result)})
+        else:
+            insights.append(result)
+    
+    return {
+        "survey_id": survey_data["survey_id"],
+        "survey_title": survey_data["survey_title"],
+        "generated_at": datetime.now().isoformat(),
+        "total_questions": len(questions),
+        "insights": insights,
+        "failed": failed,
+    }
 
 @router.get("/organizations/{organization_id}/analytics/participants")
-async def get_participant_analytics(
+def get_participant_analytics(
     organization_id: int,
     db: Session = Depends(get_db)
 ):
@@ -393,7 +563,7 @@ async def get_participant_analytics(
     }
 
 @router.get("/organizations/{organization_id}/analytics/trends")
-async def get_trend_analytics(
+def get_trend_analytics(
     organization_id: int,
     days: int = Query(30, description="分析天数，默认30天"),
     db: Session = Depends(get_db)
@@ -450,7 +620,7 @@ async def get_trend_analytics(
     }
 
 @router.get("/organizations/{organization_id}/analytics/cross-analysis")
-async def get_cross_analysis(
+def get_cross_analysis(
     organization_id: int,
     survey_id: int,
     question1_id: int,
@@ -477,34 +647,49 @@ async def get_cross_analysis(
     if not question1 or not question2:
         raise HTTPException(status_code=404, detail="问题不存在")
     
-    # 获取所有回答
-    answers = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey_id).all()
-    
     # 交叉分析
     cross_analysis = {}
-    
-    for answer in answers:
-        try:
-            answer_data = json.loads(answer.answers)
-            if str(question1_id) in answer_data and str(question2_id) in answer_data:
-                response1 = answer_data[str(question1_id)]
-                response2 = answer_data[str(question2_id)]
-                
-                # 处理不同类型的回答
-                if question1.type == QuestionType.MULTI_CHOICE and isinstance(response1, list):
-                    response1 = ", ".join(response1)
-                if question2.type == QuestionType.MULTI_CHOICE and isinstance(response2, list):
-                    response2 = ", ".join(response2)
-                
-                if response1 not in cross_analysis:
-                    cross_analysis[response1] = {}
-                
-                if response2 not in cross_analysis[response1]:
-                    cross_analysis[response1][response2] = 0
-                
-                cross_analysis[response1][response2] += 1
-        except (json.JSONDecodeError, KeyError):
-            continue
+    multi_row_types = (QuestionType.MULTI_CHOICE, QuestionType.SORT_ORDER)
+    
+    if question1.type not in multi_row_types and question2.type not in multi_row_types:
+        # 两题每份答卷各只有一行明细，直接自连接后 GROUP BY
+        item1 = aliased(SurveyAnswerItem)
+        item2 = aliased(SurveyAnswerItem)
+        rows = db.query(item1.option_text, item2.option_text, func.count(item1.id)).join(
+            item2, item2.answer_id == item1.answer_id
+        ).filter(
+            item1.survey_id == survey_id,
+            item1.question_id == question1_id,
+            item2.question_id == question2_id
+        ).group_by(item1.option_text, item2.option_text).all()
+        for response1, response2, count in rows:
+            cross_analysis.setdefault(response1, {})[response2] = count
+    else:
+        # 多选/排序题需要先按答卷拼接选项，只取明细中的必要列
+        rows = db.query(
+            SurveyAnswerItem.answer_id, SurveyAnswerItem.question_id, SurveyAnswerItem.option_text
+        ).filter(
+            SurveyAnswerItem.survey_id == survey_id,
+            SurveyAnswerItem.question_id.in_([question1_id, question2_id])
+        ).order_by(SurveyAnswerItem.id).all()
+        
+        responses: Dict[int, Dict[int, List[str]]] = {}
+        for answer_id, qid, option_text in rows:
+            responses.setdefault(answer_id, {}).setdefault(qid, []).append(option_text)
+        
+        for answer_responses in responses.values():
+            if question1_id not in answer_responses or question2_id not in answer_responses:
+                continue
+            response1 = ", ".join(answer_responses[question1_id])
+            response2 = ", ".join(answer_responses[question2_id])
+            
+            if response1 not in cross_analysis:
+                cross_analysis[response1] = {}
+            
+            if response2 not in cross_analysis[response1]:
+                cross_analysis[response1][response2] = 0
+            
+            cross_analysis[response1][response2] += 1
     
     return {
         "survey_id": survey_id,
@@ -522,7 +707,7 @@ async def get_cross_analysis(
     }
 
 @router.get("/organizations/{organization_id}/analytics/comparison")
-async def get_comparison_analysis(
+def get_comparison_analysis(
     organization_id: int,
     survey1_id: int,
     survey2_id: int,
@@ -587,61 +772,36 @@ async def get_comparison_analysis(
         }
     }
 
+def _survey_export_response(db: Session, survey: Survey, format: str) -> StreamingResponse:
+    """构建问卷答卷的流式导出响应"""
+    export_format = export_service.normalize_format(format)
+    if export_format is None:
+        raise HTTPException(status_code=400, detail="不支持的导出格式，可选：csv、xlsx、json")
+    media_type, extension = export_service.EXPORT_FORMATS[export_format]
+    filename = quote(f"{survey.title or 'survey'}_{survey.id}.{extension}")
+    return StreamingResponse(
+        export_service.stream_survey_export(db, survey.id, survey.title, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=survey_{survey.id}.{extension}; filename*=UTF-8''{filename}"},
+    )
+
 @router.get("/organizations/{organization_id}/analytics/export")
-async def export_analytics_data(
+def export_analytics_data(
     organization_id: int,
     survey_id: Optional[int] = None,
-    format: str = Query("json", description="导出格式：json 或 csv"),
+    format: str = Query("json", description="导出格式：json、csv 或 xlsx"),
     db: Session = Depends(get_db)
 ):
     """导出分析数据"""
     
     if survey_id:
-        # 导出特定调研的数据
-        survey = db.query(Survey).filter(
-            and_(
-                Survey.id == survey_id,
-                Survey.organization_id == organization_id
-            )
-        ).first()
+        # 导出特定调研的数据（流式输出，内存占用与答卷数无关）
+        survey = _get_organization_survey(db, organization_id, survey_id)
         
         if not survey:
             raise HTTPException(status_code=404, detail="调研不存在")
         
-        answers = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey_id).all()
-        questions = db.query(Question).filter(Question.survey_id == survey_id).all()
-        
-        # 构建导出数据
-        export_data = []
-        for answer in answers:
-            row = {
-                "answer_id": answer.id,
-                "participant_id": answer.participant_id,
-                "submitted_at": answer.submitted_at.isoformat() if answer.submitted_at else None
-            }
-            
-            try:
-                answer_data = json.loads(answer.answers)
-                for question in questions:
-                    question_key = str(question.id)
-                    if question_key in answer_data:
-                        response = answer_data[question_key]
-                        if isinstance(response, list):
-                            response = ", ".join(response)
-                        row[f"q{question.id}_{question.text[:20]}"] = response
-                    else:
-                        row[f"q{question.id}_{question.text[:20]}"] = None
-            except (json.JSONDecodeError, KeyError):
-                pass
-            
-            export_data.append(row)
-        
-        return {
-            "survey_id": survey_id,
-            "survey_title": survey.title,
-            "total_records": len(export_data),
-            "data": export_data
-        }
+        return _survey_export_response(db, survey, format)
     else:
         # 导出组织概览数据
         surveys = db.query(Survey).filter(Survey.organization_id == organization_id).all()
@@ -670,10 +830,23 @@ async def export_analytics_data(
             ]
         }
 
+@router.get("/organizations/{organization_id}/surveys/{survey_id}/analytics/export")
+def export_survey_answers(
+    organization_id: int,
+    survey_id: int,
+    format: str = Query("csv", description="导出格式：csv、xlsx（excel）或 json"),
+    db: Session = Depends(get_db)
+):
+    """流式导出调研的原始答卷"""
+    survey = _get_organization_survey(db, organization_id, survey_id)
+    if not survey:
+        raise HTTPException(status_code=404, detail="调研不存在")
+    return _survey_export_response(db, survey, format)
+
 # 在企业间对比功能部分添加新的API端点
 
 @router.get("/organizations/{organization_id}/analytics/enterprise-comparison")
-async def get_enterprise_comparison(
+def get_enterprise_comparison(
     organization_id: int,
     survey_id: int,
     compare_organizations: str = Query(..., description="要对比的组织ID列表，用逗号分隔"),
@@ -760,7 +933,7 @@ async def get_enterprise_comparison(
     }
 
 @router.get("/analytics/global-enterprise-comparison")
-async def get_global_enterprise_comparison(
+def get_global_enterprise_comparison(
     survey_title: str = Query(..., description="调研标题"),
     db: Session = Depends(get_db)
 ):
@@ -837,7 +1010,7 @@ async def get_global_enterprise_comparison(
     }
 
 @router.get("/organizations/{organization_id}/surveys/{survey_id}/questions/{question_id}/analytics")
-async def get_question_analytics(
+def get_question_analytics(
     organization_id: int,
     survey_id: int,
     question_id: int,
@@ -915,7 +1088,7 @@ async def get_question_analytics(
     }
 
 @router.get("/organizations/{organization_id}/surveys/{survey_id}/analytics/category/{category_id}")
-async def get_category_analytics(
+def get_category_analytics(
     organization_id: int,
     survey_id: int,
     category_id: int,
@@ -983,7 +1156,7 @@ async def get_category_analytics(
     }
 
 @router.get("/organizations/{organization_id}/surveys/{survey_id}/analytics/tag/{tag_id}")
-async def get_tag_analytics(
+def get_tag_analytics(
     organization_id: int,
     survey_id: int,
     tag_id: int,
@@ -1015,28 +1188,37 @@ async def generate_enterprise_comparison_ai(
     organization_id: int,
     survey_id: int,
     comparison_data: dict,
+    wait: Optional[float] = JOB_WAIT_QUERY,
     db: Session = Depends(get_db)
 ):
-    """生成企业对比AI分析"""
+    """生成企业对比AI分析（在后台任务中生成）"""
     
     # 验证调研属于该组织
-    survey = db.query(Survey).filter(
-        and_(
-            Survey.id == survey_id,
-            Survey.organization_id == organization_id
-        )
-    ).first()
+    survey = await run_in_threadpool(_get_organization_survey, db, organization_id, survey_id)
     
     if not survey:
         raise HTTPException(status_code=404, detail="调研不存在")
     
+    return await enqueue_and_wait(
+        ENTERPRISE_COMPARISON_AI_JOB,
+        {"survey_id": survey_id, "survey_title": survey.title, "comparison_data": comparison_data},
+        organization_id=organization_id,
+        wait_seconds=wait,
+    )
+
+
+@job_service.job_handler(ENTERPRISE_COMPARISON_AI_JOB)
+async def _enterprise_comparison_ai_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    survey_id = params["survey_id"]
+    survey_title = params["survey_title"]
     try:
         # 调用LLM服务生成企业对比分析
-        ai_analysis = await llm_service.generate_enterprise_comparison_analysis(comparison_data)
+        await job.progress(10, "AI 生成对比分析")
+        ai_analysis = await llm_service.generate_enterprise_comparison_analysis(params["comparison_data"])
         
         return {
             "survey_id": survey_id,
-            "survey_title": survey.title,
+            "survey_title": survey_title,
             "generated_at": datetime.now().isoformat(),
             "comparison_analysis": ai_analysis
         }
@@ -1047,7 +1229,7 @@ async def generate_enterprise_comparison_ai(
         # 返回友好的错误响应
         return {
             "survey_id": survey_id,
-            "survey_title": survey.title,
+            "survey_title": survey_title,
             "generated_at": datetime.now().isoformat(),
             "comparison_analysis": f"由于LLM服务暂时不可用，无法生成企业对比AI分析。错误信息：{str(e)}\n\n请检查LLM服务配置或稍后重试。"
         }
@@ -1056,7 +1238,7 @@ async def generate_enterprise_comparison_ai(
 # ===== 标签统计功能 =====
 
 @router.get("/organizations/{organization_id}/analytics/tags")
-async def get_organization_tag_analytics(
+def get_organization_tag_analytics(
     organization_id: int,
     db: Session = Depends(get_db)
 ):
@@ -1104,7 +1286,7 @@ async def get_organization_tag_analytics(
 
 
 @router.get("/organizations/{organization_id}/surveys/{survey_id}/analytics/tags")
-async def get_survey_tag_analytics(
+def get_survey_tag_analytics(
     organization_id: int,
     survey_id: int,
     db: Session = Depends(get_db)
@@ -1122,16 +1304,12 @@ async def get_survey_tag_analytics(
     if not survey:
         raise HTTPException(status_code=404, detail="调研不存在")
     
-    # 获取调研的所有问题
-    survey_questions = db.query(SurveyQuestion).filter(SurveyQuestion.survey_id == survey_id).all()
-    questions = []
-    for sq in survey_questions:
-        question = db.query(Question).filter(Question.id == sq.question_id).first()
-        if question:
-            questions.append(question)
+    # 获取调研的所有问题（联表查询并预加载标签）
+    questions = [question for question, _ in load_survey_questions(db, survey_id, with_tags=True)]
     
-    # 获取调研的所有回答
-    answers = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey_id).all()
+    # 获取调研的所有回答，每份答卷只解析一次
+    answers = db.query(SurveyAnswer.answers).filter(SurveyAnswer.survey_id == survey_id).all()
+    answers_data = _parse_answer_rows(answers)
     
     # 统计每个标签的数据
     tag_analytics = {}
@@ -1159,9 +1337,8 @@ async def get_survey_tag_analytics(
                 
                 # 统计该问题的回答
                 question_response_count = 0
-                for answer in answers:
+                for answer_data in answers_data:
                     try:
-                        answer_data = json.loads(answer.answers) if isinstance(answer.answers, str) else answer.answers
                         if str(question.id) in answer_data:
                             question_response_count += 1
                             response = answer_data[str(question.id)]
@@ -1221,7 +1398,7 @@ async def get_survey_tag_analytics(
 
 
 @router.get("/organizations/{organization_id}/analytics/tags/summary")
-async def get_organization_tag_summary(
+def get_organization_tag_summary(
     organization_id: int,
     db: Session = Depends(get_db)
 ):
@@ -1233,18 +1410,19 @@ async def get_organization_tag_summary(
     tag_summary = {}
     total_surveys = len(surveys)
     
+    # 一次性加载所有调研的题目（含标签）与回答，避免逐个调研、逐题查询
+    survey_ids = [survey.id for survey in surveys]
+    questions_by_survey = load_questions_for_surveys(db, survey_ids, with_tags=True)
+    answers_by_survey: Dict[int, List[Any]] = {}
+    if survey_ids:
+        answer_rows = db.query(SurveyAnswer.survey_id, SurveyAnswer.answers).filter(SurveyAnswer.survey_id.in_(survey_ids)).all()
+        for answer_survey_id, answer_json in answer_rows:
+            answers_by_survey.setdefault(answer_survey_id, []).append((answer_json,))
+    
     # 统计每个标签在所有调研中的表现
     for survey in surveys:
-        # 获取调研的所有问题
-        survey_questions = db.query(SurveyQuestion).filter(SurveyQuestion.survey_id == survey.id).all()
-        questions = []
-        for sq in survey_questions:
-            question = db.query(Question).filter(Question.id == sq.question_id).first()
-            if question:
-                questions.append(question)
-        
-        # 获取调研的所有回答
-        answers = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey.id).all()
+        questions = questions_by_survey.get(survey.id, [])
+        answers_data = _parse_answer_rows(answers_by_survey.get(survey.id, []))
         
         for question in questions:
             if question.tags:
@@ -1274,12 +1452,7 @@ async def get_organization_tag_summary(
                     question_max_score = 0
                     
                     # 获取问题选项和分值
-                    options = []
-                    if question.options:
-                        try:
-                            options = json.loads(question.options) if isinstance(question.options, str) else question.options
-                        except (json.JSONDecodeError, TypeError):
-                            options = []
+                    options = parse_options(question.options)
                     
                     # 计算最大可能分数
                     max_score_per_option = 0
@@ -1287,9 +1460,8 @@ async def get_organization_tag_summary(
                         if isinstance(option, dict) and "score" in option:
                             max_score_per_option = max(max_score_per_option, option["score"])
                     
-                    for answer in answers:
+                    for answer_data in answers_data:
                         try:
-                            answer_data = json.loads(answer.answers) if isinstance(answer.answers, str) else answer.answers
                             if str(question.id) in answer_data:
                                 response = answer_data[str(question.id)]
                                 question_responses += 1
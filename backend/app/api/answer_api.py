@@ -1,6 +1,7 @@
 # backend/app/api/answer_api.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional, cast
 import json
@@ -8,6 +9,7 @@ import json
 from app import crud, schemas, models
 from app.api.deps import get_db, get_survey_by_id_and_owner
 from app.security import get_current_user, get_current_user_optional
+from app.services import answer_ingest_service
 from fastapi.security import HTTPBearer
 from fastapi import Header
 
@@ -20,7 +22,7 @@ router = APIRouter() # 路由前缀将在 main.py 中定义
     status_code=status.HTTP_201_CREATED,
     summary="Submit an answer to a survey (anonymous allowed)"
 )
-async def submit_survey_answer(
+def submit_survey_answer(
     survey_id: int,
     answer_in: schemas.SurveyAnswerCreate, # 使用 answer_in 避免与 crud 函数的 answer 参数混淆
     db: Session = Depends(get_db),
@@ -37,7 +39,7 @@ async def submit_survey_answer(
             if payload:
                 username = payload.get("sub")
                 if username:
-                    current_user = user_service.get_user_by_username(db, username=username)
+                    current_user = user_service.get_user_snapshot(db, username=username)
         except Exception:
             pass  # 忽略认证错误，允许匿名访问
     # 检查问卷是否存在
@@ -86,13 +88,73 @@ async def submit_survey_answer(
     db_answer.answers = json.loads(cast(str, db_answer.answers))
     return db_answer
 
+def _can_ingest_answers(db: Session, survey: models.Survey, user) -> bool:
+    """批量导入权限：问卷创建者，或问卷所属组织的所有者/成员"""
+    if survey.created_by_user_id == user.id:
+        return True
+    if not survey.organization_id:
+        return False
+    organization = crud.get_organization(db, org_id=survey.organization_id)
+    if organization and organization.owner_id == user.id:
+        return True
+    return crud.get_organization_member_by_org_and_user(db, organization_id=survey.organization_id, user_id=user.id) is not None
+
+
+def _ingest_answers(db: Session, survey_id: int, rows: list, current_user, all_or_nothing: bool):
+    db_survey = crud.get_survey(db, survey_id=survey_id)
+    if not db_survey:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Survey not found")
+    if not _can_ingest_answers(db, db_survey, current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to import answers for this survey")
+    return answer_ingest_service.ingest_survey_answers(
+        db,
+        db_survey,
+        rows,
+        default_organization_id=current_user.organization_id,
+        all_or_nothing=all_or_nothing
+    )
+
+
+# 批量提交问卷回答（纸质录入 / 离线终端回传）
+@router.post(
+    "/surveys/{survey_id}/answers/batch",
+    response_model=schemas.SurveyAnswerBatchResponse,
+    summary="Bulk import answers for a survey (JSON array or NDJSON)"
+)
+async def submit_survey_answers_batch(
+    survey_id: int,
+    request: Request,
+    all_or_nothing: bool = Query(False, description="任一行校验失败时整批不写入"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    批量导入答卷
+    - 请求体为 SurveyAnswerCreate 数组（application/json），或每行一个对象（application/x-ndjson）
+    - 每行独立校验，返回逐行结果；合法答卷在同一事务内写入
+    - 导入的答卷视为匿名答卷（不关联导入人），填写了 respondent_name 时登记参与者
+    """
+    try:
+        rows = answer_ingest_service.parse_batch_body(await request.body(), request.headers.get("content-type"))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No answers submitted")
+    if len(rows) > answer_ingest_service.BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {answer_ingest_service.BATCH_MAX_ROWS} answers per request"
+        )
+    # 数据库操作放到线程池执行，避免阻塞事件循环
+    return await run_in_threadpool(_ingest_answers, db, survey_id, rows, current_user, all_or_nothing)
+
 # 获取某个问卷的所有回答 (只有问卷所有者可以查看)
 @router.get(
     "/surveys/{survey_id}/answers/",
     response_model=List[schemas.SurveyAnswerResponse],
     summary="Get all answers for a specific survey (owner only)"
 )
-async def get_survey_answers(
+def get_survey_answers(
     survey_id: int,
     db: Session = Depends(get_db),
     survey: models.Survey = Depends(get_survey_by_id_and_owner), # 这个依赖会处理 404 和 403
@@ -111,7 +173,7 @@ async def get_survey_answers(
     response_model=schemas.SurveyAnswerResponse,
     summary="Get a single survey answer by ID (owner or submitter only)"
 )
-async def get_single_survey_answer(
+def get_single_survey_answer(
     answer_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user) # 确保用户已登录
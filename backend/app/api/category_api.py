@@ -11,10 +11,11 @@ from app.schemas.category import (
     CategoryTreeResponse, CategoryMoveRequest, CategoryBulkUpdateRequest
 )
 from app.crud import (
-    get_category, get_categories, get_category_tree, create_category,
+    get_category, get_categories, create_category,
     update_category, delete_category, get_category_question_count,
     move_category, get_category_children
 )
+from app.services import category_service
 from app.api.deps import get_current_active_user
 from app.models.organization_member import OrganizationMember
 
@@ -38,7 +39,7 @@ def has_organization_manage_access(db: Session, user_id: int, organization_id: i
     return member is not None
 
 @router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories_list(
+def get_categories_list(
     organization_id: Optional[int] = Query(None, description="组织ID，为空表示获取全局分类"),
     skip: int = Query(0, ge=0, description="跳过的记录数"),
     limit: int = Query(100, ge=1, le=1000, description="返回的最大记录数"),
@@ -52,10 +53,11 @@ async def get_categories_list(
     
     categories = get_categories(db, organization_id, skip, limit)
     
-    # 为每个分类添加题目数量
+    # 为每个分类添加题目数量（一次分组查询）
+    question_counts = category_service.get_category_question_counts(db, [category.id for category in categories])
     result = []
     for category in categories:
-        question_count = get_category_question_count(db, category.id)
+        question_count = question_counts.get(category.id, 0)
         category_dict = {
             "id": category.id,
             "name": category.name,
@@ -78,43 +80,23 @@ async def get_categories_list(
     return result
 
 @router.get("/categories/tree", response_model=List[CategoryTreeResponse])
-async def get_categories_tree(
+def get_categories_tree(
     organization_id: Optional[int] = Query(None, description="组织ID，为空表示获取全局分类树"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """获取分类树结构"""
+    """
+    获取分类树结构
+    每个节点包含本分类题目数 question_count 与含子分类的 subtree_question_count，结果按组织缓存
+    """
     # 如果指定了组织ID，检查权限
     if organization_id and not has_organization_access(db, current_user.id, organization_id):
         raise HTTPException(status_code=403, detail="没有访问权限")
     
-    def build_tree(categories, parent_id=None):
-        """递归构建分类树"""
-        tree = []
-        for category in categories:
-            if category.parent_id == parent_id:
-                children = build_tree(categories, category.id)
-                question_count = get_category_question_count(db, category.id)
-                
-                tree.append(CategoryTreeResponse(
-                    id=category.id,
-                    name=category.name,
-                    description=category.description,
-                    level=category.level,
-                    path=category.path,
-                    sort_order=category.sort_order,
-                    is_active=category.is_active,
-                    question_count=question_count,
-                    children=children
-                ))
-        return sorted(tree, key=lambda x: x.sort_order)
-    
-    # 获取所有分类
-    all_categories = get_categories(db, organization_id, skip=0, limit=1000)
-    return build_tree(all_categories)
+    return category_service.load_category_tree(db, organization_id)
 
 @router.get("/categories/{category_id}", response_model=CategoryResponse)
-async def get_category_detail(
+def get_category_detail(
     category_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -130,9 +112,10 @@ async def get_category_detail(
     
     # 获取子分类
     children = get_category_children(db, category_id)
+    question_counts = category_service.get_category_question_counts(db, [category_id] + [child.id for child in children])
     children_data = []
     for child in children:
-        question_count = get_category_question_count(db, child.id)
+        question_count = question_counts.get(child.id, 0)
         children_data.append(CategoryResponse(
             id=child.id,
             name=child.name,
@@ -152,7 +135,7 @@ async def get_category_detail(
         ))
     
     # 获取题目数量
-    question_count = get_category_question_count(db, category_id)
+    question_count = question_counts.get(category_id, 0)
     
     return CategoryResponse(
         id=category.id,
@@ -173,7 +156,7 @@ async def get_category_detail(
     )
 
 @router.post("/categories", response_model=CategoryResponse)
-async def create_new_category(
+def create_new_category(
     category: CategoryCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -217,7 +200,7 @@ async def create_new_category(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/categories/{category_id}", response_model=CategoryResponse)
-async def update_category_info(
+def update_category_info(
     category_id: int,
     category_update: CategoryUpdate,
     db: Session = Depends(get_db),
@@ -274,7 +257,7 @@ async def update_category_info(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/categories/{category_id}")
-async def delete_category_by_id(
+def delete_category_by_id(
     category_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -300,7 +283,7 @@ async def delete_category_by_id(
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 @router.post("/categories/{category_id}/move")
-async def move_category_to_parent(
+def move_category_to_parent(
     category_id: int,
     move_request: CategoryMoveRequest,
     db: Session = Depends(get_db),
@@ -335,7 +318,7 @@ async def move_category_to_parent(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/categories/{category_id}/children", response_model=List[CategoryResponse])
-async def get_category_children_list(
+def get_category_children_list(
     category_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -350,10 +333,11 @@ async def get_category_children_list(
         raise HTTPException(status_code=403, detail="没有访问权限")
     
     children = get_category_children(db, category_id)
+    question_counts = category_service.get_category_question_counts(db, [child.id for child in children])
     
     result = []
     for child in children:
-        question_count = get_category_question_count(db, child.id)
+        question_count = question_counts.get(child.id, 0)
         result.append(CategoryResponse(
             id=child.id,
             name=child.name,
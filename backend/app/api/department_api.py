@@ -10,6 +10,7 @@ from app.models.user import User
 from app.models.organization_member import OrganizationMember
 from app.schemas.department import DepartmentCreate, DepartmentUpdate, DepartmentResponse
 from app.api.deps import get_current_user
+from app.services import department_service
 
 router = APIRouter()
 
@@ -58,7 +59,7 @@ def get_public_department_tree(
     org_id: int,
     db: Session = Depends(get_db),
 ):
-    """获取公开的组织部门树结构（无需认证）"""
+    """获取公开的组织部门树结构（无需认证），按组织缓存"""
     org = db.query(Organization).filter(Organization.id == org_id).first()
     if not org:
         raise HTTPException(
@@ -66,13 +67,7 @@ def get_public_department_tree(
             detail="组织不存在"
         )
 
-    root_departments = db.query(Department).filter(
-        Department.organization_id == org_id,
-        Department.parent_id == None,
-        Department.is_active == True
-    ).all()
-
-    return build_department_tree(root_departments, db)
+    return department_service.load_department_tree(db, org_id)
 
 @router.get("/organizations/{org_id}/departments/tree", response_model=List[DepartmentResponse])
 def get_department_tree(
@@ -88,14 +83,7 @@ def get_department_tree(
             detail="没有权限访问该组织"
         )
     
-    # 获取顶级部门
-    root_departments = db.query(Department).filter(
-        Department.organization_id == org_id,
-        Department.parent_id == None,
-        Department.is_active == True
-    ).all()
-    
-    return build_department_tree(root_departments, db)
+    return department_service.load_department_tree(db, org_id)
 
 @router.post("/organizations/{org_id}/departments", response_model=DepartmentResponse)
 def create_department(
@@ -124,8 +112,8 @@ def create_department(
         dept_count += 1
         new_code = f"{dept_count + 1:03d}"
     
-    # 计算部门层级
-    level = 1
+    # 计算部门层级和路径
+    parent = None
     if department.parent_id:
         parent = db.query(Department).filter(
             Department.id == department.parent_id,
@@ -136,7 +124,7 @@ def create_department(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="上级部门不存在"
             )
-        level = parent.level + 1
+    level, path = department_service.placement_under(parent)
     
     new_department = Department(
         name=department.name,
@@ -144,12 +132,14 @@ def create_department(
         description=department.description,
         organization_id=org_id,
         parent_id=department.parent_id,
-        level=level
+        level=level,
+        path=path
     )
     
     db.add(new_department)
     db.commit()
     db.refresh(new_department)
+    department_service.invalidate_department_tree(org_id)
     
     return new_department
 
@@ -184,11 +174,32 @@ def update_department(
     if 'code' in update_data:
         del update_data['code']
 
+    # 调整上级部门：同步更新自身及全部下级部门的层级和路径
+    if 'parent_id' in update_data:
+        parent_id = update_data.pop('parent_id')
+        if parent_id != dept.parent_id:
+            parent = None
+            if parent_id:
+                parent = db.query(Department).filter(
+                    Department.id == parent_id,
+                    Department.organization_id == dept.organization_id
+                ).first()
+                if not parent:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="上级部门不存在"
+                    )
+            try:
+                department_service.move_department(db, dept, parent)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     for field, value in update_data.items():
         setattr(dept, field, value)
     
     db.commit()
     db.refresh(dept)
+    department_service.invalidate_department_tree(dept.organization_id)
     
     return dept
 
@@ -213,8 +224,10 @@ def delete_department(
             detail="没有权限管理该组织"
         )
     
-    # 软删除部门及其子部门
-    delete_department_recursive(dept_id, db)
+    # 软删除部门及其子部门（一条 UPDATE）
+    department_service.deactivate_subtree(db, dept)
+    db.commit()
+    department_service.invalidate_department_tree(dept.organization_id)
     
     return {"message": "部门删除成功"}
 
@@ -248,49 +261,3 @@ def has_organization_manage_access(db: Session, user: User, org_id: int) -> bool
     ).first()
     
     return member is not None
-
-def build_department_tree(departments: List[Department], db: Session) -> List[Department]:
-    """构建部门树结构"""
-    result = []
-    for dept in departments:
-        dept_dict = {
-            "id": dept.id,
-            "name": dept.name,
-            "code": dept.code,
-            "description": dept.description,
-            "level": dept.level,
-            "parent_id": dept.parent_id,
-            "organization_id": dept.organization_id,
-            "is_active": dept.is_active,
-            "created_at": dept.created_at,
-            "updated_at": dept.updated_at,
-            "children": []
-        }
-        
-        # 获取子部门
-        children = db.query(Department).filter(
-            Department.parent_id == dept.id,
-            Department.is_active == True
-        ).all()
-        
-        if children:
-            dept_dict["children"] = build_department_tree(children, db)
-        
-        result.append(dept_dict)
-    
-    return result
-
-def delete_department_recursive(dept_id: int, db: Session):
-    """递归删除部门及其子部门"""
-    # 获取子部门
-    children = db.query(Department).filter(Department.parent_id == dept_id).all()
-    
-    # 递归删除子部门
-    for child in children:
-        delete_department_recursive(child.id, db)
-    
-    # 软删除当前部门
-    dept = db.query(Department).filter(Department.id == dept_id).first()
-    if dept:
-        dept.is_active = False
-        db.commit()
@@ -3,11 +3,12 @@
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
 from app import crud, models, schemas
+from app.config import settings
 from app.database import get_db
 from sqlalchemy.orm import Session
 from app.security import get_current_user
 
-async def get_survey_by_id_and_owner(
+def get_survey_by_id_and_owner(
     survey_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
@@ -19,7 +20,7 @@ async def get_survey_by_id_and_owner(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this survey's answers")
     return db_survey
 
-async def get_current_active_user(
+def get_current_active_user(
     current_user: models.User = Depends(get_current_user),
 ) -> models.User:
     """
@@ -31,15 +32,23 @@ async def get_current_active_user(
     return current_user
 
 # --- 新增：获取当前活跃的超级用户 (系统管理员) ---
-async def get_current_active_superuser(
+def is_system_admin(user) -> bool:
+    """
+    用户名在 SYSTEM_ADMIN_USERNAMES 中。
+    用户的 role 字段可在注册和 /users/me 中自行填写，不能作为管理员依据。
+    """
+    usernames = {name.strip() for name in settings.SYSTEM_ADMIN_USERNAMES.split(",") if name.strip()}
+    return getattr(user, "username", None) in usernames
+
+
+def get_current_active_superuser(
     current_user: models.User = Depends(get_current_user),
 ) -> models.User:
     """
-    获取当前活跃的超级用户（系统管理员）。
+    获取当前活跃的超级用户（系统管理员），其他用户返回 403。
     """
-    # 暂时跳过is_superuser检查，因为可能没有这个属性
-    # if not current_user.is_superuser:
-    #     raise HTTPException(
-    #         status_code=status.HTTP_400_BAD_REQUEST, detail="用户权限不足，需要超级用户权限"
-    #     )
-    return current_user
\ No newline at end of file
+    if not is_system_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="用户权限不足，需要系统管理员权限"
+        )
+    return current_user
@@ -0,0 +1,111 @@
+# backend/app/api/job_api.py
+"""
+后台 AI 任务的查询、取消、结果与进度推送（SSE）接口，
+以及供各 AI 接口使用的“提交并短暂等待”封装
+"""
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+from app.services import job_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"],
+)
+
+API_PREFIX = "/api/v1"
+
+
+def job_links(job_id: str) -> Dict[str, str]:
+    base = f"{API_PREFIX}/jobs/{job_id}"
+    return {
+        "status_url": base,
+        "result_url": f"{base}/result",
+        "events_url": f"{base}/events",
+        "cancel_url": f"{base}/cancel",
+    }
+
+
+async def enqueue_and_wait(
+    kind: str,
+    params: Dict[str, Any],
+    organization_id: Optional[int] = None,
+    wait_seconds: Optional[float] = None,
+    failure_status: int = status.HTTP_502_BAD_GATEWAY,
+    failure_prefix: str = "AI服务暂时不可用"
+):
+    """
+    提交后台任务并最多等待 wait_seconds 秒（默认 AI_JOB_WAIT_SECONDS）：
+    - 期间完成：直接返回任务结果，与同步调用时的响应一致
+    - 期间失败：按 failure_status 返回错误
+    - 仍在执行：返回 202 和任务地址，客户端轮询 status_url 或订阅 events_url，完成后读取 result_url
+    """
+    job = await job_service.submit_job(kind, params, organization_id)
+    wait = settings.AI_JOB_WAIT_SECONDS if wait_seconds is None else wait_seconds
+    if wait > 0:
+        job = await job_service.wait_for_job(job["id"], wait)
+
+    if job["status"] == job_service.JOB_SUCCEEDED:
+        _, result = await run_in_threadpool(job_service.get_job_result, job["id"])
+        return result
+    if job["status"] == job_service.JOB_FAILED:
+        raise HTTPException(status_code=failure_status, detail=f"{failure_prefix}: {job['error']}")
+    if job["status"] == job_service.JOB_CANCELLED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="任务已取消")
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=jsonable_encoder({"job_id": job["id"], **job, **job_links(job["id"])}),
+    )
+
+
+@router.get("/{job_id}")
+def get_job_status(job_id: str):
+    """查询任务状态与进度"""
+    job = job_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {**job, **job_links(job_id)}
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    """获取已完成任务的结果；任务未成功完成时返回 409 与当前状态"""
+    job, result = job_service.get_job_result(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if job["status"] != job_service.JOB_SUCCEEDED:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "任务尚未成功完成", "status": job["status"], "error": job["error"]},
+        )
+    return result
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """取消排队中或执行中的任务"""
+    job = await job_service.cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {**job, **job_links(job_id)}
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """以 Server-Sent Events 推送任务进度，任务结束后关闭连接"""
+    job = await run_in_threadpool(job_service.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return StreamingResponse(
+        job_service.stream_job_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
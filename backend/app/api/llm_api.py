@@ -2,14 +2,17 @@
 """
 LLM 相关的 API 端点。
 """
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import logging
 from datetime import datetime
 
 # 导入我们的服务
-from ..services import llm_service
+from ..services import job_service, llm_cache_service, llm_gateway, llm_service
+from ..services.job_service import format_sse
+from .job_api import enqueue_and_wait
 
 logger = logging.getLogger(__name__)
 
@@ -61,40 +64,102 @@ router = APIRouter(
     tags=["LLM"],
 )
 
+# 后台任务类型
+GENERATE_QUESTIONS_JOB = "llm_generate_questions"
+SUMMARIZE_ANSWERS_JOB = "llm_summarize_answers"
+SURVEY_SUMMARY_JOB = "llm_survey_summary"
+QUESTION_INSIGHTS_JOB = "llm_question_insights"
+
+JOB_WAIT_QUERY = Query(
+    None, ge=0, le=55,
+    description="最多等待的秒数（默认 AI_JOB_WAIT_SECONDS）；超时返回 202 与任务地址，可轮询或订阅 SSE 获取进度"
+)
+
+
+def _job_response(result, response_model):
+    """任务已完成时按响应模型返回结果，否则原样返回 202 响应"""
+    if isinstance(result, JSONResponse):
+        return result
+    return response_model(**result)
+
+def _stream_response(run, response_model, success_message: str) -> StreamingResponse:
+    """
+    以 Server-Sent Events 流式返回生成过程：
+    start 事件立即发送；token 事件逐段转发模型输出；result 事件为与非流式接口结构相同的最终结果；出错时发送 error 事件
+    """
+    async def events():
+        yield format_sse("start", {"started_at": datetime.now().isoformat()})
+        try:
+            async for kind, value in llm_service.stream_generation(run):
+                if kind == "token":
+                    yield format_sse("token", {"text": value})
+                else:
+                    value["processing_status"] = {
+                        "success": True,
+                        "message": success_message,
+                        "processing_time": datetime.now().isoformat()
+                    }
+                    yield format_sse("result", response_model(**value).model_dump())
+        except Exception as e:
+            logger.exception(f"流式生成失败: {e}")
+            yield format_sse("error", {"detail": str(e), "error_type": type(e).__name__})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # --- 定义 API 端点 ---
 
 @router.post("/generate_questions", response_model=GenerateQuestionsResponse)
-async def generate_questions(request: GenerateQuestionsRequest):
+async def generate_questions(request: GenerateQuestionsRequest, wait: Optional[float] = JOB_WAIT_QUERY):
     """
-    根据主题自动生成问卷问题。
+    根据主题自动生成问卷问题（在后台任务中生成）。
     """
     logger.info(f"收到生成问题请求: 主题='{request.topic}', 数量={request.num_questions}")
-    try:
-        questions = await llm_service.generate_questions(request.topic, request.num_questions)
-        return GenerateQuestionsResponse(questions=questions)
-    except Exception as e:
-        logger.error(f"生成问题失败: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    result = await enqueue_and_wait(
+        GENERATE_QUESTIONS_JOB, request.model_dump(), wait_seconds=wait,
+        failure_status=status.HTTP_500_INTERNAL_SERVER_ERROR, failure_prefix="生成问题失败",
+    )
+    return _job_response(result, GenerateQuestionsResponse)
+
+
+@job_service.job_handler(GENERATE_QUESTIONS_JOB)
+async def _generate_questions_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    request = GenerateQuestionsRequest(**params)
+    await job.progress(10, "AI 生成问题")
+    questions = await llm_service.generate_questions(request.topic, request.num_questions)
+    return {"questions": questions}
 
 
 @router.post("/summarize_answers", response_model=SummarizeAnswersResponse)
-async def summarize_answers(request: SummarizeAnswersRequest):
+async def summarize_answers(request: SummarizeAnswersRequest, wait: Optional[float] = JOB_WAIT_QUERY):
     """
-    对问卷问题的回答进行 LLM 总结。
+    对问卷问题的回答进行 LLM 总结（在后台任务中生成）。
     """
     logger.info(f"收到总结回答请求: 问题='{request.question_text[:30]}...'")
-    try:
-        summary = await llm_service.summarize_answers(request.question_text, request.answers)
-        return SummarizeAnswersResponse(question_text=request.question_text, summary=summary)
-    except Exception as e:
-        logger.error(f"总结回答失败: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    result = await enqueue_and_wait(
+        SUMMARIZE_ANSWERS_JOB, request.model_dump(), wait_seconds=wait,
+        failure_status=status.HTTP_500_INTERNAL_SERVER_ERROR, failure_prefix="总结回答失败",
+    )
+    return _job_response(result, SummarizeAnswersResponse)
 
-@router.post("/generate_survey_summary", response_model=SurveySummaryResponse)
-async def generate_survey_summary(request: SurveySummaryRequest):
-    """
-    生成调研的智能总结报告。
-    """
+
+@job_service.job_handler(SUMMARIZE_ANSWERS_JOB)
+async def _summarize_answers_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    request = SummarizeAnswersRequest(**params)
+    await job.progress(10, "AI 总结回答")
+
+    async def on_progress(done: int, total: int) -> None:
+        await job.progress(10 + 80 * done // total, f"已总结 {done}/{total} 批回答")
+
+    summary = await llm_service.summarize_answers(request.question_text, request.answers, on_progress=on_progress)
+    return {"question_text": request.question_text, "summary": summary}
+
+
+def _validate_survey_summary_request(request: SurveySummaryRequest) -> None:
+    """校验调研总结请求，数据不足时返回 400"""
     survey_title = request.survey_data.get('survey_title', '未知调研')
     logger.info(f"收到生成调研总结请求: 调研='{survey_title}'")
     
@@ -112,6 +177,49 @@ async def generate_survey_summary(request: SurveySummaryRequest):
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="没有问题分析数据，无法生成总结报告"
         )
+
+
+def _validate_question_insights_request(request: QuestionInsightsRequest) -> None:
+    """校验问题洞察请求，缺少问题文本时返回 400"""
+    question_text = request.question_data.get('question_text', '未知问题')
+    question_id = request.question_data.get('question_id', '未知ID')
+    logger.info(f"收到生成问题洞察请求: 问题ID={question_id}, 问题='{question_text[:30]}...'")
+    
+    # 验证请求数据
+    if not request.question_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="请求数据不能为空"
+        )
+    
+    if not question_text:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="问题文本不能为空"
+        )
+    
+    # 检查回答分布数据
+    response_dist = request.question_data.get('response_distribution', {})
+    if not response_dist or not isinstance(response_dist, dict):
+        logger.warning(f"问题 {question_id} 没有有效的回答分布数据")
+
+
+@router.post("/generate_survey_summary", response_model=SurveySummaryResponse)
+async def generate_survey_summary(request: SurveySummaryRequest, wait: Optional[float] = JOB_WAIT_QUERY):
+    """
+    生成调研的智能总结报告（在后台任务中生成）。
+    """
+    _validate_survey_summary_request(request)
+    result = await enqueue_and_wait(SURVEY_SUMMARY_JOB, request.model_dump(), wait_seconds=wait)
+    return _job_response(result, SurveySummaryResponse)
+
+
+@job_service.job_handler(SURVEY_SUMMARY_JOB)
+async def _survey_summary_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    request = SurveySummaryRequest(**params)
+    survey_title = request.survey_data.get('survey_title', '未知调研')
+    question_analytics = request.survey_data.get('question_analytics', [])
+    await job.progress(10, "AI 生成总结")
     
     try:
         summary_data = await llm_service.generate_survey_summary(request.survey_data)
@@ -127,7 +235,7 @@ async def generate_survey_summary(request: SurveySummaryRequest):
             "processing_time": datetime.now().isoformat()
         }
         
-        return SurveySummaryResponse(**summary_data)
+        return SurveySummaryResponse(**summary_data).model_dump()
         
     except Exception as e:
         logger.error(f"生成调研总结失败: {e}")
@@ -190,34 +298,25 @@ async def generate_survey_summary(request: SurveySummaryRequest):
             }
         }
         
-        return SurveySummaryResponse(**error_response_data)
+        return SurveySummaryResponse(**error_response_data).model_dump()
 
 @router.post("/generate_question_insights", response_model=QuestionInsightsResponse)
-async def generate_question_insights(request: QuestionInsightsRequest):
+async def generate_question_insights(request: QuestionInsightsRequest, wait: Optional[float] = JOB_WAIT_QUERY):
     """
-    生成单个问题的深度洞察分析。
+    生成单个问题的深度洞察分析（在后台任务中生成）。
     """
+    _validate_question_insights_request(request)
+    result = await enqueue_and_wait(QUESTION_INSIGHTS_JOB, request.model_dump(), wait_seconds=wait)
+    return _job_response(result, QuestionInsightsResponse)
+
+
+@job_service.job_handler(QUESTION_INSIGHTS_JOB)
+async def _question_insights_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    request = QuestionInsightsRequest(**params)
     question_text = request.question_data.get('question_text', '未知问题')
     question_id = request.question_data.get('question_id', '未知ID')
-    logger.info(f"收到生成问题洞察请求: 问题ID={question_id}, 问题='{question_text[:30]}...'")
-    
-    # 验证请求数据
-    if not request.question_data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="请求数据不能为空"
-        )
-    
-    if not question_text:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="问题文本不能为空"
-        )
-    
-    # 检查回答分布数据
     response_dist = request.question_data.get('response_distribution', {})
-    if not response_dist or not isinstance(response_dist, dict):
-        logger.warning(f"问题 {question_id} 没有有效的回答分布数据")
+    await job.progress(10, "AI 生成洞察")
     
     try:
         insights_data = await llm_service.generate_question_insights(request.question_data)
@@ -233,7 +332,7 @@ async def generate_question_insights(request: QuestionInsightsRequest):
             "processing_time": datetime.now().isoformat()
         }
         
-        return QuestionInsightsResponse(**insights_data)
+        return QuestionInsightsResponse(**insights_data).model_dump()
         
     except Exception as e:
         logger.error(f"生成问题洞察失败: {e}")
@@ -315,5 +414,46 @@ async def generate_question_insights(request: QuestionInsightsRequest):
         
         error_response_data["insights"] += "\n".join(f"- {analysis}" for analysis in basic_analysis)
         
-        return QuestionInsightsResponse(**error_response_data)
+        return QuestionInsightsResponse(**error_response_data).model_dump()
+
+
+@router.post("/generate_survey_summary/stream")
+async def stream_survey_summary(request: SurveySummaryRequest):
+    """
+    流式生成调研的智能总结报告（Server-Sent Events），模型输出到达即转发。
+    """
+    _validate_survey_summary_request(request)
+    return _stream_response(
+        lambda complete: llm_service.generate_survey_summary(request.survey_data, completion=complete),
+        SurveySummaryResponse,
+        "总结生成成功",
+    )
 
+
+@router.post("/generate_question_insights/stream")
+async def stream_question_insights(request: QuestionInsightsRequest):
+    """
+    流式生成单个问题的深度洞察分析（Server-Sent Events），模型输出到达即转发。
+    """
+    _validate_question_insights_request(request)
+    return _stream_response(
+        lambda complete: llm_service.generate_question_insights(request.question_data, completion=complete),
+        QuestionInsightsResponse,
+        "洞察分析生成成功",
+    )
+
+
+@router.get("/cache/stats")
+def get_llm_cache_stats():
+    """
+    LLM 结果缓存统计：本进程的命中/未命中/写入/淘汰次数与命中率，以及缓存表中现存条目数。
+    """
+    return llm_cache_service.get_cache_stats()
+
+
+@router.get("/gateway/stats")
+def get_llm_gateway_stats():
+    """
+    LLM 上游访问统计：本进程发出的上游请求数、合并的重复请求数、排队次数、熔断跳过次数与熔断器状态。
+    """
+    return llm_gateway.get_gateway_stats()
@@ -13,7 +13,7 @@ router = APIRouter()
 # --- 组织 (Organization) 相关 API ---
 
 @router.post("/organizations/", response_model=schemas.OrganizationResponse, status_code=status.HTTP_201_CREATED)
-async def create_organization(
+def create_organization(
     org_in: schemas.OrganizationCreate,
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -91,9 +91,10 @@ def read_organizations_with_active_surveys(
     """
     from app.models.survey import Survey as SurveyModel
     from app.models.organization import Organization as OrgModel
+    from app.services.survey_service import survey_status_expression
     active_org_ids = (
         db.query(SurveyModel.organization_id)
-        .filter(SurveyModel.status == 'active', SurveyModel.organization_id.isnot(None))
+        .filter(survey_status_expression() == 'active', SurveyModel.organization_id.isnot(None))
         .distinct()
         .all()
     )
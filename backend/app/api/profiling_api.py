@@ -0,0 +1,43 @@
+# backend/app/api/profiling_api.py
+"""
+慢请求调用栈采样文件的查看与下载（仅管理员），采样逻辑见 app/profiling.py
+"""
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from app import profiling
+from app.api.deps import get_current_active_superuser
+from app.config import settings
+from app.models.user import User as UserModel
+
+router = APIRouter(
+    prefix="/admin/profiles",
+    tags=["Profiling"],
+)
+
+
+@router.get("/")
+def list_profiles(current_user: UserModel = Depends(get_current_active_superuser)) -> Dict[str, Any]:
+    """
+    列出已保存的调用栈采样文件（最新的在前）及当前采样配置
+    """
+    profiles: List[Dict[str, Any]] = profiling.list_profiles()
+    return {
+        "enabled": settings.PROFILING_ENABLED,
+        "slow_request_seconds": settings.PROFILING_SLOW_REQUEST_SECONDS,
+        "max_files": settings.PROFILING_MAX_FILES,
+        "profiles": profiles,
+    }
+
+
+@router.get("/{name}")
+def download_profile(name: str, current_user: UserModel = Depends(get_current_active_superuser)):
+    """
+    下载折叠栈格式的采样文件，可用 flamegraph.pl 或 speedscope 生成火焰图
+    """
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="采样文件不存在")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
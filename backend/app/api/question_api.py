@@ -264,8 +264,9 @@ def read_organization_questions(
     skip: int = 0,
     limit: int = 100,
     type: Optional[str] = Query(None, description="按题目类型筛选 (single, multiple, text)"),
-    search: Optional[str] = Query(None, description="搜索关键词，在题目文本中搜索"),
-    sort_by: Optional[str] = Query(None, description="排序方式 (created_desc, created_asc, usage_desc, usage_asc)"),
+    search: Optional[str] = Query(None, description="搜索关键词，在题目文本中搜索；多个词用空格分隔，需全部命中，结果附带 highlight"),
+    sort_by: Optional[str] = Query(None, description="排序方式 (created_desc, created_asc, usage_desc, usage_asc, relevance)；带搜索词时默认 relevance"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor；传入时按游标翻页并忽略 skip"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
@@ -287,7 +288,10 @@ def read_organization_questions(
     if not has_organization_access(db, current_user, org_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="没有权限访问该组织")
     
-    result = crud.get_organization_questions(db, org_id=org_id, skip=skip, limit=limit, type_filter=type, search_filter=search, sort_by=sort_by)
+    try:
+        result = crud.get_organization_questions(db, org_id=org_id, skip=skip, limit=limit, type_filter=type, search_filter=search, sort_by=sort_by, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     return result
 
 @router.get("/questions/", response_model=QuestionListResponse)
@@ -295,10 +299,11 @@ def read_global_questions(
     skip: int = 0,
     limit: int = 100,
     type: Optional[str] = Query(None, description="按题目类型筛选 (single_choice/multi_choice/text_input/number_input，也兼容 single/multiple/text/number)"),
-    search: Optional[str] = Query(None, description="搜索关键词，在题目文本中搜索"),
-    sort_by: Optional[str] = Query(None, description="排序方式 (created_desc, created_asc, usage_desc, usage_asc)"),
+    search: Optional[str] = Query(None, description="搜索关键词，在题目文本中搜索；多个词用空格分隔，需全部命中，结果附带 highlight"),
+    sort_by: Optional[str] = Query(None, description="排序方式 (created_desc, created_asc, usage_desc, usage_asc, relevance)；带搜索词时默认 relevance"),
     category_id: Optional[int] = Query(None, description="按分类ID筛选"),
     tags: Optional[str] = Query(None, description="按标签筛选，多个标签用逗号分隔"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor；传入时按游标翻页并忽略 skip"),
     db: Session = Depends(get_db)
 ):
     """
@@ -334,7 +339,10 @@ def read_global_questions(
     if type in type_alias_map:
         type = type_alias_map[type]
     
-    result = crud.get_global_questions(db, skip=skip, limit=limit, type_filter=type, search_filter=search, sort_by=sort_by, category_filter=category_id, tag_filter=tag_filter)
+    try:
+        result = crud.get_global_questions(db, skip=skip, limit=limit, type_filter=type, search_filter=search, sort_by=sort_by, category_filter=category_id, tag_filter=tag_filter, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     return result
 
 def has_organization_access(db: Session, user: models.User, org_id: int) -> bool:
@@ -1,20 +1,21 @@
 # backend/app/api/survey_api.py
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Optional, cast
+from typing import Any, Dict, List, Optional, cast
 
-from app.api.deps import get_db
+from app.api.deps import get_current_active_superuser, get_db
+from app.api.job_api import enqueue_and_wait
+from app.database import SessionLocal
 from app.schemas.survey import SurveyCreate, SurveyUpdate, SurveyResponse, SurveyStatusUpdate, SubjectiveAnswerDetail
 from app import crud
 from app.security import get_current_user
-from app.services import survey_service
+from app.services import job_service, survey_service
 from app.models.user import User as UserModel
 from app.models.survey import Survey as SurveyModel
-from app.models.answer import SurveyAnswer
 from app.models.question import Question
-from app.models.survey_question import SurveyQuestion
 from app.models.department import Department
 
 router = APIRouter(
@@ -22,6 +23,9 @@ router = APIRouter(
     tags=["Surveys"]
 )
 
+# 后台任务类型
+RECONCILE_SURVEY_COUNTS_JOB = "reconcile_survey_counts"
+
 @router.post("/", response_model=SurveyResponse, status_code=status.HTTP_201_CREATED)
 def create_survey(
     survey: SurveyCreate,
@@ -42,7 +46,7 @@ def get_dashboard_stats(
     department_count = db.query(func.count(Department.id)).scalar() or 0
     question_count = db.query(func.count(Question.id)).scalar() or 0
     survey_count = db.query(func.count(SurveyModel.id)).scalar() or 0
-    respondent_count = db.query(func.count(SurveyAnswer.id)).scalar() or 0
+    respondent_count = db.query(func.coalesce(func.sum(SurveyModel.response_count), 0)).scalar() or 0
 
     recent = (
         db.query(SurveyModel)
@@ -52,7 +56,6 @@ def get_dashboard_stats(
     )
     recent_surveys = []
     for s in recent:
-        answer_count = db.query(func.count(SurveyAnswer.id)).filter(SurveyAnswer.survey_id == s.id).scalar() or 0
         status_map = {"active": "进行中", "completed": "已完成", "pending": "待发布"}
         created_at = ""
         if s.created_at:
@@ -60,9 +63,9 @@ def get_dashboard_stats(
         recent_surveys.append({
             "id": s.id,
             "title": s.title,
-            "status": status_map.get(s.status, s.status),
+            "status": status_map.get(survey_service.compute_survey_status(s), s.status),
             "created_at": created_at,
-            "count": answer_count,
+            "count": s.response_count,
         })
 
     return {
@@ -91,16 +94,7 @@ def get_survey(
     if cast(int, db_survey.created_by_user_id) != cast(int, current_user.id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权访问此问卷")
 
-    # 实时计算答题人数和题目数量
-    response_count = db.query(func.count(SurveyAnswer.id)).filter(SurveyAnswer.survey_id == survey_id).scalar() or 0
-    question_count = db.query(func.count(SurveyQuestion.id)).filter(SurveyQuestion.survey_id == survey_id).scalar() or 0
-
-    # 将动态字段附加到返回结果
-    result = db_survey
-    object.__setattr__(result, 'response_count', response_count)
-    object.__setattr__(result, 'question_count', question_count)
-
-    return result
+    return db_survey
 
 @router.get("/", response_model=List[SurveyResponse])
 def get_user_surveys(
@@ -116,14 +110,6 @@ def get_user_surveys(
     print(f"获取用户 {current_user.id} ({current_user.username}) 的调研列表")
     surveys = survey_service.get_surveys_by_user(db=db, user_id=cast(int, current_user.id), skip=skip, limit=limit)
     print(f"找到 {len(surveys)} 个调研")
-
-    # 实时计算每个调研的答题人数和题目数量
-    for s in surveys:
-        rc = db.query(func.count(SurveyAnswer.id)).filter(SurveyAnswer.survey_id == s.id).scalar() or 0
-        qc = db.query(func.count(SurveyQuestion.id)).filter(SurveyQuestion.survey_id == s.id).scalar() or 0
-        object.__setattr__(s, 'response_count', rc)
-        object.__setattr__(s, 'question_count', qc)
-
     return surveys
 
 @router.get("/global/all", response_model=List[SurveyResponse])
@@ -148,13 +134,6 @@ def get_global_surveys(
         status_filter=status_filter,
         sort_by=sort_by
     )
-
-    for s in surveys:
-        rc = db.query(func.count(SurveyAnswer.id)).filter(SurveyAnswer.survey_id == s.id).scalar() or 0
-        qc = db.query(func.count(SurveyQuestion.id)).filter(SurveyQuestion.survey_id == s.id).scalar() or 0
-        object.__setattr__(s, 'response_count', rc)
-        object.__setattr__(s, 'question_count', qc)
-
     return surveys
 
 @router.put("/{survey_id}", response_model=SurveyResponse)
@@ -318,3 +297,31 @@ def get_survey_detail(survey_id: int, db: Session = Depends(get_db)):
         "organization_id": db_survey.organization_id,
         "questions": questions or []
     }
+
+@router.post("/maintenance/reconcile-counts")
+async def reconcile_survey_counts(
+    survey_ids: Optional[List[int]] = None,
+    current_user: UserModel = Depends(get_current_active_superuser)
+):
+    """
+    按答卷与题目关联核对问卷的 response_count / question_count 并修正偏差（在后台任务中执行）
+    请求体为问卷ID列表，省略时核对全部问卷；仅系统管理员可调用
+    """
+    return await enqueue_and_wait(
+        RECONCILE_SURVEY_COUNTS_JOB, {"survey_ids": survey_ids},
+        failure_status=status.HTTP_500_INTERNAL_SERVER_ERROR, failure_prefix="核对问卷计数失败",
+    )
+
+
+@job_service.job_handler(RECONCILE_SURVEY_COUNTS_JOB)
+async def _reconcile_survey_counts_job(params: Dict[str, Any], job: job_service.JobContext) -> Dict[str, Any]:
+    def reconcile() -> int:
+        db = SessionLocal()
+        try:
+            return survey_service.reconcile_survey_counts(db, params.get("survey_ids"))
+        finally:
+            db.close()
+
+    await job.progress(10, "核对问卷计数")
+    corrected = await run_in_threadpool(reconcile)
+    return {"corrected": corrected}
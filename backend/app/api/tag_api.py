@@ -13,11 +13,12 @@ import json
 from app.database import get_db
 from app.models.tag import Tag, question_tags
 from app.schemas.tag import TagCreate, TagUpdate, TagResponse
+from app.services.question_service import invalidate_question_counts
 
 router = APIRouter(prefix="/question-tags", tags=["Question Tags"])
 
 @router.get("/", response_model=List[TagResponse])
-async def get_tags(
+def get_tags(
     skip: int = Query(0, ge=0, description="跳过的记录数"),
     limit: int = Query(100, ge=1, le=1000, description="返回的最大记录数"),
     db: Session = Depends(get_db)
@@ -45,7 +46,7 @@ async def get_tags(
         raise HTTPException(status_code=500, detail=f"获取标签列表失败: {str(e)}")
 
 @router.post("/", response_model=TagResponse)
-async def create_tag(
+def create_tag(
     tag_data: TagCreate,
     db: Session = Depends(get_db)
 ):
@@ -81,7 +82,7 @@ async def create_tag(
         raise HTTPException(status_code=500, detail=f"创建标签失败: {str(e)}")
 
 @router.put("/{tag_id}", response_model=TagResponse)
-async def update_tag(
+def update_tag(
     tag_id: int,
     tag_data: TagUpdate,
     db: Session = Depends(get_db)
@@ -108,6 +109,7 @@ async def update_tag(
         
         db.commit()
         db.refresh(tag)
+        invalidate_question_counts()
         
         # 获取题目数量
         question_count = db.query(func.count(question_tags.c.question_id)).filter(
@@ -128,7 +130,7 @@ async def update_tag(
         raise HTTPException(status_code=500, detail=f"更新标签失败: {str(e)}")
 
 @router.delete("/{tag_id}")
-async def delete_tag(
+def delete_tag(
     tag_id: int,
     db: Session = Depends(get_db)
 ):
@@ -142,6 +144,7 @@ async def delete_tag(
         db.execute(question_tags.delete().where(question_tags.c.tag_id == tag.id))
         db.delete(tag)
         db.commit()
+        invalidate_question_counts()
         
         return {"message": "标签删除成功，并已从相关题目中移除"}
     except HTTPException:
@@ -1,8 +1,10 @@
 # backend/app/api/user_api.py
 
 from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app import crud
 from app.schemas.user import UserCreate, UserLogin, UserResponse, UserUpdate
 from app.schemas.token import Token
 from app.services import user_service
@@ -22,21 +24,24 @@ router = APIRouter(
 )
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: UserModel = Depends(get_current_user), db: Session = Depends(get_db)):
+def read_users_me(current_user: UserModel = Depends(get_current_user), db: Session = Depends(get_db)):
     """
     获取当前登录用户的信息。
     - 需要有效的 JWT 访问令牌。
     """
+    # 认证依赖只提供用户快照，这里按 id 读取完整用户信息
+    db_user = crud.get_user(db, user_id=current_user.id)
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     # 补充 organization_name 便于前端显示
-    if current_user.organization_id:
+    if db_user.organization_id:
         try:
-            from app import crud
-            org = crud.get_organization(db, org_id=current_user.organization_id)  # type: ignore
+            org = crud.get_organization(db, org_id=db_user.organization_id)  # type: ignore
             if org:
-                setattr(current_user, "organization_name", org.name)
+                setattr(db_user, "organization_name", org.name)
         except Exception:
             pass
-    return current_user
+    return db_user
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """
@@ -97,7 +102,7 @@ def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return users
 
 @router.put("/me", response_model=UserResponse)
-async def update_current_user(
+def update_current_user(
     user_update: UserUpdate,
     current_user: UserModel = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -118,7 +123,7 @@ async def update_current_user(
     return updated_user
 
 @router.put("/me/password")
-async def change_current_user_password(
+def change_current_user_password(
     password_data: dict,
     current_user: UserModel = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -137,8 +142,9 @@ async def change_current_user_password(
             detail="Old password and new password are required"
         )
     
-    # 验证当前密码
-    if not user_service.verify_password(old_password, str(current_user.hashed_password)):
+    # 验证当前密码（用户快照不含密码哈希，按 id 读取）
+    db_user = crud.get_user(db, user_id=current_user.id)
+    if db_user is None or not user_service.verify_password(old_password, str(db_user.hashed_password)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect old password"
@@ -159,7 +165,7 @@ async def forgot_password(data: dict, db: Session = Depends(get_db)):
     if not email:
         raise HTTPException(status_code=400, detail="Email is required")
 
-    db_user = user_service.get_user_by_email(db, email=email)
+    db_user = await run_in_threadpool(user_service.get_user_by_email, db, email=email)
     if not db_user:
         raise HTTPException(status_code=404, detail="该邮箱未注册")
 
@@ -178,7 +184,7 @@ async def forgot_password(data: dict, db: Session = Depends(get_db)):
 
 
 @router.post("/verify-reset-code")
-async def verify_reset_code(data: dict):
+def verify_reset_code(data: dict):
     email = data.get("email")
     code = data.get("code")
     if not email or not code:
@@ -200,7 +206,7 @@ async def verify_reset_code(data: dict):
 
 
 @router.post("/reset-password")
-async def reset_password(data: dict, db: Session = Depends(get_db)):
+def reset_password(data: dict, db: Session = Depends(get_db)):
     email = data.get("email")
     new_password = data.get("new_password")
     token = data.get("token")
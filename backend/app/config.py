@@ -8,6 +8,13 @@ class Settings(BaseSettings):
     DATABASE_URL: str = "postgresql://localhost:5432/survey_db"  # 本地开发默认值
     # 在生产环境中，Render会自动设置 DATABASE_URL 环境变量
 
+    # 数据库连接池与线程池配置
+    # 同步接口在线程池中执行，每个请求占用一个连接；线程数不宜明显超过连接池容量
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    THREADPOOL_MAX_WORKERS: int = 30
+
     # JWT 配置
     SECRET_KEY: str = "anata-dake-wo-oboe-te-iru-kumo-no-kage-ga-nagere-te-yuku-kotoba-dake-ga-afure-te-iru-omoide-ha-natsukaze-yurare-nagara" # 生产环境中请务必使用强随机密钥
     # SECRET_KEY: str
@@ -16,6 +23,53 @@ class Settings(BaseSettings):
 
     # LLM 配置
     OPENROUTER_API_KEY: str = ""  # 必须从环境变量获取
+    # LLM 结果缓存：相同的模型与提示词直接返回已生成的结果
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 5000
+    # LLM 上游访问：共享连接池、并发上限（全局 / 每个组织）与熔断
+    OPENROUTER_API_URL: str = "https://openrouter.ai/api/v1/chat/completions"
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 300.0
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_CONCURRENCY_PER_ORG: int = 3
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+    # 大量开放题回答的分批总结：每批提示词的 token 预算、同时进行的批次数
+    LLM_SUMMARY_CHUNK_TOKENS: int = 3000
+    LLM_SUMMARY_MAP_CONCURRENCY: int = 4
+    # 后台 AI 任务：每个进程同时执行的任务数、接口内联等待时长（需小于负载均衡的 60s 超时）、
+    # 无进度更新多久视为中断、已结束任务的保留天数
+    AI_JOB_MAX_CONCURRENCY: int = 4
+    AI_JOB_WAIT_SECONDS: float = 25.0
+    AI_JOB_STALE_SECONDS: int = 3600
+    AI_JOB_RETENTION_DAYS: int = 7
+
+    # 按请求统计 SQL：单个请求的查询次数预算、同一语句重复多少次视为疑似 N+1（0 为不检查）；
+    # 开启 SQL_BUDGET_ENFORCE 时超出直接抛错（测试环境使用），否则只记录警告并加响应头
+    SQL_QUERY_BUDGET: int = 50
+    SQL_REPEAT_THRESHOLD: int = 10
+    SQL_BUDGET_ENFORCE: bool = False
+
+    # 问卷状态由开始/结束时间推导，读取接口不写库；后台每隔多少秒把到期问卷的状态批量写回（0 为关闭）
+    SURVEY_STATUS_SYNC_SECONDS: int = 60
+
+    # 系统管理员用户名（逗号分隔）；维护与诊断接口仅对其开放。用户可自行设置 role，不以角色判断
+    SYSTEM_ADMIN_USERNAMES: str = ""
+
+    # /metrics 指标：多进程部署时各进程把快照写入的共享目录（为空时只导出本进程）与写入间隔（秒）
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_FLUSH_SECONDS: int = 10
+
+    # 慢请求调用栈采样（默认关闭）：请求耗时达到阈值（秒，0 为只按令牌触发）后开始采样；
+    # 请求头 X-Profile-Token 与 PROFILING_TOKEN 一致时从请求开始采样（为空时不接受令牌）
+    # 采样文件保存目录（为空时使用系统临时目录下的 survey_profiles）及最多保留的文件数
+    PROFILING_ENABLED: bool = False
+    PROFILING_SLOW_REQUEST_SECONDS: float = 5.0
+    PROFILING_TOKEN: str = ""
+    PROFILING_SAMPLE_INTERVAL: float = 0.005
+    PROFILING_DIR: str = ""
+    PROFILING_MAX_FILES: int = 50
 
     # SMTP 邮件配置（Resend）
     SMTP_HOST: str = ""
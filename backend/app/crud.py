@@ -18,6 +18,11 @@ from app.schemas.organization_member import OrganizationMemberCreate, Organizati
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
 from passlib.context import CryptContext # type: ignore
 import json
+from app.services.user_service import invalidate_user_snapshot
+from app.services.question_service import QUESTION_SEARCH_INDEX, build_question_filters, invalidate_question_counts, paginate_questions
+from app.services.search_service import remove_search_document, update_search_document
+from app.services.survey_analytics_cache_service import invalidate_question_analytics, invalidate_survey_analytics
+from app.services.category_service import ancestor_ids, invalidate_category_tree, rebase_descendants
 
 # ===== 密码处理配置 =====
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -132,6 +137,7 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[
         for key, value in user_update.dict(exclude_unset=True).items():
             setattr(db_user, key, value)
         db.commit()
+        invalidate_user_snapshot(user_id=user_id)
         db.refresh(db_user)
     return db_user
 
@@ -150,6 +156,7 @@ def delete_user(db: Session, user_id: int) -> bool:
     if db_user:
         db.delete(db_user)
         db.commit()
+        invalidate_user_snapshot(user_id=user_id)
         return True
     return False
 
@@ -286,18 +293,16 @@ def get_questions_by_survey(db: Session, survey_id: int, skip: int = 0, limit: i
     """
     from app.models.survey_question import SurveyQuestion
     
-    # 通过中间表获取题目
-    survey_questions = db.query(SurveyQuestion).filter(
-        SurveyQuestion.survey_id == survey_id
-    ).order_by(SurveyQuestion.order).offset(skip).limit(limit).all()
-    
-    questions = []
-    for sq in survey_questions:
-        question = db.query(models.Question).filter(models.Question.id == sq.question_id).first()
-        if question:
-            questions.append(question)
-    
-    return questions
+    # 通过中间表联表获取题目（单次查询）
+    return (
+        db.query(models.Question)
+        .join(SurveyQuestion, SurveyQuestion.question_id == models.Question.id)
+        .filter(SurveyQuestion.survey_id == survey_id)
+        .order_by(SurveyQuestion.order, SurveyQuestion.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 def create_survey_question(db: Session, question: QuestionCreate, survey_id: int) -> models.Question:
     """
@@ -344,6 +349,10 @@ def create_survey_question(db: Session, question: QuestionCreate, survey_id: int
     db.add(db_question)
     db.commit()
     db.refresh(db_question)
+    invalidate_question_counts()
+    update_search_document(QUESTION_SEARCH_INDEX, db_question.id, db_question.text)
+    if db_question.category_id:
+        invalidate_category_tree(all_organizations=True)
     
     # 处理标签
     if tags_data:
@@ -368,7 +377,13 @@ def create_survey_question(db: Session, question: QuestionCreate, survey_id: int
         order=0  # 默认排序
     )
     db.add(survey_question)
+    adjust_survey_counts(db, survey_id, questions=1)
+    # 题目集合变化后，已有答卷的未作答统计需要重算；还没有答卷时预聚合中没有该题的数据，无需扫描
+    if survey is not None and survey.response_count:
+        rebuild_survey_rollups(db, survey_id)
     db.commit()
+    invalidate_scoring_plan(survey_id)
+    invalidate_survey_analytics(survey_id)
     
     return db_question
 
@@ -453,6 +468,13 @@ def update_question(db: Session, question_id: int, question_update: QuestionUpda
 
         db.add(db_question)
         db.commit()
+        # 选项/题型可能已变化，使引用该题目的问卷评分计划失效
+        invalidate_question_scoring(question_id)
+        invalidate_question_analytics(question_id)
+        invalidate_question_counts()
+        update_search_document(QUESTION_SEARCH_INDEX, db_question.id, db_question.text)
+        if "category_id" in update_data:
+            invalidate_category_tree(all_organizations=True)
         db.refresh(db_question)
         
         # 在返回前，强制将options转换为列表
@@ -477,8 +499,15 @@ def delete_question(db: Session, question_id: int) -> Optional[models.Question]:
     """
     db_question = db.query(models.Question).filter(models.Question.id == question_id).first()
     if db_question:
+        category_id = db_question.category_id
         db.delete(db_question)
         db.commit()
+        invalidate_question_scoring(question_id)
+        invalidate_question_analytics(question_id)
+        invalidate_question_counts()
+        remove_search_document(QUESTION_SEARCH_INDEX, question_id)
+        if category_id:
+            invalidate_category_tree(all_organizations=True)
     return db_question
 
 # ===== 全局题库 CRUD 操作 =====
@@ -538,6 +567,10 @@ def create_global_question(db: Session, question: schemas.QuestionCreate, owner_
             # 添加关联
             db_question.tags.append(tag)
         db.commit()
+    invalidate_question_counts()
+    update_search_document(QUESTION_SEARCH_INDEX, db_question.id, db_question.text)
+    if db_question.category_id:
+        invalidate_category_tree(all_organizations=True)
 
     # 在返回前，强制将options转换为列表
     if db_question.options and isinstance(db_question.options, str):
@@ -547,134 +580,28 @@ def create_global_question(db: Session, question: schemas.QuestionCreate, owner_
             print(f"Error decoding options for newly created question ID {db_question.id}: {e}")
     return db_question
 
-def get_global_questions(db: Session, skip: int = 0, limit: int = 100, type_filter: str = None, search_filter: str = None, sort_by: str = None, category_filter: int = None, tag_filter: List[str] = None) -> dict:
+def get_global_questions(db: Session, skip: int = 0, limit: int = 100, type_filter: str = None, search_filter: str = None, sort_by: str = None, category_filter: int = None, tag_filter: List[str] = None, cursor: Optional[str] = None) -> dict:
     """
     获取全局题库中的问题，支持分页和类型筛选
     
     Args:
         db: 数据库会话
-        skip: 跳过的记录数
+        skip: 跳过的记录数（传入 cursor 时忽略）
         limit: 返回的最大记录数
         type_filter: 问题类型筛选
+        search_filter: 搜索词（走检索索引，按相关度排序并返回高亮）
+        cursor: 上一页返回的 next_cursor，用于键集分页
         
     Returns:
         dict: 包含问题列表和分页信息的字典
     """
-    # 构建基础查询 - 现在所有题目都是全局题目
-    base_query = db.query(models.Question)
-    
-    if type_filter:
-        base_query = base_query.filter(models.Question.type == type_filter)
-    
-    # 添加搜索过滤
-    if search_filter:
-        base_query = base_query.filter(models.Question.text.contains(search_filter))
-    
-    # 添加分类过滤
-    if category_filter:
-        base_query = base_query.filter(models.Question.category_id == category_filter)
-    
-    # 添加标签过滤
-    if tag_filter:
-        from app.models.tag import Tag
-        base_query = base_query.join(models.Question.tags).filter(Tag.name.in_(tag_filter))
-    
-    # 添加排序
-    if sort_by:
-        if sort_by == "created_desc":
-            base_query = base_query.order_by(models.Question.id.desc())
-        elif sort_by == "created_asc":
-            base_query = base_query.order_by(models.Question.id.asc())
-        elif sort_by == "usage_desc":
-            base_query = base_query.order_by(models.Question.usage_count.desc())
-        elif sort_by == "usage_asc":
-            base_query = base_query.order_by(models.Question.usage_count.asc())
-    
-    # 获取总数
-    total = base_query.count()
-    
-    # 使用join查询来获取用户信息
-    query = db.query(models.Question, models.User.username.label('owner_name'))
     # 现在所有题目都是全局题目
-    query = query.outerjoin(models.User, models.Question.owner_id == models.User.id)
-    
-    if type_filter:
-        query = query.filter(models.Question.type == type_filter)
-    
-    # 添加搜索过滤
-    if search_filter:
-        query = query.filter(models.Question.text.contains(search_filter))
-    
-    # 添加分类过滤
-    if category_filter:
-        query = query.filter(models.Question.category_id == category_filter)
-    
-    # 添加标签过滤
-    if tag_filter:
-        from app.models.tag import Tag
-        query = query.join(models.Question.tags).filter(Tag.name.in_(tag_filter))
-    
-    # 添加排序
-    if sort_by:
-        if sort_by == "created_desc":
-            query = query.order_by(models.Question.id.desc())
-        elif sort_by == "created_asc":
-            query = query.order_by(models.Question.id.asc())
-        elif sort_by == "usage_desc":
-            query = query.order_by(models.Question.usage_count.desc())
-        elif sort_by == "usage_asc":
-            query = query.order_by(models.Question.usage_count.asc())
-        
-    # 获取结果
-    results = query.offset(skip).limit(limit).all()
-    
-    # 处理结果，将用户信息添加到问题对象中
-    questions = []
-    for question, owner_name in results:
-        # 处理options字段
-        if question.options and isinstance(question.options, str):
-            try:
-                # 尝试将字符串解析为JSON列表
-                object.__setattr__(question, 'options', json.loads(question.options))
-            except json.JSONDecodeError as decode_error:
-                # 如果解析失败，则设为空列表并记录日志
-                print(f"Warning: Could not decode options for question ID {question.id}. Options: {question.options}. Error: {decode_error}")
-                object.__setattr__(question, 'options', [])
-        # 处理 trigger_options 字段
-        if question.trigger_options:
-            if isinstance(question.trigger_options, str):
-                try:
-                    parsed = json.loads(question.trigger_options)
-                except json.JSONDecodeError as decode_error:
-                    print(f"Warning: Could not decode trigger_options for question ID {question.id}. Value: {question.trigger_options}. Error: {decode_error}")
-                    parsed = []
-            else:
-                parsed = question.trigger_options
-            # Ensure trigger_options is a list of dicts with option_text
-            normalized = []
-            for item in parsed or []:
-                if isinstance(item, dict) and "option_text" in item:
-                    normalized.append(item)
-                else:
-                    normalized.append({"option_text": item})
-            object.__setattr__(question, 'trigger_options', normalized)
-        
-        # 添加创建者用户名
-        object.__setattr__(question, 'owner_name', owner_name)
-        questions.append(question)
-    
-    # 计算分页信息
-    page = (skip // limit) + 1 if limit > 0 else 1
-    pages = (total + limit - 1) // limit if limit > 0 else 1
-    
-    return {
-        'items': questions,
-        'total': total,
-        'skip': skip,
-        'limit': limit,
-        'page': page,
-        'pages': pages
-    }
+    filters, cache_key = build_question_filters(
+        type_filter=type_filter,
+        category_filter=category_filter,
+        tag_filter=tag_filter
+    )
+    return paginate_questions(db, filters, cache_key, skip=skip, limit=limit, sort_by=sort_by, cursor=cursor, search_filter=search_filter)
 
 # ===== 组织题库 CRUD 操作 =====
 
@@ -717,6 +644,10 @@ def create_organization_question(db: Session, question: schemas.QuestionCreate,
     db.add(db_question)
     db.commit()
     db.refresh(db_question)
+    invalidate_question_counts()
+    update_search_document(QUESTION_SEARCH_INDEX, db_question.id, db_question.text)
+    if db_question.category_id:
+        invalidate_category_tree(all_organizations=True)
     # 在返回前，强制将options转换为列表
     if db_question.options and isinstance(db_question.options, str):
         try:
@@ -725,107 +656,39 @@ def create_organization_question(db: Session, question: schemas.QuestionCreate,
             print(f"Error decoding options for newly created question ID {db_question.id}: {e}")
     return db_question
 
-def get_organization_questions(db: Session, org_id: int, skip: int = 0, limit: int = 100, type_filter: str = None, search_filter: str = None, sort_by: str = None) -> dict:
+def get_organization_questions(db: Session, org_id: int, skip: int = 0, limit: int = 100, type_filter: str = None, search_filter: str = None, sort_by: str = None, cursor: Optional[str] = None) -> dict:
     """
     获取组织题库中的问题，支持分页和类型筛选
     
     Args:
         db: 数据库会话
         org_id: 组织ID
-        skip: 跳过的记录数
+        skip: 跳过的记录数（传入 cursor 时忽略）
         limit: 返回的最大记录数
         type_filter: 问题类型筛选
+        search_filter: 搜索词（走检索索引，按相关度排序并返回高亮）
+        cursor: 上一页返回的 next_cursor，用于键集分页
         
     Returns:
         dict: 包含问题列表和分页信息的字典
     """
-    # 构建基础查询
-    base_query = db.query(models.Question)
-    base_query = base_query.filter(models.Question.organization_id == org_id)
-    base_query = base_query.filter(models.Question.survey_id.is_(None))
-    
-    if type_filter:
-        base_query = base_query.filter(models.Question.type == type_filter)
-    
-    # 添加搜索过滤
-    if search_filter:
-        base_query = base_query.filter(models.Question.text.contains(search_filter))
-    
-    # 添加排序
-    if sort_by:
-        if sort_by == "created_desc":
-            base_query = base_query.order_by(models.Question.id.desc())
-        elif sort_by == "created_asc":
-            base_query = base_query.order_by(models.Question.id.asc())
-        elif sort_by == "usage_desc":
-            base_query = base_query.order_by(models.Question.usage_count.desc())
-        elif sort_by == "usage_asc":
-            base_query = base_query.order_by(models.Question.usage_count.asc())
-    
-    # 获取总数
-    total = base_query.count()
-    
-    # 使用join查询来获取用户信息
-    query = db.query(models.Question, models.User.username.label('owner_name'))
-    # 筛选指定组织的问题，且survey_id为NULL
-    query = query.outerjoin(models.User, models.Question.owner_id == models.User.id)
-    query = query.filter(models.Question.organization_id == org_id)
-    query = query.filter(models.Question.survey_id.is_(None))
-    
-    if type_filter:
-        query = query.filter(models.Question.type == type_filter)
-    
-    # 添加搜索过滤
-    if search_filter:
-        query = query.filter(models.Question.text.contains(search_filter))
-    
-    # 添加排序
-    if sort_by:
-        if sort_by == "created_desc":
-            query = query.order_by(models.Question.id.desc())
-        elif sort_by == "created_asc":
-            query = query.order_by(models.Question.id.asc())
-        elif sort_by == "usage_desc":
-            query = query.order_by(models.Question.usage_count.desc())
-        elif sort_by == "usage_asc":
-            query = query.order_by(models.Question.usage_count.asc())
-        
-    # 获取结果
-    results = query.offset(skip).limit(limit).all()
-    
-    # 处理结果，将用户信息添加到问题对象中
-    questions = []
-    for question, owner_name in results:
-        # 处理options字段
-        if question.options and isinstance(question.options, str):
-            try:
-                # 尝试将字符串解析为JSON列表
-                object.__setattr__(question, 'options', json.loads(question.options))
-            except json.JSONDecodeError as decode_error:
-                # 如果解析失败，则设为空列表并记录日志
-                print(f"Warning: Could not decode options for question ID {question.id}. Options: {question.options}. Error: {decode_error}")
-                object.__setattr__(question, 'options', [])
-        
-        # 添加创建者用户名
-        object.__setattr__(question, 'owner_name', owner_name)
-        questions.append(question)
-    
-    # 计算分页信息
-    page = (skip // limit) + 1 if limit > 0 else 1
-    pages = (total + limit - 1) // limit if limit > 0 else 1
-    
-    return {
-        'items': questions,
-        'total': total,
-        'skip': skip,
-        'limit': limit,
-        'page': page,
-        'pages': pages
-    }
+    filters, cache_key = build_question_filters(
+        organization_id=org_id,
+        type_filter=type_filter
+    )
+    return paginate_questions(db, filters, cache_key, skip=skip, limit=limit, sort_by=sort_by, cursor=cursor, search_filter=search_filter)
 
 # ===== Survey Answer CRUD 操作 =====
 
-from app.services.grading_service import calculate_survey_total_score
+from app.services.grading_service import (
+    calculate_survey_total_score,
+    get_scoring_plan,
+    invalidate_question_scoring,
+    invalidate_scoring_plan,
+)
+from app.services.answer_item_service import build_answer_items
+from app.services.survey_stat_service import apply_answer_to_rollups, rebuild_survey_rollups
+from app.services.survey_service import adjust_survey_counts
 
 def create_survey_answer(
     db: Session,
@@ -837,8 +700,9 @@ def create_survey_answer(
     """
     创建调研答案
     """
-    # 计算总分
+    # 计算总分（评分计划按问卷缓存，与下方拆分明细共用）
     total_score = calculate_survey_total_score(db, survey_id, answer.answers)
+    plan = get_scoring_plan(db, survey_id)
 
     # 提取部门和职位（如果 answer 中有这些字段）
     # 注意：answer.answers 仅包含题目答案，department/position 在 answer 对象本身
@@ -863,6 +727,13 @@ def create_survey_answer(
         organization_name=organization_name
     )
     db.add(db_answer)
+    db.flush()  # 取得答卷ID，供答题明细引用
+
+    # 同一事务内写入拆分后的答题明细（批量插入），供统计分析按列聚合，并累加预聚合统计
+    items = build_answer_items(db_answer, answer.answers, plan)
+    db.bulk_save_objects(items)
+    apply_answer_to_rollups(db, db_answer, items, plan)
+    adjust_survey_counts(db, survey_id, responses=1)
     db.commit()
     db.refresh(db_answer)
     return db_answer
@@ -1268,6 +1139,7 @@ def create_category(db: Session, category: CategoryCreate, created_by: int) -> m
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    invalidate_category_tree(db_category.organization_id)
     return db_category
 
 def update_category(db: Session, category_id: int, category_update: CategoryUpdate) -> Optional[models.Category]:
@@ -1285,6 +1157,7 @@ def update_category(db: Session, category_id: int, category_update: CategoryUpda
     db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
     if db_category:
         update_data = category_update.dict(exclude_unset=True)
+        old_level, old_path = db_category.level, db_category.path
         
         # 如果更新了父分类，需要重新计算层级和路径
         if 'parent_id' in update_data:
@@ -1294,6 +1167,8 @@ def update_category(db: Session, category_id: int, category_update: CategoryUpda
             if update_data['parent_id']:
                 parent = get_category(db, update_data['parent_id'])
                 if parent:
+                    if category_id in ancestor_ids(parent.path):
+                        raise ValueError("不能将分类移动到自身或其子分类下")
                     level = parent.level + 1
                     path = f"{parent.path}/{parent.id}" if parent.path else str(parent.id)
             
@@ -1303,9 +1178,13 @@ def update_category(db: Session, category_id: int, category_update: CategoryUpda
         for key, value in update_data.items():
             setattr(db_category, key, value)
         
+        if 'parent_id' in update_data:
+            # 后代分类的路径和层级随之变化
+            rebase_descendants(db, db_category, old_level, old_path)
         db.add(db_category)
         db.commit()
         db.refresh(db_category)
+        invalidate_category_tree(db_category.organization_id)
     return db_category
 
 def delete_category(db: Session, category_id: int) -> Optional[models.Category]:
@@ -1335,6 +1214,7 @@ def delete_category(db: Session, category_id: int) -> Optional[models.Category]:
         
         db.delete(db_category)
         db.commit()
+        invalidate_category_tree(db_category.organization_id)
     return db_category
 
 def get_category_question_count(db: Session, category_id: int) -> int:
@@ -1368,9 +1248,7 @@ def move_category(db: Session, category_id: int, target_parent_id: Optional[int]
     db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
     if not db_category:
         return None
-    
-    # 更新父分类
-    db_category.parent_id = target_parent_id
+    old_level, old_path = db_category.level, db_category.path
     
     # 重新计算层级和路径
     level = 1
@@ -1379,9 +1257,14 @@ def move_category(db: Session, category_id: int, target_parent_id: Optional[int]
     if target_parent_id:
         parent = get_category(db, target_parent_id)
         if parent:
+            # 目标父分类的祖先中包含自己，说明要移到自己的子树下，会形成环
+            if parent.id == category_id or category_id in ancestor_ids(parent.path):
+                raise ValueError("不能将分类移动到自身或其子分类下")
             level = parent.level + 1
             path = f"{parent.path}/{parent.id}" if parent.path else str(parent.id)
     
+    # 更新父分类
+    db_category.parent_id = target_parent_id
     db_category.level = level
     db_category.path = path
     
@@ -1389,7 +1272,10 @@ def move_category(db: Session, category_id: int, target_parent_id: Optional[int]
     if position is not None:
         db_category.sort_order = position
     
+    # 后代分类的路径和层级随之变化
+    rebase_descendants(db, db_category, old_level, old_path)
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    invalidate_category_tree(db_category.organization_id)
     return db_category
\ No newline at end of file
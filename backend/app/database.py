@@ -1,6 +1,6 @@
 # backend/app/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
@@ -9,12 +9,30 @@ from app.config import settings
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
 # 创建 SQLAlchemy 引擎
+# 连接池大小与线程池大小匹配：同步接口都在线程池中执行，避免线程排队等待连接
+_pool_options = {}
+if not SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    _pool_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     # echo=True, # 在开发阶段可以开启，用于打印所有执行的 SQL 语句，方便调试
-    pool_pre_ping=True # 保持数据库连接活跃，防止连接超时
+    pool_pre_ping=True, # 保持数据库连接活跃，防止连接超时
+    **_pool_options
 )
 
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # 本地 SQLite：启用 WAL，读查询不再阻塞线程池中并发执行的写入
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
 # 创建 SessionLocal 类，用于创建数据库会话
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -22,6 +40,8 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # 依赖项：获取数据库会话
+# Session 是同步的：使用它的接口应声明为普通 def（由 FastAPI 放入线程池执行），
+# 必须是 async def 的接口（如需要 await LLM 调用）应通过 run_in_threadpool 执行数据库操作
 def get_db():
     db = SessionLocal()
     try:
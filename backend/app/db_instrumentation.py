@@ -0,0 +1,154 @@
+# backend/app/db_instrumentation.py
+"""
+按请求统计 SQL：查询次数、数据库耗时与重复语句（疑似 N+1）
+- 监听 SQLAlchemy 引擎的 before/after_cursor_execute，只在请求上下文中计数（后台任务、脚本不受影响）
+- QueryInstrumentationMiddleware 在响应头中返回 X-DB-Query-Count 与 Server-Timing
+- 超出 SQL_QUERY_BUDGET 或同一语句执行达到 SQL_REPEAT_THRESHOLD 次时记录警告并加响应头 X-DB-Query-Budget: exceeded；
+  SQL_BUDGET_ENFORCE 开启时（测试环境）改为抛出 QueryBudgetExceeded，使测试失败
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """请求的 SQL 查询数超出预算或出现疑似 N+1（仅 SQL_BUDGET_ENFORCE 开启时抛出）"""
+
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"IN \((?:\?|%\(\w+\)s|:\w+)(?:, (?:\?|%\(\w+\)s|:\w+))*\)", re.IGNORECASE)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(statement: str) -> str:
+    """语句指纹：合并空白、把字面量和 IN 列表归一，使只有参数不同的语句指纹相同"""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _IN_LIST.sub("IN (?)", statement)
+    return _LITERAL.sub("?", statement)
+
+
+class RequestQueryStats:
+    """单个请求的 SQL 统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数达到 threshold 的语句指纹（按次数降序）"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def problems(self) -> List[str]:
+        """超出预算与疑似 N+1 的说明，没有问题时为空"""
+        found = []
+        if settings.SQL_QUERY_BUDGET and self.count > settings.SQL_QUERY_BUDGET:
+            found.append(f"查询 {self.count} 次，超出预算 {settings.SQL_QUERY_BUDGET}")
+        for sql, n in self.repeated(settings.SQL_REPEAT_THRESHOLD) if settings.SQL_REPEAT_THRESHOLD else []:
+            found.append(f"同一语句执行 {n} 次（疑似 N+1）: {sql[:200]}")
+        return found
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+# 本进程累计的请求数、查询次数、数据库耗时与被标记（超预算或疑似 N+1）的请求数
+_totals_lock = threading.Lock()
+_totals = {"requests": 0, "queries": 0, "db_seconds": 0.0, "flagged_requests": 0}
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    """当前请求的 SQL 统计；不在请求上下文中时为 None"""
+    return _current_stats.get()
+
+
+def get_query_totals() -> Dict[str, Any]:
+    """本进程处理的请求数、SQL 总次数、数据库总耗时与被标记的请求数"""
+    with _totals_lock:
+        return dict(_totals)
+
+
+# 监听所有引擎：测试中通过依赖覆盖替换的引擎同样计入
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.get("query_started_at")
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+class QueryInstrumentationMiddleware:
+    """ASGI 中间件：为每个 HTTP 请求统计 SQL，并在响应头中返回"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                problems = stats.problems()
+                if problems and settings.SQL_BUDGET_ENFORCE:
+                    raise QueryBudgetExceeded(f"{_route(scope)}: " + "; ".join(problems))
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"server-timing", f'db;dur={stats.total_seconds * 1000:.1f};desc="{stats.count} queries"'.encode()))
+                if problems:
+                    headers.append((b"x-db-query-budget", b"exceeded"))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            self._finish(scope, stats)
+
+    @staticmethod
+    def _finish(scope, stats: RequestQueryStats) -> None:
+        problems = stats.problems()
+        with _totals_lock:
+            _totals["requests"] += 1
+            _totals["queries"] += stats.count
+            _totals["db_seconds"] += stats.total_seconds
+            if problems:
+                _totals["flagged_requests"] += 1
+        if problems:
+            logger.warning(
+                f"{scope.get('method')} {_route(scope)}: {stats.count} 次查询，数据库耗时 {stats.total_seconds * 1000:.1f}ms；"
+                + "；".join(problems)
+            )
+
+
+def _route(scope) -> str:
+    """路由模板（如 /api/v1/surveys/{survey_id}），未匹配路由时为请求路径"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
@@ -10,6 +10,7 @@
 # static files (index.html, JS, CSS, etc.) into a predictable directory.
 # ---------------------------------------------------------------------------
 
+import asyncio
 import logging
 import os
 from pathlib import Path
@@ -27,7 +28,11 @@ import traceback
 
 # --- 导入你的数据库模型和API路由 ---
 # 确保你的数据库配置和API路由导入是正确的
+from app.config import settings
 from app.database import engine, Base
+from app.db_instrumentation import QueryInstrumentationMiddleware
+from app import metrics
+from app.profiling import ProfilingMiddleware
 from app.api import user_api
 from app.api import survey_api
 from app.api import question_api
@@ -37,6 +42,7 @@ from app.api import llm_api
 from app.api import department_api
 from app.api import participant_api
 from app.api import analytics_api, category_api, tag_api, analysis_api
+from app.api import job_api, profiling_api
 
 # --- 数据库初始化 ---
 # 这一步会确保你的数据库表被创建。
@@ -71,6 +77,79 @@ app = FastAPI(
     version="0.1.0",
 )
 
+@app.on_event("startup")
+async def configure_threadpool():
+    """同步接口和依赖在 AnyIO 线程池中执行，按配置调整线程池容量"""
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_MAX_WORKERS
+
+_survey_status_task = None
+
+async def _sync_survey_statuses_periodically():
+    from fastapi.concurrency import run_in_threadpool
+    from app.database import SessionLocal
+    from app.services import survey_service
+
+    def sync():
+        db = SessionLocal()
+        try:
+            return survey_service.sync_survey_statuses(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            updated = await run_in_threadpool(sync)
+            if updated:
+                logging.info("已批量更新 %s 份问卷的状态", updated)
+        except Exception as exc:
+            logging.warning("问卷状态同步失败: %s", exc)
+        await asyncio.sleep(settings.SURVEY_STATUS_SYNC_SECONDS)
+
+@app.on_event("startup")
+async def start_survey_status_scheduler():
+    """定期把开始/结束时间已到的问卷状态批量写回数据库（读取接口只推导状态、不写库）"""
+    global _survey_status_task
+    if settings.SURVEY_STATUS_SYNC_SECONDS > 0:
+        _survey_status_task = asyncio.create_task(_sync_survey_statuses_periodically())
+
+@app.on_event("shutdown")
+async def stop_survey_status_scheduler():
+    if _survey_status_task is not None:
+        _survey_status_task.cancel()
+
+_metrics_flush_task = None
+
+async def _flush_metrics_periodically():
+    from fastapi.concurrency import run_in_threadpool
+
+    while True:
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+        try:
+            await run_in_threadpool(metrics.write_snapshot)
+        except Exception as exc:
+            logging.warning("写入指标快照失败: %s", exc)
+
+@app.on_event("startup")
+async def start_metrics_flush():
+    """多进程部署时定期把本进程指标快照写入共享目录，由响应 /metrics 的进程合并"""
+    global _metrics_flush_task
+    if settings.METRICS_MULTIPROC_DIR:
+        _metrics_flush_task = asyncio.create_task(_flush_metrics_periodically())
+
+@app.on_event("shutdown")
+async def stop_metrics_flush():
+    if _metrics_flush_task is not None:
+        _metrics_flush_task.cancel()
+        # 退出前写入最终的累计值，计数器不会因进程重启而回退
+        metrics.write_snapshot()
+
+@app.on_event("shutdown")
+async def close_llm_http_client():
+    """释放 LLM 上游共享连接池"""
+    from app.services import llm_gateway
+    await llm_gateway.close_http_client()
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     import traceback
@@ -125,6 +204,13 @@ local_origins = [
 # else:
 #     # Fallback or warn, depending on your setup
 
+# 按请求统计 SQL 次数与耗时，超出预算或疑似 N+1 时告警
+app.add_middleware(QueryInstrumentationMiddleware)
+# 按路由模板统计请求耗时与进行中的请求数（见 GET /metrics）
+app.add_middleware(metrics.MetricsMiddleware)
+# 按需采样慢请求的调用栈（PROFILING_ENABLED 开启时生效，见 /api/v1/admin/profiles）
+app.add_middleware(ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*", *local_origins],  # 暂时允许所有源 + 本地开发源，生产请收紧！
@@ -154,6 +240,13 @@ app.include_router(analytics_api.router, tags=["analytics"], prefix="/api/v1")
 app.include_router(category_api.router, tags=["category"], prefix="/api/v1")
 app.include_router(tag_api.router, tags=["tag"], prefix="/api/v1")
 app.include_router(analysis_api.router, tags=["analysis"], prefix="/api/v1")
+app.include_router(job_api.router, tags=["job"], prefix="/api/v1")
+app.include_router(profiling_api.router, tags=["profiling"], prefix="/api/v1")
+
+# Prometheus 抓取端点（需在 SPA 兜底路由之前注册）；合并多进程快照时读写文件，使用同步函数在线程池中执行
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.generate_latest(), media_type=metrics.CONTENT_TYPE)
 
 # --- 3. 挂载前端静态文件 ---
 # 注意顺序：先注册 API，再挂载静态目录，避免 /api/* 被静态服务截获导致 404/405
@@ -0,0 +1,384 @@
+# backend/app/metrics.py
+"""
+进程内指标与 Prometheus 文本格式导出（GET /metrics）
+- 计数器、仪表盘、直方图只在内存中累加（一次加锁的字典更新），抓取时才格式化输出
+- MetricsMiddleware 按路由模板（如 /api/v1/surveys/{survey_id}）统计请求耗时直方图和进行中的请求数
+- 数据库连接池、SQL 累计统计、LLM 网关统计在抓取时读取
+- 多进程部署时设置 METRICS_MULTIPROC_DIR：各进程每隔 METRICS_FLUSH_SECONDS 把本进程快照写入该目录，
+  任一进程响应 /metrics 时合并全部快照。计数器与直方图跨进程累加（已退出进程的累计值保留，
+  与 Prometheus 计数器单调递增的语义一致），仪表盘只累加仍在写快照的进程。
+  该目录应在每次部署启动前清空
+"""
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 直方图默认分桶（秒）：覆盖普通接口到慢查询；LLM 调用单独使用更长的分桶
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# 未匹配任何路由的请求统一归入该标签，避免按原始路径产生无限多的时间序列
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _Metric:
+    """指标基类：按标签值元组保存样本"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        _registry.append(self)
+
+    def _key(self, labels: Sequence[Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {labels}")
+        return tuple(str(value) for value in labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(key), self._copy(value)] for key, value in self._values.items()]
+        return {"type": self.kind, "help": self.documentation, "labels": list(self.labelnames), "samples": samples}
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """只增不减的累计值"""
+
+    kind = "counter"
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """分桶计数：每个标签组合保存 {"counts": 各桶（不累计，末尾为 +Inf）, "sum": 总和}"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            entry["counts"][index] += 1
+            entry["sum"] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        family = super().snapshot()
+        family["buckets"] = list(self.buckets)
+        return family
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return {"counts": list(value["counts"]), "sum": value["sum"]}
+
+
+_registry: List[_Metric] = []
+
+HTTP_REQUESTS = Counter("survey_http_requests_total", "按路由模板统计的 HTTP 请求数", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("survey_http_request_duration_seconds", "按路由模板统计的 HTTP 请求耗时（秒）", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("survey_http_requests_in_flight", "进行中的 HTTP 请求数")
+LLM_LATENCY = Histogram(
+    "survey_llm_call_duration_seconds", "LLM 调用耗时（秒），outcome 为 ok/cache_hit/fallback/exception",
+    ("model", "outcome"), buckets=LLM_BUCKETS,
+)
+LLM_ERRORS = Counter("survey_llm_call_errors_total", "LLM 调用失败次数，reason 为 fallback（返回兜底文本）或 exception", ("model", "reason"))
+CACHE_LOOKUPS = Counter("survey_cache_lookups_total", "进程内与 LLM 结果缓存的查询次数，result 为 hit/miss", ("cache", "result"))
+
+
+def record_request(method: str, route: str, status: int, seconds: float) -> None:
+    HTTP_REQUESTS.inc(method, route, status)
+    HTTP_LATENCY.observe(seconds, method, route)
+
+
+def record_llm_call(model: str, outcome: str, seconds: float) -> None:
+    """记录一次 LLM 调用；fallback 与 exception 同时计入错误数"""
+    LLM_LATENCY.observe(seconds, model, outcome)
+    if outcome in ("fallback", "exception"):
+        LLM_ERRORS.inc(model, outcome)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache, "hit" if hit else "miss")
+
+
+def reset() -> None:
+    """清空本进程的全部指标（测试使用）"""
+    for metric in _registry:
+        metric.clear()
+
+
+# ===== 抓取时读取的瞬时值 =====
+
+def _family(kind: str, documentation: str, samples: List[Tuple[Sequence[str], float]], labelnames: Sequence[str] = ()) -> Dict[str, Any]:
+    return {"type": kind, "help": documentation, "labels": list(labelnames), "samples": [[list(key), value] for key, value in samples]}
+
+
+def _collect_runtime() -> Dict[str, Dict[str, Any]]:
+    """数据库连接池、SQL 累计统计与 LLM 网关统计"""
+    families: Dict[str, Dict[str, Any]] = {}
+
+    from app.database import engine
+    pool = engine.pool
+    # SQLite 内存库等使用的连接池没有容量统计
+    if hasattr(pool, "checkedout") and hasattr(pool, "overflow"):
+        families["survey_db_pool_checked_out"] = _family("gauge", "已借出的数据库连接数", [((), pool.checkedout())])
+        families["survey_db_pool_overflow"] = _family("gauge", "超出 pool_size 的溢出连接数（未创建溢出连接时为负数）", [((), pool.overflow())])
+        families["survey_db_pool_size"] = _family("gauge", "数据库连接池容量", [((), pool.size())])
+
+    from app.db_instrumentation import get_query_totals
+    totals = get_query_totals()
+    families["survey_db_queries_total"] = _family("counter", "HTTP 请求中执行的 SQL 次数", [((), totals["queries"])])
+    families["survey_db_query_seconds_total"] = _family("counter", "HTTP 请求中 SQL 的累计耗时（秒）", [((), totals["db_seconds"])])
+    families["survey_db_flagged_requests_total"] = _family("counter", "SQL 超出预算或疑似 N+1 的请求数", [((), totals["flagged_requests"])])
+
+    from app.services import llm_gateway
+    stats = llm_gateway.get_gateway_stats()
+    families["survey_llm_gateway_events_total"] = _family(
+        "counter", "LLM 网关事件数：上游请求、合并、排队、熔断跳过",
+        [((event,), stats[event]) for event in ("requests", "coalesced", "queued", "short_circuited")], ("event",),
+    )
+    families["survey_llm_gateway_inflight"] = _family("gauge", "进行中的去重 LLM 请求数", [((), stats["inflight"])])
+    return families
+
+
+def local_snapshot() -> Dict[str, Any]:
+    """本进程的全部指标"""
+    families = {metric.name: metric.snapshot() for metric in _registry}
+    try:
+        families.update(_collect_runtime())
+    except Exception as exc:
+        logger.warning(f"采集运行时指标失败: {exc}")
+    return {"pid": os.getpid(), "written_at": time.time(), "metrics": families}
+
+
+# ===== 多进程合并 =====
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_snapshot() -> None:
+    """把本进程快照写入 METRICS_MULTIPROC_DIR（先写临时文件再替换，读取方不会读到半个文件）"""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(local_snapshot(), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_snapshots(directory: str) -> List[Dict[str, Any]]:
+    snapshots = []
+    for name in os.listdir(directory):
+        if not (name.startswith("metrics-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError) as exc:
+            logger.warning(f"读取指标快照 {name} 失败: {exc}")
+    return snapshots
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    合并多个进程的快照：计数器与直方图按标签累加；
+    仪表盘只累加 METRICS_FLUSH_SECONDS 三倍时间内写过快照的进程（已退出进程的瞬时值不再有意义）
+    """
+    now = time.time() if now is None else now
+    stale_after = settings.METRICS_FLUSH_SECONDS * 3
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        live = now - snapshot.get("written_at", 0) <= stale_after
+        for name, family in snapshot["metrics"].items():
+            if family["type"] == "gauge" and not live:
+                continue
+            target = merged.setdefault(name, {**family, "samples": {}})
+            if family["type"] == "histogram" and family.get("buckets") != target.get("buckets"):
+                logger.warning(f"指标 {name} 的分桶在各进程间不一致，跳过进程 {snapshot.get('pid')} 的数据")
+                continue
+            samples = target["samples"]
+            for labels, value in family["samples"]:
+                key = tuple(labels)
+                if family["type"] != "histogram":
+                    samples[key] = samples.get(key, 0.0) + value
+                elif key in samples:
+                    entry = samples[key]
+                    entry["counts"] = [a + b for a, b in zip(entry["counts"], value["counts"])]
+                    entry["sum"] += value["sum"]
+                else:
+                    samples[key] = {"counts": list(value["counts"]), "sum": value["sum"]}
+    for family in merged.values():
+        family["samples"] = [[list(key), value] for key, value in family["samples"].items()]
+    return merged
+
+
+def collect() -> Dict[str, Dict[str, Any]]:
+    """本进程或全部进程（配置了 METRICS_MULTIPROC_DIR 时）的指标"""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return merge_snapshots([local_snapshot()])
+    write_snapshot()
+    return merge_snapshots(_read_snapshots(directory))
+
+
+# ===== 文本格式 =====
+
+def _cache_hit_ratio(families: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """由合并后的缓存查询次数推导各缓存的命中率"""
+    lookups = families.get(CACHE_LOOKUPS.name)
+    if not lookups:
+        return None
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in lookups["samples"]:
+        hits_and_total = totals.setdefault(cache, [0.0, 0.0])
+        hits_and_total[1] += value
+        if result == "hit":
+            hits_and_total[0] += value
+    return _family(
+        "gauge", "缓存命中率（命中次数 / 查询次数）",
+        [((cache,), hits / total) for cache, (hits, total) in sorted(totals.items()) if total], ("cache",),
+    )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(families: Dict[str, Dict[str, Any]]) -> str:
+    """按 Prometheus 文本格式 0.0.4 输出"""
+    ratio = _cache_hit_ratio(families)
+    if ratio is not None:
+        families = {**families, "survey_cache_hit_ratio": ratio}
+
+    lines: List[str] = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# HELP {name} {_escape(family['help'])}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        names = family["labels"]
+        for labels, value in sorted(family["samples"], key=lambda sample: sample[0]):
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(names, labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(family["buckets"]) + [math.inf], value["counts"]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{name}_bucket{_format_labels(names, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(names, labels)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_latest() -> str:
+    return render(collect())
+
+
+# ===== ASGI 中间件 =====
+
+class MetricsMiddleware:
+    """ASGI 中间件：按路由模板记录每个 HTTP 请求的耗时与状态码，并维护进行中的请求数"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            record_request(scope.get("method", ""), route, status, time.perf_counter() - started)
@@ -4,6 +4,8 @@ from .user import User
 from .survey import Survey
 from .question import Question
 from .answer import SurveyAnswer
+from .answer_item import SurveyAnswerItem
+from .survey_stat import SurveyStatRollup
 from .organization import Organization
 from .organization_member import OrganizationMember
 from .department import Department
@@ -11,8 +13,10 @@ from .participant import Participant
 from .category import Category
 from .survey_question import SurveyQuestion
 from .tag import Tag
+from .llm_cache import LlmCacheEntry
+from .ai_job import AiJob
 
 # 你也可以在这里定义一个列表，包含所有模型类，方便 Base.metadata.create_all 找到它们
 # 但由于 main.py 中已经导入了整个 models 包，SQLAlchemy 会自动发现继承自 Base 的类
 # 所以这里不强制要求，但为了清晰性，可以保留。
-__all__ = ["User", "Survey", "Question", "SurveyAnswer", "Organization", "OrganizationMember", "Department", "Participant", "Category", "SurveyQuestion", "Tag"]
+__all__ = ["User", "Survey", "Question", "SurveyAnswer", "SurveyAnswerItem", "SurveyStatRollup", "Organization", "OrganizationMember", "Department", "Participant", "Category", "SurveyQuestion", "Tag", "LlmCacheEntry", "AiJob"]
@@ -0,0 +1,31 @@
+# backend/app/models/ai_job.py
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from app.database import Base
+
+class AiJob(Base):
+    """
+    后台 AI 任务
+    长耗时的 AI 报告在后台执行，接口立即返回任务ID，客户端轮询或通过 SSE 获取进度；
+    状态流转：pending -> running -> succeeded / failed，pending / running 期间可取消（cancelled）
+    """
+    __tablename__ = "ai_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 十六进制
+    kind = Column(String(50), nullable=False)  # 任务类型，对应 job_service 中注册的处理函数
+    organization_id = Column(Integer, nullable=True, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    progress = Column(Integer, nullable=False, default=0)  # 0-100
+    message = Column(String(255), nullable=True)  # 当前步骤说明
+    params = Column(Text, nullable=True)  # JSON
+    result = Column(Text, nullable=True)  # JSON，仅 succeeded 时有值
+    error = Column(Text, nullable=True)
+
+    # 均为 UTC 时间（不带时区）
+    created_at = Column(DateTime, nullable=False, index=True)
+    updated_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<AiJob(id='{self.id}', kind='{self.kind}', status='{self.status}')>"
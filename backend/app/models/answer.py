@@ -1,6 +1,6 @@
 # backend/app/models/answer.py
 
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -14,7 +14,7 @@ class SurveyAnswer(Base):
     # 关联到哪个用户（如果用户是登录状态）
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     # 关联到哪个参与者（如果是扫码参与）
-    participant_id = Column(Integer, ForeignKey("participants.id"), nullable=True)
+    participant_id = Column(Integer, ForeignKey("participants.id"), nullable=True, index=True)
     # 回答提交时间
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
     # 存储回答的具体内容，通常是 JSON 格式
@@ -37,3 +37,12 @@ class SurveyAnswer(Base):
     user = relationship("User", back_populates="answers")
     participant = relationship("Participant", back_populates="answers")
     organization = relationship("Organization", backref="survey_answers")
+    # 拆分后的答题明细
+    items = relationship("SurveyAnswerItem", back_populates="answer", cascade="all, delete-orphan", passive_deletes=True)
+
+    # 按问卷读取答卷（趋势按提交时间、对比按组织过滤）以及组织级趋势统计
+    __table_args__ = (
+        Index("ix_survey_answers_survey_submitted", "survey_id", "submitted_at"),
+        Index("ix_survey_answers_survey_organization", "survey_id", "organization_id"),
+        Index("ix_survey_answers_organization_submitted", "organization_id", "submitted_at"),
+    )
@@ -0,0 +1,36 @@
+# backend/app/models/answer_item.py
+
+from sqlalchemy import Column, Integer, ForeignKey, Text, Float, Index
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class SurveyAnswerItem(Base):
+    """
+    答卷明细模型
+    将 SurveyAnswer.answers 中的 JSON 拆分为「每题每选项一行」，
+    供统计分析直接使用 GROUP BY 聚合，避免逐条解析 JSON
+    """
+    __tablename__ = "answer_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 所属答卷
+    answer_id = Column(Integer, ForeignKey("survey_answers.id", ondelete="CASCADE"), nullable=False, index=True)
+    # 冗余问卷ID，便于按问卷聚合时无需回表
+    survey_id = Column(Integer, ForeignKey("surveys.id", ondelete="CASCADE"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+
+    # 选择题为选项文本；填空/数字题为回答文本；排序题为被排序的选项
+    option_text = Column(Text, nullable=True)
+    # 数字题为数值；排序题为名次（从1开始）
+    numeric_value = Column(Float, nullable=True)
+    # 提交时该选项的得分
+    score = Column(Float, default=0.0)
+
+    answer = relationship("SurveyAnswer", back_populates="items")
+
+    __table_args__ = (
+        Index("ix_answer_items_survey_question", "survey_id", "question_id"),
+    )
+
+    def __repr__(self):
+        return f"<SurveyAnswerItem(answer_id={self.answer_id}, question_id={self.question_id}, option_text='{self.option_text}')>"
@@ -18,11 +18,11 @@ class Category(Base):
     code = Column(String(50), nullable=True)    # 分类编码
     
     # 组织关联（可为空，表示全局分类）
-    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True, index=True)
     organization = relationship("Organization", back_populates="categories")
     
     # 上级分类（自关联，支持树状结构）
-    parent_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
     parent = relationship("Category", remote_side=[id], back_populates="children")
     children = relationship("Category", back_populates="parent")
     
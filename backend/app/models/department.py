@@ -1,6 +1,6 @@
 # backend/app/models/department.py
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -22,12 +22,13 @@ class Department(Base):
     organization = relationship("Organization", back_populates="departments")
     
     # 上级部门（自关联）
-    parent_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("departments.id"), nullable=True, index=True)
     parent = relationship("Department", remote_side=[id], back_populates="children")
     children = relationship("Department", back_populates="parent")
     
     # 部门层级
     level = Column(Integer, default=1)  # 部门层级，1为顶级部门
+    path = Column(String(1000), nullable=True)  # 祖先部门路径，如 "1/3/5"；顶级部门为空
     
     # 状态
     is_active = Column(Boolean, default=True)
@@ -36,5 +37,10 @@ class Department(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # 按组织加载部门，以及按上级部门查找子部门
+    __table_args__ = (
+        Index("ix_departments_organization_parent", "organization_id", "parent_id"),
+    )
+
     def __repr__(self):
         return f"<Department(id={self.id}, name='{self.name}', org_id={self.organization_id})>"
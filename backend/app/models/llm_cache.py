@@ -0,0 +1,26 @@
+# backend/app/models/llm_cache.py
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from app.database import Base
+
+class LlmCacheEntry(Base):
+    """
+    LLM 结果缓存
+    以 (模型, 系统提示, 用户提示) 等内容的哈希为键保存生成结果，多进程共享；
+    过期时间控制 TTL，最近命中时间用于超出容量时淘汰最久未用的条目
+    """
+    __tablename__ = "llm_cache_entries"
+
+    cache_key = Column(String(64), primary_key=True)  # 内容的 SHA-256 十六进制摘要
+    namespace = Column(String(50), nullable=False, default="completion")  # completion：单次调用结果；survey-summary：整份总结
+    model = Column(String(255), nullable=True)
+    content = Column(Text, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+
+    # 均为 UTC 时间（不带时区）
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    last_hit_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<LlmCacheEntry(key='{self.cache_key[:12]}', namespace='{self.namespace}', model='{self.model}')>"
@@ -12,7 +12,7 @@ class OrganizationMember(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     role = Column(String(50), default="member", nullable=False) # 例如: "owner", "admin", "member", "viewer"
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -14,13 +14,13 @@ class Participant(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)  # 参与者姓名
-    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)  # 所属部门
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True, index=True)  # 所属部门
     position = Column(String(255), nullable=True)  # 职位
     email = Column(String(255), nullable=True)  # 邮箱（可选）
     phone = Column(String(50), nullable=True)  # 电话（可选）
     
     # 组织关联
-    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
     organization = relationship("Organization", back_populates="participants")
     
     # 部门关联
@@ -6,7 +6,7 @@
 """
 
 # ===== 导入依赖 =====
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Enum, Boolean, Table, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Enum, Boolean, Table, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -54,11 +54,11 @@ class Question(Base):
     owner = relationship("User", back_populates="questions")
     
     # 组织关联（可为空，表示全局题库问题）
-    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True, index=True)
     organization = relationship("Organization", back_populates="questions")
     
     # 分类关联（可为空，表示未分类）
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
     category = relationship("Category")
     
     # 标签关联（多对多关系）
@@ -78,13 +78,18 @@ class Question(Base):
     usage_count = Column(Integer, default=0)  # 使用次数统计
     
     # ===== 关联题字段 =====
-    parent_question_id = Column(Integer, ForeignKey("questions.id"), nullable=True)  # 关联题的父题目ID
+    parent_question_id = Column(Integer, ForeignKey("questions.id"), nullable=True, index=True)  # 关联题的父题目ID
     trigger_options = Column(Text, nullable=True)  # 触发条件（JSON格式，存储触发该关联题的选项列表）
     
     # ===== 时间戳字段 =====
     created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), onupdate=lambda: datetime.datetime.now(datetime.timezone.utc))
 
+    # 题库按使用次数排序的键集分页：(COALESCE(usage_count, 0), id)
+    __table_args__ = (
+        Index("ix_questions_usage_count_id", func.coalesce(usage_count, 0), id),
+    )
+
     # ===== 反向关系 =====
     # 回答关系（已注释，避免循环依赖）
     # answers = relationship("SurveyAnswer", back_populates="question", cascade="all, delete-orphan")
@@ -1,6 +1,6 @@
 # backend/app/models/survey.py
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -16,13 +16,17 @@ class Survey(Base):
     is_anonymous = Column(Boolean, default=False, nullable=False)
 
     # 外键关联到 User 模型，表示问卷的创建者
-    created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     owner = relationship("User", back_populates="surveys") # 定义与 User 模型的关系
 
     # 外键关联到 Organization 模型 (如果问卷属于某个组织)
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
     organization = relationship("Organization", back_populates="surveys")
 
+    # 冗余计数：答卷与题目关联增删时在同一事务内维护，列表接口无需逐份 COUNT；偏差由 reconcile_survey_counts 修正
+    response_count = Column(Integer, default=0, server_default="0", nullable=False)
+    question_count = Column(Integer, default=0, server_default="0", nullable=False)
+
     start_time = Column(DateTime(timezone=True), nullable=True)
     end_time = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
@@ -34,6 +38,11 @@ class Survey(Base):
     # 定义与 SurveyAnswer 模型的关系 (一个问卷可以有多个回答)
     answers = relationship("SurveyAnswer", back_populates="survey", cascade="all, delete-orphan")
 
+    # 组织问卷列表按创建时间排序
+    __table_args__ = (
+        Index("ix_surveys_organization_created", "organization_id", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Survey(id={self.id}, title='{self.title}', created_by_user_id={self.created_by_user_id})>"
 
@@ -1,6 +1,6 @@
 # backend/app/models/survey_question.py
 
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -14,7 +14,7 @@ class SurveyQuestion(Base):
     
     # 外键关联
     survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)
-    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, index=True)
     
     # 题目在调研中的排序
     order = Column(Integer, default=0, nullable=False)
@@ -25,6 +25,11 @@ class SurveyQuestion(Base):
     # 关系定义
     survey = relationship("Survey", back_populates="survey_questions")
     question = relationship("Question", back_populates="survey_questions")
+
+    # 按问卷加载题目并按题目顺序排序
+    __table_args__ = (
+        Index("ix_survey_questions_survey_order", "survey_id", "order"),
+    )
     
     def __repr__(self):
         return f"<SurveyQuestion(survey_id={self.survey_id}, question_id={self.question_id}, order={self.order})>"
@@ -0,0 +1,43 @@
+# backend/app/models/survey_stat.py
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, UniqueConstraint
+from app.database import Base
+
+class SurveyStatRollup(Base):
+    """
+    问卷统计预聚合模型
+    提交答卷时增量更新，分析接口直接读取按人群分组后的计数，避免每次全量扫描答卷
+
+    行的含义由 question_id / option_text 决定：
+    - question_id = 0, option_text = ''：问卷级汇总，count 为答卷数，score_sum 为总分之和
+    - question_id > 0, option_text = ''：题目级汇总，count 为作答人数，unanswered_count 为未作答人数，
+      submitted_count 为答卷中包含该题的份数（含空回答，作为每题平均分的分母）
+    - question_id > 0, option_text 非空：选项级汇总，count 为选择次数（仅选择题）
+    """
+    __tablename__ = "survey_stat_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id", ondelete="CASCADE"), nullable=False)
+    # 使用 0 / '' 代替 NULL，保证唯一约束在各数据库上都能用于 upsert
+    question_id = Column(Integer, nullable=False, default=0)
+    option_text = Column(String(255), nullable=False, default="")
+    # 维度：department / position / organization
+    dimension = Column(String(20), nullable=False)
+    dimension_value = Column(String(255), nullable=False)
+    # 答卷所属组织（0 表示无组织），用于按组织过滤/对比
+    organization_id = Column(Integer, nullable=False, default=0)
+
+    count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    unanswered_count = Column(Integer, nullable=False, default=0)
+    submitted_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "survey_id", "question_id", "option_text", "dimension", "dimension_value", "organization_id",
+            name="uq_survey_stat_rollups_key"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<SurveyStatRollup(survey_id={self.survey_id}, question_id={self.question_id}, dimension='{self.dimension}', dimension_value='{self.dimension_value}')>"
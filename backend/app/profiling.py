@@ -0,0 +1,239 @@
+# backend/app/profiling.py
+"""
+按需采样慢请求的调用栈，保存为火焰图可用的折叠栈文件（flamegraph.pl / speedscope 均可直接打开）
+- PROFILING_ENABLED 开启后，ProfilingMiddleware 只把进行中的请求登记到字典；
+  后台采样线程在没有请求达到阈值时一直休眠，未触发时几乎没有额外开销
+- 触发条件：请求耗时达到 PROFILING_SLOW_REQUEST_SECONDS（达到阈值后才开始采样，
+  结果不含阈值之前的部分），或请求头 X-Profile-Token 与 PROFILING_TOKEN 一致（从请求开始就采样）
+- 采样线程每隔 PROFILING_SAMPLE_INTERVAL 秒读取一次所有线程的调用栈，
+  只保留包含该请求接口函数的栈（同步接口在线程池中执行，按接口函数的栈帧定位所在线程）；
+  同一接口的并发慢请求会互相计入
+- 文件保存在 PROFILING_DIR，超出 PROFILING_MAX_FILES 时删除最早的文件
+"""
+
+import hmac
+import inspect
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_SUFFIX = ".folded"
+# 文件名只允许这些字符，下载接口据此拒绝路径穿越
+PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+_UNSAFE = re.compile(r"[^\w-]+")
+
+
+class ProfiledRequest:
+    """一个登记中的请求及其采样结果（折叠栈 -> 采样次数）"""
+
+    __slots__ = ("scope", "started", "forced", "samples", "_code")
+
+    def __init__(self, scope, forced: bool):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.forced = forced
+        self.samples: Counter = Counter()
+        self._code = None
+
+    def endpoint_code(self):
+        """接口函数的代码对象；路由匹配之前为 None"""
+        if self._code is None:
+            endpoint = self.scope.get("endpoint")
+            if endpoint is not None:
+                self._code = getattr(inspect.unwrap(endpoint), "__code__", None)
+        return self._code
+
+
+_lock = threading.Lock()
+_active: Dict[int, ProfiledRequest] = {}
+_wakeup = threading.Event()
+_sampler: Optional[threading.Thread] = None
+
+
+def profile_dir() -> str:
+    return settings.PROFILING_DIR or os.path.join(tempfile.gettempdir(), "survey_profiles")
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        filename = filename[marker + len("site-packages") + 1:]
+    else:
+        filename = os.sep.join(filename.split(os.sep)[-2:])
+    # 折叠栈格式以分号分隔栈帧，次数在最后一个空格之后
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _sample(due: List[ProfiledRequest]) -> None:
+    """读取一次所有线程的调用栈，把包含接口函数的部分计入对应请求"""
+    me = threading.get_ident()
+    found = []
+    for ident, frame in sys._current_frames().items():
+        if ident == me:
+            continue
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        for request in due:
+            code = request.endpoint_code()
+            if code is None or code not in codes:
+                continue
+            # 从接口函数开始，省略线程池与框架的栈帧
+            stack = codes[:codes.index(code) + 1]
+            found.append((request, ";".join(_frame_label(c) for c in reversed(stack))))
+    # 请求结束（已注销）后不再修改其采样结果，保存文件时无需加锁
+    with _lock:
+        for request, stack in found:
+            if id(request) in _active:
+                request.samples[stack] += 1
+
+
+def _sample_forever() -> None:
+    while True:
+        _wakeup.clear()
+        with _lock:
+            requests = list(_active.values())
+        if not requests:
+            _wakeup.wait()
+            continue
+        now = time.perf_counter()
+        threshold = settings.PROFILING_SLOW_REQUEST_SECONDS
+        due = [r for r in requests if r.forced or (threshold > 0 and now - r.started >= threshold)]
+        if not due:
+            # 休眠到最早的请求达到阈值；新登记的请求只会更晚到达阈值，强制采样的请求会唤醒本线程
+            _wakeup.wait(min(r.started for r in requests) + threshold - now if threshold > 0 else None)
+            continue
+        try:
+            _sample(due)
+        except Exception as exc:
+            logger.warning(f"采样调用栈失败: {exc}")
+        time.sleep(settings.PROFILING_SAMPLE_INTERVAL)
+
+
+def _ensure_sampler() -> None:
+    global _sampler
+    if _sampler is None or not _sampler.is_alive():
+        with _lock:
+            if _sampler is None or not _sampler.is_alive():
+                _sampler = threading.Thread(target=_sample_forever, name="request-profiler", daemon=True)
+                _sampler.start()
+
+
+def _register(request: ProfiledRequest) -> None:
+    _ensure_sampler()
+    with _lock:
+        _active[id(request)] = request
+        first = len(_active) == 1
+    if first or request.forced:
+        _wakeup.set()
+
+
+def _unregister(request: ProfiledRequest) -> None:
+    with _lock:
+        _active.pop(id(request), None)
+
+
+def _token_requested(scope) -> bool:
+    token = settings.PROFILING_TOKEN
+    if not token:
+        return False
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_TOKEN_HEADER:
+            return hmac.compare_digest(value, token.encode())
+    return False
+
+
+# ===== 文件存储 =====
+
+def save_profile(request: ProfiledRequest, method: str, route: str, seconds: float) -> str:
+    """写入折叠栈文件并按 PROFILING_MAX_FILES 清理最早的文件，返回文件名"""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    slug = _UNSAFE.sub("_", route).strip("_")[:80] or "root"
+    name = f"{stamp}-{method}-{slug}-{int(seconds * 1000)}ms{PROFILE_SUFFIX}"
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        f.writelines(f"{stack} {count}\n" for stack, count in request.samples.most_common())
+    _enforce_retention(directory)
+    logger.info(f"{method} {route} 耗时 {seconds:.2f}s，已保存调用栈采样 {name}（{sum(request.samples.values())} 次采样）")
+    return name
+
+
+def _enforce_retention(directory: str) -> None:
+    names = sorted(name for name in os.listdir(directory) if PROFILE_NAME.match(name))
+    for name in names[:max(len(names) - settings.PROFILING_MAX_FILES, 0)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """已保存的采样文件，最新的在前"""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not PROFILE_NAME.match(name):
+            continue
+        stat = os.stat(os.path.join(directory, name))
+        profiles.append({
+            "name": name,
+            "size": stat.st_size,
+            "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+        })
+    return profiles
+
+
+def profile_path(name: str) -> Optional[str]:
+    """采样文件的完整路径；文件名不合法或文件不存在时为 None"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+# ===== ASGI 中间件 =====
+
+class ProfilingMiddleware:
+    """ASGI 中间件：登记进行中的请求，请求结束时保存慢请求或带令牌请求的采样结果"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        request = ProfiledRequest(scope, _token_requested(scope))
+        _register(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _unregister(request)
+            seconds = time.perf_counter() - request.started
+            # 带令牌的请求即使过快未采到样本也保存（空文件），便于确认已触发
+            if request.samples or request.forced:
+                route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+                try:
+                    await run_in_threadpool(save_profile, request, scope.get("method", ""), route, seconds)
+                except OSError as exc:
+                    logger.warning(f"保存调用栈采样失败: {exc}")
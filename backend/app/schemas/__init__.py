@@ -5,7 +5,7 @@ from .token import Token
 from app.schemas.survey import SurveyCreate, SurveyUpdate, SurveyResponse
 from app.schemas.user import UserCreate, UserUpdate
 from .question import QuestionCreate, QuestionBase
-from .answer import SurveyAnswer, SurveyAnswerCreate, SurveyAnswerResponse, SurveyAnswerInDBBase
+from .answer import SurveyAnswer, SurveyAnswerCreate, SurveyAnswerResponse, SurveyAnswerInDBBase, SurveyAnswerBatchRowResult, SurveyAnswerBatchResponse
 from .organization import OrganizationCreate, OrganizationUpdate, OrganizationResponse
 from .organization_member import OrganizationMemberCreate, OrganizationMemberUpdate, OrganizationMemberResponse
 from .department import DepartmentCreate, DepartmentUpdate, DepartmentResponse
@@ -18,7 +18,7 @@ __all__ = [
     "UserCreate", "UserUpdate", "UserResponse",
     "SurveyCreate", "SurveyUpdate", "SurveyResponse",
     "QuestionCreate", "QuestionBase",
-    "SurveyAnswer", "SurveyAnswerCreate", "SurveyAnswerResponse", "SurveyAnswerInDBBase",
+    "SurveyAnswer", "SurveyAnswerCreate", "SurveyAnswerResponse", "SurveyAnswerInDBBase", "SurveyAnswerBatchRowResult", "SurveyAnswerBatchResponse",
     "OrganizationCreate", "OrganizationUpdate", "OrganizationResponse",
     "OrganizationMemberCreate", "OrganizationMemberUpdate", "OrganizationMemberResponse",
     "DepartmentCreate", "DepartmentUpdate", "DepartmentResponse",
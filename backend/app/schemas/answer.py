@@ -1,7 +1,7 @@
 # backend/app/schemas/answer.py  <-- 文件名改为 answer.py
 
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 # 用于接收用户提交的回答
@@ -37,3 +37,19 @@ class SurveyAnswerResponse(SurveyAnswerInDBBase): # <-- 类名改为 SurveyAnswe
 # 用于 __init__.py 导入
 class SurveyAnswer(SurveyAnswerInDBBase): # <-- 类名改为 SurveyAnswer
     pass
+
+# 批量导入答卷的逐行结果
+class SurveyAnswerBatchRowResult(BaseModel):
+    index: int = Field(..., description="Row index in the submitted batch")
+    status: str = Field(..., description="created / error / skipped")
+    answer_id: Optional[int] = None
+    total_score: Optional[float] = None
+    error: Optional[str] = None
+
+# 批量导入答卷的响应
+class SurveyAnswerBatchResponse(BaseModel):
+    survey_id: int
+    total: int
+    created: int
+    failed: int
+    results: List[SurveyAnswerBatchRowResult]
@@ -54,6 +54,7 @@ class CategoryTreeResponse(BaseModel):
     sort_order: int
     is_active: bool
     question_count: int
+    subtree_question_count: int = Field(0, description="包含全部子分类的题目数量")
     children: List['CategoryTreeResponse'] = []
     
     class Config:
@@ -219,6 +219,7 @@ class QuestionResponse(QuestionBase):
     usage_count: Optional[int] = 0
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    highlight: Optional[str] = None  # 搜索时返回：HTML 转义后的题干，命中词以 <mark> 标出
 
     @model_validator(mode="after")
     @classmethod
@@ -246,6 +247,7 @@ class QuestionListResponse(BaseModel):
     limit: int
     page: int
     pages: int
+    next_cursor: Optional[str] = None  # 下一页游标（键集分页），没有下一页时为空
 
     class Config:
         """
@@ -72,6 +72,7 @@ class SurveyResponse(BaseModel):
     questions: Optional[list] = None
     question_count: int = 0
     response_count: int = 0
+    highlight: Optional[str] = None  # 搜索时返回：HTML 转义后的标题，命中词以 <mark> 标出
 
     class Config:
         from_attributes = True # 兼容 SQLAlchemy 模型
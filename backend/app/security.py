@@ -38,12 +38,12 @@ def verify_token(token: str) -> Union[dict, None]:
     except JWTError:
         return None
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     FastAPI 依赖函数，用于获取当前登录用户。
     - 从请求头中提取令牌。
     - 验证令牌。
-    - 从数据库中获取用户对象。
+    - 获取用户快照（id、用户名、角色、组织），短时间缓存，避免每个请求都查询数据库。
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -70,14 +70,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except Exception as e:
         raise credentials_exception
 
-    user = user_service.get_user_by_username(db, username=username)
+    user = user_service.get_user_snapshot(db, username=username)
     
     if user is None:
         raise credentials_exception
     
     return user
 
-async def get_current_user_optional(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user_optional(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     FastAPI 依赖函数，用于获取当前登录用户（可选）。
     - 如果没有令牌或令牌无效，返回 None。
@@ -102,7 +102,7 @@ async def get_current_user_optional(token: str = Depends(oauth2_scheme), db: Ses
     except Exception as e:
         return None
 
-    user = user_service.get_user_by_username(db, username=username)
+    user = user_service.get_user_snapshot(db, username=username)
     
     if user is None:
         return None
@@ -0,0 +1,188 @@
+# backend/app/services/answer_ingest_service.py
+"""
+答卷批量导入服务
+用于纸质问卷录入、离线/自助终端回传等一次上传大量答卷的场景：
+整批共用一次加载的问卷定义和评分计划，逐行校验，合法答卷在同一事务内批量写入
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.models.answer import SurveyAnswer
+from app.models.participant import Participant
+from app.models.question import QuestionType
+from app.models.survey import Survey
+from app.schemas.answer import SurveyAnswerCreate
+from app.services.answer_item_service import build_answer_items, has_answer
+from app.services.grading_service import get_scoring_plan, score_answers_with_plan
+from app.services.survey_service import adjust_survey_counts
+from app.services.survey_stat_service import apply_answers_to_rollups
+
+# 单次请求允许的最大答卷数
+BATCH_MAX_ROWS = 20000
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class InvalidRow:
+    """请求体中无法解析的行，保留错误信息以便逐行返回"""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def parse_batch_body(body: bytes, content_type: Optional[str]) -> List[Any]:
+    """
+    解析批量请求体：JSON 数组，或每行一个 JSON 对象的 NDJSON
+    NDJSON 中解析失败的行以 InvalidRow 占位；整体格式错误时抛出 ValueError
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    text = body.decode("utf-8-sig")
+    if media_type in NDJSON_CONTENT_TYPES:
+        rows: List[Any] = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as exc:
+                rows.append(InvalidRow(f"第 {line_number} 行不是合法的 JSON: {exc.msg}"))
+        return rows
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"请求体不是合法的 JSON: {exc.msg}")
+    if not isinstance(data, list):
+        raise ValueError("请求体必须是答卷数组，或使用 application/x-ndjson 逐行提交")
+    return data
+
+
+def validate_answer_values(answers: Dict[str, Any], plan: Dict[int, Dict[str, Any]]) -> Optional[str]:
+    """按问卷定义校验答案，返回错误信息；合法时返回 None"""
+    for key, value in answers.items():
+        try:
+            question_id = int(key)
+        except (TypeError, ValueError):
+            return f"题目ID无效: {key}"
+        entry = plan.get(question_id)
+        if entry is None:
+            return f"题目 {question_id} 不属于该问卷"
+        if not has_answer(value):
+            continue
+        scores = entry["scores"]
+        if entry["type"] == QuestionType.SINGLE_CHOICE:
+            if not isinstance(value, str):
+                return f"题目 {question_id} 为单选题，答案必须是选项文本"
+            if scores and value not in scores:
+                return f"题目 {question_id} 的选项无效: {value}"
+        elif entry["type"] == QuestionType.MULTI_CHOICE:
+            if not isinstance(value, list):
+                return f"题目 {question_id} 为多选题，答案必须是选项列表"
+            for option in value:
+                if scores and (not isinstance(option, str) or option not in scores):
+                    return f"题目 {question_id} 的选项无效: {option}"
+    return None
+
+
+def _validate_row(raw: Any, plan: Dict[int, Dict[str, Any]]):
+    """校验单行，返回 (SurveyAnswerCreate, None) 或 (None, 错误信息)"""
+    if isinstance(raw, InvalidRow):
+        return None, raw.error
+    try:
+        answer_in = SurveyAnswerCreate.model_validate(raw)
+    except ValidationError as exc:
+        error = exc.errors()[0]
+        location = ".".join(str(part) for part in error.get("loc", ()))
+        return None, f"{location}: {error.get('msg')}" if location else error.get("msg")
+    error = validate_answer_values(answer_in.answers, plan)
+    if error:
+        return None, error
+    return answer_in, None
+
+
+def ingest_survey_answers(
+    db: Session,
+    survey: Survey,
+    rows: List[Any],
+    user_id: Optional[int] = None,
+    default_organization_id: Optional[int] = None,
+    all_or_nothing: bool = False
+) -> Dict[str, Any]:
+    """
+    批量导入答卷
+    - 整批共用一个评分计划，总分在内存中计算
+    - 参与者、答卷、答题明细在同一事务内批量写入，预聚合统计合并增量后一次更新
+    - all_or_nothing=True 时任一行校验失败则整批不写入
+    返回 {"survey_id", "total", "created", "failed", "results": [逐行结果]}
+    """
+    plan = get_scoring_plan(db, survey.id)
+    organization_fallback = survey.organization_id or default_organization_id
+
+    results: List[Dict[str, Any]] = []
+    accepted = []  # (结果字典, SurveyAnswerCreate)
+    for index, raw in enumerate(rows):
+        answer_in, error = _validate_row(raw, plan)
+        if error:
+            results.append({"index": index, "status": "error", "error": error})
+            continue
+        result = {"index": index, "status": "created"}
+        results.append(result)
+        accepted.append((result, answer_in))
+
+    failed = len(rows) - len(accepted)
+    if all_or_nothing and failed:
+        for result, _ in accepted:
+            result["status"] = "skipped"
+        return {"survey_id": survey.id, "total": len(rows), "created": 0, "failed": failed, "results": results}
+
+    db_answers: List[SurveyAnswer] = []
+    for result, answer_in in accepted:
+        organization_id = answer_in.organization_id or organization_fallback
+        participant = None
+        # 与单份提交一致：匿名且填写了姓名时登记为参与者
+        if user_id is None and answer_in.respondent_name and organization_id:
+            participant = Participant(
+                name=answer_in.respondent_name,
+                department_id=answer_in.department_id,
+                position=answer_in.position,
+                organization_id=organization_id
+            )
+        db_answers.append(SurveyAnswer(
+            survey_id=survey.id,
+            user_id=user_id,
+            participant=participant,
+            answers=json.dumps(answer_in.answers),
+            total_score=score_answers_with_plan(plan, answer_in.answers),
+            department=answer_in.department,
+            position=answer_in.position,
+            organization_id=organization_id,
+            organization_name=answer_in.organization_name
+        ))
+
+    if db_answers:
+        try:
+            db.add_all(db_answers)
+            db.flush()  # 批量插入参与者和答卷，取得答卷ID
+
+            answers_with_items = []
+            all_items = []
+            for db_answer, (result, answer_in) in zip(db_answers, accepted):
+                # 提交前记录结果：commit 后属性过期，再读取会逐行刷新
+                result["answer_id"] = db_answer.id
+                result["total_score"] = float(db_answer.total_score or 0.0)
+                items = build_answer_items(db_answer, answer_in.answers, plan)
+                answers_with_items.append((db_answer, items))
+                all_items.extend(items)
+            db.bulk_save_objects(all_items)
+            apply_answers_to_rollups(db, survey.id, answers_with_items, plan)
+            adjust_survey_counts(db, survey.id, responses=len(db_answers))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    return {"survey_id": survey.id, "total": len(rows), "created": len(db_answers), "failed": failed, "results": results}
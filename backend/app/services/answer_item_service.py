@@ -0,0 +1,193 @@
+# backend/app/services/answer_item_service.py
+"""
+答卷明细服务
+负责把 SurveyAnswer.answers 的 JSON 拆分为 answer_items 行，并提供按维度分组的辅助函数
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.models.answer import SurveyAnswer
+from app.models.answer_item import SurveyAnswerItem
+from app.models.question import Question, QuestionType
+from app.services.grading_service import build_scoring_plan, compile_question_scoring
+
+CHOICE_TYPES = (QuestionType.SINGLE_CHOICE, QuestionType.MULTI_CHOICE)
+
+
+def has_answer(value: Any) -> bool:
+    """判断是否作答：None、空字符串、空列表都算未作答"""
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return bool(value.strip())
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, list):
+        return len(value) > 0
+    return bool(value)
+
+
+def submitted_question_ids(answers: Any, question_ids: Iterable[int]) -> Set[int]:
+    """
+    答卷 JSON（字符串或已解析的字典）中出现的题目，含空回答
+    与逐条统计时「答卷中包含该题的键即计入」的口径一致，用作每题平均分的分母
+    """
+    if isinstance(answers, str):
+        try:
+            answers = json.loads(answers) if answers else {}
+        except (TypeError, ValueError):
+            return set()
+    if not isinstance(answers, dict):
+        return set()
+    return {qid for qid in question_ids if str(qid) in answers}
+
+
+def _option_text(raw: Any) -> str:
+    if isinstance(raw, dict) and 'text' in raw:
+        return str(raw['text'])
+    return raw if isinstance(raw, str) else str(raw)
+
+
+def score_option(question: Question, option_text: str) -> float:
+    """计算单个选项的得分（多选题按单个选中项计分），直接查编译后的分值表"""
+    return score_plan_option(compile_question_scoring(question), option_text)
+
+
+def score_plan_option(entry: Optional[Dict[str, Any]], option_text: str) -> float:
+    """按评分计划中的单题条目计算单个选项的得分"""
+    if not entry or entry["type"] not in CHOICE_TYPES:
+        return 0.0
+    return entry["scores"].get(option_text, 0.0)
+
+
+def explode_answer(entry: Dict[str, Any], value: Any) -> List[Dict[str, Any]]:
+    """
+    将单题回答拆分为明细行（不含 answer_id/survey_id），entry 为评分计划中的单题条目
+    - 单选/关联题：一行
+    - 多选题：每个选中项一行
+    - 排序题：每个选项一行，numeric_value 为名次
+    - 数字题：一行，numeric_value 为数值
+    - 填空题：一行，option_text 为回答文本
+    """
+    if not has_answer(value):
+        return []
+
+    rows: List[Dict[str, Any]] = []
+    question_type = entry["type"]
+    if question_type == QuestionType.SORT_ORDER and isinstance(value, list):
+        for rank, raw in enumerate(value, 1):
+            rows.append({"option_text": _option_text(raw), "numeric_value": float(rank), "score": 0.0})
+    elif isinstance(value, list):
+        for raw in value:
+            text = _option_text(raw)
+            rows.append({"option_text": text, "numeric_value": None, "score": score_plan_option(entry, text)})
+    else:
+        text = _option_text(value)
+        numeric_value = None
+        if question_type == QuestionType.NUMBER_INPUT:
+            try:
+                numeric_value = float(value)
+            except (TypeError, ValueError):
+                numeric_value = None
+        score = score_plan_option(entry, text)
+        rows.append({"option_text": text, "numeric_value": numeric_value, "score": score})
+    return rows
+
+
+def build_answer_items(
+    db_answer: SurveyAnswer,
+    answers_data: Dict[str, Any],
+    plan: Dict[int, Dict[str, Any]]
+) -> List[SurveyAnswerItem]:
+    """根据答卷 JSON 生成明细行对象（答卷需已 flush 取得ID；调用方负责写入/commit）"""
+    items: List[SurveyAnswerItem] = []
+    for qid_raw, value in (answers_data or {}).items():
+        try:
+            qid = int(qid_raw)
+        except (TypeError, ValueError):
+            continue
+        entry = plan.get(qid)
+        if not entry:
+            continue
+        for row in explode_answer(entry, value):
+            items.append(SurveyAnswerItem(
+                answer_id=db_answer.id,
+                survey_id=db_answer.survey_id,
+                question_id=qid,
+                **row
+            ))
+    return items
+
+
+def rebuild_answer_items(db: Session, survey_id: Optional[int] = None, batch_size: int = 1000) -> int:
+    """
+    重建答卷明细（用于历史数据回填或数据修复）
+    survey_id 为空时重建全部问卷，返回写入的明细行数
+    """
+    if survey_id is not None:
+        survey_ids = [survey_id]
+    else:
+        survey_ids = [row[0] for row in db.query(SurveyAnswer.survey_id).distinct().all() if row[0] is not None]
+
+    written = 0
+    for sid in survey_ids:
+        db.query(SurveyAnswerItem).filter(SurveyAnswerItem.survey_id == sid).delete(synchronize_session=False)
+        plan = build_scoring_plan(db, sid)
+        last_id = 0
+        while True:
+            # 按主键分批，避免一次性加载整份问卷的答卷
+            batch = (
+                db.query(SurveyAnswer)
+                .filter(SurveyAnswer.survey_id == sid, SurveyAnswer.id > last_id)
+                .order_by(SurveyAnswer.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            for db_answer in batch:
+                try:
+                    answers_data = json.loads(db_answer.answers) if db_answer.answers else {}
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                items = build_answer_items(db_answer, answers_data, plan)
+                db.bulk_save_objects(items)
+                written += len(items)
+            last_id = batch[-1].id
+            db.commit()
+            db.expunge_all()
+        db.commit()
+    return written
+
+
+# ===== 维度分组辅助 =====
+
+def dimension_columns(dimension: str) -> list:
+    """返回按维度分组时需要 GROUP BY 的答卷列"""
+    if dimension == "department":
+        return [SurveyAnswer.department]
+    if dimension == "position":
+        return [SurveyAnswer.position]
+    if dimension == "organization":
+        return [SurveyAnswer.organization_name, SurveyAnswer.organization_id]
+    raise ValueError("dimension must be 'department', 'position', or 'organization'")
+
+
+def dimension_label(dimension: str, values: Iterable[Any]) -> str:
+    """把 GROUP BY 得到的维度列值转换为展示用的分组名，规则与逐条统计时一致"""
+    values = list(values)
+    if dimension == "department":
+        return values[0] or "未知部门"
+    if dimension == "position":
+        return values[0] or "未知职位"
+    if dimension == "organization":
+        organization_name, organization_id = values
+        if organization_name:
+            return organization_name
+        if organization_id is not None:
+            return f"组织#{organization_id}"
+        return "未知组织"
+    return "未指定"
@@ -0,0 +1,161 @@
+# backend/app/services/category_service.py
+"""
+题目分类树服务
+分类树由一次分类查询 + 一次按 category_id 分组的题目计数查询一遍组装，
+子树题目数借助物化路径 Category.path（祖先ID以 "/" 连接）向上累加，结果按组织缓存
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.models.category import Category
+from app.models.question import Question
+
+# ===== 分类树缓存 =====
+# 分类增删改、移动以及题目分类变化时在本进程内主动失效；多进程部署下由 TTL 兜底
+CATEGORY_TREE_TTL_SECONDS = 300
+CATEGORY_TREE_MAX_SIZE = 256
+
+_tree_lock = threading.Lock()
+_tree_cache: "OrderedDict[Optional[int], Tuple[List[Dict[str, Any]], float]]" = OrderedDict()  # 组织ID（None 为全局）-> (分类树, 缓存时间)
+
+
+def _organization_filter(organization_id: Optional[int]):
+    if organization_id:
+        return Category.organization_id == organization_id
+    return Category.organization_id.is_(None)
+
+
+def ancestor_ids(path: Optional[str]) -> List[int]:
+    """解析物化路径，返回祖先分类ID（自顶向下）"""
+    return [int(part) for part in (path or "").split("/") if part.strip().isdigit()]
+
+
+def get_category_question_counts(db: Session, category_ids: Iterable[int]) -> Dict[int, int]:
+    """一次分组查询统计多个分类各自（不含子分类）的题目数"""
+    category_ids = list(category_ids)
+    if not category_ids:
+        return {}
+    rows = (
+        db.query(Question.category_id, func.count(Question.id))
+        .filter(Question.category_id.in_(category_ids))
+        .group_by(Question.category_id)
+        .all()
+    )
+    return {category_id: count for category_id, count in rows}
+
+
+def build_category_tree(categories: Iterable[Category], counts: Dict[int, int]) -> List[Dict[str, Any]]:
+    """
+    一遍组装分类树
+    - categories 需按 (sort_order, id) 排序，子节点顺序与之一致
+    - question_count 为分类本身的题目数，subtree_question_count 包含全部后代分类
+    - 父分类不在结果集中的分类（如跨组织引用）作为顶级节点返回
+    """
+    nodes: Dict[int, Dict[str, Any]] = {}
+    paths: Dict[int, Optional[str]] = {}
+    parents: Dict[int, Optional[int]] = {}
+    for category in categories:
+        own = counts.get(category.id, 0)
+        nodes[category.id] = {
+            "id": category.id,
+            "name": category.name,
+            "description": category.description,
+            "level": category.level,
+            "path": category.path,
+            "sort_order": category.sort_order,
+            "is_active": category.is_active,
+            "question_count": own,
+            "subtree_question_count": own,
+            "children": [],
+        }
+        paths[category.id] = category.path
+        parents[category.id] = category.parent_id
+
+    roots: List[Dict[str, Any]] = []
+    for category_id, node in nodes.items():
+        parent = nodes.get(parents[category_id])
+        if parent is None or parent is node:
+            roots.append(node)
+        else:
+            parent["children"].append(node)
+        # 沿物化路径把本分类的题目数累加到每个祖先
+        if node["question_count"]:
+            for ancestor_id in ancestor_ids(paths[category_id]):
+                ancestor = nodes.get(ancestor_id)
+                if ancestor is not None and ancestor is not node:
+                    ancestor["subtree_question_count"] += node["question_count"]
+    return roots
+
+
+def load_category_tree(db: Session, organization_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    获取分类树（含每个节点的题目数与子树题目数），命中缓存时不访问数据库
+    返回的结构在缓存中共享，调用方不得修改
+    """
+    organization_id = organization_id or None
+    now = time.monotonic()
+    with _tree_lock:
+        cached = _tree_cache.get(organization_id)
+        if cached and now - cached[1] < CATEGORY_TREE_TTL_SECONDS:
+            _tree_cache.move_to_end(organization_id)
+            metrics.record_cache_lookup("category_tree", True)
+            return cached[0]
+
+    metrics.record_cache_lookup("category_tree", False)
+    categories = (
+        db.query(Category)
+        .filter(_organization_filter(organization_id))
+        .order_by(Category.sort_order, Category.id)
+        .all()
+    )
+    counts = dict(
+        db.query(Question.category_id, func.count(Question.id))
+        .join(Category, Question.category_id == Category.id)
+        .filter(_organization_filter(organization_id))
+        .group_by(Question.category_id)
+        .all()
+    )
+    tree = build_category_tree(categories, counts)
+
+    with _tree_lock:
+        _tree_cache[organization_id] = (tree, now)
+        _tree_cache.move_to_end(organization_id)
+        while len(_tree_cache) > CATEGORY_TREE_MAX_SIZE:
+            _tree_cache.popitem(last=False)
+    return tree
+
+
+def invalidate_category_tree(organization_id: Optional[int] = None, all_organizations: bool = False) -> None:
+    """使分类树缓存失效；题目分类变化时无法直接确定组织，传 all_organizations=True 全部清空"""
+    with _tree_lock:
+        if all_organizations:
+            _tree_cache.clear()
+        else:
+            _tree_cache.pop(organization_id or None, None)
+
+
+def rebase_descendants(db: Session, category: Category, old_level: int, old_path: Optional[str]) -> None:
+    """
+    分类移动后同步所有后代的层级和路径（集合更新，不逐个加载）
+    后代的路径都以 "旧路径/分类ID" 开头，替换为 "新路径/分类ID"
+    """
+    old_prefix = f"{old_path}/{category.id}" if old_path else str(category.id)
+    new_prefix = f"{category.path}/{category.id}" if category.path else str(category.id)
+    level_delta = (category.level or 1) - (old_level or 1)
+    if old_prefix == new_prefix and not level_delta:
+        return
+    descendants = (Category.path == old_prefix) | Category.path.like(f"{old_prefix}/%")
+    db.query(Category).filter(_organization_filter(category.organization_id), descendants).update(
+        {
+            Category.path: new_prefix + func.substr(Category.path, len(old_prefix) + 1),
+            Category.level: Category.level + level_delta,
+        },
+        synchronize_session=False,
+    )
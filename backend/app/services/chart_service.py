@@ -1,21 +1,8 @@
 from sqlalchemy.orm import Session
-from app.models.answer import SurveyAnswer
 from app.models.question import Question, QuestionType
-import json
-from typing import List, Dict, Any, Optional
-
-def _resolve_group_value(ans: SurveyAnswer, dimension: str) -> str:
-    if dimension == "department":
-        return ans.department or "未知部门"
-    if dimension == "position":
-        return ans.position or "未知职位"
-    if dimension == "organization":
-        if ans.organization_name:
-            return ans.organization_name
-        if ans.organization_id is not None:
-            return f"组织#{ans.organization_id}"
-        return "未知组织"
-    return "未指定"
+from app.models.survey_stat import SurveyStatRollup
+from app.services.survey_stat_service import query_rollups
+from typing import List, Dict, Any, Iterable, Optional
 
 def get_question_option_stats(
     db: Session,
@@ -37,13 +24,22 @@ def get_question_option_stats(
     questions = get_survey_questions(db, survey_id)
     if not questions:
         return []
-        
-    # 2. 获取该问卷的所有回答
-    answers_query = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey_id)
-    if organization_ids:
-        answers_query = answers_query.filter(SurveyAnswer.organization_id.in_(organization_ids))
-    answers = answers_query.all()
-    
+
+    # 2. 读取预聚合数据：选项级行为选择次数，题目级行为作答/未作答人数
+    rows = query_rollups(db, survey_id, dimension, organization_ids).filter(
+        SurveyStatRollup.question_id.in_([question['id'] for question in questions])
+    ).all()
+    return build_question_option_stats(questions, rows)
+
+
+def build_question_option_stats(
+    questions: List[Dict[str, Any]],
+    rows: Iterable[SurveyStatRollup]
+) -> List[Dict[str, Any]]:
+    """
+    由题目列表（get_survey_questions 的返回值）和同一维度的预聚合行生成选项分布图表数据，
+    不访问数据库；不属于这些题目的行（如问卷级汇总行）会被忽略
+    """
     stats_map: Dict[str, Dict[str, Any]] = {} # question_id -> option_text -> group -> count
     
     # 初始化统计结构
@@ -67,69 +63,25 @@ def get_question_option_stats(
         # 初始化 "未作答" 统计
         stats_map[q_id]["options_stats"]["(未作答)"] = {}
 
-    for ans in answers:
-        group_value = _resolve_group_value(ans, dimension)
-        
-        if not ans.answers:
-            # 如果整个回答都为空，所有问题都算未作答
-            for q_id in stats_map:
-                stats_map[q_id]["options_stats"]["(未作答)"][group_value] = stats_map[q_id]["options_stats"]["(未作答)"].get(group_value, 0) + 1
+    for row in rows:
+        q_stats = stats_map.get(str(row.question_id))
+        if not q_stats:
             continue
-            
-        try:
-            ans_data = json.loads(ans.answers)
-        except (json.JSONDecodeError, TypeError):
-            # 解析失败，视为未作答
-            for q_id in stats_map:
-                stats_map[q_id]["options_stats"]["(未作答)"][group_value] = stats_map[q_id]["options_stats"]["(未作答)"].get(group_value, 0) + 1
+        is_choice = q_stats["type"] in [QuestionType.SINGLE_CHOICE, QuestionType.MULTI_CHOICE]
+        if row.option_text:
+            if is_choice and row.count > 0:
+                opt_stats = q_stats["options_stats"].setdefault(row.option_text, {})
+                opt_stats[row.dimension_value] = opt_stats.get(row.dimension_value, 0) + row.count
             continue
-        
-        # 遍历每个问题，判断是否回答
-        for q_id, q_stats in stats_map.items():
-            user_ans = ans_data.get(q_id)
-            
-            # 判断是否回答：None, 空字符串, 空列表 都算未回答
-            has_answer = False
-            if user_ans is not None:
-                if isinstance(user_ans, str) and user_ans.strip():
-                    has_answer = True
-                elif isinstance(user_ans, (int, float)):
-                    has_answer = True
-                elif isinstance(user_ans, list) and len(user_ans) > 0:
-                    has_answer = True
-            
-            if not has_answer:
-                # 计入未作答
-                q_stats["options_stats"]["(未作答)"][group_value] = q_stats["options_stats"]["(未作答)"].get(group_value, 0) + 1
-            else:
-                is_choice = q_stats["type"] in [QuestionType.SINGLE_CHOICE, QuestionType.MULTI_CHOICE]
-                
-                if is_choice:
-                    selected_options = []
-                    if isinstance(user_ans, str):
-                        selected_options = [user_ans]
-                    elif isinstance(user_ans, list):
-                        selected_options = user_ans
-                    elif isinstance(user_ans, (int, float)):
-                        selected_options = [str(user_ans)]
-                        
-                    for raw_opt in selected_options:
-                        opt_text = raw_opt
-                        if isinstance(raw_opt, dict) and 'text' in raw_opt:
-                            opt_text = raw_opt['text']
-                        elif not isinstance(raw_opt, str):
-                            opt_text = str(raw_opt)
-                        if opt_text not in q_stats["options_stats"]:
-                            q_stats["options_stats"][opt_text] = {}
-                        
-                        q_stats["options_stats"][opt_text][group_value] = q_stats["options_stats"][opt_text].get(group_value, 0) + 1
-                else:
-                    # 非选择题：统一计入“有答案”
-                    if "有答案" not in q_stats["options_stats"]:
-                        q_stats["options_stats"]["有答案"] = {}
-                    q_stats["options_stats"]["有答案"][group_value] = q_stats["options_stats"]["有答案"].get(group_value, 0) + 1
+        if not is_choice and row.count > 0:
+            # 非选择题：统一计入“有答案”
+            answered = q_stats["options_stats"]["有答案"]
+            answered[row.dimension_value] = answered.get(row.dimension_value, 0) + row.count
+        if row.unanswered_count > 0:
+            unanswered = q_stats["options_stats"]["(未作答)"]
+            unanswered[row.dimension_value] = unanswered.get(row.dimension_value, 0) + row.unanswered_count
 
-    # 3. 转换为前端友好的列表格式
+    # 转换为前端友好的列表格式
     result = []
     for q_id, data in stats_map.items():
         options_data = []
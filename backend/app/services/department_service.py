@@ -0,0 +1,161 @@
+# backend/app/services/department_service.py
+"""
+部门层级服务
+部门用物化路径 Department.path（祖先ID以 "/" 连接，顶级部门为空）表示层级：
+整棵树一次查询组装，子树的停用、移动各是一条集合更新语句；部门树按组织缓存
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.models.department import Department
+
+# ===== 部门树缓存 =====
+# 公开部门树在每位匿名答题者选择部门时都会请求；部门增删改时在本进程内主动失效，多进程部署下由 TTL 兜底
+DEPARTMENT_TREE_TTL_SECONDS = 300
+DEPARTMENT_TREE_MAX_SIZE = 256
+
+_tree_lock = threading.Lock()
+_tree_cache: "OrderedDict[int, Tuple[List[Dict[str, Any]], float]]" = OrderedDict()  # 组织ID -> (部门树, 缓存时间)
+
+
+def ancestor_ids(path: Optional[str]) -> List[int]:
+    """解析物化路径，返回祖先部门ID（自顶向下）"""
+    return [int(part) for part in (path or "").split("/") if part.strip().isdigit()]
+
+
+def subtree_prefix(department: Department) -> str:
+    """部门后代路径的公共前缀：自身路径 + 自身ID"""
+    return f"{department.path}/{department.id}" if department.path else str(department.id)
+
+
+def placement_under(parent: Optional[Department]) -> Tuple[int, Optional[str]]:
+    """挂到 parent 下时的 (层级, 路径)；parent 为空表示顶级部门"""
+    if parent is None:
+        return 1, None
+    return (parent.level or 1) + 1, subtree_prefix(parent)
+
+
+def _subtree_filter(department: Department, include_self: bool = True):
+    prefix = subtree_prefix(department)
+    conditions = [Department.path == prefix, Department.path.like(f"{prefix}/%")]
+    if include_self:
+        conditions.append(Department.id == department.id)
+    return (Department.organization_id == department.organization_id) & or_(*conditions)
+
+
+def department_node(department: Department) -> Dict[str, Any]:
+    return {
+        "id": department.id,
+        "name": department.name,
+        "code": department.code,
+        "description": department.description,
+        "level": department.level,
+        "parent_id": department.parent_id,
+        "organization_id": department.organization_id,
+        "is_active": department.is_active,
+        "created_at": department.created_at,
+        "updated_at": department.updated_at,
+        "children": [],
+    }
+
+
+def build_department_tree(departments: Iterable[Department]) -> List[Dict[str, Any]]:
+    """
+    一遍组装部门树；子节点顺序与输入顺序一致
+    上级部门不在结果集中（已停用）的部门连同其子树不返回，与逐层查询时的结果一致
+    """
+    nodes: Dict[int, Dict[str, Any]] = {}
+    for department in departments:
+        nodes[department.id] = department_node(department)
+
+    roots: List[Dict[str, Any]] = []
+    for node in nodes.values():
+        parent_id = node["parent_id"]
+        if parent_id is None:
+            roots.append(node)
+        elif parent_id in nodes and parent_id != node["id"]:
+            nodes[parent_id]["children"].append(node)
+    return roots
+
+
+def load_department_tree(db: Session, organization_id: int) -> List[Dict[str, Any]]:
+    """
+    获取组织的在用部门树，命中缓存时不访问数据库
+    返回的结构在缓存中共享，调用方不得修改
+    """
+    now = time.monotonic()
+    with _tree_lock:
+        cached = _tree_cache.get(organization_id)
+        if cached and now - cached[1] < DEPARTMENT_TREE_TTL_SECONDS:
+            _tree_cache.move_to_end(organization_id)
+            metrics.record_cache_lookup("department_tree", True)
+            return cached[0]
+
+    metrics.record_cache_lookup("department_tree", False)
+    departments = (
+        db.query(Department)
+        .filter(Department.organization_id == organization_id, Department.is_active == True)
+        .order_by(Department.id)
+        .all()
+    )
+    tree = build_department_tree(departments)
+
+    with _tree_lock:
+        _tree_cache[organization_id] = (tree, now)
+        _tree_cache.move_to_end(organization_id)
+        while len(_tree_cache) > DEPARTMENT_TREE_MAX_SIZE:
+            _tree_cache.popitem(last=False)
+    return tree
+
+
+def invalidate_department_tree(organization_id: Optional[int] = None) -> None:
+    """使部门树缓存失效；不传组织ID时全部清空"""
+    with _tree_lock:
+        if organization_id is None:
+            _tree_cache.clear()
+        else:
+            _tree_cache.pop(organization_id, None)
+
+
+def deactivate_subtree(db: Session, department: Department) -> int:
+    """停用部门及其全部后代（一条 UPDATE），返回受影响的部门数；由调用方提交"""
+    return (
+        db.query(Department)
+        .filter(_subtree_filter(department))
+        .update({Department.is_active: False}, synchronize_session="fetch")
+    )
+
+
+def move_department(db: Session, department: Department, parent: Optional[Department]) -> None:
+    """
+    把部门移动到 parent 下（parent 为空表示移到顶级），后代的层级和路径一并更新；由调用方提交
+    目标为自身或自身后代时抛出 ValueError
+    """
+    if parent is not None and (parent.id == department.id or department.id in ancestor_ids(parent.path)):
+        raise ValueError("不能将部门移动到自身或其下级部门下")
+
+    old_prefix = subtree_prefix(department)
+    old_level = department.level or 1
+    descendants = _subtree_filter(department, include_self=False)
+    department.parent_id = parent.id if parent is not None else None
+    department.level, department.path = placement_under(parent)
+    new_prefix = subtree_prefix(department)
+    level_delta = department.level - old_level
+    if old_prefix == new_prefix and not level_delta:
+        return
+
+    # 后代路径都以旧前缀开头：截掉旧前缀、拼上新前缀
+    db.query(Department).filter(descendants).update(
+        {
+            Department.path: new_prefix + func.substr(Department.path, len(old_prefix) + 1),
+            Department.level: Department.level + level_delta,
+        },
+        synchronize_session=False,
+    )
@@ -1,88 +1,134 @@
-
 from sqlalchemy.orm import Session
+from app import metrics
 from app.models.question import Question, QuestionType
 from app.models.answer import SurveyAnswer
 import json
-from typing import List, Dict, Any
+import threading
+import time
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+from app.services.question_service import load_survey_questions, parse_options
 
-def calculate_answer_score(question: Question, answer_value: Any) -> float:
-    """
-    计算单个问题的得分
-    """
-    if not answer_value:
-        return 0.0
+# ===== 评分计划 =====
+# 评分计划：question_id -> {"type": 题型, "scores": {选项文本: 分值}}
+# 按问卷缓存；题目/问卷修改时在本进程内主动失效，多进程部署下由 TTL 兜底
+SCORING_PLAN_TTL_SECONDS = 300
+
+_plan_lock = threading.Lock()
+_plan_cache: Dict[int, Dict[str, Any]] = {}  # survey_id -> {"plan": ..., "built_at": ...}
+_question_surveys: Dict[int, set] = {}  # question_id -> 引用该题目的已缓存问卷
 
-    # 解析选项
-    options = []
-    if question.options:
+
+@lru_cache(maxsize=4096)
+def _compile_options(raw_options: str) -> Dict[Any, float]:
+    scores: Dict[Any, float] = {}
+    for opt in parse_options(raw_options):
+        # 兼容旧格式和新格式
+        opt_text = opt.get('text') if isinstance(opt, dict) else opt
+        opt_score = opt.get('score', 0) if isinstance(opt, dict) else 0
+        opt_correct = opt.get('is_correct', False) if isinstance(opt, dict) else False
         try:
-            options = json.loads(question.options) if isinstance(question.options, str) else question.options
-        except:
-            options = []
-
-    score = 0.0
-
-    if question.type == QuestionType.SINGLE_CHOICE:
-        # 单选题：找到匹配的选项，累加分数
-        if isinstance(answer_value, str): # 假设单选答案是选项文本
-             for opt in options:
-                # 兼容旧格式和新格式
-                opt_text = opt.get('text') if isinstance(opt, dict) else opt
-                opt_score = opt.get('score', 0) if isinstance(opt, dict) else 0
-                opt_correct = opt.get('is_correct', False) if isinstance(opt, dict) else False
-                
-                if opt_text == answer_value:
-                    score += float(opt_score)
-                    # 如果没有设置具体分值但设置了正确答案，默认给1分（或者根据业务规则调整）
-                    if opt_score == 0 and opt_correct:
-                        score += 1.0 
-                    break
-
-    elif question.type == QuestionType.MULTI_CHOICE:
-        # 多选题：遍历所有选中项
+            hash(opt_text)
+        except TypeError:
+            continue
+        if opt_text in scores:
+            # 与逐项匹配时一致：同名选项以第一个为准
+            continue
+        score = float(opt_score or 0)
+        # 如果没有设置具体分值但设置了正确答案，默认给1分（或者根据业务规则调整）
+        if not opt_score and opt_correct:
+            score += 1.0
+        scores[opt_text] = score
+    return scores
+
+
+def compile_question_scoring(question: Question) -> Dict[str, Any]:
+    """把题目选项编译为 {选项文本: 分值} 的哈希表（按原始选项 JSON 缓存）"""
+    raw_options = question.options if isinstance(question.options, str) else json.dumps(question.options or [], ensure_ascii=False)
+    return {"type": question.type, "scores": _compile_options(raw_options or "")}
+
+
+def score_with_plan(entry: Optional[Dict[str, Any]], answer_value: Any) -> float:
+    """使用编译后的评分表计算单题得分"""
+    if not entry or not answer_value:
+        return 0.0
+    scores = entry["scores"]
+    if entry["type"] == QuestionType.SINGLE_CHOICE:
+        # 单选题：答案是选项文本
+        if isinstance(answer_value, str):
+            return scores.get(answer_value, 0.0)
+    elif entry["type"] == QuestionType.MULTI_CHOICE:
+        # 多选题：累加所有选中项
         if isinstance(answer_value, list):
+            total = 0.0
             for val in answer_value:
-                for opt in options:
-                    opt_text = opt.get('text') if isinstance(opt, dict) else opt
-                    opt_score = opt.get('score', 0) if isinstance(opt, dict) else 0
-                    opt_correct = opt.get('is_correct', False) if isinstance(opt, dict) else False
-
-                    if opt_text == val:
-                        score += float(opt_score)
-                        if opt_score == 0 and opt_correct:
-                            score += 1.0
-                        break
-    
+                try:
+                    total += scores.get(val, 0.0)
+                except TypeError:
+                    continue
+            return total
     # 填空题和数字题暂时不支持自动评分，除非有标准答案匹配逻辑（此处略）
-    
-    return score
+    return 0.0
+
+
+def build_scoring_plan(db: Session, survey_id: int) -> Dict[int, Dict[str, Any]]:
+    """构建问卷评分计划（单次联表查询）"""
+    return {question.id: compile_question_scoring(question) for question, _ in load_survey_questions(db, survey_id)}
+
+
+def get_scoring_plan(db: Session, survey_id: int) -> Dict[int, Dict[str, Any]]:
+    """获取问卷评分计划，命中缓存时不访问数据库"""
+    now = time.monotonic()
+    with _plan_lock:
+        cached = _plan_cache.get(survey_id)
+        if cached and now - cached["built_at"] < SCORING_PLAN_TTL_SECONDS:
+            metrics.record_cache_lookup("scoring_plan", True)
+            return cached["plan"]
+
+    metrics.record_cache_lookup("scoring_plan", False)
+    plan = build_scoring_plan(db, survey_id)
+    with _plan_lock:
+        _plan_cache[survey_id] = {"plan": plan, "built_at": now}
+        for question_id in plan:
+            _question_surveys.setdefault(question_id, set()).add(survey_id)
+    return plan
+
+
+def invalidate_scoring_plan(survey_id: Optional[int] = None) -> None:
+    """使问卷评分计划失效；survey_id 为空时清空全部"""
+    with _plan_lock:
+        if survey_id is None:
+            _plan_cache.clear()
+            _question_surveys.clear()
+        else:
+            _plan_cache.pop(survey_id, None)
+
+
+def invalidate_question_scoring(question_id: int) -> None:
+    """题目修改后，使所有引用该题目的问卷评分计划失效"""
+    with _plan_lock:
+        for survey_id in _question_surveys.pop(question_id, set()):
+            _plan_cache.pop(survey_id, None)
+
+
+def calculate_answer_score(question: Question, answer_value: Any) -> float:
+    """
+    计算单个问题的得分
+    """
+    return score_with_plan(compile_question_scoring(question), answer_value)
 
 def calculate_survey_total_score(db: Session, survey_id: int, answers_data: Dict[str, Any]) -> float:
     """
     计算整份问卷的总分
     """
-    from app.services.survey_service import get_survey_questions
-    
-    # 获取问卷题目
-    # 注意：这里直接复用 get_survey_questions 可能会返回 dict 列表而不是 ORM 对象
-    # 我们直接查询 ORM 对象以便使用
-    from app.models.survey_question import SurveyQuestion
-    
-    survey_questions_relations = db.query(SurveyQuestion).filter(
-        SurveyQuestion.survey_id == survey_id
-    ).all()
-    
+    return score_answers_with_plan(get_scoring_plan(db, survey_id), answers_data)
+
+def score_answers_with_plan(plan: Dict[int, Dict[str, Any]], answers_data: Dict[str, Any]) -> float:
+    """
+    使用评分计划计算整份答卷的总分（不访问数据库，批量导入时复用同一计划）
+    """
     total_score = 0.0
-    
-    for sq in survey_questions_relations:
-        question = db.query(Question).filter(Question.id == sq.question_id).first()
-        if not question:
-            continue
-            
+    for question_id, entry in plan.items():
         # 答案中的 key 通常是 question_id (str)
-        ans_val = answers_data.get(str(question.id))
-        if ans_val:
-            total_score += calculate_answer_score(question, ans_val)
-            
+        total_score += score_with_plan(entry, answers_data.get(str(question_id)))
     return total_score
-
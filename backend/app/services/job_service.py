@@ -0,0 +1,304 @@
+# backend/app/services/job_service.py
+"""
+后台 AI 任务服务
+任务记录持久化在 ai_jobs 表，执行在本进程的事件循环中：
+- submit_job 写入 pending 记录后立即返回，任务在后台按 AI_JOB_MAX_CONCURRENCY 限流执行
+- 处理函数通过 job_handler(kind) 注册，签名为 async (params, job) -> 可 JSON 序列化的结果，
+  执行中调用 await job.progress(百分比, 说明) 汇报进度
+- 状态变更都是带状态条件的 UPDATE，取消与完成并发时以先写入者为准；
+  取消由其他进程写入时，本进程在下一次汇报进度时停止
+- 同进程内的等待方（内联等待、SSE）在状态变化时立即被唤醒，跨进程时按 JOB_POLL_SECONDS 轮询数据库
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.ai_job import AiJob
+from app.services import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+ACTIVE_STATUSES = (JOB_PENDING, JOB_RUNNING)
+TERMINAL_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+# 跨进程等待时轮询数据库的间隔；SSE 无变化时发送心跳的间隔
+JOB_POLL_SECONDS = 1.0
+SSE_KEEPALIVE_SECONDS = 15.0
+
+JobHandler = Callable[[Dict[str, Any], "JobContext"], Awaitable[Any]]
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    """注册任务处理函数"""
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _snapshot(job: AiJob) -> Dict[str, Any]:
+    """任务状态（不含结果正文）"""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "organization_id": job.organization_id,
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# ===== 数据库读写（同步，协程中通过 asyncio.to_thread 调用）=====
+
+def _create_job(kind: str, params: Dict[str, Any], organization_id: Optional[int]) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        now = _utcnow()
+        # 顺带清理超过保留期的已结束任务（created_at 有索引）
+        db.query(AiJob).filter(
+            AiJob.created_at < now - timedelta(days=settings.AI_JOB_RETENTION_DAYS),
+            AiJob.status.in_(TERMINAL_STATUSES),
+        ).delete(synchronize_session=False)
+        job = AiJob(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            organization_id=organization_id,
+            status=JOB_PENDING,
+            progress=0,
+            message="排队中",
+            params=json.dumps(params, ensure_ascii=False, default=str),
+            created_at=now,
+            updated_at=now,
+        )
+        db.add(job)
+        db.commit()
+        return _snapshot(job)
+    finally:
+        db.close()
+
+
+def _transition(job_id: str, from_statuses: Tuple[str, ...], **values) -> bool:
+    """仅当任务处于 from_statuses 之一时更新，返回是否更新成功"""
+    db = SessionLocal()
+    try:
+        values["updated_at"] = _utcnow()
+        updated = db.query(AiJob).filter(AiJob.id == job_id, AiJob.status.in_(from_statuses)).update(
+            {getattr(AiJob, name): value for name, value in values.items()},
+            synchronize_session=False,
+        )
+        db.commit()
+        return updated > 0
+    finally:
+        db.close()
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    查询任务状态；不存在时返回 None
+    长时间没有进度更新的未结束任务（执行进程已退出）标记为失败
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(AiJob, job_id)
+        if job is None:
+            return None
+        if job.status in ACTIVE_STATUSES and job.updated_at < _utcnow() - timedelta(seconds=settings.AI_JOB_STALE_SECONDS):
+            db.close()
+            _transition(job_id, ACTIVE_STATUSES, status=JOB_FAILED, error="任务中断（执行进程已退出）", finished_at=_utcnow())
+            db = SessionLocal()
+            job = db.get(AiJob, job_id)
+        return _snapshot(job)
+    finally:
+        db.close()
+
+
+def get_job_result(job_id: str) -> Tuple[Optional[Dict[str, Any]], Any]:
+    """返回 (任务状态, 结果)；任务不存在时状态为 None，未成功完成时结果为 None"""
+    db = SessionLocal()
+    try:
+        job = db.get(AiJob, job_id)
+        if job is None:
+            return None, None
+        result = json.loads(job.result) if job.status == JOB_SUCCEEDED and job.result else None
+        return _snapshot(job), result
+    finally:
+        db.close()
+
+
+# ===== 本进程的执行状态（与事件循环绑定）=====
+
+class _Runtime:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.slots = asyncio.Semaphore(settings.AI_JOB_MAX_CONCURRENCY)
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.changed: Dict[str, asyncio.Event] = {}
+
+
+_runtime: Optional[_Runtime] = None
+
+
+def _get_runtime() -> _Runtime:
+    global _runtime
+    loop = asyncio.get_running_loop()
+    if _runtime is None or _runtime.loop is not loop:
+        _runtime = _Runtime(loop)
+    return _runtime
+
+
+def _notify(job_id: str) -> None:
+    """唤醒等待该任务状态变化的协程"""
+    event = _get_runtime().changed.pop(job_id, None)
+    if event is not None:
+        event.set()
+
+
+async def _wait_for_change(job_id: str, timeout: float) -> None:
+    event = _get_runtime().changed.setdefault(job_id, asyncio.Event())
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+class JobContext:
+    """传给处理函数的任务上下文"""
+
+    def __init__(self, job_id: str, organization_id: Optional[int]):
+        self.job_id = job_id
+        self.organization_id = organization_id
+
+    async def progress(self, percent: int, message: Optional[str] = None) -> None:
+        """汇报进度；任务已被取消时抛出 CancelledError 结束处理函数"""
+        values = {"progress": max(0, min(100, int(percent)))}
+        if message is not None:
+            values["message"] = message[:255]
+        if not await asyncio.to_thread(_transition, self.job_id, (JOB_RUNNING,), **values):
+            raise asyncio.CancelledError()
+        _notify(self.job_id)
+
+
+async def _run_job(job_id: str, kind: str, params: Dict[str, Any], organization_id: Optional[int]) -> None:
+    runtime = _get_runtime()
+    # 任务中的 LLM 调用计入所属组织的并发配额
+    llm_gateway.set_organization(organization_id)
+    try:
+        async with runtime.slots:
+            if not await asyncio.to_thread(
+                _transition, job_id, (JOB_PENDING,), status=JOB_RUNNING, started_at=_utcnow(), message="执行中"
+            ):
+                return  # 排队期间已被取消
+            _notify(job_id)
+            result = await _handlers[kind](params, JobContext(job_id, organization_id))
+        await asyncio.to_thread(
+            _transition, job_id, (JOB_RUNNING,),
+            status=JOB_SUCCEEDED,
+            progress=100,
+            message="已完成",
+            result=json.dumps(result, ensure_ascii=False, default=str),
+            finished_at=_utcnow(),
+        )
+    except asyncio.CancelledError:
+        await asyncio.to_thread(
+            _transition, job_id, ACTIVE_STATUSES, status=JOB_CANCELLED, message="已取消", finished_at=_utcnow()
+        )
+    except Exception as e:
+        logger.exception(f"后台任务 {kind}({job_id}) 执行失败: {e}")
+        await asyncio.to_thread(
+            _transition, job_id, (JOB_RUNNING,), status=JOB_FAILED, message="执行失败", error=str(e), finished_at=_utcnow()
+        )
+    finally:
+        runtime.tasks.pop(job_id, None)
+        _notify(job_id)
+
+
+# ===== 对外接口（需在事件循环中调用）=====
+
+async def submit_job(kind: str, params: Dict[str, Any], organization_id: Optional[int] = None) -> Dict[str, Any]:
+    """创建任务并在后台开始执行，返回任务状态；未注册的任务类型抛出 ValueError"""
+    if kind not in _handlers:
+        raise ValueError(f"未知的任务类型: {kind}")
+    snapshot = await asyncio.to_thread(_create_job, kind, params, organization_id)
+    runtime = _get_runtime()
+    # 在空白上下文中执行：任务比提交它的请求活得久，不继承请求的 SQL 统计等上下文变量
+    runtime.tasks[snapshot["id"]] = runtime.loop.create_task(
+        _run_job(snapshot["id"], kind, params, organization_id), context=contextvars.Context()
+    )
+    return snapshot
+
+
+async def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """取消未结束的任务（已结束的任务保持原状态），返回最新状态；任务不存在时返回 None"""
+    cancelled = await asyncio.to_thread(
+        _transition, job_id, ACTIVE_STATUSES, status=JOB_CANCELLED, message="已取消", finished_at=_utcnow()
+    )
+    if cancelled:
+        task = _get_runtime().tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        _notify(job_id)
+    return await asyncio.to_thread(get_job, job_id)
+
+
+async def wait_for_job(job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """等待任务结束，最多 timeout 秒，返回最新状态"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        snapshot = await asyncio.to_thread(get_job, job_id)
+        remaining = deadline - asyncio.get_running_loop().time()
+        if snapshot is None or snapshot["status"] in TERMINAL_STATUSES or remaining <= 0:
+            return snapshot
+        await _wait_for_change(job_id, min(remaining, JOB_POLL_SECONDS))
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def stream_job_events(job_id: str) -> AsyncIterator[str]:
+    """
+    以 Server-Sent Events 格式推送任务进度：状态或进度变化时发送 progress 事件，
+    任务结束时发送 done 事件后关闭；长时间无变化时发送注释行保持连接
+    """
+    last_state = None
+    last_sent = asyncio.get_running_loop().time()
+    while True:
+        snapshot = await asyncio.to_thread(get_job, job_id)
+        if snapshot is None:
+            yield format_sse("error", {"detail": "任务不存在"})
+            return
+        state = (snapshot["status"], snapshot["progress"], snapshot["message"])
+        now = asyncio.get_running_loop().time()
+        if state != last_state:
+            yield format_sse("progress", snapshot)
+            last_state, last_sent = state, now
+        elif now - last_sent >= SSE_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            last_sent = now
+        if snapshot["status"] in TERMINAL_STATUSES:
+            yield format_sse("done", snapshot)
+            return
+        await _wait_for_change(job_id, JOB_POLL_SECONDS)
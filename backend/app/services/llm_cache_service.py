@@ -0,0 +1,172 @@
+# backend/app/services/llm_cache_service.py
+"""
+LLM 结果缓存服务
+以内容哈希为键把生成结果持久化到 llm_cache_entries 表，多进程共享：
+- 读取时忽略已过期条目；命中时最多每 HIT_TOUCH_INTERVAL_SECONDS 写一次最近命中时间，
+  期间的命中次数先在进程内累计，随下一次写入一并加到 hit_count，热点条目的读取不会每次都变成写事务
+- 写入后超出容量则淘汰最久未命中的条目
+- 进程内记录命中/未命中/写入/淘汰次数
+数据库访问是同步的，协程中请通过 asyncio.to_thread 调用
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.config import settings
+from app.database import SessionLocal
+from app.models.llm_cache import LlmCacheEntry
+
+logger = logging.getLogger(__name__)
+
+COMPLETION_NAMESPACE = "completion"
+# 命中时刷新 last_hit_at 的最小间隔（秒）；淘汰按最近命中时间排序，分钟级精度足够
+HIT_TOUCH_INTERVAL_SECONDS = 60
+# 淘汰时每条 DELETE 语句的键数量
+EVICT_BATCH_SIZE = 500
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+# 尚未写入数据库的命中次数：cache_key -> 次数
+_pending_hits: Dict[str, int] = {}
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def make_cache_key(*parts: Any) -> str:
+    """对有序的内容片段做 SHA-256，作为缓存键（片段需可 JSON 序列化）"""
+    raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _session(db: Optional[Session]):
+    return (db, False) if db is not None else (SessionLocal(), True)
+
+
+def get_cached(cache_key: str, db: Optional[Session] = None) -> Optional[str]:
+    """读取未过期的缓存内容，不存在或出错时返回 None（缓存故障不影响正常调用）"""
+    session, owned = _session(db)
+    try:
+        now = _utcnow()
+        entry = session.get(LlmCacheEntry, cache_key)
+        if entry is None or entry.expires_at <= now:
+            _count("misses")
+            metrics.record_cache_lookup("llm", False)
+            return None
+        content = entry.content
+        with _stats_lock:
+            pending = _pending_hits.pop(cache_key, 0) + 1
+            touch = entry.last_hit_at is None or now - entry.last_hit_at >= timedelta(seconds=HIT_TOUCH_INTERVAL_SECONDS)
+            if not touch:
+                _pending_hits[cache_key] = pending
+        if touch:
+            entry.hit_count = (entry.hit_count or 0) + pending
+            entry.last_hit_at = now
+            session.commit()
+        _count("hits")
+        metrics.record_cache_lookup("llm", True)
+        return content
+    except Exception as e:
+        session.rollback()
+        _count("errors")
+        logger.warning(f"读取 LLM 缓存失败: {e}")
+        return None
+    finally:
+        if owned:
+            session.close()
+
+
+def store(
+    cache_key: str,
+    content: str,
+    model: Optional[str] = None,
+    namespace: str = COMPLETION_NAMESPACE,
+    ttl_seconds: Optional[int] = None,
+    db: Optional[Session] = None
+) -> None:
+    """写入（或覆盖）缓存条目，随后按容量淘汰；出错时只记录日志"""
+    session, owned = _session(db)
+    try:
+        now = _utcnow()
+        ttl = settings.LLM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        session.merge(LlmCacheEntry(
+            cache_key=cache_key,
+            namespace=namespace,
+            model=model,
+            content=content,
+            hit_count=0,
+            created_at=now,
+            expires_at=now + timedelta(seconds=ttl),
+            last_hit_at=now,
+        ))
+        session.commit()
+        with _stats_lock:
+            _pending_hits.pop(cache_key, None)
+        _count("stores")
+        evict(session, now)
+    except Exception as e:
+        session.rollback()
+        _count("errors")
+        logger.warning(f"写入 LLM 缓存失败: {e}")
+    finally:
+        if owned:
+            session.close()
+
+
+def evict(db: Session, now: Optional[datetime] = None, max_entries: Optional[int] = None) -> int:
+    """删除过期条目；仍超出容量时按最近命中时间淘汰最旧的条目，返回删除数"""
+    now = now or _utcnow()
+    max_entries = settings.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    removed = db.query(LlmCacheEntry).filter(LlmCacheEntry.expires_at <= now).delete(synchronize_session=False)
+    excess = db.query(LlmCacheEntry).count() - max_entries
+    if excess > 0:
+        # 先查出键再按键删除：MySQL 不支持 IN 子查询中的 LIMIT，也不允许子查询读取正在删除的表
+        oldest = [
+            key for (key,) in db.query(LlmCacheEntry.cache_key).order_by(LlmCacheEntry.last_hit_at.asc()).limit(excess)
+        ]
+        for start in range(0, len(oldest), EVICT_BATCH_SIZE):
+            removed += db.query(LlmCacheEntry).filter(
+                LlmCacheEntry.cache_key.in_(oldest[start:start + EVICT_BATCH_SIZE])
+            ).delete(synchronize_session=False)
+    db.commit()
+    if removed:
+        _count("evictions", removed)
+    return removed
+
+
+def get_cache_stats(db: Optional[Session] = None) -> Dict[str, Any]:
+    """进程内命中统计 + 表中现存条目数"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+    session, owned = _session(db)
+    try:
+        stats["entries"] = session.query(LlmCacheEntry).count()
+    finally:
+        if owned:
+            session.close()
+    stats["enabled"] = settings.LLM_CACHE_ENABLED
+    stats["ttl_seconds"] = settings.LLM_CACHE_TTL_SECONDS
+    stats["max_entries"] = settings.LLM_CACHE_MAX_ENTRIES
+    return stats
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+        _pending_hits.clear()
@@ -0,0 +1,230 @@
+# backend/app/services/llm_gateway.py
+"""
+LLM 上游访问治理
+- 共享的 httpx.AsyncClient 连接池：复用 TLS 连接，应用关闭时释放
+- 并发闸门：全局信号量 + 按组织的信号量，突发请求在本进程内排队而不是同时打到上游
+- 请求合并：相同键的请求在进行中时，后来者等待同一个结果，只产生一次上游调用
+- 熔断器：连续失败达到阈值后短路一段时间，冷却后放行一个试探请求
+连接池、信号量和进行中的请求都绑定事件循环，事件循环变化（如测试中多次 asyncio.run）时自动重建
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 未绑定组织的调用（如 /llm 下的通用接口）共用一个组织配额
+NO_ORGANIZATION = None
+
+# 当前请求所属的组织，由接口层设置，用于按组织限流
+_current_organization: ContextVar[Optional[int]] = ContextVar("llm_organization_id", default=NO_ORGANIZATION)
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "coalesced": 0, "queued": 0, "short_circuited": 0}
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def set_organization(organization_id: Optional[int]) -> None:
+    """标记当前协程后续的 LLM 调用归属的组织（只影响当前请求的上下文）"""
+    _current_organization.set(organization_id)
+
+
+class CircuitBreaker:
+    """
+    简单的三态熔断器
+    - closed：正常放行，连续失败达到 failure_threshold 次后转为 open
+    - open：直接拒绝，reset_seconds 后转为 half_open
+    - half_open：只放行一个试探请求，成功则关闭，失败则重新打开；
+      试探请求在得到结果前被取消时调用 release 交还名额
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_locked()
+            return self._state
+
+    def _refresh_locked(self) -> None:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._probing = False
+
+    def allow(self) -> bool:
+        """是否允许发出一次上游请求"""
+        with self._lock:
+            self._refresh_locked()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """放行的请求未得到结果（如被取消）时调用：不计成功或失败，半开状态下交还试探名额"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"LLM 上游连续失败 {self._failures} 次，熔断 {self.reset_seconds}s")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_locked()
+            return {"state": self._state, "consecutive_failures": self._failures}
+
+
+breaker = CircuitBreaker(settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_SECONDS)
+
+
+class _LoopState:
+    """与单个事件循环绑定的资源"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.client: Optional[httpx.AsyncClient] = None
+        self.global_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self.organization_slots: Dict[Optional[int], asyncio.Semaphore] = {}
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+
+_state: Optional[_LoopState] = None
+
+
+def _loop_state() -> _LoopState:
+    global _state
+    loop = asyncio.get_running_loop()
+    if _state is None or _state.loop is not loop:
+        _state = _LoopState(loop)
+    return _state
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """返回当前事件循环共享的连接池客户端（首次使用时创建）"""
+    state = _loop_state()
+    if state.client is None or state.client.is_closed:
+        state.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT_SECONDS, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return state.client
+
+
+async def close_http_client() -> None:
+    """应用关闭时释放连接池"""
+    global _state
+    state = _state
+    if state is not None and state.client is not None and state.loop is asyncio.get_running_loop():
+        await state.client.aclose()
+    _state = None
+
+
+@asynccontextmanager
+async def concurrency_slot():
+    """占用一个全局并发名额和一个当前组织的并发名额，名额不足时排队等待"""
+    state = _loop_state()
+    organization_id = _current_organization.get()
+    organization_slots = state.organization_slots.get(organization_id)
+    if organization_slots is None:
+        organization_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY_PER_ORG)
+        state.organization_slots[organization_id] = organization_slots
+
+    if organization_slots.locked() or state.global_slots.locked():
+        _count("queued")
+    # 先取组织名额再取全局名额，单个组织的突发流量不会占满全局名额
+    async with organization_slots:
+        async with state.global_slots:
+            _count("requests")
+            yield
+
+
+async def coalesce(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    相同 key 的调用在进行中时只执行一次 factory，其余调用方等待并共享结果（包括异常）
+    factory 在独立的任务中执行，任一调用方（包括首个调用方）被取消都不影响其他等待方
+    """
+    state = _loop_state()
+    task = state.inflight.get(key)
+    if task is not None:
+        _count("coalesced")
+    else:
+        task = state.loop.create_task(factory())
+        state.inflight[key] = task
+
+        def done(finished: asyncio.Future) -> None:
+            if state.inflight.get(key) is finished:
+                del state.inflight[key]
+            # 没有等待方时异常不会被取出，避免 "exception was never retrieved" 警告
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(done)
+    # shield：调用方被取消时只停止等待，不取消共享的任务
+    return await asyncio.shield(task)
+
+
+def count_short_circuit() -> None:
+    """记录一次因熔断而跳过的上游请求"""
+    _count("short_circuited")
+
+
+def get_gateway_stats() -> Dict[str, Any]:
+    """本进程的上游请求、合并、排队和熔断统计"""
+    with _stats_lock:
+        stats = dict(_stats)
+    state = _state
+    stats["inflight"] = len(state.inflight) if state is not None else 0
+    stats["circuit"] = breaker.snapshot()
+    stats["max_concurrency"] = settings.LLM_MAX_CONCURRENCY
+    stats["max_concurrency_per_org"] = settings.LLM_MAX_CONCURRENCY_PER_ORG
+    return stats
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
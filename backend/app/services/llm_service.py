@@ -4,13 +4,18 @@ LLM 服务模块，用于与大语言模型进行交互。
 支持 OpenRouter API。
 """
 import logging
-from typing import List, Optional, Dict, Any
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 import httpx
 import asyncio
 from ..config import settings
+from .. import metrics
+from . import llm_cache_service, llm_gateway
 import json
 from datetime import datetime
 import statistics
+import unicodedata
 
 # --- 终极调试：在模块加载时打印 ---
 # 这行会在该模块第一次被导入时执行
@@ -23,8 +28,7 @@ logger.critical(f"[LLM Service Module Load] OPENROUTER_API_KEY Status: {key_stat
 # logger = logging.getLogger(__name__)
 
 # --- 1. 定义常量 ---
-# OpenRouter API 基础 URL
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+# OpenRouter API 地址见 settings.OPENROUTER_API_URL（测试时可指向本地模拟服务）
 # 你可以选择任何在 OpenRouter 上可用的模型
 # 如果Mistral不可用，可以尝试其他免费模型
 DEFAULT_MODEL = "openrouter/free"
@@ -33,17 +37,66 @@ DEFAULT_MODEL = "openrouter/free"
 # "deepseek/deepseek-chat-v3-0324:free"
 # "google/gemma-2-9b-it:free"
 
+DEFAULT_SYSTEM_MESSAGE = "你是一个专业的问卷调查助手。"
+
+# 重试退避的基础间隔（秒），第 n 次重试等待 n 倍
+RATE_LIMIT_RETRY_SECONDS = 10
+NETWORK_RETRY_SECONDS = 5
+
+# 当前协程最近一次 _call_openrouter 是否拿到了真实的模型输出（而非密钥缺失、重试耗尽等兜底文本）
+# 调用方据此决定是否缓存由该输出组装的结果
+_last_completion_ok: ContextVar[bool] = ContextVar("llm_last_completion_ok", default=False)
+
+
+def last_completion_ok() -> bool:
+    """当前协程最近一次 LLM 调用是否返回了真实的模型输出（含缓存命中）"""
+    return _last_completion_ok.get()
+
 # --- 2. 定义内部辅助函数 ---
 
-async def _call_openrouter(prompt: str, model: str = DEFAULT_MODEL, system_message: str = "你是一个专业的问卷调查助手。") -> str:
+async def _call_openrouter(
+    prompt: str,
+    model: str = DEFAULT_MODEL,
+    system_message: str = DEFAULT_SYSTEM_MESSAGE,
+    use_cache: bool = True
+) -> str:
     """
-    调用 OpenRouter API。
+    调用 OpenRouter API，结果按 (模型, 系统提示, 用户提示) 的哈希缓存。
+    只缓存真实的模型输出；兜底文本（密钥缺失、鉴权失败、重试耗尽、熔断）不会写入缓存。
+    缓存未命中时，本进程内进行中的相同请求合并为一次上游调用；use_cache=False 时既不缓存也不合并。
+    每次调用的耗时与结果（ok/cache_hit/fallback/exception）计入 /metrics。
     """
-    if not settings.OPENROUTER_API_KEY:
-        logger.error("OPENROUTER_API_KEY 未在环境变量中设置。")
-        # 返回一个默认的响应而不是抛出异常
-        return f"由于API密钥未配置，无法调用LLM服务。以下是基于输入的分析：\n\n{prompt}\n\n请配置OPENROUTER_API_KEY环境变量以启用完整的AI功能。"
-
+    started = time.perf_counter()
+    outcome = "exception"
+    try:
+        if not use_cache:
+            text, ok = await _request_openrouter(prompt, model=model, system_message=system_message)
+        else:
+            cache_key = llm_cache_service.make_cache_key(model, system_message, prompt)
+            if settings.LLM_CACHE_ENABLED:
+                cached = await asyncio.to_thread(llm_cache_service.get_cached, cache_key)
+                if cached is not None:
+                    logger.info(f"LLM 缓存命中: {cache_key[:12]}")
+                    _last_completion_ok.set(True)
+                    outcome = "cache_hit"
+                    return cached
+
+            async def request_and_store() -> Tuple[str, bool]:
+                text, ok = await _request_openrouter(prompt, model=model, system_message=system_message)
+                if ok and settings.LLM_CACHE_ENABLED:
+                    await asyncio.to_thread(llm_cache_service.store, cache_key, text, model)
+                return text, ok
+
+            text, ok = await llm_gateway.coalesce(cache_key, request_and_store)
+        _last_completion_ok.set(ok)
+        outcome = "ok" if ok else "fallback"
+        return text
+    finally:
+        metrics.record_llm_call(model, outcome, time.perf_counter() - started)
+
+
+def _openrouter_request(prompt: str, model: str, system_message: str) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """构造 OpenRouter 请求的 (headers, 请求体)"""
     headers = {
         "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
         "HTTP-Referer": "http://localhost:8000", # 可选，但推荐填写，有助于 OpenRouter 统计
@@ -72,73 +125,237 @@ async def _call_openrouter(prompt: str, model: str = DEFAULT_MODEL, system_messa
         # "frequency_penalty": 0,
         # "presence_penalty": 0,
     }
+    return headers, data
 
-    async with httpx.AsyncClient() as client:
-        max_retries = 3
-        for attempt in range(max_retries + 1):
-            try:
-                response = await client.post(OPENROUTER_API_URL, headers=headers, json=data, timeout=300.0)
-
-                if response.status_code == 429:
-                    if attempt < max_retries:
-                        retry_after = 10 * (attempt + 1)
-                        logger.warning(f"OpenRouter 429 rate limited, retrying in {retry_after}s (attempt {attempt + 1}/{max_retries})")
-                        await asyncio.sleep(retry_after)
-                        continue
-                    error_msg = f"调用 OpenRouter API 失败 (HTTP 429): 请求频率超限，请稍后重试"
-                    logger.error(error_msg)
-                    raise RuntimeError(error_msg)
 
-                response.raise_for_status()
-
-                logger.debug(f"OpenRouter API 原始响应状态码: {response.status_code}")
-
-                try:
-                    res_data = response.json()
-                except json.JSONDecodeError as json_err:
-                    logger.error(f"无法解析OpenRouter API 的 JSON 响应。原始响应内容: {response.text[:500]}")
-                    raise RuntimeError(f"API 返回了无效的 JSON: {response.text[:500]}...") from json_err
-
-                if 'choices' in res_data and res_data['choices']:
-                    generated_text = res_data['choices'][0]['message']['content']
-                    return generated_text
-                else:
-                    error_msg = f"OpenRouter API 返回格式异常: {res_data}"
-                    logger.error(error_msg)
-                    raise RuntimeError(error_msg)
-
-            except httpx.HTTPStatusError as e:
-                try:
-                    error_detail = e.response.json().get('error', {}).get('message', '未知错误')
-                except:
-                    error_detail = e.response.text[:500]
-                error_msg = f"调用 OpenRouter API 失败 (HTTP {e.response.status_code}): {error_detail}"
-                logger.error(error_msg)
-                if e.response.status_code == 401:
-                    return f"由于API密钥无效，无法调用LLM服务。以下是基于输入的分析：\n\n{prompt}\n\n请检查OPENROUTER_API_KEY环境变量配置是否正确。"
-                if e.response.status_code == 429 and attempt < max_retries:
-                    retry_after = 10 * (attempt + 1)
-                    logger.warning(f"429 from HTTPStatusError, retrying in {retry_after}s")
-                    await asyncio.sleep(retry_after)
-                    continue
-                raise RuntimeError(error_msg) from e
-            except RuntimeError:
-                raise
-            except httpx.RequestError as e:
+async def _request_openrouter(prompt: str, model: str, system_message: str) -> Tuple[str, bool]:
+    """
+    请求 OpenRouter API，返回 (文本, 是否为真实的模型输出)。
+    """
+    if not settings.OPENROUTER_API_KEY:
+        logger.error("OPENROUTER_API_KEY 未在环境变量中设置。")
+        # 返回一个默认的响应而不是抛出异常
+        return f"由于API密钥未配置，无法调用LLM服务。以下是基于输入的分析：\n\n{prompt}\n\n请配置OPENROUTER_API_KEY环境变量以启用完整的AI功能。", False
+
+    headers, data = _openrouter_request(prompt, model, system_message)
+
+    # 共享连接池客户端由应用生命周期管理，这里不关闭
+    client = llm_gateway.get_http_client()
+    max_retries = 3
+    for attempt in range(max_retries + 1):
+        # 熔断期间不再请求上游，直接返回兜底文本
+        if not llm_gateway.breaker.allow():
+            llm_gateway.count_short_circuit()
+            logger.warning("OpenRouter 连续失败已熔断，跳过本次请求")
+            return f"LLM服务暂时不可用（上游连续失败，已暂停调用），请稍后重试。\n\n原始提示：\n{prompt[:500]}...", False
+
+        response = None
+        try:
+            async with llm_gateway.concurrency_slot():
+                response = await client.post(settings.OPENROUTER_API_URL, headers=headers, json=data)
+
+            # 限流和 5xx 计为上游故障；其余响应说明上游可用
+            if response.status_code == 429 or response.status_code >= 500:
+                llm_gateway.breaker.record_failure()
+            else:
+                llm_gateway.breaker.record_success()
+
+            if response.status_code == 429:
                 if attempt < max_retries:
-                    retry_after = 5 * (attempt + 1)
-                    logger.warning(f"网络错误，{retry_after}s 后重试 (attempt {attempt + 1}/{max_retries}): {e}")
+                    retry_after = RATE_LIMIT_RETRY_SECONDS * (attempt + 1)
+                    logger.warning(f"OpenRouter 429 rate limited, retrying in {retry_after}s (attempt {attempt + 1}/{max_retries})")
                     await asyncio.sleep(retry_after)
                     continue
-                error_msg = f"调用 OpenRouter API 时发生网络错误: {e}"
+                error_msg = f"调用 OpenRouter API 失败 (HTTP 429): 请求频率超限，请稍后重试"
                 logger.error(error_msg)
-                raise RuntimeError(error_msg) from e
-            except Exception as e:
-                error_msg = f"调用 OpenRouter API 时发生未知错误: {e}"
-                logger.exception(error_msg)
-                raise RuntimeError(error_msg) from e
+                raise RuntimeError(error_msg)
+
+            response.raise_for_status()
+
+            logger.debug(f"OpenRouter API 原始响应状态码: {response.status_code}")
+
+            try:
+                res_data = response.json()
+            except json.JSONDecodeError as json_err:
+                logger.error(f"无法解析OpenRouter API 的 JSON 响应。原始响应内容: {response.text[:500]}")
+                raise RuntimeError(f"API 返回了无效的 JSON: {response.text[:500]}...") from json_err
+
+            if 'choices' in res_data and res_data['choices']:
+                generated_text = res_data['choices'][0]['message']['content']
+                return generated_text, True
+            else:
+                error_msg = f"OpenRouter API 返回格式异常: {res_data}"
+                logger.error(error_msg)
+                raise RuntimeError(error_msg)
 
-        return f"调用LLM服务失败，已重试{max_retries}次。请稍后重试。\n\n原始提示：\n{prompt[:500]}..."
+        except httpx.HTTPStatusError as e:
+            try:
+                error_detail = e.response.json().get('error', {}).get('message', '未知错误')
+            except:
+                error_detail = e.response.text[:500]
+            error_msg = f"调用 OpenRouter API 失败 (HTTP {e.response.status_code}): {error_detail}"
+            logger.error(error_msg)
+            if e.response.status_code == 401:
+                return f"由于API密钥无效，无法调用LLM服务。以下是基于输入的分析：\n\n{prompt}\n\n请检查OPENROUTER_API_KEY环境变量配置是否正确。", False
+            if e.response.status_code == 429 and attempt < max_retries:
+                retry_after = RATE_LIMIT_RETRY_SECONDS * (attempt + 1)
+                logger.warning(f"429 from HTTPStatusError, retrying in {retry_after}s")
+                await asyncio.sleep(retry_after)
+                continue
+            raise RuntimeError(error_msg) from e
+        except RuntimeError:
+            raise
+        except httpx.RequestError as e:
+            llm_gateway.breaker.record_failure()
+            if attempt < max_retries:
+                retry_after = NETWORK_RETRY_SECONDS * (attempt + 1)
+                logger.warning(f"网络错误，{retry_after}s 后重试 (attempt {attempt + 1}/{max_retries}): {e}")
+                await asyncio.sleep(retry_after)
+                continue
+            error_msg = f"调用 OpenRouter API 时发生网络错误: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg) from e
+        except asyncio.CancelledError:
+            # 得到响应之前被取消：不计成功或失败，交还半开状态下的试探名额
+            if response is None:
+                llm_gateway.breaker.release()
+            raise
+        except Exception as e:
+            if response is None:
+                llm_gateway.breaker.record_failure()
+            error_msg = f"调用 OpenRouter API 时发生未知错误: {e}"
+            logger.exception(error_msg)
+            raise RuntimeError(error_msg) from e
+
+    return f"调用LLM服务失败，已重试{max_retries}次。请稍后重试。\n\n原始提示：\n{prompt[:500]}...", False
+
+class _StreamUnavailable(Exception):
+    """流式请求在产出任何内容之前失败，可退回非流式调用"""
+
+
+async def _iter_stream_deltas(response: httpx.Response) -> AsyncIterator[str]:
+    """解析 OpenRouter 的 SSE 流（data: {...} / data: [DONE]，以 ":" 开头的行是保活注释）"""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            return
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+        if chunk.get("error"):
+            error = chunk["error"]
+            raise _StreamUnavailable(error.get("message", error) if isinstance(error, dict) else error)
+        choices = chunk.get("choices") or []
+        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+        if delta:
+            yield delta
+
+
+async def stream_openrouter(
+    prompt: str,
+    model: str = DEFAULT_MODEL,
+    system_message: str = DEFAULT_SYSTEM_MESSAGE,
+    use_cache: bool = True
+) -> AsyncIterator[str]:
+    """
+    _call_openrouter 的流式模式（stream: true）：模型输出到达即逐段产出。
+    - 与 _call_openrouter 共用缓存：命中时一次产出完整结果，完整输出结束后写入缓存
+    - 在产出任何内容之前失败（密钥缺失、熔断、限流、5xx、网络错误）时退回 _call_openrouter（含重试与兜底文本）
+    - 已产出部分内容后中断时抛出 RuntimeError
+    """
+    cache_key = llm_cache_service.make_cache_key(model, system_message, prompt)
+    if use_cache and settings.LLM_CACHE_ENABLED:
+        cached = await asyncio.to_thread(llm_cache_service.get_cached, cache_key)
+        if cached is not None:
+            _last_completion_ok.set(True)
+            yield cached
+            return
+
+    parts: List[str] = []
+    # 熔断期间（含半开状态下已有试探请求）不发起流式请求，由 _call_openrouter 返回兜底文本
+    if settings.OPENROUTER_API_KEY and llm_gateway.breaker.allow():
+        headers, data = _openrouter_request(prompt, model, system_message)
+        client = llm_gateway.get_http_client()
+        settled = False
+        try:
+            async with llm_gateway.concurrency_slot():
+                async with client.stream(
+                    "POST", settings.OPENROUTER_API_URL, headers=headers, json={**data, "stream": True}
+                ) as response:
+                    settled = True
+                    if response.status_code == 429 or response.status_code >= 500:
+                        llm_gateway.breaker.record_failure()
+                    else:
+                        llm_gateway.breaker.record_success()
+                    if response.status_code != 200:
+                        raise _StreamUnavailable(f"HTTP {response.status_code}")
+                    async for delta in _iter_stream_deltas(response):
+                        parts.append(delta)
+                        yield delta
+        except (httpx.RequestError, _StreamUnavailable) as e:
+            if isinstance(e, httpx.RequestError):
+                llm_gateway.breaker.record_failure()
+            if parts:
+                raise RuntimeError(f"OpenRouter 流式输出中断: {e}") from e
+            logger.warning(f"OpenRouter 流式请求失败，改用非流式调用: {e}")
+        finally:
+            # 得到响应之前被取消或出错：交还半开状态下的试探名额（已记录失败时不会改变状态）
+            if not settled:
+                llm_gateway.breaker.release()
+
+    if not parts:
+        yield await _call_openrouter(prompt, model=model, system_message=system_message, use_cache=use_cache)
+        return
+
+    _last_completion_ok.set(True)
+    if use_cache and settings.LLM_CACHE_ENABLED:
+        await asyncio.to_thread(llm_cache_service.store, cache_key, "".join(parts), model)
+
+
+# 补全函数：(提示词, 模型) -> 完整文本；默认为一次性返回的 _call_openrouter，流式接口传入逐段转发的实现
+CompletionFn = Callable[[str, str], Awaitable[str]]
+
+
+async def _complete(prompt: str, model: str) -> str:
+    return await _call_openrouter(prompt, model=model)
+
+
+async def stream_generation(run: Callable[[CompletionFn], Awaitable[Any]]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    以流式补全执行 run（如 lambda complete: generate_survey_summary(data, completion=complete)），
+    依次产出 ("token", 文本片段)，最后产出 ("result", run 的返回值)；run 抛出的异常原样抛出。
+    消费方提前结束（如客户端断开）时取消生成。
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def complete(prompt: str, model: str) -> str:
+        parts = []
+        async for delta in stream_openrouter(prompt, model=model):
+            parts.append(delta)
+            await queue.put(("token", delta))
+        return "".join(parts)
+
+    async def runner():
+        try:
+            await queue.put(("result", await run(complete)))
+        except Exception as e:
+            await queue.put(("error", e))
+
+    task = asyncio.create_task(runner())
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "error":
+                raise value
+            yield kind, value
+            if kind == "result":
+                return
+    finally:
+        if not task.done():
+            task.cancel()
 
 # --- 3. 定义对外服务函数 ---
 
@@ -167,7 +384,8 @@ async def generate_questions(topic: str, num_questions: int = 5, model: str = DE
 问题列表:
 """
     try:
-        raw_response = await _call_openrouter(prompt, model=model)
+        # 生成题目时用户期望每次得到新的候选，不使用缓存
+        raw_response = await _call_openrouter(prompt, model=model, use_cache=False)
         
         # 简单的后处理：按行分割，并过滤掉空行
         questions = [q.strip() for q in raw_response.strip().split('\n') if q.strip()]
@@ -178,14 +396,94 @@ async def generate_questions(topic: str, num_questions: int = 5, model: str = DE
         logger.exception(f"生成问题时失败: {e}")
         raise RuntimeError(f"生成问题失败: {e}") from e
 
-async def summarize_answers(question_text: str, answers: List[str], model: str = DEFAULT_MODEL) -> str:
+def _normalize_answer(text: str) -> str:
+    """归一化回答用于去重：全角转半角、忽略大小写、空白与标点"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(ch for ch in text if ch.isalnum()) or text.strip()
+
+
+def deduplicate_answers(answers: List[str]) -> List[Tuple[str, int]]:
+    """
+    合并近似相同的回答（仅大小写、空白、标点或全半角不同），丢弃空回答
+    返回 (首次出现的原文, 人数) 列表，按人数降序，人数相同时保持原顺序
+    """
+    groups: Dict[str, List[Any]] = {}
+    for answer in answers:
+        if not answer or not answer.strip():
+            continue
+        key = _normalize_answer(answer)
+        if key in groups:
+            groups[key][1] += 1
+        else:
+            groups[key] = [answer.strip(), 1]
+    return sorted(((text, count) for text, count in groups.values()), key=lambda item: -item[1])
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符每字约 1 个，其余字符每 4 个约 1 个"""
+    cjk = sum(1 for ch in text if "\u2e80" <= ch <= "\u9fff" or "\uac00" <= ch <= "\ud7af" or "\uf900" <= ch <= "\ufaff")
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def _format_answer_lines(items: List[Tuple[str, int]]) -> List[str]:
+    return [f"- {text}" if count == 1 else f"- {text}（{count} 人）" for text, count in items]
+
+
+def _chunk_lines(lines: List[str], token_budget: int) -> List[List[str]]:
+    """按 token 预算顺序切分；单行超出预算时独占一批"""
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for line in lines:
+        tokens = _estimate_tokens(line)
+        if current and used + tokens > token_budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(line)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _complete_concurrently(
+    prompts: List[str],
+    model: str,
+    on_done: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> List[Tuple[str, bool]]:
+    """并发执行多个提示词（最多 LLM_SUMMARY_MAP_CONCURRENCY 个同时进行），返回 (输出, 是否为真实模型输出)"""
+    semaphore = asyncio.Semaphore(settings.LLM_SUMMARY_MAP_CONCURRENCY)
+    done = 0
+
+    async def run(prompt: str) -> Tuple[str, bool]:
+        nonlocal done
+        async with semaphore:
+            text = await _call_openrouter(prompt, model=model)
+            ok = last_completion_ok()
+        done += 1
+        if on_done:
+            await on_done(done, len(prompts))
+        return text, ok
+
+    return await asyncio.gather(*(run(prompt) for prompt in prompts))
+
+
+async def summarize_answers(
+    question_text: str,
+    answers: List[str],
+    model: str = DEFAULT_MODEL,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> str:
     """
     使用 LLM 对问卷问题的回答进行总结。
+    先在本地合并近似相同的回答；去重后仍超出 LLM_SUMMARY_CHUNK_TOKENS 时按预算分批，
+    各批并发提炼要点（map），再把要点合并为最终总结（reduce），耗时取决于并发批次而非回答总数。
 
     Args:
         question_text (str): 问题的文本。
         answers (List[str]): 回答列表。
         model (str): 要使用的 LLM 模型名称。
+        on_progress (Callable): 可选的进度回调，参数为 (已完成批次, 总批次)，仅在分批时调用。
 
     Returns:
         str: LLM 生成的总结文本。
@@ -193,20 +491,50 @@ async def summarize_answers(question_text: str, answers: List[str], model: str =
     if not answers:
         return "没有收集到任何回答。"
 
-    # 数据预处理
-    answers_text = "\n".join([f"- {answer}" for answer in answers if answer.strip()])
-    
-    if not answers_text.strip():
+    # 数据预处理：去重并按人数排序
+    unique_answers = deduplicate_answers(answers)
+    if not unique_answers:
          return "所有回答均为空。"
 
-    # 构造 Prompt
-    prompt = f"""
+    total_count = sum(count for _, count in unique_answers)
+    chunks = _chunk_lines(_format_answer_lines(unique_answers), settings.LLM_SUMMARY_CHUNK_TOKENS)
+
+    try:
+        if len(chunks) == 1:
+            answers_text = "\n".join(chunks[0])
+            answers_intro = "用户的回答如下"
+        else:
+            logger.info(f"问题 '{question_text[:20]}...' 共 {total_count} 条回答（去重后 {len(unique_answers)} 条），分 {len(chunks)} 批总结")
+            # map：各批并发提炼要点
+            results = await _complete_concurrently(
+                [_chunk_summary_prompt(question_text, "\n".join(chunk), index + 1, len(chunks)) for index, chunk in enumerate(chunks)],
+                model, on_progress,
+            )
+            # 要点合计仍超出预算时逐轮合并，直到可以放入一个提示词
+            while all(ok for _, ok in results) and len(results) > 1 and \
+                    sum(_estimate_tokens(text) for text, _ in results) > settings.LLM_SUMMARY_CHUNK_TOKENS:
+                groups = _chunk_lines([text for text, _ in results], settings.LLM_SUMMARY_CHUNK_TOKENS)
+                if len(groups) == len(results):
+                    break  # 每批要点都已接近预算，无法继续合并
+                results = await _complete_concurrently(
+                    [_merge_points_prompt(question_text, "\n\n".join(group)) for group in groups], model
+                )
+            failed = [text for text, ok in results if not ok]
+            if failed:
+                # 与单次调用一致：返回兜底文本，不组装不完整的总结
+                _last_completion_ok.set(False)
+                return failed[0]
+            answers_text = "\n\n".join(f"### 第 {index + 1} 部分\n{text}" for index, (text, _) in enumerate(results))
+            answers_intro = f"共 {total_count} 条回答（去重后 {len(unique_answers)} 条），已分批整理出以下要点"
+
+        # reduce（或回答较少时的单次调用）
+        prompt = f"""
 你是一个专业的数据分析员。请根据以下信息，对用户的回答进行总结和分析。
 
 问题：
 {question_text}
 
-用户的回答如下：
+{answers_intro}：
 {answers_text}
 
 请执行以下任务：
@@ -217,8 +545,6 @@ async def summarize_answers(question_text: str, answers: List[str], model: str =
 
 你的总结：
 """
-
-    try:
         summary = await _call_openrouter(prompt, model=model)
         logger.info(f"为问题 '{question_text[:20]}...' 生成了总结。")
         return summary
@@ -227,13 +553,40 @@ async def summarize_answers(question_text: str, answers: List[str], model: str =
         logger.exception(f"总结回答时失败: {e}")
         raise RuntimeError(f"总结回答失败: {e}") from e
 
-async def generate_survey_summary(survey_data: Dict[str, Any], model: str = DEFAULT_MODEL) -> Dict[str, Any]:
+
+def _chunk_summary_prompt(question_text: str, answers_text: str, index: int, total: int) -> str:
+    return f"""
+你是一个专业的数据分析员。以下是问题“{question_text}”的第 {index}/{total} 批用户回答，括号内为相同回答的人数。
+
+{answers_text}
+
+请提炼这批回答中的主要观点：每个观点一行，注明大致人数，并附一句有代表性的原话。
+只输出要点列表，不要写开场白或结论。
+"""
+
+
+def _merge_points_prompt(question_text: str, points_text: str) -> str:
+    return f"""
+你是一个专业的数据分析员。以下是问题“{question_text}”的多批回答分别整理出的要点。
+
+{points_text}
+
+请把这些要点合并为一份要点列表：相同或相近的观点合并为一条并累加人数，保留有代表性的原话。
+只输出要点列表，不要写开场白或结论。
+"""
+
+async def generate_survey_summary(
+    survey_data: Dict[str, Any],
+    model: str = DEFAULT_MODEL,
+    completion: Optional[CompletionFn] = None
+) -> Dict[str, Any]:
     """
     生成调研的智能总结报告。
 
     Args:
         survey_data (Dict[str, Any]): 调研数据，包含问题、答案、统计等信息。
         model (str): 要使用的 LLM 模型名称。
+        completion (CompletionFn): 可选的补全函数，流式接口借此逐段转发模型输出。
 
     Returns:
         Dict[str, Any]: 包含总结报告的字典。
@@ -408,7 +761,7 @@ async def generate_survey_summary(survey_data: Dict[str, Any], model: str = DEFA
 
         # 调用LLM生成总结
         logger.info(f"开始生成调研 '{survey_title}' 的智能总结报告...")
-        summary_text = await _call_openrouter(prompt, model=model)
+        summary_text = await (completion or _complete)(prompt, model)
         
         # 构造结构化的返回结果
         current_time = datetime.now().isoformat()
@@ -453,13 +806,18 @@ async def generate_survey_summary(survey_data: Dict[str, Any], model: str = DEFA
         error_details = f"错误类型: {type(e).__name__}, 错误信息: {str(e)}"
         raise RuntimeError(f"生成调研总结失败: {error_details}") from e
 
-async def generate_question_insights(question_data: Dict[str, Any], model: str = DEFAULT_MODEL) -> Dict[str, Any]:
+async def generate_question_insights(
+    question_data: Dict[str, Any],
+    model: str = DEFAULT_MODEL,
+    completion: Optional[CompletionFn] = None
+) -> Dict[str, Any]:
     """
     生成单个问题的深度洞察分析。
 
     Args:
         question_data (Dict[str, Any]): 问题数据，包含问题文本、回答分布等。
         model (str): 要使用的 LLM 模型名称。
+        completion (CompletionFn): 可选的补全函数，流式接口借此逐段转发模型输出。
 
     Returns:
         Dict[str, Any]: 包含问题洞察的字典。
@@ -608,7 +966,7 @@ async def generate_question_insights(question_data: Dict[str, Any], model: str =
 
         # 调用LLM生成洞察
         logger.info(f"开始生成问题 '{question_text[:50]}...' 的深度洞察分析...")
-        insights_text = await _call_openrouter(prompt, model=model)
+        insights_text = await (completion or _complete)(prompt, model)
         
         # 构造结构化的返回结果
         current_time = datetime.now().isoformat()
@@ -0,0 +1,297 @@
+# backend/app/services/question_service.py
+"""
+题目加载服务
+提供问卷题目的批量加载（单次联表查询，避免逐题查询）、选项 JSON 的解析缓存，
+以及题库列表的游标分页与总数缓存
+"""
+
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.orm import Session, selectinload
+
+from app import metrics
+from app.models.question import Question
+from app.models.survey_question import SurveyQuestion
+from app.models.tag import Tag
+from app.models.user import User
+from app.services.search_service import build_text_search, highlight
+
+# ===== 题库总数缓存 =====
+# 题库列表的总数按筛选条件缓存；题目增删改时在本进程内主动失效，多进程部署下由 TTL 兜底
+QUESTION_COUNT_TTL_SECONDS = 60
+QUESTION_COUNT_MAX_SIZE = 512
+
+_count_lock = threading.Lock()
+_count_cache: "OrderedDict[tuple, Tuple[int, float]]" = OrderedDict()  # 筛选条件 -> (总数, 写入时间)
+
+# 使用次数排序表达式需与索引 ix_questions_usage_count_id 完全一致（0 以字面量输出，不能是绑定参数）
+_USAGE_COUNT = func.coalesce(Question.usage_count, literal_column("0"))
+
+# 排序方式 -> (排序列, 是否降序)；排序值相同时按题目ID确定先后，保证游标稳定
+QUESTION_SORTS = {
+    "created_desc": (Question.id, True),
+    "created_asc": (Question.id, False),
+    "usage_desc": (_USAGE_COUNT, True),
+    "usage_asc": (_USAGE_COUNT, False),
+}
+DEFAULT_QUESTION_SORT = "created_asc"
+# 按相关度排序；带搜索词且未指定排序方式时默认使用
+RELEVANCE_SORT = "relevance"
+# 进程内检索索引名称（见 search_service）
+QUESTION_SEARCH_INDEX = "questions"
+
+
+@lru_cache(maxsize=4096)
+def _parse_options_json(raw: str) -> tuple:
+    try:
+        parsed = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return ()
+    return tuple(parsed) if isinstance(parsed, list) else ()
+
+
+def parse_options(options: Any) -> List[Any]:
+    """
+    解析题目选项，按原始 JSON 文本缓存解析结果
+    返回新的列表；列表中的选项字典为缓存共享对象，请勿原地修改
+    """
+    if not options:
+        return []
+    if isinstance(options, str):
+        return list(_parse_options_json(options))
+    if isinstance(options, (list, tuple)):
+        return list(options)
+    return []
+
+
+def load_survey_questions(db: Session, survey_id: int, with_tags: bool = False) -> List[Tuple[Question, int]]:
+    """
+    按题目顺序加载问卷题目，返回 [(题目, 排序)]
+    单次联表查询；with_tags=True 时额外用一次 IN 查询预加载标签
+    """
+    query = (
+        db.query(Question, SurveyQuestion.order)
+        .join(SurveyQuestion, SurveyQuestion.question_id == Question.id)
+        .filter(SurveyQuestion.survey_id == survey_id)
+        .order_by(SurveyQuestion.order, SurveyQuestion.id)
+    )
+    if with_tags:
+        query = query.options(selectinload(Question.tags))
+    return [(question, order) for question, order in query.all()]
+
+
+def load_questions_for_surveys(
+    db: Session,
+    survey_ids: Iterable[int],
+    with_tags: bool = False
+) -> Dict[int, List[Question]]:
+    """一次性加载多份问卷的题目，返回 {survey_id: [题目, ...]}（按题目顺序）"""
+    survey_ids = list(survey_ids)
+    result: Dict[int, List[Question]] = defaultdict(list)
+    if not survey_ids:
+        return result
+    query = (
+        db.query(SurveyQuestion.survey_id, Question)
+        .join(Question, Question.id == SurveyQuestion.question_id)
+        .filter(SurveyQuestion.survey_id.in_(survey_ids))
+        .order_by(SurveyQuestion.survey_id, SurveyQuestion.order, SurveyQuestion.id)
+    )
+    if with_tags:
+        query = query.options(selectinload(Question.tags))
+    for survey_id, question in query.all():
+        result[survey_id].append(question)
+    return result
+
+
+# ===== 题库列表 =====
+
+def build_question_filters(
+    organization_id: Optional[int] = None,
+    type_filter: Optional[str] = None,
+    category_filter: Optional[int] = None,
+    tag_filter: Optional[List[str]] = None
+) -> Tuple[list, tuple]:
+    """
+    构建题库列表的筛选条件，返回 (条件列表, 缓存键)
+    计数和分页查询共用同一组条件；标签使用 EXISTS 子查询，命中多个标签的题目不会重复
+    搜索词由 paginate_questions 通过检索服务单独处理
+    """
+    filters = []
+    if organization_id is not None:
+        filters.append(Question.organization_id == organization_id)
+    if type_filter:
+        filters.append(Question.type == type_filter)
+    if category_filter:
+        filters.append(Question.category_id == category_filter)
+    if tag_filter:
+        filters.append(Question.tags.any(Tag.name.in_(tag_filter)))
+    cache_key = (organization_id, type_filter, category_filter, tuple(sorted(tag_filter or [])))
+    return filters, cache_key
+
+
+def count_questions(db: Session, filters: list, cache_key: tuple) -> int:
+    """按筛选条件统计题目总数，命中缓存时不访问数据库"""
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(cache_key)
+        if cached and now - cached[1] < QUESTION_COUNT_TTL_SECONDS:
+            _count_cache.move_to_end(cache_key)
+            metrics.record_cache_lookup("question_count", True)
+            return cached[0]
+
+    metrics.record_cache_lookup("question_count", False)
+    total = db.query(func.count(Question.id)).filter(*filters).scalar() or 0
+    with _count_lock:
+        _count_cache[cache_key] = (total, now)
+        _count_cache.move_to_end(cache_key)
+        while len(_count_cache) > QUESTION_COUNT_MAX_SIZE:
+            _count_cache.popitem(last=False)
+    return total
+
+
+def invalidate_question_counts() -> None:
+    """题目新增、删除或修改后清空题库总数缓存"""
+    with _count_lock:
+        _count_cache.clear()
+
+
+def encode_cursor(sort_value: Any, question_id: int) -> str:
+    """把上一页最后一条记录的 (排序值, 题目ID) 编码为游标"""
+    raw = json.dumps([sort_value, question_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, question_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("无效的分页游标")
+    if not isinstance(question_id, int) or not isinstance(sort_value, (int, float)):
+        raise ValueError("无效的分页游标")
+    return sort_value, question_id
+
+
+def _normalize_trigger_options(value: Any) -> List[Dict[str, Any]]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            value = []
+    return [item if isinstance(item, dict) and "option_text" in item else {"option_text": item} for item in value or []]
+
+
+def question_list_item(question: Question, owner_name: Optional[str]) -> Dict[str, Any]:
+    """题库列表中的单条题目（选项已解析），不修改 ORM 对象"""
+    return {
+        "id": question.id,
+        "text": question.text,
+        "type": question.type,
+        "is_required": question.is_required,
+        "order": question.order,
+        "category_id": question.category_id,
+        "options": parse_options(question.options),
+        "min_score": question.min_score,
+        "max_score": question.max_score,
+        "tags": [tag.name for tag in question.tags],
+        "owner_id": question.owner_id,
+        "owner_name": owner_name,
+        "usage_count": question.usage_count,
+        "parent_question_id": question.parent_question_id,
+        "trigger_options": _normalize_trigger_options(question.trigger_options),
+        "created_at": question.created_at,
+        "updated_at": question.updated_at,
+    }
+
+
+def paginate_questions(
+    db: Session,
+    filters: list,
+    cache_key: tuple,
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: Optional[str] = None,
+    cursor: Optional[str] = None,
+    search_filter: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    题库分页
+    - 传入 cursor 时按 (排序值, 题目ID) 做键集分页，忽略 skip，深翻页耗时不随页码增长
+    - 未传 cursor 时按 skip 偏移分页（兼容按页码跳转）
+    - 传入 search_filter 时走检索索引，每条结果附带 highlight；未指定排序方式时按相关度排序
+    两种方式都会返回 next_cursor，没有下一页时为 None
+    """
+    search = build_text_search(db, QUESTION_SEARCH_INDEX, Question.text, Question.id, search_filter)
+    if search:
+        filters = [*filters, search["criterion"]]
+        cache_key = (*cache_key, tuple(search["terms"]))
+        if not sort_by:
+            sort_by = RELEVANCE_SORT
+
+    if search and sort_by == RELEVANCE_SORT:
+        sort_column, descending = search["rank"], True
+    else:
+        sort_column, descending = QUESTION_SORTS.get(sort_by or DEFAULT_QUESTION_SORT, QUESTION_SORTS[DEFAULT_QUESTION_SORT])
+    is_id_sort = sort_column is Question.id
+
+    query = (
+        db.query(Question, User.username.label("owner_name"), sort_column.label("sort_value"))
+        .outerjoin(User, Question.owner_id == User.id)
+        .filter(*filters)
+        .options(selectinload(Question.tags))
+    )
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        if is_id_sort:
+            query = query.filter(Question.id < last_id if descending else Question.id > last_id)
+        else:
+            # 行值比较可直接作为 (排序值, id) 索引的范围条件；拆成 OR 时 PostgreSQL 只能边扫边过滤
+            key = tuple_(sort_column, Question.id)
+            bound = tuple_(last_value, last_id)
+            query = query.filter(key < bound if descending else key > bound)
+    if is_id_sort:
+        query = query.order_by(Question.id.desc() if descending else Question.id.asc())
+    else:
+        query = query.order_by(*(
+            (sort_column.desc(), Question.id.desc()) if descending else (sort_column.asc(), Question.id.asc())
+        ))
+    if not cursor and skip:
+        query = query.offset(skip)
+
+    # 多取一条判断是否还有下一页
+    results = query.limit(limit + 1).all() if limit > 0 else []
+    has_more = len(results) > limit
+    results = results[:limit]
+    items = []
+    for question, owner_name, _ in results:
+        item = question_list_item(question, owner_name)
+        if search:
+            item["highlight"] = highlight(question.text, search["terms"])
+        items.append(item)
+
+    next_cursor = None
+    if has_more and results:
+        last, _, sort_value = results[-1]
+        next_cursor = encode_cursor(sort_value, last.id)
+
+    total = count_questions(db, filters, cache_key)
+    page = (skip // limit) + 1 if limit > 0 else 1
+    pages = (total + limit - 1) // limit if limit > 0 else 1
+    return {
+        "items": items,
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "page": page,
+        "pages": pages,
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,249 @@
+# backend/app/services/search_service.py
+"""
+题库 / 调研库文本检索服务
+- PostgreSQL（已安装 pg_trgm）：ILIKE 由 gin_trgm_ops 索引加速，按 similarity() 排序
+- 其他数据库（SQLite 测试环境等）：进程内二元组（bigram）倒排索引筛出候选 ID，再用主键 IN 过滤
+两种实现返回同一组语义：查询按空白拆成若干词，全部命中（不区分大小写的子串匹配）才算匹配
+"""
+
+import html
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Float, and_, case, cast, false, func, literal, text
+from sqlalchemy.orm import Session
+
+# 单个查询最多使用的词数，避免超长输入生成过多条件
+SEARCH_MAX_TERMS = 8
+# 进程内索引的最长存活时间；本进程写入时增量更新，多进程部署下由 TTL 兜底
+SEARCH_INDEX_TTL_SECONDS = 300
+# 候选结果超过该数量时不再拼主键 IN 列表（此时索引已无选择性，直接扫描更划算）
+SEARCH_MAX_CANDIDATES = 5000
+
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+# LIKE 转义字符与 SQLAlchemy autoescape 一致使用 "/"，避免反斜杠在不同数据库中的转义差异
+LIKE_ESCAPE = "/"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """全角转半角、统一大小写、合并空白，索引与查询使用同一规则"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", value or "").casefold()).strip()
+
+
+def split_terms(query: Optional[str]) -> List[str]:
+    """拆分查询词：去重并保持原顺序"""
+    terms: List[str] = []
+    for term in normalize_text(query).split(" "):
+        if term and term not in terms:
+            terms.append(term)
+    return terms[:SEARCH_MAX_TERMS]
+
+
+def bigrams(value: str) -> Set[str]:
+    """文本的二元组集合（中文两字词、英文相邻字母都能覆盖）"""
+    return {value[i:i + 2] for i in range(len(value) - 1)}
+
+
+class NgramIndex:
+    """进程内二元组倒排索引，保存规范化后的原文用于精确校验"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: int, value: Optional[str]) -> None:
+        """新增或更新一条文档"""
+        normalized = normalize_text(value)
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._documents[doc_id] = normalized
+            for gram in bigrams(normalized):
+                self._postings[gram].add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: int) -> None:
+        old = self._documents.pop(doc_id, None)
+        if old is None:
+            return
+        for gram in bigrams(old):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(doc_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def search(self, terms: List[str]) -> Set[int]:
+        """返回包含全部查询词的文档ID"""
+        if not terms:
+            return set()
+        with self._lock:
+            candidates: Optional[Set[int]] = None
+            # 先用二元组倒排表求交集缩小范围；单字查询没有二元组，只能逐条比对
+            for gram in sorted({gram for term in terms for gram in bigrams(term)}, key=lambda g: len(self._postings.get(g, ()))):
+                postings = self._postings.get(gram)
+                if not postings:
+                    return set()
+                candidates = set(postings) if candidates is None else candidates & postings
+                if not candidates:
+                    return set()
+            if candidates is None:
+                candidates = set(self._documents)
+            return {doc_id for doc_id in candidates if all(term in self._documents[doc_id] for term in terms)}
+
+
+# ===== 索引注册表 =====
+# 名称 -> (索引, 构建时间)；首次检索时从数据库全量加载
+_index_lock = threading.Lock()
+_indexes: Dict[str, Tuple[NgramIndex, float]] = {}
+# 引擎 URL -> 是否可用 pg_trgm
+_trigram_support: Dict[str, bool] = {}
+
+
+def _get_index(name: str, loader: Callable[[], Iterable[Tuple[int, Optional[str]]]]) -> NgramIndex:
+    now = time.monotonic()
+    with _index_lock:
+        cached = _indexes.get(name)
+        if cached and now - cached[1] < SEARCH_INDEX_TTL_SECONDS:
+            return cached[0]
+    index = NgramIndex()
+    for doc_id, value in loader():
+        index.add(doc_id, value)
+    with _index_lock:
+        _indexes[name] = (index, now)
+    return index
+
+
+def update_search_document(name: str, doc_id: int, value: Optional[str]) -> None:
+    """文档新增或修改后同步进程内索引（索引尚未构建时无需处理）"""
+    with _index_lock:
+        cached = _indexes.get(name)
+    if cached:
+        cached[0].add(doc_id, value)
+
+
+def remove_search_document(name: str, doc_id: int) -> None:
+    """文档删除后同步进程内索引"""
+    with _index_lock:
+        cached = _indexes.get(name)
+    if cached:
+        cached[0].remove(doc_id)
+
+
+def invalidate_search_index(name: Optional[str] = None) -> None:
+    """丢弃进程内索引，下次检索时重建；不传 name 时全部丢弃"""
+    with _index_lock:
+        if name is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(name, None)
+
+
+def uses_trigram(db: Session) -> bool:
+    """当前数据库是否为已安装 pg_trgm 的 PostgreSQL（按引擎缓存检测结果）"""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.engine.url)
+    if key not in _trigram_support:
+        installed = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+        _trigram_support[key] = installed
+    return _trigram_support[key]
+
+
+# ===== 查询条件 =====
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escaped}%"
+
+
+def _like_criterion(column, terms: List[str]):
+    return and_(*(column.ilike(_like_pattern(term), escape=LIKE_ESCAPE) for term in terms))
+
+
+def build_text_search(
+    db: Session,
+    name: str,
+    column,
+    id_column,
+    query: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    构建文本检索条件
+    返回 {"terms", "criterion", "rank"}：criterion 用于过滤，rank 为相关度表达式（越大越相关）
+    查询为空时返回 None
+    """
+    terms = split_terms(query)
+    if not terms:
+        return None
+    phrase = " ".join(terms)
+
+    if uses_trigram(db):
+        # ILIKE '%词%' 可直接走 gin_trgm_ops 索引；similarity 衡量整体相似度，命中越完整越靠前
+        return {
+            "terms": terms,
+            "criterion": _like_criterion(column, terms),
+            "rank": func.similarity(column, phrase),
+        }
+
+    index = _get_index(name, lambda: db.query(id_column, column).yield_per(2000))
+    matched = index.search(terms)
+    if len(matched) > SEARCH_MAX_CANDIDATES:
+        criterion = _like_criterion(column, terms)
+    else:
+        criterion = id_column.in_(sorted(matched)) if matched else false()
+    # 可移植的相关度：以查询开头的优先，其次文本越短（查询词占比越高）越靠前
+    rank = (
+        case((func.lower(column).like(_like_pattern(terms[0])[1:], escape=LIKE_ESCAPE), 1.0), else_=0.0)
+        + cast(literal(len(phrase)), Float) / (func.length(column) + 1.0)
+    )
+    return {"terms": terms, "criterion": criterion, "rank": rank}
+
+
+def highlight(value: Optional[str], terms: List[str]) -> Optional[str]:
+    """对原文做 HTML 转义，并用 <mark> 标出命中的查询词（不区分大小写）"""
+    if value is None:
+        return None
+    if not terms:
+        return html.escape(value)
+    # 按规范化后的字符逐一映射回原文位置（NFKC 可能改变长度，逐字符规范化保证映射准确）
+    normalized_chars = [normalize_text(char) or char for char in value]
+    normalized = "".join(normalized_chars)
+    offsets: List[int] = []
+    for position, chars in enumerate(normalized_chars):
+        offsets.extend([position] * len(chars))
+
+    marked = [False] * len(value)
+    for term in sorted(terms, key=len, reverse=True):
+        start = normalized.find(term)
+        while start != -1:
+            for position in range(offsets[start], offsets[start + len(term) - 1] + 1):
+                marked[position] = True
+            start = normalized.find(term, start + len(term))
+
+    parts: List[str] = []
+    inside = False
+    for char, is_marked in zip(value, marked):
+        if is_marked and not inside:
+            parts.append(HIGHLIGHT_OPEN)
+        elif not is_marked and inside:
+            parts.append(HIGHLIGHT_CLOSE)
+        inside = is_marked
+        parts.append(html.escape(char))
+    if inside:
+        parts.append(HIGHLIGHT_CLOSE)
+    return "".join(parts)
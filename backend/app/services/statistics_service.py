@@ -2,9 +2,15 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.models.answer import SurveyAnswer
+from app.models.answer_item import SurveyAnswerItem
 from app.models.question import QuestionType
-from typing import List, Dict, Any, Optional
-import json
+from app.models.survey_stat import SurveyStatRollup
+from app.services.answer_item_service import CHOICE_TYPES, dimension_columns, dimension_label, score_plan_option
+from app.services.chart_service import build_question_option_stats
+from app.services.grading_service import compile_question_scoring, get_scoring_plan
+from app.services.question_service import parse_options
+from app.services.survey_stat_service import key_text, query_rollups, question_submissions, survey_totals, totals_from_rollups
+from typing import List, Dict, Any, Iterable, Optional
 
 def get_survey_stats_by_dimension(
     db: Session,
@@ -18,30 +24,16 @@ def get_survey_stats_by_dimension(
     """
     if dimension not in ['department', 'position', 'organization']:
         return []
-    query = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey_id)
-    if organization_ids:
-        query = query.filter(SurveyAnswer.organization_id.in_(organization_ids))
-
-    result_map: Dict[str, Dict[str, float]] = {}
-    for ans in query.all():
-        if dimension == "organization":
-            key = ans.organization_name or (f"组织#{ans.organization_id}" if ans.organization_id is not None else "未知组织")
-        elif dimension == "department":
-            key = ans.department or "未知部门"
-        elif dimension == "position":
-            key = ans.position or "未知职位"
-        else:
-            continue
-        if key not in result_map:
-            result_map[key] = {"count": 0, "total": 0.0, "avg_sum": 0.0}
-        result_map[key]["count"] += 1
-        if ans.total_score is not None:
-            result_map[key]["total"] += float(ans.total_score)
-    
+    # 直接读取预聚合的问卷级汇总，无需扫描答卷
+    return build_dimension_stats(dimension, survey_totals(db, survey_id, dimension, organization_ids))
+
+
+def build_dimension_stats(dimension: str, totals: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """由问卷级汇总（分组 -> {count, score_sum}）生成维度统计列表"""
     result = []
-    for k, v in result_map.items():
+    for k, v in totals.items():
         count = v["count"]
-        total = v["total"]
+        total = v["score_sum"]
         avg = total / count if count else 0.0
         result.append({
             "dimension": dimension,
@@ -74,9 +66,7 @@ def get_per_question_scores(
       ...
     ]
     """
-    from app.services.grading_service import calculate_answer_score
     from app.services.survey_service import get_survey_questions
-    from app.models.question import Question as QuestionModel
 
     questions_in_survey = get_survey_questions(db, survey_id)
     question_map: Dict[str, Dict[str, Any]] = {}
@@ -92,36 +82,44 @@ def get_per_question_scores(
     if not question_map:
         return []
 
-    query = db.query(SurveyAnswer).filter(SurveyAnswer.survey_id == survey_id)
-    if department is not None:
-        query = query.filter(SurveyAnswer.department == department)
-    if position is not None:
-        query = query.filter(SurveyAnswer.position == position)
-    if organization_ids:
-        query = query.filter(SurveyAnswer.organization_id.in_(organization_ids))
-
-    answers = query.all()
-
-    q_models = db.query(QuestionModel).filter(QuestionModel.id.in_([q["id"] for q in questions_in_survey])).all()
-    q_model_map: Dict[str, QuestionModel] = {str(q.id): q for q in q_models}
-
-    for ans in answers:
-        if not ans.answers:
-            continue
-        try:
-            ans_data = json.loads(ans.answers)
-        except (json.JSONDecodeError, TypeError):
+    def item_query(*columns):
+        query = (
+            db.query(SurveyAnswerItem.question_id, *columns)
+            .join(SurveyAnswer, SurveyAnswer.id == SurveyAnswerItem.answer_id)
+            .filter(SurveyAnswerItem.survey_id == survey_id)
+        )
+        if department is not None:
+            query = query.filter(SurveyAnswer.department == department)
+        if position is not None:
+            query = query.filter(SurveyAnswer.position == position)
+        if organization_ids:
+            query = query.filter(SurveyAnswer.organization_id.in_(organization_ids))
+        return query
+
+    # 按 (题目, 选项) 聚合选择次数，再用评分计划按当前选项分值计分，题目分值修改后无需重算答卷
+    plan = get_scoring_plan(db, survey_id)
+    option_rows = item_query(SurveyAnswerItem.option_text, func.count(SurveyAnswerItem.id)).group_by(
+        SurveyAnswerItem.question_id, SurveyAnswerItem.option_text
+    ).all()
+    for qid, option_text, count in option_rows:
+        qid_str = str(qid)
+        if qid_str not in question_map or qid not in plan:
             continue
-
-        for qid_str, user_ans in ans_data.items():
-            if qid_str not in question_map:
-                continue
-            q_model = q_model_map.get(qid_str)
-            if not q_model:
-                continue
-            score = calculate_answer_score(q_model, user_ans)
-            question_map[qid_str]["total_score"] += score
-            question_map[qid_str]["response_count"] += 1
+        question_map[qid_str]["total_score"] += score_plan_option(plan[qid], option_text) * count
+
+    # 分母为答卷中包含该题的份数（含空回答），直接读取预聚合行；
+    # 预聚合只按单一维度分组，同时按部门和职位过滤时无法区分，退回按作答人数统计
+    if department is not None and position is not None:
+        response_counts = dict(item_query(func.count(func.distinct(SurveyAnswerItem.answer_id))).group_by(
+            SurveyAnswerItem.question_id
+        ).all())
+    elif position is not None:
+        response_counts = question_submissions(db, survey_id, "position", position, organization_ids)
+    else:
+        response_counts = question_submissions(db, survey_id, "department", department, organization_ids)
+    for qid, count in response_counts.items():
+        if str(qid) in question_map:
+            question_map[str(qid)]["response_count"] = count
 
     result = []
     for qid_str, info in question_map.items():
@@ -140,6 +138,41 @@ def get_per_question_scores(
     return result
 
 
+def build_question_scores_from_rollups(
+    questions: List[Dict[str, Any]],
+    rows: Iterable[SurveyStatRollup],
+    plan: Dict[int, Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    由同一维度的预聚合行生成每题总分/平均分（不按部门/职位过滤时与 get_per_question_scores 结果一致）
+    每份答卷在任一维度下恰好属于一个分组，跨分组累加即为全部答卷的汇总；分母为提交份数（含空回答）
+    """
+    totals: Dict[int, Dict[str, float]] = {}
+    for row in rows:
+        if row.question_id == 0:
+            continue
+        info = totals.setdefault(row.question_id, {"total_score": 0.0, "response_count": 0})
+        if row.option_text:
+            info["total_score"] += score_plan_option(plan.get(row.question_id), row.option_text) * row.count
+        else:
+            info["response_count"] += row.submitted_count
+
+    result = []
+    for q in questions:
+        info = totals.get(q["id"])
+        if not info or info["response_count"] <= 0:
+            continue
+        count = info["response_count"]
+        total = info["total_score"]
+        result.append({
+            "question_id": q["id"],
+            "question_text": q["text"],
+            "response_count": count,
+            "total_score": round(total, 2),
+            "avg_score": round(total / count, 2)
+        })
+    return result
+
 
 def get_line_scores_by_dimension(
     db: Session,
@@ -158,111 +191,115 @@ def get_line_scores_by_dimension(
     if dimension not in ["department", "position", "organization"]:
         raise ValueError("dimension must be 'department', 'position', or 'organization'")
 
-    from app.models.answer import SurveyAnswer as SurveyAnswerModel
     from app.models.question import Question as QuestionModel
-    from app.services.grading_service import calculate_answer_score
-    from app.services.survey_service import get_survey_questions
-    import json
-
-    # 拉取答卷
-    answers_query = db.query(SurveyAnswerModel).filter(SurveyAnswerModel.survey_id == survey_id)
-    if organization_ids:
-        answers_query = answers_query.filter(SurveyAnswerModel.organization_id.in_(organization_ids))
-    answers = answers_query.all()
-
-    # 收集人群列表
-    categories_set = set()
-    for ans in answers:
-        if dimension == "organization":
-            key = ans.organization_name or (f"组织#{ans.organization_id}" if ans.organization_id is not None else "未知组织")
-        elif dimension == "department":
-            key = ans.department or "未知部门"
-        else:
-            key = ans.position or "未知职位"
-        categories_set.add(key)
-    categories = sorted(categories_set)
+
+    # 人群列表与问卷总分均来自预聚合的问卷级汇总
+    totals = survey_totals(db, survey_id, dimension, organization_ids)
+
+    # 按题目（仅统计有分值的单/多选题）
+    scored: Dict[int, Any] = {}
+    rows = []
+    if question_ids:
+        q_objs = db.query(QuestionModel).filter(QuestionModel.id.in_(question_ids)).all()
+        scored = {
+            q.id: (q.text, compile_question_scoring(q))
+            for q in q_objs if has_scored_options(q.type, parse_options(q.options))
+        }
+        if scored:
+            # 题目级汇总行提供作答人数，选项级汇总行按当前选项分值计分
+            rows = query_rollups(db, survey_id, dimension, organization_ids).filter(
+                SurveyStatRollup.question_id.in_(list(scored.keys()))
+            ).all()
+    return build_line_scores(totals, rows, scored, include_survey_total)
+
+
+def has_scored_options(question_type: Any, options: List[Any]) -> bool:
+    """是否为设置了选项分值的单/多选题（折线图只统计这类题目）"""
+    if question_type not in [QuestionType.SINGLE_CHOICE, QuestionType.MULTI_CHOICE]:
+        return False
+    return any(isinstance(o, dict) and o.get("score") is not None for o in options)
+
+
+def build_line_scores(
+    totals: Dict[str, Dict[str, Any]],
+    rows: Iterable[SurveyStatRollup],
+    scored_questions: Dict[int, Any],
+    include_survey_total: bool
+) -> Dict[str, Any]:
+    """
+    由问卷级汇总和同一维度的预聚合行生成折线图数据，不访问数据库
+    scored_questions: question_id -> (题目文本, 评分计划条目)，按 question_id 顺序输出 series
+    """
+    categories = sorted(totals.keys())
 
     series = []
 
     # 1) 问卷总分
     if include_survey_total:
-        totals_map = {cat: {"sum": 0.0, "count": 0} for cat in categories}
-        for ans in answers:
-            if dimension == "organization":
-                key = ans.organization_name or (f"组织#{ans.organization_id}" if ans.organization_id is not None else "未知组织")
-            elif dimension == "department":
-                key = ans.department or "未知部门"
-            else:
-                key = ans.position or "未知职位"
-            if ans.total_score is not None:
-                totals_map[key]["sum"] += ans.total_score
-                totals_map[key]["count"] += 1
         data = []
         for cat in categories:
-            c = totals_map[cat]
-            avg = c["sum"] / c["count"] if c["count"] > 0 else 0.0
+            c = totals[cat]
+            avg = c["score_sum"] / c["count"] if c["count"] > 0 else 0.0
             data.append(round(avg, 2))
         series.append({"name": "问卷总分", "data": data})
 
-    # 2) 按题目（仅统计有分值的单/多选题）
-    if question_ids:
-        q_objs = db.query(QuestionModel).filter(QuestionModel.id.in_(question_ids)).all()
+    # 2) 按题目
+    if not scored_questions:
+        return {"categories": categories, "series": series}
 
-        def is_scored_choice(q: QuestionModel) -> bool:
-            if q.type not in [QuestionType.SINGLE_CHOICE, QuestionType.MULTI_CHOICE]:
-                return False
-            try:
-                opts = json.loads(q.options) if isinstance(q.options, str) else (q.options or [])
-            except Exception:
-                return False
-            return any(isinstance(o, dict) and o.get("score") is not None for o in opts)
-
-        q_map = {q.id: q for q in q_objs if is_scored_choice(q)}
-        if not q_map:
-            return {"categories": categories, "series": series}
-
-        # 准备聚合结构：qid -> cat -> {sum, count}
-        agg: Dict[int, Dict[str, Dict[str, float]]] = {
-            qid: {cat: {"sum": 0.0, "count": 0} for cat in categories}
-            for qid in q_map.keys()
-        }
+    # 准备聚合结构：qid -> cat -> {sum, count}
+    agg: Dict[int, Dict[str, Dict[str, float]]] = {
+        qid: {cat: {"sum": 0.0, "count": 0} for cat in categories}
+        for qid in sorted(scored_questions.keys())
+    }
+    for row in rows:
+        if row.question_id not in agg:
+            continue
+        c = agg[row.question_id].setdefault(row.dimension_value, {"sum": 0.0, "count": 0})
+        if row.option_text:
+            c["sum"] += score_plan_option(scored_questions[row.question_id][1], row.option_text) * row.count
+        else:
+            c["count"] += row.count
 
-        for ans in answers:
-            if dimension == "organization":
-                key = ans.organization_name or (f"组织#{ans.organization_id}" if ans.organization_id is not None else "未知组织")
-            elif dimension == "department":
-                key = ans.department or "未知部门"
-            else:
-                key = ans.position or "未知职位"
-            try:
-                ans_data = json.loads(ans.answers)
-            except Exception:
-                continue
-
-            for qid, q_obj in q_map.items():
-                if str(qid) not in ans_data:
-                    continue
-                val = ans_data.get(str(qid))
-                score = calculate_answer_score(q_obj, val)
-                agg[qid][key]["sum"] += score
-                # 只有有回答才计数
-                if val is not None and (str(val).strip() != '' if not isinstance(val, list) else len(val) > 0):
-                    agg[qid][key]["count"] += 1
-
-        for qid, cat_map in agg.items():
-            data = []
-            for cat in categories:
-                c = cat_map[cat]
-                avg = c["sum"] / c["count"] if c["count"] > 0 else 0.0
-                data.append(round(avg, 2))
-            q_obj = q_map[qid]
-            series.append({"name": f"Q{qid} {q_obj.text}", "data": data})
+    for qid, cat_map in agg.items():
+        data = []
+        for cat in categories:
+            c = cat_map[cat]
+            avg = c["sum"] / c["count"] if c["count"] > 0 else 0.0
+            data.append(round(avg, 2))
+        series.append({"name": f"Q{qid} {scored_questions[qid][0]}", "data": data})
     return {"categories": categories, "series": series}
 
 
 
 from app.services.survey_service import get_survey_questions
 
+
+def build_pie_from_rollups(
+    rows: Iterable[SurveyStatRollup],
+    question_id: int,
+    option_text: str,
+    dimension: str,
+    include_unanswered: bool = True
+) -> Dict[str, Any]:
+    """由同一维度的预聚合行生成选择题某选项的饼图数据，不访问数据库"""
+    rows = [row for row in rows if row.question_id == question_id]
+    result_map: Dict[str, int] = {}
+    if include_unanswered:
+        unanswered = sum(row.unanswered_count for row in rows if not row.option_text)
+        if unanswered > 0:
+            result_map["(未作答)"] = unanswered
+    for row in rows:
+        if row.option_text and row.option_text == key_text(option_text) and row.count > 0:
+            result_map[row.dimension_value] = result_map.get(row.dimension_value, 0) + row.count
+    data = [{"name": k, "value": v} for k, v in result_map.items()]
+    return {
+        "option": option_text,
+        "dimension": dimension,
+        "data": data
+    }
+
+
 def get_pie_option_distribution(
     db: Session,
     survey_id: int,
@@ -288,51 +325,41 @@ def get_pie_option_distribution(
     if not question_obj:
         return {"option": option_text, "dimension": dimension, "data": []}
 
-    answers_query = db.query(SurveyAnswerModel).filter(SurveyAnswerModel.survey_id == survey_id)
-    if organization_ids:
-        answers_query = answers_query.filter(SurveyAnswerModel.organization_id.in_(organization_ids))
-    answers = answers_query.all()
-
     result_map: Dict[str, int] = {}
-    for ans in answers:
-        if dimension == "organization":
-            key = ans.organization_name or (f"组织#{ans.organization_id}" if ans.organization_id is not None else "未知组织")
-        elif dimension == "department":
-            key = ans.department or "未知部门"
-        else:
-            key = ans.position or "未知职位"
-
-        try:
-            ans_data = json.loads(ans.answers) if ans.answers else {}
-        except Exception:
-            ans_data = {}
-
-        user_val = ans_data.get(str(question_id))
-
-        has_answer = False
-        if user_val is not None:
-            if isinstance(user_val, str) and user_val.strip():
-                has_answer = True
-            elif isinstance(user_val, list) and len(user_val) > 0:
-                has_answer = True
-            elif isinstance(user_val, (int, float)):
-                has_answer = True
-
-        if not has_answer:
-            if include_unanswered:
-                result_map["(未作答)"] = result_map.get("(未作答)", 0) + 1
-            continue
-
-        matched = False
-        if isinstance(user_val, list):
-            if option_text in user_val:
-                matched = True
-        else:
-            if str(user_val) == option_text:
-                matched = True
-
-        if matched:
-            result_map[key] = result_map.get(key, 0) + 1
+    if question_obj.type in CHOICE_TYPES:
+        # 选择题直接读取预聚合的选项级/题目级汇总
+        rows = query_rollups(db, survey_id, dimension, organization_ids).filter(
+            SurveyStatRollup.question_id == question_id
+        ).all()
+        return build_pie_from_rollups(rows, question_id, option_text, dimension, include_unanswered)
+
+    group_cols = dimension_columns(dimension)
+
+    def item_query(*columns):
+        query = (
+            db.query(*columns)
+            .join(SurveyAnswerModel, SurveyAnswerModel.id == SurveyAnswerItem.answer_id)
+            .filter(SurveyAnswerItem.survey_id == survey_id, SurveyAnswerItem.question_id == question_id)
+        )
+        if organization_ids:
+            query = query.filter(SurveyAnswerModel.organization_id.in_(organization_ids))
+        return query
+
+    if include_unanswered:
+        total_query = db.query(func.count(SurveyAnswerModel.id)).filter(SurveyAnswerModel.survey_id == survey_id)
+        if organization_ids:
+            total_query = total_query.filter(SurveyAnswerModel.organization_id.in_(organization_ids))
+        total = total_query.scalar() or 0
+        answered = item_query(func.count(func.distinct(SurveyAnswerItem.answer_id))).scalar() or 0
+        if total - answered > 0:
+            result_map["(未作答)"] = total - answered
+
+    matched_rows = item_query(*group_cols, func.count(func.distinct(SurveyAnswerItem.answer_id))).filter(
+        SurveyAnswerItem.option_text == option_text
+    ).group_by(*group_cols).all()
+    for row in matched_rows:
+        key = dimension_label(dimension, row[:-1])
+        result_map[key] = result_map.get(key, 0) + row[-1]
 
     data = [{"name": k, "value": v} for k, v in result_map.items()]
     return {
@@ -340,3 +367,69 @@ def get_pie_option_distribution(
         "dimension": dimension,
         "data": data
     }
+
+
+def get_analysis_bundle(
+    db: Session,
+    survey_id: int,
+    dimension: str = "department",
+    organization_ids: Optional[List[int]] = None,
+    line_question_ids: Optional[List[int]] = None,
+    include_survey_total: bool = True,
+    pies: Optional[List[Any]] = None,
+    include_unanswered: bool = True,
+    department: Optional[str] = None,
+    position: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    分析页一次性取数：维度统计、每题得分、选项分布、折线图、饼图
+    题目列表、评分计划和该维度的预聚合行各只读取一次，各部分在内存中生成，
+    结果与 stats / questions/scores / charts/options / line / pie 接口分别返回的数据一致
+    - pies: [(question_id, option_text), ...]
+    - 按部门/职位过滤每题得分时预聚合行无法区分，退回按答题明细统计
+    """
+    if dimension not in ["department", "position", "organization"]:
+        raise ValueError("dimension must be 'department', 'position', or 'organization'")
+
+    questions = get_survey_questions(db, survey_id) or []
+    rows = query_rollups(db, survey_id, dimension, organization_ids).all() if questions else []
+    plan = get_scoring_plan(db, survey_id) if questions else {}
+    totals = totals_from_rollups(rows)
+
+    if department is not None or position is not None:
+        question_scores = get_per_question_scores(
+            db, survey_id, department=department, position=position, organization_ids=organization_ids
+        )
+    else:
+        question_scores = build_question_scores_from_rollups(questions, rows, plan)
+
+    wanted = set(line_question_ids or [])
+    scored = {
+        q["id"]: (q["text"], plan[q["id"]])
+        for q in questions
+        if q["id"] in wanted and q["id"] in plan and has_scored_options(q["type"], q["options"])
+    }
+
+    question_types = {q["id"]: q["type"] for q in questions}
+    pie_results = []
+    for question_id, option_text in pies or []:
+        if question_types.get(question_id) in CHOICE_TYPES:
+            pie = build_pie_from_rollups(rows, question_id, option_text, dimension, include_unanswered)
+        else:
+            # 非选择题没有选项级汇总，单独按答题明细统计
+            pie = get_pie_option_distribution(
+                db, survey_id, question_id, option_text, dimension=dimension,
+                include_unanswered=include_unanswered, organization_ids=organization_ids
+            )
+        pie["question_id"] = question_id
+        pie_results.append(pie)
+
+    return {
+        "survey_id": survey_id,
+        "dimension": dimension,
+        "stats": build_dimension_stats(dimension, totals),
+        "question_scores": question_scores,
+        "option_charts": build_question_option_stats(questions, rows),
+        "line": build_line_scores(totals, rows, scored, include_survey_total),
+        "pies": pie_results
+    }
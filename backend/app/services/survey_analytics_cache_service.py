@@ -0,0 +1,64 @@
+# backend/app/services/survey_analytics_cache_service.py
+"""
+调研分析快照缓存
+AI 接口（总结、单题洞察、批量洞察）共用，连续为多个问题生成洞察时只汇总一次答卷
+- 读取时按答卷指纹校验，新增或删除答卷后立即失效
+- 题目修改/删除、问卷题目集合变化时由 crud / survey_service 主动失效（与评分计划一致）
+- 多进程部署下其他进程的快照由短 TTL 兜底
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app import metrics
+
+SURVEY_ANALYTICS_TTL_SECONDS = 120
+SURVEY_ANALYTICS_MAX_SIZE = 64
+
+_analytics_lock = threading.Lock()
+_analytics_cache: "OrderedDict[Tuple[int, int], Tuple[tuple, Dict[str, Any], float]]" = OrderedDict()  # (组织ID, 调研ID) -> (答卷指纹, 分析数据, 缓存时间)
+
+
+def get_cached_analytics(organization_id: int, survey_id: int, fingerprint: tuple) -> Optional[Dict[str, Any]]:
+    """返回指纹一致且未过期的分析数据副本，调用方可以修改；未命中时为 None"""
+    key = (organization_id, survey_id)
+    with _analytics_lock:
+        cached = _analytics_cache.get(key)
+        if cached and cached[0] == fingerprint and time.monotonic() - cached[2] < SURVEY_ANALYTICS_TTL_SECONDS:
+            _analytics_cache.move_to_end(key)
+            metrics.record_cache_lookup("survey_analytics", True)
+            return copy.deepcopy(cached[1])
+    metrics.record_cache_lookup("survey_analytics", False)
+    return None
+
+
+def store_analytics(organization_id: int, survey_id: int, fingerprint: tuple, survey_data: Dict[str, Any]) -> None:
+    key = (organization_id, survey_id)
+    with _analytics_lock:
+        _analytics_cache[key] = (fingerprint, survey_data, time.monotonic())
+        _analytics_cache.move_to_end(key)
+        while len(_analytics_cache) > SURVEY_ANALYTICS_MAX_SIZE:
+            _analytics_cache.popitem(last=False)
+
+
+def invalidate_survey_analytics(survey_id: Optional[int] = None) -> None:
+    """使调研分析快照失效；不传 survey_id 时全部清空"""
+    with _analytics_lock:
+        if survey_id is None:
+            _analytics_cache.clear()
+        else:
+            for key in [key for key in _analytics_cache if key[1] == survey_id]:
+                del _analytics_cache[key]
+
+
+def invalidate_question_analytics(question_id: int) -> None:
+    """题目修改或删除后，使包含该题目的调研分析快照失效"""
+    with _analytics_lock:
+        for key in [
+            key for key, (_, survey_data, _) in _analytics_cache.items()
+            if any(q["question_id"] == question_id for q in survey_data.get("question_analytics", []))
+        ]:
+            del _analytics_cache[key]
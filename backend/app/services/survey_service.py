@@ -2,63 +2,109 @@
 
 from typing import Optional
 import json
-from sqlalchemy import func
+from sqlalchemy import and_, case, func, or_, select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
 from app.models.answer import SurveyAnswer
 from app.models.question import Question as QuestionModel, QuestionType
 from app.models.survey import Survey as SurveyModel
 from app.models.survey_question import SurveyQuestion
 from app.schemas.survey import SurveyCreate, SurveyUpdate
+from app.services.grading_service import invalidate_scoring_plan
+from app.services.question_service import load_survey_questions, parse_options
+from app.services.search_service import build_text_search, highlight, remove_search_document, update_search_document
+from app.services.survey_analytics_cache_service import invalidate_survey_analytics
+from app.services.survey_stat_service import rebuild_survey_rollups
 import datetime
 
-def _attach_counts(db: Session, surveys: list[SurveyModel]):
-    survey_ids = [survey.id for survey in surveys if survey]
-    if not survey_ids:
-        return
+# 进程内检索索引名称（见 search_service）
+SURVEY_SEARCH_INDEX = "surveys"
 
-    question_counts = dict(
-        db.query(SurveyQuestion.survey_id, func.count(SurveyQuestion.question_id))
-        .filter(SurveyQuestion.survey_id.in_(survey_ids))
-        .group_by(SurveyQuestion.survey_id)
-        .all()
+def adjust_survey_counts(db: Session, survey_id: int, responses: int = 0, questions: int = 0) -> None:
+    """
+    在当前事务内增减问卷的答卷数与题目数（不提交）
+    使用 SET col = col + n，并发提交答卷时不会丢失更新
+    """
+    values = {}
+    if responses:
+        values[SurveyModel.response_count] = SurveyModel.response_count + responses
+    if questions:
+        values[SurveyModel.question_count] = SurveyModel.question_count + questions
+    if values:
+        db.query(SurveyModel).filter(SurveyModel.id == survey_id).update(values, synchronize_session=False)
+
+
+def reconcile_survey_counts(db: Session, survey_ids: Optional[list[int]] = None) -> int:
+    """
+    按答卷与题目关联重新核对问卷计数，修正不一致的问卷并提交；survey_ids 为空时核对全部问卷
+    单条 UPDATE 完成，返回被修正的问卷数
+    """
+    responses = select(func.count(SurveyAnswer.id)).where(SurveyAnswer.survey_id == SurveyModel.id).scalar_subquery()
+    questions = select(func.count(SurveyQuestion.id)).where(SurveyQuestion.survey_id == SurveyModel.id).scalar_subquery()
+    query = db.query(SurveyModel).filter(
+        or_(SurveyModel.response_count != responses, SurveyModel.question_count != questions)
     )
+    if survey_ids is not None:
+        query = query.filter(SurveyModel.id.in_(survey_ids))
+    corrected = query.update(
+        {SurveyModel.response_count: responses, SurveyModel.question_count: questions},
+        synchronize_session=False,
+    )
+    db.commit()
+    return corrected
 
-    response_counts = dict(
-        db.query(SurveyAnswer.survey_id, func.count(SurveyAnswer.id))
-        .filter(SurveyAnswer.survey_id.in_(survey_ids))
-        .group_by(SurveyAnswer.survey_id)
-        .all()
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    """不带时区的时间按 UTC 处理（SQLite 读回的时间不带时区）"""
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+
+
+def compute_survey_status(survey: SurveyModel, now: Optional[datetime.datetime] = None) -> str:
+    """
+    由开始/结束时间推导问卷状态：已过结束时间为 completed，设置了开始时间为 active，否则为 pending
+    与 survey_status_expression 保持一致
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    if survey.end_time and now >= _as_utc(survey.end_time):
+        return 'completed'
+    if survey.start_time:
+        return 'active'
+    return 'pending'
+
+
+def survey_status_expression(now: Optional[datetime.datetime] = None):
+    """compute_survey_status 的 SQL 版本，用于按状态筛选与批量写回"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return case(
+        (and_(SurveyModel.end_time.isnot(None), SurveyModel.end_time <= now), 'completed'),
+        (SurveyModel.start_time.isnot(None), 'active'),
+        else_='pending',
     )
 
-    for survey in surveys:
-        if not survey:
-            continue
-        setattr(survey, 'question_count', question_counts.get(survey.id, 0))
-        setattr(survey, 'response_count', response_counts.get(survey.id, 0))
 
-def _normalize_status(db: Session, survey: SurveyModel):
+def _apply_derived_status(surveys: list[SurveyModel]) -> None:
+    """
+    读取时按时间推导状态，只修改内存中的值（不标记为待写入，不提交）
+    数据库中的状态由 sync_survey_statuses 定期批量写回
+    """
     now = datetime.datetime.now(datetime.timezone.utc)
-    expected_status = survey.status
-
-    if survey.end_time and now >= survey.end_time:
-        expected_status = 'completed'
-    elif survey.start_time and (not survey.end_time or now < survey.end_time):
-        expected_status = 'active'
-    elif not survey.start_time:
-        expected_status = 'pending'
-
-    if expected_status != survey.status:
-        survey.status = expected_status
-        db.add(survey)
-        db.commit()
-        db.refresh(survey)
+    for survey in surveys:
+        status = compute_survey_status(survey, now)
+        if status != survey.status:
+            set_committed_value(survey, 'status', status)
+
+
+def sync_survey_statuses(db: Session, now: Optional[datetime.datetime] = None) -> int:
+    """把状态与开始/结束时间不一致的问卷一次性批量更新并提交，返回更新的问卷数"""
+    expected = survey_status_expression(now)
+    updated = db.query(SurveyModel).filter(SurveyModel.status != expected).update(
+        {SurveyModel.status: expected}, synchronize_session=False
+    )
+    db.commit()
+    return updated
+
 
 def _enrich_surveys(db: Session, surveys: list[SurveyModel]):
-    if not surveys:
-        return surveys
-    for survey in surveys:
-        _normalize_status(db, survey)
-    _attach_counts(db, surveys)
+    _apply_derived_status(surveys)
     return surveys
 
 def get_subjective_answers(
@@ -160,11 +206,13 @@ def create_survey(db: Session, survey: SurveyCreate, user_id: int):
         description=survey.description,
         created_by_user_id=user_id,
         organization_id=survey.organization_id,
-        is_anonymous=survey.is_anonymous or False
+        is_anonymous=survey.is_anonymous or False,
+        question_count=len(survey.question_ids or [])
     )
     db.add(db_survey)
     db.commit()
     db.refresh(db_survey)
+    update_search_document(SURVEY_SEARCH_INDEX, db_survey.id, db_survey.title)
 
     # 如果提供了question_ids，则创建调研与题目的关联关系
     if survey.question_ids:
@@ -185,8 +233,7 @@ def get_survey(db: Session, survey_id: int):
     """
     survey = db.query(SurveyModel).filter(SurveyModel.id == survey_id).first()
     if survey:
-        _normalize_status(db, survey)
-        _attach_counts(db, [survey])
+        _apply_derived_status([survey])
     return survey
 
 def get_surveys_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
@@ -200,16 +247,18 @@ def get_global_surveys(db: Session, skip: int = 0, limit: int = 100, search: str
     """
     获取全局调研库中的所有调研。
     支持搜索、状态筛选和排序。
+    搜索走检索索引：未指定排序方式时按相关度排序，每条结果附带 highlight。
     """
     query = db.query(SurveyModel)
     
     # 添加搜索过滤
-    if search:
-        query = query.filter(SurveyModel.title.contains(search))
+    text_search = build_text_search(db, SURVEY_SEARCH_INDEX, SurveyModel.title, SurveyModel.id, search)
+    if text_search:
+        query = query.filter(text_search["criterion"])
     
     # 添加状态过滤
     if status_filter:
-        query = query.filter(SurveyModel.status == status_filter)
+        query = query.filter(survey_status_expression() == status_filter)
     
     # 添加排序
     if sort_by:
@@ -221,11 +270,16 @@ def get_global_surveys(db: Session, skip: int = 0, limit: int = 100, search: str
             query = query.order_by(SurveyModel.title.asc())
         elif sort_by == "title_desc":
             query = query.order_by(SurveyModel.title.desc())
+    elif text_search:
+        query = query.order_by(text_search["rank"].desc(), SurveyModel.created_at.desc())
     else:
         # 默认按创建时间降序
         query = query.order_by(SurveyModel.created_at.desc())
     
     surveys = query.offset(skip).limit(limit).all()
+    if text_search:
+        for survey in surveys:
+            object.__setattr__(survey, 'highlight', highlight(survey.title, text_search["terms"]))
     return _enrich_surveys(db, surveys)
 
 def update_survey(db: Session, survey_id: int, survey_update: SurveyUpdate):
@@ -256,13 +310,22 @@ def update_survey(db: Session, survey_id: int, survey_update: SurveyUpdate):
                     )
                     db.add(survey_question)
 
+            db_survey.question_count = len(question_ids or [])
+
+            # 题目集合变化后，已有答卷的未作答统计需要重算
+            rebuild_survey_rollups(db, survey_id)
+
         # 更新其他字段
         for key, value in update_data.items():
             setattr(db_survey, key, value)
 
         db.add(db_survey)
         db.commit()
+        # 题目集合可能已变化，评分计划需重建；分析快照包含标题与题目列表，一并失效
+        invalidate_scoring_plan(survey_id)
+        invalidate_survey_analytics(survey_id)
         db.refresh(db_survey)
+        update_search_document(SURVEY_SEARCH_INDEX, survey_id, db_survey.title)
     return db_survey
 
 def delete_survey(db: Session, survey_id: int):
@@ -273,6 +336,9 @@ def delete_survey(db: Session, survey_id: int):
     if db_survey:
         db.delete(db_survey)
         db.commit()
+        invalidate_scoring_plan(survey_id)
+        invalidate_survey_analytics(survey_id)
+        remove_search_document(SURVEY_SEARCH_INDEX, survey_id)
     return db_survey
 
 # 辅助函数：检查用户是否是问卷的创建者
@@ -288,41 +354,24 @@ def get_survey_questions(db: Session, survey_id: int):
     """
     获取调研的题目列表
     """
-    from app.models.question import Question
-    
     # 首先检查调研是否存在
     survey = db.query(SurveyModel).filter(SurveyModel.id == survey_id).first()
     if not survey:
         return None
     
-    # 通过SurveyQuestion关联表获取题目
-    survey_questions = db.query(SurveyQuestion).filter(
-        SurveyQuestion.survey_id == survey_id
-    ).order_by(SurveyQuestion.order).all()
-    
+    # 单次联表查询获取全部题目，选项解析结果按原始 JSON 缓存
     questions = []
-    for sq in survey_questions:
-        question = db.query(Question).filter(Question.id == sq.question_id).first()
-        if question:
-            # 转换选项格式
-            options = []
-            if question.options:
-                try:
-                    import json
-                    options = json.loads(question.options) if isinstance(question.options, str) else question.options
-                except:
-                    options = []
-            
-            questions.append({
-                "id": question.id,
-                "text": question.text,
-                "type": question.type,
-                "options": options,
-                "is_required": question.is_required,
-                "order": sq.order,
-                "min_score": question.min_score,
-                "max_score": question.max_score
-            })
+    for question, order in load_survey_questions(db, survey_id):
+        questions.append({
+            "id": question.id,
+            "text": question.text,
+            "type": question.type,
+            "options": parse_options(question.options),
+            "is_required": question.is_required,
+            "order": order,
+            "min_score": question.min_score,
+            "max_score": question.max_score
+        })
     
     return questions
 
@@ -333,6 +382,8 @@ def update_survey_status(db: Session, survey_id: int, status: str, end_time: Opt
 
     now = datetime.datetime.now(datetime.timezone.utc)
     survey.status = status
+    # 同一会话中 get_survey 可能已把推导状态写入内存（视为已提交），与目标状态相同时不会产生 UPDATE，这里强制写回
+    flag_modified(survey, 'status')
 
     if status == 'active':
         survey.start_time = start_time or survey.start_time or now
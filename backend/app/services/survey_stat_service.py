@@ -0,0 +1,352 @@
+# backend/app/services/survey_stat_service.py
+"""
+问卷统计预聚合服务
+提交答卷时在同一事务内增量更新 survey_stat_rollups，分析接口只需读取 O(分组数) 行
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.answer import SurveyAnswer
+from app.models.answer_item import SurveyAnswerItem
+from app.models.survey_stat import SurveyStatRollup
+from app.services.answer_item_service import (
+    CHOICE_TYPES,
+    dimension_columns,
+    dimension_label,
+    submitted_question_ids,
+)
+from app.services.grading_service import build_scoring_plan
+
+DIMENSIONS = ("department", "position", "organization")
+KEY_TEXT_LENGTH = 255
+UNANSWERED_LABEL = "(未作答)"
+# 预聚合多行 upsert 每条语句的行数（每行 10 个绑定参数，远低于 SQLite 32766 的上限）
+ROLLUP_UPSERT_BATCH_SIZE = 500
+
+# (question_id, option_text, dimension, dimension_value, organization_id)
+RollupKey = Tuple[int, str, str, str, int]
+
+
+def key_text(value: Optional[str]) -> str:
+    """统一处理写入唯一键的文本列（截断到列长度）"""
+    return (value or "")[:KEY_TEXT_LENGTH]
+
+
+def _add(
+    deltas: Dict[RollupKey, List[float]],
+    key: RollupKey,
+    count: float = 0,
+    score: float = 0.0,
+    unanswered: float = 0,
+    submitted: float = 0
+) -> None:
+    delta = deltas[key]
+    delta[0] += count
+    delta[1] += score
+    delta[2] += unanswered
+    delta[3] += submitted
+
+
+def _new_deltas() -> Dict[RollupKey, List[float]]:
+    return defaultdict(lambda: [0, 0.0, 0, 0])
+
+
+def collect_answer_deltas(
+    db_answer: SurveyAnswer,
+    items: Iterable[SurveyAnswerItem],
+    plan: Dict[int, Dict[str, Any]]
+) -> Dict[RollupKey, List[float]]:
+    """计算一份答卷对预聚合表的增量（plan 为问卷评分计划，用于确定题目集合与题型）"""
+    items_by_question: Dict[int, List[SurveyAnswerItem]] = defaultdict(list)
+    for item in items:
+        items_by_question[item.question_id].append(item)
+
+    organization_id = db_answer.organization_id or 0
+    submitted = submitted_question_ids(db_answer.answers, plan)
+    deltas = _new_deltas()
+    for dimension in DIMENSIONS:
+        values = [getattr(db_answer, column.key) for column in dimension_columns(dimension)]
+        label = key_text(dimension_label(dimension, values))
+
+        _add(deltas, (0, "", dimension, label, organization_id), 1, float(db_answer.total_score or 0.0))
+        for qid, entry in plan.items():
+            q_items = items_by_question.get(qid)
+            is_submitted = 1 if qid in submitted else 0
+            if not q_items:
+                _add(deltas, (qid, "", dimension, label, organization_id), unanswered=1, submitted=is_submitted)
+                continue
+            _add(
+                deltas, (qid, "", dimension, label, organization_id),
+                1, sum(float(i.score or 0.0) for i in q_items), submitted=is_submitted
+            )
+            if entry["type"] in CHOICE_TYPES:
+                for item in q_items:
+                    _add(deltas, (qid, key_text(item.option_text), dimension, label, organization_id), 1, float(item.score or 0.0))
+    return deltas
+
+
+def _upsert_rollups(db: Session, survey_id: int, deltas: Dict[RollupKey, List[float]]) -> None:
+    """按唯一键累加增量；按键排序写入，降低并发提交时的死锁概率"""
+    if not deltas:
+        return
+    table = SurveyStatRollup.__table__
+    rows = [
+        {
+            "survey_id": survey_id,
+            "question_id": key[0],
+            "option_text": key[1],
+            "dimension": key[2],
+            "dimension_value": key[3],
+            "organization_id": key[4],
+            "count": int(delta[0]),
+            "score_sum": float(delta[1]),
+            "unanswered_count": int(delta[2]),
+            "submitted_count": int(delta[3]),
+        }
+        for key, delta in sorted(deltas.items())
+    ]
+    key_columns = ["survey_id", "question_id", "option_text", "dimension", "dimension_value", "organization_id"]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        def upsert(batch):
+            stmt = insert(table).values(batch)
+            return stmt.on_conflict_do_update(
+                index_elements=key_columns,
+                set_={
+                    "count": table.c["count"] + stmt.excluded["count"],
+                    "score_sum": table.c.score_sum + stmt.excluded.score_sum,
+                    "unanswered_count": table.c.unanswered_count + stmt.excluded.unanswered_count,
+                    "submitted_count": table.c.submitted_count + stmt.excluded.submitted_count,
+                }
+            )
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+
+        def upsert(batch):
+            stmt = insert(table).values(batch)
+            return stmt.on_duplicate_key_update(
+                count=table.c["count"] + stmt.inserted["count"],
+                score_sum=table.c.score_sum + stmt.inserted.score_sum,
+                unanswered_count=table.c.unanswered_count + stmt.inserted.unanswered_count,
+                submitted_count=table.c.submitted_count + stmt.inserted.submitted_count,
+            )
+    else:
+        # 其他数据库：逐行查询后更新
+        for row in rows:
+            existing = db.query(SurveyStatRollup).filter_by(**{k: row[k] for k in key_columns}).first()
+            if existing:
+                existing.count += row["count"]
+                existing.score_sum += row["score_sum"]
+                existing.unanswered_count += row["unanswered_count"]
+                existing.submitted_count += row["submitted_count"]
+            else:
+                db.add(SurveyStatRollup(**row))
+        return
+
+    # 分批执行，避免全量重建或批量导入时单条语句超出绑定参数上限
+    for start in range(0, len(rows), ROLLUP_UPSERT_BATCH_SIZE):
+        db.execute(upsert(rows[start:start + ROLLUP_UPSERT_BATCH_SIZE]))
+
+
+def apply_answer_to_rollups(
+    db: Session,
+    db_answer: SurveyAnswer,
+    items: Iterable[SurveyAnswerItem],
+    plan: Dict[int, Dict[str, Any]]
+) -> None:
+    """把一份新答卷计入预聚合表（调用方负责 commit，与答卷写入处于同一事务）"""
+    _upsert_rollups(db, db_answer.survey_id, collect_answer_deltas(db_answer, items, plan))
+
+
+def apply_answers_to_rollups(
+    db: Session,
+    survey_id: int,
+    answers_with_items: Iterable[Tuple[SurveyAnswer, Iterable[SurveyAnswerItem]]],
+    plan: Dict[int, Dict[str, Any]]
+) -> None:
+    """批量计入多份答卷：先在内存中合并增量，再一次性写入（调用方负责 commit）"""
+    merged = _new_deltas()
+    for db_answer, items in answers_with_items:
+        for key, delta in collect_answer_deltas(db_answer, items, plan).items():
+            _add(merged, key, *delta)
+    _upsert_rollups(db, survey_id, merged)
+
+
+def _add_submitted_counts(
+    db: Session,
+    survey_id: int,
+    question_ids: Iterable[int],
+    deltas: Dict[RollupKey, List[float]],
+    batch_size: int = 1000
+) -> None:
+    """
+    重建时统计每题的提交份数：空回答不产生答题明细，只能从答卷 JSON 中得到，分批读取解析
+    提交答卷时由 collect_answer_deltas 增量维护，读取接口不会走到这里
+    """
+    columns = {column.key: column for dimension in DIMENSIONS for column in dimension_columns(dimension)}
+    query = db.query(*columns.values(), SurveyAnswer.answers).filter(SurveyAnswer.survey_id == survey_id)
+    for row in query.yield_per(batch_size):
+        submitted = submitted_question_ids(row.answers, question_ids)
+        if not submitted:
+            continue
+        organization_id = row.organization_id or 0
+        for dimension in DIMENSIONS:
+            label = key_text(dimension_label(dimension, [getattr(row, column.key) for column in dimension_columns(dimension)]))
+            for qid in submitted:
+                _add(deltas, (qid, "", dimension, label, organization_id), submitted=1)
+
+
+def rebuild_survey_rollups(db: Session, survey_id: int) -> int:
+    """
+    基于答卷与答卷明细全量重建指定问卷的预聚合数据（不提交事务）
+    题目增删后未作答人数需要重算，也用于数据修复；返回写入行数
+    """
+    db.flush()
+    db.query(SurveyStatRollup).filter(SurveyStatRollup.survey_id == survey_id).delete(synchronize_session=False)
+    question_map = build_scoring_plan(db, survey_id)
+    choice_ids = [qid for qid, entry in question_map.items() if entry["type"] in CHOICE_TYPES]
+
+    deltas = _new_deltas()
+    for dimension in DIMENSIONS:
+        group_cols = dimension_columns(dimension)
+        width = len(group_cols)
+
+        totals: Dict[Tuple[str, int], int] = defaultdict(int)
+        total_rows = db.query(
+            *group_cols, SurveyAnswer.organization_id,
+            func.count(SurveyAnswer.id), func.coalesce(func.sum(SurveyAnswer.total_score), 0.0)
+        ).filter(SurveyAnswer.survey_id == survey_id).group_by(*group_cols, SurveyAnswer.organization_id).all()
+        for row in total_rows:
+            label, organization_id = key_text(dimension_label(dimension, row[:width])), row[width] or 0
+            _add(deltas, (0, "", dimension, label, organization_id), row[-2], float(row[-1] or 0.0))
+            totals[(label, organization_id)] += row[-2]
+
+        if not question_map:
+            continue
+
+        def item_query(*columns):
+            return (
+                db.query(*columns)
+                .join(SurveyAnswer, SurveyAnswer.id == SurveyAnswerItem.answer_id)
+                .filter(SurveyAnswerItem.survey_id == survey_id)
+            )
+
+        answered: Dict[Tuple[int, str, int], int] = defaultdict(int)
+        answered_rows = item_query(
+            SurveyAnswerItem.question_id, *group_cols, SurveyAnswer.organization_id,
+            func.count(func.distinct(SurveyAnswerItem.answer_id)), func.coalesce(func.sum(SurveyAnswerItem.score), 0.0)
+        ).filter(SurveyAnswerItem.question_id.in_(list(question_map.keys()))).group_by(
+            SurveyAnswerItem.question_id, *group_cols, SurveyAnswer.organization_id
+        ).all()
+        for row in answered_rows:
+            qid = row[0]
+            label, organization_id = key_text(dimension_label(dimension, row[1:1 + width])), row[1 + width] or 0
+            _add(deltas, (qid, "", dimension, label, organization_id), row[-2], float(row[-1] or 0.0))
+            answered[(qid, label, organization_id)] += row[-2]
+
+        for qid in question_map:
+            for (label, organization_id), total in totals.items():
+                unanswered = total - answered.get((qid, label, organization_id), 0)
+                if unanswered > 0:
+                    _add(deltas, (qid, "", dimension, label, organization_id), unanswered=unanswered)
+
+        if choice_ids:
+            option_rows = item_query(
+                SurveyAnswerItem.question_id, SurveyAnswerItem.option_text, *group_cols, SurveyAnswer.organization_id,
+                func.count(SurveyAnswerItem.id), func.coalesce(func.sum(SurveyAnswerItem.score), 0.0)
+            ).filter(SurveyAnswerItem.question_id.in_(choice_ids)).group_by(
+                SurveyAnswerItem.question_id, SurveyAnswerItem.option_text, *group_cols, SurveyAnswer.organization_id
+            ).all()
+            for row in option_rows:
+                label, organization_id = key_text(dimension_label(dimension, row[2:2 + width])), row[2 + width] or 0
+                _add(deltas, (row[0], key_text(row[1]), dimension, label, organization_id), row[-2], float(row[-1] or 0.0))
+
+    if question_map:
+        _add_submitted_counts(db, survey_id, question_map, deltas)
+    _upsert_rollups(db, survey_id, deltas)
+    return len(deltas)
+
+
+def rebuild_rollups(db: Session, survey_id: Optional[int] = None) -> int:
+    """重建预聚合数据并逐份问卷提交；survey_id 为空时重建全部问卷"""
+    if survey_id is not None:
+        survey_ids = [survey_id]
+    else:
+        survey_ids = [row[0] for row in db.query(SurveyAnswer.survey_id).distinct().all() if row[0] is not None]
+    written = 0
+    for sid in survey_ids:
+        written += rebuild_survey_rollups(db, sid)
+        db.commit()
+    return written
+
+
+# ===== 读取 =====
+
+def query_rollups(
+    db: Session,
+    survey_id: int,
+    dimension: str,
+    organization_ids: Optional[List[int]] = None
+):
+    """按问卷与维度读取预聚合行，可按组织过滤"""
+    query = db.query(SurveyStatRollup).filter(
+        SurveyStatRollup.survey_id == survey_id,
+        SurveyStatRollup.dimension == dimension
+    )
+    if organization_ids:
+        query = query.filter(SurveyStatRollup.organization_id.in_(organization_ids))
+    return query
+
+
+def survey_totals(
+    db: Session,
+    survey_id: int,
+    dimension: str,
+    organization_ids: Optional[List[int]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """问卷级汇总：分组 -> {count, score_sum}"""
+    rows = query_rollups(db, survey_id, dimension, organization_ids).filter(SurveyStatRollup.question_id == 0).all()
+    return totals_from_rollups(rows)
+
+
+def question_submissions(
+    db: Session,
+    survey_id: int,
+    dimension: str = "department",
+    dimension_value: Optional[str] = None,
+    organization_ids: Optional[List[int]] = None
+) -> Dict[int, int]:
+    """每题的提交份数（含空回答）：题目 -> submitted_count，可限定某个分组；任一维度跨分组累加都是全部答卷"""
+    query = db.query(SurveyStatRollup.question_id, func.sum(SurveyStatRollup.submitted_count)).filter(
+        SurveyStatRollup.survey_id == survey_id,
+        SurveyStatRollup.dimension == dimension,
+        SurveyStatRollup.question_id != 0,
+        SurveyStatRollup.option_text == ""
+    )
+    if dimension_value is not None:
+        query = query.filter(SurveyStatRollup.dimension_value == key_text(dimension_value))
+    if organization_ids:
+        query = query.filter(SurveyStatRollup.organization_id.in_(organization_ids))
+    return {qid: int(count or 0) for qid, count in query.group_by(SurveyStatRollup.question_id).all()}
+
+
+def totals_from_rollups(rows: Iterable[SurveyStatRollup]) -> Dict[str, Dict[str, Any]]:
+    """从已读取的预聚合行中汇总问卷级数据（只取 question_id=0 的行）：分组 -> {count, score_sum}"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        if row.question_id != 0:
+            continue
+        total = totals.setdefault(row.dimension_value, {"count": 0, "score_sum": 0.0})
+        total["count"] += row.count
+        total["score_sum"] += row.score_sum
+    return totals
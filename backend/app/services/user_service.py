@@ -1,6 +1,12 @@
 # backend/app/services/user_service.py
 
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
 from sqlalchemy.orm import Session
+from app import metrics
 from app.models.user import User
 from app.models.organization import Organization
 from app.models.organization_member import OrganizationMember
@@ -30,6 +36,77 @@ def get_user_by_username(db: Session, username: str) -> User | None:
     """
     return db.query(User).filter(User.username == username).first()
 
+# ===== 认证用户缓存 =====
+# 每个带令牌的请求都要按令牌 subject（用户名）解析当前用户，这里缓存轻量快照避免逐请求查库
+# 用户信息修改、改密、删除时在本进程内主动失效；多进程部署下由 TTL 兜底
+USER_CACHE_TTL_SECONDS = 60
+USER_CACHE_MAX_SIZE = 1024
+
+_user_cache_lock = threading.Lock()
+_user_cache: "OrderedDict[str, tuple]" = OrderedDict()  # username -> (快照, 缓存时间)
+
+
+class UserSnapshot:
+    """
+    当前用户的轻量快照，只包含鉴权和归属判断所需的字段
+    需要完整用户信息（邮箱、密码哈希等）时请按 id 重新查询
+    """
+    __slots__ = ("id", "username", "role", "organization_id")
+
+    def __init__(self, id: int, username: str, role: str, organization_id: Optional[int]):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.organization_id = organization_id
+
+    def __repr__(self):
+        return f"<UserSnapshot(id={self.id}, username='{self.username}', role='{self.role}')>"
+
+
+def get_user_snapshot(db: Session, username: str) -> Optional[UserSnapshot]:
+    """
+    根据用户名获取用户快照，命中缓存时不访问数据库
+    """
+    now = time.monotonic()
+    with _user_cache_lock:
+        cached = _user_cache.get(username)
+        if cached and now - cached[1] < USER_CACHE_TTL_SECONDS:
+            _user_cache.move_to_end(username)
+            metrics.record_cache_lookup("user_snapshot", True)
+            return cached[0]
+
+    metrics.record_cache_lookup("user_snapshot", False)
+    row = (
+        db.query(User.id, User.username, User.role, User.organization_id)
+        .filter(User.username == username)
+        .first()
+    )
+    if row is None:
+        # 不缓存不存在的用户，避免新注册用户在 TTL 内无法登录
+        return None
+
+    snapshot = UserSnapshot(row.id, row.username, row.role, row.organization_id)
+    with _user_cache_lock:
+        _user_cache[username] = (snapshot, now)
+        _user_cache.move_to_end(username)
+        while len(_user_cache) > USER_CACHE_MAX_SIZE:
+            _user_cache.popitem(last=False)
+    return snapshot
+
+
+def invalidate_user_snapshot(user_id: Optional[int] = None, username: Optional[str] = None) -> None:
+    """
+    使用户快照失效；按 id 失效时同时覆盖改名前的旧用户名，两者都为空时清空全部
+    """
+    with _user_cache_lock:
+        if user_id is None and username is None:
+            _user_cache.clear()
+            return
+        for key in [key for key, (snapshot, _) in _user_cache.items()
+                    if key == username or snapshot.id == user_id]:
+            del _user_cache[key]
+
+
 def get_user_by_email(db: Session, email: str) -> User | None:
     """
     根据邮箱获取用户
@@ -123,6 +200,7 @@ def update_user(db: Session, user_id: int, user_update) -> User:
             setattr(db_user, field, value)
     
     db.commit()
+    invalidate_user_snapshot(user_id=user_id)
     db.refresh(db_user)
     return db_user
 
@@ -139,6 +217,7 @@ def update_user_password(db: Session, user_id: int, new_password: str) -> User:
     db_user.hashed_password = hashed_password
     
     db.commit()
+    invalidate_user_snapshot(user_id=user_id)
     db.refresh(db_user)
     return db_user
 
@@ -149,6 +228,7 @@ def update_user_password_by_email(db: Session, email: str, new_password: str) ->
         return None
     db_user.hashed_password = get_password_hash(new_password)
     db.commit()
+    invalidate_user_snapshot(user_id=db_user.id)
     db.refresh(db_user)
     return db_user
 
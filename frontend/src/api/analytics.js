@@ -8,6 +8,7 @@
 
 import request from './request'
 import axios from 'axios'
+import { waitForJob } from './jobs'
 
 // 为LLM API创建专门的请求实例，使用更长的超时时间
 const llmRequest = axios.create({
@@ -74,7 +75,22 @@ export function getSurveyAnalytics(surveyId, dimension = 'department') {
  * @returns {Promise<Object>} AI分析总结
  */
 export function getSurveyAISummary(organizationId, surveyId) {
-  return llmRequest.get(`/organizations/${organizationId}/surveys/${surveyId}/analytics/ai-summary`)
+  return llmRequest.get(`/organizations/${organizationId}/surveys/${surveyId}/analytics/ai-summary`).then(data => waitForJob(data))
+}
+
+/**
+ * 批量获取调研各问题的AI洞察（调研数据只汇总一次，各问题并发生成）
+ * @param {number} organizationId - 组织ID
+ * @param {number} surveyId - 调研ID
+ * @param {Array<number>} [questionIds] - 只分析这些问题，默认全部
+ * @param {Function} [onProgress] - 进度回调，参数为任务状态
+ * @returns {Promise<Object>} { insights: 各问题洞察, failed: 生成失败的问题 }
+ */
+export function getSurveyQuestionsAIInsights(organizationId, surveyId, questionIds, onProgress) {
+  return llmRequest.get(`/organizations/${organizationId}/surveys/${surveyId}/analytics/ai-insights`, {
+    params: questionIds ? { question_ids: questionIds } : {},
+    paramsSerializer: { indexes: null }
+  }).then(data => waitForJob(data, onProgress))
 }
 
 /**
@@ -290,7 +306,7 @@ export function getPredictionAnalysis(organizationId, surveyId, params = {}) {
  * @returns {Promise<Object>} AI分析结果
  */
 export function generateEnterpriseComparisonAI(organizationId, surveyId, comparisonData) {
-  return llmRequest.post(`/organizations/${organizationId}/surveys/${surveyId}/analytics/enterprise-comparison-ai`, comparisonData)
+  return llmRequest.post(`/organizations/${organizationId}/surveys/${surveyId}/analytics/enterprise-comparison-ai`, comparisonData).then(data => waitForJob(data))
 }
 
 export function getLineScores(surveyId, params = {}) {
@@ -351,3 +367,17 @@ export function getPieOptionDistribution(surveyId, params = {}) {
 export function getOptionCharts(surveyId, params = {}) {
   return request.get(`/analysis/survey/${surveyId}/charts/options`, { params })
 }
+
+/**
+ * 分析页合并接口：一次返回维度统计、题目得分、选项分布、折线图与饼图数据
+ * @param {number} surveyId - 调研ID
+ * @param {Object} params - 参数
+ * @param {string} [params.dimension] - 统计维度 department / position / organization
+ * @param {string} [params.scope] - 折线图范围 survey / question / both
+ * @param {Array<number>} [params.question_ids] - 折线图题目ID
+ * @param {Array<string>} [params.pies] - 饼图请求，格式为 '题目ID:选项文本'
+ * @returns {Promise<Object>} { stats, question_scores, option_charts, line, pies }
+ */
+export function getAnalysisBundle(surveyId, params = {}) {
+  return request.get(`/analysis/survey/${surveyId}/bundle`, { params })
+}
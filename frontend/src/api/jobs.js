@@ -0,0 +1,59 @@
+/**
+ * @fileoverview 后台任务API模块
+ * @description AI 接口在后台任务中执行：等待时间内完成时直接返回结果，
+ * 否则返回 202 与任务地址（job_id、status_url 等），这里轮询任务直到结束后读取结果
+ */
+
+import request from './request'
+
+// 轮询任务状态的间隔（毫秒）
+const JOB_POLL_INTERVAL = 2000
+
+/**
+ * 查询任务状态
+ * @param {string} jobId - 任务ID
+ * @returns {Promise<Object>} 任务状态（status、progress、message、error 等）
+ */
+export function getJob(jobId) {
+  return request.get(`/jobs/${jobId}`)
+}
+
+/**
+ * 获取已完成任务的结果
+ * @param {string} jobId - 任务ID
+ * @returns {Promise<Object>} 任务结果
+ */
+export function getJobResult(jobId) {
+  return request.get(`/jobs/${jobId}/result`)
+}
+
+/**
+ * 取消排队中或执行中的任务
+ * @param {string} jobId - 任务ID
+ * @returns {Promise<Object>} 任务状态
+ */
+export function cancelJob(jobId) {
+  return request.post(`/jobs/${jobId}/cancel`)
+}
+
+/**
+ * 若响应是 202 任务信息，则轮询直到任务结束并返回结果；否则原样返回
+ * @param {Object} data - AI 接口的响应数据
+ * @param {Function} [onProgress] - 进度回调，参数为任务状态
+ * @returns {Promise<Object>} AI 接口的结果
+ */
+export async function waitForJob(data, onProgress) {
+  if (!data || !data.job_id || !data.result_url) {
+    return data
+  }
+  let job = data
+  while (job.status === 'pending' || job.status === 'running') {
+    if (onProgress) onProgress(job)
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL))
+    job = await getJob(data.job_id)
+  }
+  if (job.status !== 'succeeded') {
+    throw new Error(job.error || (job.status === 'cancelled' ? '任务已取消' : '任务执行失败'))
+  }
+  return getJobResult(data.job_id)
+}
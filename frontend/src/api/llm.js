@@ -8,6 +8,7 @@
 
 import request from './request'
 import axios from 'axios'
+import { waitForJob } from './jobs'
 
 // 为LLM API创建专门的请求实例，使用更长的超时时间
 const llmRequest = axios.create({
@@ -135,7 +136,59 @@ export function analyzeSurveyData(analysisData) {
  * @returns {Promise<Object>} 生成的报告
  */
 export function generateSurveyReport(reportData) {
-  return llmRequest.post('/llm/generate_survey_summary', reportData)
+  return llmRequest.post('/llm/generate_survey_summary', reportData).then(data => waitForJob(data))
+}
+
+/**
+ * 流式生成调研报告：模型输出逐段回调，结束后返回与 generateSurveyReport 相同的结果
+ * @param {Object} reportData - 报告参数，同 generateSurveyReport
+ * @param {Function} onToken - 每段新生成文本的回调
+ * @returns {Promise<Object>} 生成的报告
+ */
+export function streamSurveyReport(reportData, onToken) {
+  return streamLLM('/llm/generate_survey_summary/stream', reportData, onToken)
+}
+
+/**
+ * 以 Server-Sent Events 读取流式接口（token / result / error 事件）
+ * axios 在浏览器中无法逐段读取响应，这里使用 fetch
+ */
+async function streamLLM(url, body, onToken) {
+  const token = localStorage.getItem('access_token')
+  const response = await fetch(`/api/v1${url}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...(token ? { Authorization: 'Bearer ' + token } : {})
+    },
+    body: JSON.stringify(body)
+  })
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}))
+    throw new Error(error.detail || `请求失败 (${response.status})`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      const event = (block.match(/^event: (.*)$/m) || [])[1]
+      const data = (block.match(/^data: (.*)$/m) || [])[1]
+      if (!event || data === undefined) continue
+      const payload = JSON.parse(data)
+      if (event === 'token' && onToken) onToken(payload.text)
+      else if (event === 'result') return payload
+      else if (event === 'error') throw new Error(payload.detail)
+    }
+  }
+  throw new Error('流式响应意外结束')
 }
 
 /**
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+重建问卷统计数据
+用于数据修复：重新拆分答卷明细（answer_items）并重建预聚合统计（survey_stat_rollups）
+
+用法：
+    python scripts/rebuild_survey_stats.py                 # 重建全部问卷
+    python scripts/rebuild_survey_stats.py --survey-id 12  # 只重建指定问卷
+    python scripts/rebuild_survey_stats.py --rollups-only  # 答卷明细无误时只重建预聚合
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from app.database import SessionLocal
+from app.services.answer_item_service import rebuild_answer_items
+from app.services.survey_stat_service import rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建问卷统计数据")
+    parser.add_argument("--survey-id", type=int, default=None, help="只重建指定问卷")
+    parser.add_argument("--rollups-only", action="store_true", help="跳过答卷明细，只重建预聚合统计")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if not args.rollups_only:
+            items = rebuild_answer_items(db, survey_id=args.survey_id)
+            print(f"✅ 答卷明细已重建：{items} 行")
+        rollups = rebuild_rollups(db, survey_id=args.survey_id)
+        print(f"✅ 预聚合统计已重建：{rollups} 行")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
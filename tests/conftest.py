@@ -12,6 +12,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from unittest.mock import Mock, patch
 
+# 测试中请求的 SQL 超出预算或出现疑似 N+1 时直接失败
+os.environ.setdefault("SQL_BUDGET_ENFORCE", "true")
+
 # 添加backend路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+并发吞吐基准脚本
+在重量级分析请求持续进行时并发提交答卷，观察答卷提交是否被分析接口阻塞
+
+用法（在仓库根目录执行）：
+    python tests/performance/concurrency_benchmark.py [--answers 5000] [--analytics 8] [--submissions 40] [--db-latency-ms 2]
+
+脚本使用临时 SQLite 数据库与进程内 ASGI 客户端，不依赖运行中的服务；
+默认给每条 SQL 加 2ms 的模拟网络延迟，使本地 SQLite 更接近远程 PostgreSQL 的 I/O 特征。
+如果 async 接口在事件循环中直接执行同步数据库查询，提交请求会排在分析请求之后，
+延迟接近分析请求的总耗时；修复后两类请求在线程池中并行执行。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+os.environ["ENVIRONMENT"] = "production"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend"))
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app import models  # noqa: E402
+
+
+def seed(answer_count: int):
+    """创建用户、组织、问卷和大量答卷，返回 (token, organization_id, survey_id, question_ids)"""
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app)
+    client.post("/api/v1/users/register", json={"username": "bench", "email": "bench@example.com", "password": "bench123"})
+    token = client.post("/api/v1/users/login/access-token", data={"username": "bench", "password": "bench123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    org_id = client.post("/api/v1/organizations/", json={"name": "基准测试组织"}, headers=headers).json()["id"]
+    question_ids = []
+    for i in range(10):
+        question = client.post("/api/v1/questions/", json={
+            "text": f"基准题目{i}",
+            "type": "single_choice",
+            "options": [{"text": "A", "score": 1}, {"text": "B", "score": 3}, {"text": "C", "score": 5}],
+        }, headers=headers).json()
+        question_ids.append(question["id"])
+    survey_id = client.post("/api/v1/surveys/", json={
+        "title": "并发基准问卷", "organization_id": org_id, "question_ids": question_ids
+    }, headers=headers).json()["id"]
+
+    # 直接写库批量造数，避免逐条走接口
+    db = SessionLocal()
+    try:
+        departments = ["研发部", "市场部", "销售部", "人事部"]
+        for _ in range(answer_count):
+            db.add(models.SurveyAnswer(
+                survey_id=survey_id,
+                answers=json.dumps({str(qid): random.choice(["A", "B", "C"]) for qid in question_ids}),
+                total_score=0,
+                department=random.choice(departments),
+                organization_id=org_id,
+            ))
+        db.commit()
+    finally:
+        db.close()
+    return token, org_id, survey_id, question_ids
+
+
+def simulate_db_latency(latency_ms: float):
+    """每条 SQL 执行前等待固定时长，模拟远程数据库的网络往返（等待期间释放 GIL，与真实 I/O 一致）"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _delay(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(latency_ms / 1000)
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list):
+    """每 10ms 唤醒一次，记录实际唤醒延迟，反映事件循环被阻塞的程度"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - start - 0.01)
+
+
+async def run(args):
+    token, org_id, survey_id, question_ids = seed(args.answers)
+    if args.db_latency_ms > 0:
+        simulate_db_latency(args.db_latency_ms)
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        heavy_paths = [
+            f"/api/v1/organizations/{org_id}/analytics/trends",
+            f"/api/v1/organizations/{org_id}/analytics/tags/summary",
+            f"/api/v1/organizations/{org_id}/surveys/{survey_id}/analytics",
+        ]
+        heavy_latencies = []
+
+        async def heavy(i):
+            start = time.perf_counter()
+            response = await client.get(heavy_paths[i % len(heavy_paths)], headers=headers)
+            heavy_latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+        latencies = []
+
+        async def submit(scheduled_at=None):
+            # 从计划发送时刻开始计时：事件循环被阻塞时，任务本身也无法按时开始执行
+            if scheduled_at is not None:
+                await asyncio.sleep(max(0.0, scheduled_at - time.perf_counter()))
+            start = scheduled_at or time.perf_counter()
+            payload = {"answers": {str(qid): random.choice(["A", "B", "C"]) for qid in question_ids}}
+            response = await client.post(f"/api/v1/surveys/{survey_id}/answers/", json=payload)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 201, response.text
+
+        # 基线：无分析负载时的提交延迟
+        for _ in range(5):
+            await submit()
+        idle = statistics.median(latencies)
+        latencies.clear()
+
+        stop = asyncio.Event()
+        loop_lag = []
+        lag_task = asyncio.create_task(measure_loop_lag(stop, loop_lag))
+        start = time.perf_counter()
+        heavy_tasks = [asyncio.create_task(heavy(i)) for i in range(args.analytics)]
+        # 按固定间隔计划提交时刻，避免发送端被阻塞时低估延迟
+        submit_tasks = [
+            asyncio.create_task(submit(start + 0.01 + i * args.interval))
+            for i in range(args.submissions)
+        ]
+        await asyncio.gather(*submit_tasks)
+        submissions_done = time.perf_counter() - start
+        await asyncio.gather(*heavy_tasks)
+        total = time.perf_counter() - start
+        stop.set()
+        await lag_task
+
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"答卷数: {args.answers}  并发分析请求: {args.analytics}  并发提交: {args.submissions}  模拟SQL延迟: {args.db_latency_ms} ms")
+    print(f"分析请求平均耗时: {statistics.mean(heavy_latencies) * 1000:.1f} ms")
+    print(f"空闲时提交延迟(中位数): {idle * 1000:.1f} ms")
+    print(f"负载下提交延迟 p50: {statistics.median(latencies) * 1000:.1f} ms  p95: {p95 * 1000:.1f} ms  max: {latencies[-1] * 1000:.1f} ms")
+    print(f"全部提交完成耗时: {submissions_done:.2f} s  全部请求完成耗时: {total:.2f} s")
+    print(f"事件循环最大阻塞: {max(loop_lag, default=0) * 1000:.1f} ms")
+    print(f"提交吞吐: {args.submissions / submissions_done:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析接口与答卷提交的并发基准")
+    parser.add_argument("--answers", type=int, default=5000, help="预置答卷数")
+    parser.add_argument("--analytics", type=int, default=8, help="并发分析请求数")
+    parser.add_argument("--submissions", type=int, default=40, help="并发提交数")
+    parser.add_argument("--interval", type=float, default=0.02, help="提交间隔（秒）")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="每条SQL的模拟网络延迟（毫秒），0 表示不模拟")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+答卷批量导入服务单元测试
+"""
+import pytest
+
+from backend.app.services.answer_ingest_service import (
+    InvalidRow,
+    parse_batch_body,
+    validate_answer_values,
+)
+from backend.app.services.grading_service import QuestionType
+
+
+class TestParseBatchBody:
+    """请求体解析测试"""
+
+    def test_json_array(self):
+        rows = parse_batch_body(b'[{"answers": {"1": "A"}}]', "application/json")
+        assert rows == [{"answers": {"1": "A"}}]
+
+    def test_json_object_rejected(self):
+        with pytest.raises(ValueError):
+            parse_batch_body(b'{"answers": {"1": "A"}}', "application/json")
+
+    def test_ndjson_keeps_row_positions(self):
+        """NDJSON 跳过空行，坏行以 InvalidRow 占位"""
+        body = '{"answers": {"1": "A"}}\n\n{bad\n{"answers": {"1": "B"}}\n'.encode()
+        rows = parse_batch_body(body, "application/x-ndjson; charset=utf-8")
+        assert len(rows) == 3
+        assert isinstance(rows[1], InvalidRow)
+        assert rows[2] == {"answers": {"1": "B"}}
+
+
+class TestValidateAnswerValues:
+    """按问卷定义校验答案"""
+
+    def setup_method(self):
+        self.plan = {
+            1: {"type": QuestionType.SINGLE_CHOICE, "scores": {"A": 1.0, "B": 3.0}},
+            2: {"type": QuestionType.MULTI_CHOICE, "scores": {"X": 2.0, "Y": 5.0}},
+            3: {"type": QuestionType.TEXT_INPUT, "scores": {}},
+        }
+
+    def test_valid(self):
+        assert validate_answer_values({"1": "A", "2": ["X", "Y"], "3": "自由回答"}, self.plan) is None
+
+    def test_unanswered_allowed(self):
+        assert validate_answer_values({"1": "", "2": []}, self.plan) is None
+
+    def test_unknown_question(self):
+        assert "不属于该问卷" in validate_answer_values({"9": "A"}, self.plan)
+
+    def test_unknown_option(self):
+        assert "选项无效" in validate_answer_values({"1": "C"}, self.plan)
+        assert "选项无效" in validate_answer_values({"2": ["X", "Z"]}, self.plan)
+
+    def test_wrong_shape(self):
+        assert "必须是选项文本" in validate_answer_values({"1": ["A"]}, self.plan)
+        assert "必须是选项列表" in validate_answer_values({"2": "X"}, self.plan)
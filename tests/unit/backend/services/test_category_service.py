@@ -0,0 +1,95 @@
+"""
+分类树（一遍组装与子树题目数）单元测试
+"""
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from backend.app.services import category_service
+from backend.app.services.category_service import (
+    ancestor_ids,
+    build_category_tree,
+    invalidate_category_tree,
+    load_category_tree,
+)
+
+
+def _category(id, parent_id=None, path=None, sort_order=0):
+    return SimpleNamespace(
+        id=id, name=f"C{id}", description=None, level=len(ancestor_ids(path)) + 1,
+        path=path, parent_id=parent_id, sort_order=sort_order, is_active=True,
+    )
+
+
+# 1 ─┬─ 2 ── 4
+#    └─ 3
+# 5
+CATEGORIES = [
+    _category(5, sort_order=0),
+    _category(1, sort_order=1),
+    _category(3, 1, "1", sort_order=0),
+    _category(2, 1, "1", sort_order=1),
+    _category(4, 2, "1/2"),
+]
+
+
+class TestBuildCategoryTree:
+    """分类树组装测试"""
+
+    def test_structure_keeps_input_order(self):
+        """子节点顺序与输入（sort_order, id）一致"""
+        tree = build_category_tree(CATEGORIES, {})
+        assert [node["id"] for node in tree] == [5, 1]
+        assert [child["id"] for child in tree[1]["children"]] == [3, 2]
+        assert tree[1]["children"][1]["children"][0]["id"] == 4
+
+    def test_subtree_counts_roll_up_along_path(self):
+        """题目数沿物化路径累加到每个祖先"""
+        tree = build_category_tree(CATEGORIES, {1: 1, 3: 2, 4: 5})
+        root = tree[1]
+        assert (root["question_count"], root["subtree_question_count"]) == (1, 8)
+        assert {child["id"]: child["subtree_question_count"] for child in root["children"]} == {3: 2, 2: 5}
+        assert tree[0]["subtree_question_count"] == 0
+
+    def test_missing_parent_becomes_root(self):
+        """父分类不在结果集中时作为顶级节点"""
+        tree = build_category_tree([_category(7, 6, "6")], {7: 1})
+        assert [node["id"] for node in tree] == [7]
+        assert tree[0]["subtree_question_count"] == 1
+
+    def test_ancestor_ids_ignores_garbage(self):
+        assert ancestor_ids("1/ 2/x/3") == [1, 2, 3]
+        assert ancestor_ids(None) == []
+
+
+class TestCategoryTreeCache:
+    """分类树缓存测试"""
+
+    def setup_method(self):
+        invalidate_category_tree(all_organizations=True)
+
+    def _db(self):
+        db = Mock()
+        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = CATEGORIES
+        db.query.return_value.join.return_value.filter.return_value.group_by.return_value.all.return_value = [(4, 3)]
+        return db
+
+    def test_cache_hit_and_invalidate(self):
+        """命中缓存时不查询数据库；按组织失效后重新组装"""
+        db = self._db()
+        tree = load_category_tree(db, 9)
+        assert tree[1]["subtree_question_count"] == 3
+        assert load_category_tree(db, 9) is tree
+        assert db.query.call_count == 2
+        invalidate_category_tree(8)
+        load_category_tree(db, 9)
+        assert db.query.call_count == 2
+        invalidate_category_tree(9)
+        load_category_tree(db, 9)
+        assert db.query.call_count == 4
+
+    def test_ttl_expiry(self, monkeypatch):
+        db = self._db()
+        load_category_tree(db)
+        monkeypatch.setattr(category_service, "CATEGORY_TREE_TTL_SECONDS", 0)
+        load_category_tree(db)
+        assert db.query.call_count == 4
@@ -0,0 +1,90 @@
+"""
+部门层级（物化路径、一遍组装与子树移动）单元测试
+"""
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from backend.app.services.department_service import (
+    build_department_tree,
+    invalidate_department_tree,
+    load_department_tree,
+    move_department,
+    placement_under,
+)
+
+
+def _department(id, parent_id=None, path=None, level=1):
+    return SimpleNamespace(
+        id=id, name=f"D{id}", code=None, description=None, level=level, path=path,
+        parent_id=parent_id, organization_id=1, is_active=True, created_at=None, updated_at=None,
+    )
+
+
+# 1 ── 2 ── 3      4
+DEPARTMENTS = [
+    _department(1),
+    _department(2, 1, "1", 2),
+    _department(3, 2, "1/2", 3),
+    _department(4),
+]
+
+
+class TestBuildDepartmentTree:
+    """部门树组装测试"""
+
+    def test_structure(self):
+        tree = build_department_tree(DEPARTMENTS)
+        assert [node["id"] for node in tree] == [1, 4]
+        assert tree[0]["children"][0]["children"][0]["id"] == 3
+
+    def test_inactive_parent_hides_subtree(self):
+        """上级部门已停用（不在结果集中）时，其下级不作为顶级部门返回"""
+        tree = build_department_tree([DEPARTMENTS[0], DEPARTMENTS[2], DEPARTMENTS[3]])
+        assert [(node["id"], node["children"]) for node in tree] == [(1, []), (4, [])]
+
+
+class TestMoveDepartment:
+    """部门移动测试"""
+
+    def test_placement_under_parent(self):
+        assert placement_under(None) == (1, None)
+        assert placement_under(DEPARTMENTS[1]) == (3, "1/2")
+
+    def test_move_updates_self_and_descendants(self):
+        """移动后自身层级、路径更新，后代用一条 UPDATE 同步"""
+        db = Mock()
+        department = _department(2, 1, "1", 2)
+        move_department(db, department, _department(4))
+        assert (department.parent_id, department.level, department.path) == (4, 2, "4")
+        assert db.query.return_value.filter.return_value.update.call_count == 1
+
+    def test_move_to_root_without_change_skips_update(self):
+        db = Mock()
+        move_department(db, _department(4), None)
+        db.query.assert_not_called()
+
+    @pytest.mark.parametrize("target", [_department(2, 1, "1", 2), _department(3, 2, "1/2", 3)])
+    def test_move_into_own_subtree_rejected(self, target):
+        with pytest.raises(ValueError):
+            move_department(Mock(), _department(2, 1, "1", 2), target)
+
+
+class TestDepartmentTreeCache:
+    """部门树缓存测试"""
+
+    def setup_method(self):
+        invalidate_department_tree()
+
+    def test_cache_per_organization(self):
+        db = Mock()
+        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = DEPARTMENTS
+        tree = load_department_tree(db, 1)
+        assert load_department_tree(db, 1) is tree
+        load_department_tree(db, 2)
+        assert db.query.call_count == 2
+        invalidate_department_tree(1)
+        load_department_tree(db, 1)
+        load_department_tree(db, 2)
+        assert db.query.call_count == 3
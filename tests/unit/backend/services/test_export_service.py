@@ -0,0 +1,62 @@
+"""
+答卷导出服务单元测试
+"""
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from backend.app.services.export_service import (
+    format_cell,
+    normalize_format,
+    stream_csv,
+    stream_xlsx,
+)
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _read_sheet(content: bytes):
+    archive = zipfile.ZipFile(io.BytesIO(content))
+    assert archive.testzip() is None
+    root = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    return [
+        {cell.get("r"): "".join(cell.itertext()) for cell in row}
+        for row in root.iter(f"{SHEET_NS}row")
+    ]
+
+
+class TestExportService:
+    """导出格式测试"""
+
+    def test_normalize_format(self):
+        """兼容 excel 别名，不支持的格式返回 None"""
+        assert normalize_format("CSV") == "csv"
+        assert normalize_format("excel") == "xlsx"
+        assert normalize_format("pdf") is None
+
+    def test_format_cell(self):
+        """多选拼接，结构化答案序列化为 JSON"""
+        assert format_cell(None) == ""
+        assert format_cell(["A", "B"]) == "A, B"
+        assert format_cell({"k": "值"}) == '{"k": "值"}'
+        assert format_cell(3) == 3
+
+    def test_stream_csv(self):
+        """CSV 带 BOM，含逗号的单元格正确转义"""
+        content = b"".join(stream_csv(["ID", "答案"], iter([[1, "A, B"], [2, ""]])))
+        assert content.startswith("\ufeff".encode("utf-8"))
+        rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+        assert rows == [["ID", "答案"], ["1", "A, B"], ["2", ""]]
+
+    def test_stream_xlsx(self):
+        """XLSX 为合法 zip，数字写为数值单元格，空值跳过，特殊字符转义"""
+        content = b"".join(stream_xlsx(["ID", "答案"], iter([[1, "<a&b>"], [2, ""]])))
+        rows = _read_sheet(content)
+        assert rows == [{"A1": "ID", "B1": "答案"}, {"A2": "1", "B2": "<a&b>"}, {"A3": "2"}]
+
+    def test_stream_xlsx_many_columns(self):
+        """超过 26 列时列名进位为 AA"""
+        header = [f"c{i}" for i in range(28)]
+        rows = _read_sheet(b"".join(stream_xlsx(header, iter([]))))
+        assert rows[0]["AA1"] == "c26" and rows[0]["AB1"] == "c27"
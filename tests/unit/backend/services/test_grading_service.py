@@ -0,0 +1,61 @@
+"""
+评分服务单元测试
+"""
+import json
+from types import SimpleNamespace
+
+from backend.app.services.grading_service import (
+    QuestionType,
+    calculate_answer_score,
+    compile_question_scoring,
+    score_with_plan,
+)
+
+
+def _question(question_type, options):
+    return SimpleNamespace(type=question_type, options=json.dumps(options, ensure_ascii=False))
+
+
+class TestScoringPlan:
+    """评分计划测试"""
+
+    def test_compile_scores(self):
+        """选项编译为分值表，正确答案未设分值时默认1分"""
+        question = _question(QuestionType.SINGLE_CHOICE, [
+            {"text": "A", "score": 5},
+            {"text": "B", "score": 0, "is_correct": True},
+            "C",
+        ])
+        entry = compile_question_scoring(question)
+        assert entry["scores"] == {"A": 5.0, "B": 1.0, "C": 0.0}
+
+    def test_duplicate_option_uses_first(self):
+        """同名选项以第一个为准"""
+        question = _question(QuestionType.SINGLE_CHOICE, [{"text": "A", "score": 2}, {"text": "A", "score": 7}])
+        assert calculate_answer_score(question, "A") == 2.0
+
+    def test_single_choice_requires_text(self):
+        """单选题答案必须是选项文本"""
+        entry = compile_question_scoring(_question(QuestionType.SINGLE_CHOICE, [{"text": "A", "score": 3}]))
+        assert score_with_plan(entry, "A") == 3.0
+        assert score_with_plan(entry, ["A"]) == 0.0
+        assert score_with_plan(entry, "不存在") == 0.0
+
+    def test_multi_choice_sums_selected(self):
+        """多选题累加选中项分值，忽略无法匹配的值"""
+        entry = compile_question_scoring(_question(QuestionType.MULTI_CHOICE, [
+            {"text": "X", "score": 2},
+            {"text": "Y", "score": 5},
+        ]))
+        assert score_with_plan(entry, ["X", "Y"]) == 7.0
+        assert score_with_plan(entry, ["X", {"text": "Y"}]) == 2.0
+        assert score_with_plan(entry, "X") == 0.0
+
+    def test_text_input_not_scored(self):
+        """填空题不计分"""
+        entry = compile_question_scoring(_question(QuestionType.TEXT_INPUT, []))
+        assert score_with_plan(entry, "任意回答") == 0.0
+
+    def test_missing_entry(self):
+        """不在计划中的题目得0分"""
+        assert score_with_plan(None, "A") == 0.0
@@ -0,0 +1,152 @@
+"""
+后台 AI 任务服务单元测试：状态流转、取消、并发上限与 SSE 进度
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import db_instrumentation
+from app.models.ai_job import AiJob
+from app.services import job_service
+
+
+@pytest.fixture(autouse=True)
+def jobs_db(tmp_path, monkeypatch):
+    # 任务状态在多个线程中并发读写，使用文件库让每个线程拿到独立连接（共享单个内存库连接时并发提交会出错）
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    AiJob.__table__.create(engine)
+    monkeypatch.setattr(job_service, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(job_service, "JOB_POLL_SECONDS", 0.05)
+    yield engine
+    engine.dispose()
+
+
+@job_service.job_handler("test_echo")
+async def _echo(params, job):
+    await job.progress(50, "half")
+    return {"echo": params["value"]}
+
+
+@job_service.job_handler("test_fail")
+async def _fail(params, job):
+    raise RuntimeError("boom")
+
+
+@job_service.job_handler("test_block")
+async def _block(params, job):
+    await asyncio.sleep(params.get("seconds", 10))
+    return {"done": True}
+
+
+@job_service.job_handler("test_query")
+async def _query(params, job):
+    await asyncio.to_thread(job_service.get_job, job.job_id)
+    return {"has_request_stats": db_instrumentation.current_query_stats() is not None}
+
+
+class TestJobLifecycle:
+    """任务状态流转测试"""
+
+    def test_success(self):
+        async def scenario():
+            job = await job_service.submit_job("test_echo", {"value": 7}, organization_id=3)
+            assert job["status"] == job_service.JOB_PENDING
+            return await job_service.wait_for_job(job["id"], 5)
+
+        job = asyncio.run(scenario())
+        assert (job["status"], job["progress"], job["organization_id"]) == (job_service.JOB_SUCCEEDED, 100, 3)
+        snapshot, result = job_service.get_job_result(job["id"])
+        assert result == {"echo": 7}
+
+    def test_failure_records_error(self):
+        async def scenario():
+            job = await job_service.submit_job("test_fail", {})
+            return await job_service.wait_for_job(job["id"], 5)
+
+        job = asyncio.run(scenario())
+        assert job["status"] == job_service.JOB_FAILED
+        assert job["error"] == "boom"
+        assert job_service.get_job_result(job["id"])[1] is None
+
+    def test_job_queries_not_counted_against_submitting_request(self):
+        async def scenario():
+            stats = db_instrumentation.RequestQueryStats()
+            token = db_instrumentation._current_stats.set(stats)
+            try:
+                job = await job_service.submit_job("test_query", {})
+                submitted = stats.count
+            finally:
+                db_instrumentation._current_stats.reset(token)
+            await job_service.wait_for_job(job["id"], 5)
+            return job["id"], submitted, stats.count
+
+        job_id, submitted, final = asyncio.run(scenario())
+        assert final == submitted
+        assert job_service.get_job_result(job_id)[1] == {"has_request_stats": False}
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            asyncio.run(job_service.submit_job("nope", {}))
+
+    def test_stale_job_marked_failed(self, jobs_db, monkeypatch):
+        snapshot = job_service._create_job("test_echo", {}, None)
+        monkeypatch.setattr(job_service, "_utcnow", lambda: snapshot["updated_at"] + timedelta(days=1))
+        assert job_service.get_job(snapshot["id"])["status"] == job_service.JOB_FAILED
+
+
+class TestCancellation:
+    """取消与并发上限测试"""
+
+    def test_cancel_running_job(self):
+        async def scenario():
+            job = await job_service.submit_job("test_block", {})
+            await asyncio.sleep(0.1)
+            assert (await asyncio.to_thread(job_service.get_job, job["id"]))["status"] == job_service.JOB_RUNNING
+            cancelled = await job_service.cancel_job(job["id"])
+            await asyncio.sleep(0.05)
+            return cancelled, await asyncio.to_thread(job_service.get_job, job["id"])
+
+        cancelled, job = asyncio.run(scenario())
+        assert cancelled["status"] == job["status"] == job_service.JOB_CANCELLED
+
+    def test_concurrency_bound_and_cancel_queued(self, monkeypatch):
+        monkeypatch.setattr(job_service.settings, "AI_JOB_MAX_CONCURRENCY", 1)
+
+        async def scenario():
+            first = await job_service.submit_job("test_block", {"seconds": 0.3})
+            second = await job_service.submit_job("test_echo", {"value": 1})
+            third = await job_service.submit_job("test_echo", {"value": 2})
+            await asyncio.sleep(0.1)
+            queued = await asyncio.to_thread(job_service.get_job, second["id"])
+            await job_service.cancel_job(third["id"])
+            finished = [await job_service.wait_for_job(job["id"], 5) for job in (first, second, third)]
+            return queued, finished
+
+        queued, (first, second, third) = asyncio.run(scenario())
+        assert queued["status"] == job_service.JOB_PENDING
+        assert (first["status"], second["status"], third["status"]) == (
+            job_service.JOB_SUCCEEDED, job_service.JOB_SUCCEEDED, job_service.JOB_CANCELLED
+        )
+
+
+class TestEvents:
+    """SSE 进度推送测试"""
+
+    def test_stream_until_done(self):
+        async def scenario():
+            job = await job_service.submit_job("test_echo", {"value": 1})
+            return [chunk async for chunk in job_service.stream_job_events(job["id"])]
+
+        chunks = asyncio.run(scenario())
+        assert chunks[-1].startswith("event: done")
+        assert all(chunk.endswith("\n\n") for chunk in chunks)
+        assert '"status": "succeeded"' in chunks[-1]
+
+    def test_stream_missing_job(self):
+        async def scenario():
+            return [chunk async for chunk in job_service.stream_job_events("missing")]
+
+        assert asyncio.run(scenario())[0].startswith("event: error")
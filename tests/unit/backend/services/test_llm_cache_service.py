@@ -0,0 +1,93 @@
+"""
+LLM 结果缓存（内容哈希、TTL、容量淘汰与命中统计）单元测试
+"""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models.llm_cache import LlmCacheEntry
+from backend.app.services import llm_cache_service
+from backend.app.services.llm_cache_service import evict, get_cache_stats, get_cached, make_cache_key, store
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    LlmCacheEntry.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    llm_cache_service.reset_stats()
+    yield session
+    session.close()
+
+
+class TestCacheKey:
+    """缓存键测试"""
+
+    def test_key_depends_on_every_part(self):
+        key = make_cache_key("model", "system", "prompt")
+        assert key == make_cache_key("model", "system", "prompt")
+        assert key != make_cache_key("model", "system2", "prompt")
+        assert key != make_cache_key("model2", "system", "prompt")
+        assert len(key) == 64
+
+
+class TestCacheStore:
+    """读写、过期与淘汰测试"""
+
+    def test_miss_then_hit(self, db):
+        assert get_cached("k", db=db) is None
+        store("k", "内容", "m", db=db)
+        assert get_cached("k", db=db) == "内容"
+        stats = get_cache_stats(db=db)
+        assert (stats["hits"], stats["misses"], stats["stores"], stats["entries"]) == (1, 1, 1, 1)
+
+    def test_hit_bookkeeping_is_throttled(self, db, monkeypatch):
+        """间隔内的命中不写库，次数累计到下一次刷新最近命中时间时写入"""
+        store("k", "内容", db=db)
+        stored_at = db.get(LlmCacheEntry, "k").last_hit_at
+        writes = []
+        event.listen(db.get_bind(), "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: writes.append(statement) if statement.startswith("UPDATE") else None)
+        for _ in range(3):
+            assert get_cached("k", db=db) == "内容"
+        assert writes == []
+
+        later = stored_at + timedelta(seconds=llm_cache_service.HIT_TOUCH_INTERVAL_SECONDS)
+        monkeypatch.setattr(llm_cache_service, "_utcnow", lambda: later)
+        assert get_cached("k", db=db) == "内容"
+        entry = db.get(LlmCacheEntry, "k")
+        assert (len(writes), entry.hit_count, entry.last_hit_at) == (1, 4, later)
+
+    def test_expired_entry_is_a_miss(self, db):
+        store("k", "内容", ttl_seconds=0, db=db)
+        assert get_cached("k", db=db) is None
+
+    def test_overwrite(self, db):
+        store("k", "旧", db=db)
+        store("k", "新", db=db)
+        assert get_cached("k", db=db) == "新"
+
+    def test_evicts_least_recently_hit(self, db, monkeypatch):
+        """超出容量时淘汰最久未命中的条目"""
+        monkeypatch.setattr(llm_cache_service.settings, "LLM_CACHE_MAX_ENTRIES", 2)
+        store("a", "A", db=db)
+        store("b", "B", db=db)
+        entry = db.get(LlmCacheEntry, "a")
+        entry.last_hit_at = entry.last_hit_at + timedelta(hours=1)
+        db.commit()
+        deletes = []
+        event.listen(db.get_bind(), "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: deletes.append(statement) if statement.startswith("DELETE") else None)
+        store("c", "C", db=db)
+        assert {key for (key,) in db.query(LlmCacheEntry.cache_key)} == {"a", "c"}
+        # 按键列表删除，不使用读取同一张表的子查询（MySQL 不支持）
+        assert not [statement for statement in deletes if "SELECT" in statement.upper()]
+        assert get_cache_stats(db=db)["evictions"] == 1
+
+    def test_evict_removes_expired(self, db):
+        store("k", "内容", ttl_seconds=60, db=db)
+        later = db.get(LlmCacheEntry, "k").expires_at + timedelta(seconds=1)
+        assert evict(db, now=later) == 1
+        assert db.query(LlmCacheEntry).count() == 0
@@ -0,0 +1,293 @@
+"""
+LLM 上游访问治理单元测试：连接复用、请求合并、并发上限、熔断与流式输出
+在本地线程中启动一个模拟 OpenRouter 的 HTTP 服务
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import llm_gateway, llm_service
+from app.services.llm_gateway import CircuitBreaker
+
+
+class MockOpenRouter:
+    """模拟 OpenRouter：记录请求数、连接数与最大并发"""
+
+    def __init__(self, delay: float = 0.0, status: int = 200, chunks=("你好", "，", "世界")):
+        self.delay = delay
+        self.status = status
+        self.chunks = chunks
+        self.requests = 0
+        self.connections = set()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with mock._lock:
+                    mock.requests += 1
+                    mock.connections.add(self.client_address)
+                    mock.active += 1
+                    mock.max_active = max(mock.max_active, mock.active)
+                if body.get("stream") and mock.status == 200:
+                    self.stream_chunks()
+                    with mock._lock:
+                        mock.active -= 1
+                    return
+                time.sleep(mock.delay)
+                with mock._lock:
+                    mock.active -= 1
+                if mock.status == 200:
+                    prompt = body["messages"][-1]["content"]
+                    payload = {"choices": [{"message": {"content": f"echo:{prompt}"}}]}
+                else:
+                    payload = {"error": {"message": "upstream down"}}
+                raw = json.dumps(payload).encode()
+                self.send_response(mock.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def stream_chunks(self):
+                """逐段发送 SSE，每段之间间隔 delay 秒，发送完毕后关闭连接"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+                for text in mock.chunks:
+                    time.sleep(mock.delay)
+                    chunk = {"choices": [{"delta": {"content": text}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    mock = MockOpenRouter()
+    settings = llm_gateway.settings
+    monkeypatch.setattr(settings, "OPENROUTER_API_URL", mock.url)
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_gateway, "breaker", CircuitBreaker(2, 60))
+    llm_gateway.reset_stats()
+    yield mock
+    mock.close()
+
+
+def run(coro):
+    """在新事件循环中执行，并在结束前关闭共享客户端"""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await llm_gateway.close_http_client()
+    return asyncio.run(main())
+
+
+class TestSharedClient:
+    """连接池测试"""
+
+    def test_sequential_calls_reuse_connection(self, upstream):
+        async def calls():
+            return [await llm_service._call_openrouter(f"p{i}", use_cache=False) for i in range(3)]
+
+        assert run(calls()) == ["echo:p0", "echo:p1", "echo:p2"]
+        assert upstream.requests == 3
+        assert len(upstream.connections) == 1
+
+
+class TestCoalescing:
+    """请求合并测试"""
+
+    def test_identical_prompts_share_one_upstream_call(self, upstream):
+        upstream.delay = 0.2
+
+        async def calls():
+            return await asyncio.gather(*(llm_service._call_openrouter("same") for _ in range(5)))
+
+        assert run(calls()) == ["echo:same"] * 5
+        assert upstream.requests == 1
+        assert llm_gateway.get_gateway_stats()["coalesced"] == 4
+
+    def test_cancelled_leader_does_not_cancel_waiters(self, upstream):
+        upstream.delay = 0.3
+
+        async def calls():
+            leader = asyncio.ensure_future(llm_service._call_openrouter("same"))
+            await asyncio.sleep(0.05)
+            waiters = [asyncio.ensure_future(llm_service._call_openrouter("same")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            leader.cancel()
+            return await asyncio.gather(*waiters)
+
+        assert run(calls()) == ["echo:same"] * 2
+        assert upstream.requests == 1
+
+    def test_fresh_calls_are_not_coalesced(self, upstream):
+        async def calls():
+            return await asyncio.gather(*(llm_service._call_openrouter("same", use_cache=False) for _ in range(3)))
+
+        run(calls())
+        assert upstream.requests == 3
+
+
+class TestConcurrencyLimit:
+    """并发上限测试"""
+
+    def test_per_organization_limit(self, upstream, monkeypatch):
+        monkeypatch.setattr(llm_gateway.settings, "LLM_MAX_CONCURRENCY_PER_ORG", 2)
+        upstream.delay = 0.1
+
+        async def call(i):
+            llm_gateway.set_organization(1)
+            return await llm_service._call_openrouter(f"p{i}", use_cache=False)
+
+        async def calls():
+            return await asyncio.gather(*(call(i) for i in range(6)))
+
+        run(calls())
+        assert upstream.requests == 6
+        assert upstream.max_active == 2
+
+
+class TestCircuitBreaker:
+    """熔断测试"""
+
+    def test_opens_after_consecutive_failures(self, upstream):
+        upstream.status = 500
+
+        async def calls():
+            results = []
+            for _ in range(2):
+                with pytest.raises(RuntimeError):
+                    await llm_service._call_openrouter("p", use_cache=False)
+            results.append(await llm_service._call_openrouter("p", use_cache=False))
+            results.append(llm_service.last_completion_ok())
+            return results
+
+        text, ok = run(calls())
+        assert upstream.requests == 2
+        assert ok is False
+        assert "暂时不可用" in text
+        assert llm_gateway.get_gateway_stats()["circuit"]["state"] == CircuitBreaker.OPEN
+
+    def test_half_open_allows_single_probe(self):
+        now = [0.0]
+        breaker = CircuitBreaker(1, 10, clock=lambda: now[0])
+        breaker.record_failure()
+        assert not breaker.allow()
+        now[0] = 10
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        now[0] = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
+
+
+    def test_cancelled_probe_is_released(self, upstream, monkeypatch):
+        upstream.delay = 0.5
+        breaker = CircuitBreaker(1, 0)
+        breaker.record_failure()
+        monkeypatch.setattr(llm_gateway, "breaker", breaker)
+
+        async def cancel_probe():
+            probe = asyncio.ensure_future(llm_service._call_openrouter("p", use_cache=False))
+            await asyncio.sleep(0.1)
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+
+        run(cancel_probe())
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+
+
+class TestStreaming:
+    """流式输出测试"""
+
+    def test_tokens_arrive_before_completion(self, upstream):
+        upstream.delay = 0.2
+
+        async def consume():
+            started = time.monotonic()
+            arrivals = []
+            async for delta in llm_service.stream_openrouter("p", use_cache=False):
+                arrivals.append((delta, time.monotonic() - started))
+            return arrivals, llm_service.last_completion_ok()
+
+        arrivals, ok = run(consume())
+        assert [delta for delta, _ in arrivals] == ["你好", "，", "世界"]
+        assert arrivals[0][1] < arrivals[-1][1] - 0.3
+        assert ok is True
+
+    def test_falls_back_without_api_key(self, upstream, monkeypatch):
+        monkeypatch.setattr(llm_gateway.settings, "OPENROUTER_API_KEY", "")
+
+        async def consume():
+            return [delta async for delta in llm_service.stream_openrouter("p", use_cache=False)], llm_service.last_completion_ok()
+
+        deltas, ok = run(consume())
+        assert len(deltas) == 1 and "API密钥未配置" in deltas[0]
+        assert ok is False
+        assert upstream.requests == 0
+
+    def test_stream_generation_yields_tokens_then_result(self, upstream):
+        question = {"question_id": 1, "question_text": "满意度", "question_type": "single_choice",
+                    "total_responses": 2, "response_distribution": {"A": 1, "B": 1}}
+
+        async def consume():
+            return [event async for event in llm_service.stream_generation(
+                lambda complete: llm_service.generate_question_insights(question, completion=complete)
+            )]
+
+        events = run(consume())
+        assert [kind for kind, _ in events] == ["token", "token", "token", "result"]
+        assert events[-1][1]["insights"] == "你好，世界"
+
+    def test_stream_respects_and_updates_breaker(self, upstream, monkeypatch):
+        breaker = CircuitBreaker(1, 0)
+        breaker.record_failure()
+        monkeypatch.setattr(llm_gateway, "breaker", breaker)
+
+        async def consume():
+            return [delta async for delta in llm_service.stream_openrouter("p", use_cache=False)]
+
+        # 半开状态下已有试探请求时不发起流式请求
+        assert breaker.allow()
+        deltas = run(consume())
+        assert len(deltas) == 1 and "暂时不可用" in deltas[0]
+        assert upstream.requests == 0
+
+        # 流式请求作为试探请求，成功后关闭熔断
+        breaker.release()
+        assert run(consume()) == ["你好", "，", "世界"]
+        assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,93 @@
+"""
+开放题回答分批总结（map-reduce）单元测试：本地去重、按预算分批、并发上限与失败兜底
+"""
+import asyncio
+
+import pytest
+
+from app.services import llm_service
+
+
+class FakeCompletion:
+    """替代 _call_openrouter：记录提示词与最大并发，提示词包含 fail_marker 时返回兜底文本"""
+
+    def __init__(self, delay: float = 0.0, fail_marker: str = None):
+        self.delay = delay
+        self.fail_marker = fail_marker
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, prompt, model=llm_service.DEFAULT_MODEL, system_message=None, use_cache=True):
+        self.prompts.append(prompt)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        failed = self.fail_marker is not None and self.fail_marker in prompt
+        llm_service._last_completion_ok.set(not failed)
+        return "服务暂时不可用" if failed else f"要点{len(self.prompts)}"
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    completion = FakeCompletion()
+    monkeypatch.setattr(llm_service, "_call_openrouter", completion)
+    monkeypatch.setattr(llm_service.settings, "LLM_SUMMARY_CHUNK_TOKENS", 50)
+    monkeypatch.setattr(llm_service.settings, "LLM_SUMMARY_MAP_CONCURRENCY", 3)
+    return completion
+
+
+class TestDeduplicate:
+    """本地去重测试"""
+
+    def test_merges_near_identical_answers(self):
+        answers = ["食堂太贵", "食堂太贵！", " 食堂 太贵 ", "Good", "good.", "", "   ", "加班多"]
+        assert llm_service.deduplicate_answers(answers) == [("食堂太贵", 3), ("Good", 2), ("加班多", 1)]
+
+    def test_fullwidth_normalized(self):
+        assert llm_service.deduplicate_answers(["ＡＢＣ", "abc"]) == [("ＡＢＣ", 2)]
+
+
+class TestSummarizeAnswers:
+    """分批总结测试"""
+
+    def test_small_set_uses_single_call(self, fake):
+        summary = asyncio.run(llm_service.summarize_answers("建议", ["多发奖金", "多发奖金。", "少开会"]))
+        assert summary == "要点1"
+        assert len(fake.prompts) == 1
+        assert "- 多发奖金（2 人）" in fake.prompts[0]
+        assert "- 少开会" in fake.prompts[0]
+
+    def test_large_set_maps_concurrently_then_reduces(self, fake):
+        fake.delay = 0.05
+        answers = [f"第{i}条意见：希望改善办公环境和通勤补贴" for i in range(40)]
+        progress = []
+
+        async def on_progress(done, total):
+            progress.append((done, total))
+
+        summary = asyncio.run(llm_service.summarize_answers("建议", answers, on_progress=on_progress))
+        map_prompts = [p for p in fake.prompts if "批用户回答" in p]
+        assert len(map_prompts) > 3
+        assert fake.max_active == 3
+        assert progress[-1] == (len(map_prompts), len(map_prompts))
+        assert "共 40 条回答（去重后 40 条）" in fake.prompts[-1]
+        assert summary == f"要点{len(fake.prompts)}"
+
+    def test_failed_chunk_returns_fallback(self, fake):
+        fake.fail_marker = "第 2/"
+        answers = [f"第{i}条意见：希望改善办公环境和通勤补贴" for i in range(40)]
+
+        async def scenario():
+            summary = await llm_service.summarize_answers("建议", answers)
+            return summary, llm_service.last_completion_ok()
+
+        summary, ok = asyncio.run(scenario())
+        assert summary == "服务暂时不可用"
+        assert ok is False
+        assert not any("分批整理出以下要点" in p for p in fake.prompts)
+
+    def test_empty_answers(self, fake):
+        assert asyncio.run(llm_service.summarize_answers("建议", ["", "  "])) == "所有回答均为空。"
+        assert fake.prompts == []
@@ -0,0 +1,68 @@
+"""
+题库分页（游标与总数缓存）单元测试
+"""
+from unittest.mock import Mock
+
+import pytest
+
+from backend.app.services import question_service
+from backend.app.services.question_service import (
+    build_question_filters,
+    count_questions,
+    decode_cursor,
+    encode_cursor,
+    invalidate_question_counts,
+)
+
+
+def _db(total):
+    db = Mock()
+    db.query.return_value.filter.return_value.scalar.return_value = total
+    return db
+
+
+class TestQuestionCursor:
+    """分页游标测试"""
+
+    def test_round_trip(self):
+        """游标可还原排序值和题目ID"""
+        assert decode_cursor(encode_cursor(7, 1024)) == (7, 1024)
+
+    @pytest.mark.parametrize("cursor", ["garbage", encode_cursor("x", 1), "W10"])
+    def test_invalid_cursor(self, cursor):
+        """格式错误的游标抛出 ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestQuestionCountCache:
+    """题库总数缓存测试"""
+
+    def setup_method(self):
+        invalidate_question_counts()
+
+    def test_cache_key_ignores_tag_order(self):
+        """标签顺序不同的筛选条件共用同一缓存键"""
+        _, key1 = build_question_filters(tag_filter=["a", "b"])
+        _, key2 = build_question_filters(tag_filter=["b", "a"])
+        assert key1 == key2
+
+    def test_cache_hit_and_invalidate(self):
+        """命中缓存时不查询数据库，失效后重新统计"""
+        db = _db(42)
+        filters, key = build_question_filters(type_filter="SINGLE_CHOICE")
+        assert count_questions(db, filters, key) == 42
+        assert count_questions(db, filters, key) == 42
+        assert db.query.call_count == 1
+        invalidate_question_counts()
+        count_questions(db, filters, key)
+        assert db.query.call_count == 2
+
+    def test_ttl_expiry(self, monkeypatch):
+        """超过 TTL 后重新统计"""
+        db = _db(1)
+        filters, key = build_question_filters()
+        count_questions(db, filters, key)
+        monkeypatch.setattr(question_service, "QUESTION_COUNT_TTL_SECONDS", 0)
+        count_questions(db, filters, key)
+        assert db.query.call_count == 2
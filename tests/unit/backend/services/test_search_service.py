@@ -0,0 +1,74 @@
+"""
+题库 / 调研库检索（进程内二元组索引与高亮）单元测试
+"""
+from backend.app.services.search_service import NgramIndex, highlight, split_terms
+
+
+def _index():
+    index = NgramIndex()
+    index.add(1, "您对公司的满意度如何？")
+    index.add(2, "Customer Satisfaction overall")
+    index.add(3, "工作环境是否满意 satisfaction")
+    index.add(4, "完全无关")
+    return index
+
+
+class TestSplitTerms:
+    """查询词拆分测试"""
+
+    def test_normalize_and_dedupe(self):
+        """全角转半角、统一大小写并去重"""
+        assert split_terms("  ＡＢＣ  abc\t满意 ") == ["abc", "满意"]
+
+    def test_blank_query(self):
+        assert split_terms("   ") == []
+        assert split_terms(None) == []
+
+
+class TestNgramIndex:
+    """二元组倒排索引测试"""
+
+    def test_substring_match(self):
+        """中文、英文（不区分大小写）子串均可命中"""
+        index = _index()
+        assert index.search(["满意"]) == {1, 3}
+        assert index.search(["satisfaction"]) == {2, 3}
+
+    def test_all_terms_required(self):
+        """多个查询词需全部命中"""
+        assert _index().search(["满意", "satisfaction"]) == {3}
+
+    def test_bigrams_present_but_not_contiguous(self):
+        """二元组都存在但不连续时经原文校验排除"""
+        index = NgramIndex()
+        index.add(1, "ab bc")
+        assert index.search(["abc"]) == set()
+
+    def test_single_character(self):
+        """单字查询没有二元组，逐条比对"""
+        assert _index().search(["关"]) == {4}
+
+    def test_update_and_remove(self):
+        """修改后旧文本不再命中，删除后不再返回"""
+        index = _index()
+        index.add(4, "现在满意了")
+        assert index.search(["无关"]) == set()
+        assert index.search(["满意"]) == {1, 3, 4}
+        index.remove(1)
+        assert index.search(["满意"]) == {3, 4}
+        assert len(index) == 3
+
+
+class TestHighlight:
+    """高亮测试"""
+
+    def test_marks_terms_case_insensitively(self):
+        assert highlight("Customer Satisfaction", ["satisfaction"]) == "Customer <mark>Satisfaction</mark>"
+
+    def test_escapes_html(self):
+        """原文中的 HTML 会被转义，只保留 <mark> 标记"""
+        assert highlight("<b>满意</b>", ["满意"]) == "&lt;b&gt;<mark>满意</mark>&lt;/b&gt;"
+
+    def test_fullwidth_text(self):
+        """全角字符按规范化后的文本匹配，标记原文位置"""
+        assert highlight("ＡＢＣ满意", ["bc"]) == "Ａ<mark>ＢＣ</mark>满意"
@@ -0,0 +1,172 @@
+"""
+分析页合并取数（基于预聚合行的内存计算）单元测试
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base
+from app.services.answer_item_service import QuestionType, build_answer_items, rebuild_answer_items
+from app.services.grading_service import build_scoring_plan
+from app.services.chart_service import build_question_option_stats
+from app.services.statistics_service import (
+    build_dimension_stats,
+    build_line_scores,
+    build_pie_from_rollups,
+    build_question_scores_from_rollups,
+    get_per_question_scores,
+)
+from app.services.survey_stat_service import (
+    apply_answer_to_rollups,
+    question_submissions,
+    rebuild_survey_rollups,
+    totals_from_rollups,
+)
+
+
+def _row(question_id, option_text, dimension_value, count, score_sum=0.0, unanswered_count=0, submitted_count=None):
+    return SimpleNamespace(
+        question_id=question_id,
+        option_text=option_text,
+        dimension_value=dimension_value,
+        count=count,
+        score_sum=score_sum,
+        unanswered_count=unanswered_count,
+        submitted_count=count if submitted_count is None else submitted_count,
+    )
+
+
+PLAN = {
+    1: {"type": QuestionType.SINGLE_CHOICE, "scores": {"A": 1.0, "B": 3.0}},
+    2: {"type": QuestionType.TEXT_INPUT, "scores": {}},
+}
+
+QUESTIONS = [
+    {"id": 1, "text": "Q1", "type": QuestionType.SINGLE_CHOICE, "options": [{"text": "A", "score": 1}, {"text": "B", "score": 3}]},
+    {"id": 2, "text": "Q2", "type": QuestionType.TEXT_INPUT, "options": []},
+]
+
+# 研发部 2 份答卷（A、B），市场部 1 份（B）；Q2 研发部 1 人作答
+ROWS = [
+    _row(0, "", "研发部", 2, 4.0),
+    _row(0, "", "市场部", 1, 3.0),
+    _row(1, "", "研发部", 2, 4.0),
+    _row(1, "A", "研发部", 1, 1.0),
+    _row(1, "B", "研发部", 1, 3.0),
+    _row(1, "", "市场部", 1, 3.0),
+    _row(1, "B", "市场部", 1, 3.0),
+    _row(2, "", "研发部", 1, 0.0, unanswered_count=1),
+    _row(2, "", "市场部", 0, 0.0, unanswered_count=1),
+]
+
+
+class TestAnalysisBundleBuilders:
+    """合并取数各部分的计算测试"""
+
+    def test_dimension_stats(self):
+        """问卷级汇总只取 question_id=0 的行"""
+        stats = build_dimension_stats("department", totals_from_rollups(ROWS))
+        assert {s["key"]: (s["count"], s["average_score"]) for s in stats} == {"研发部": (2, 2.0), "市场部": (1, 3.0)}
+
+    def test_question_scores_sum_across_groups(self):
+        """每题得分跨分组累加，未作答的题目不返回"""
+        scores = build_question_scores_from_rollups(QUESTIONS, ROWS, PLAN)
+        assert scores[0] == {"question_id": 1, "question_text": "Q1", "response_count": 3, "total_score": 7.0, "avg_score": 2.33}
+        assert scores[1]["question_id"] == 2 and scores[1]["total_score"] == 0.0
+
+    def test_line_scores(self):
+        """折线图按排序后的分组输出问卷总分与题目均分"""
+        line = build_line_scores(totals_from_rollups(ROWS), ROWS, {1: ("Q1", PLAN[1])}, True)
+        assert line["categories"] == ["市场部", "研发部"]
+        assert line["series"] == [{"name": "问卷总分", "data": [3.0, 2.0]}, {"name": "Q1 Q1", "data": [3.0, 2.0]}]
+
+    def test_pie_ignores_other_questions(self):
+        """饼图只统计指定题目的行"""
+        pie = build_pie_from_rollups(ROWS, 1, "B", "department")
+        assert pie["data"] == [{"name": "研发部", "value": 1}, {"name": "市场部", "value": 1}]
+
+    def test_option_stats_skip_survey_rows(self):
+        """选项分布忽略问卷级汇总行，填空题计入“有答案/未作答”"""
+        charts = build_question_option_stats(QUESTIONS, ROWS)
+        q2 = {option["name"]: option["value"] for option in charts[1]["data"]}
+        assert q2 == {"有答案": 1, "(未作答)": 2}
+        assert [option["value"] for option in charts[0]["data"]] == [1, 2, 0]
+
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class TestPerQuestionScores:
+    """每题平均分的分母与按答卷 JSON 逐条统计时一致：提交中包含该题即计入（含空回答），从预聚合行读取"""
+
+    @staticmethod
+    def _survey(db):
+        choice = models.Question(text="Q1", type=QuestionType.SINGLE_CHOICE,
+                                 options=json.dumps([{"text": "A", "score": 2}, {"text": "B", "score": 5}]))
+        text = models.Question(text="Q2", type=QuestionType.TEXT_INPUT)
+        survey = models.Survey(title="S", created_by_user_id=1)
+        db.add_all([choice, text, survey])
+        db.flush()
+        db.add_all([models.SurveyQuestion(survey_id=survey.id, question_id=q.id, order=i) for i, q in enumerate([choice, text])])
+        db.commit()
+        c, t = str(choice.id), str(text.id)
+        answers = [
+            ({c: "A", t: ""}, "研发部"),
+            # 嵌套字典中与题目ID相同的键不算提交了该题
+            ({c: "B", t: {c: "x"}}, "研发部"),
+            ({c: None, t: "x"}, "市场部"),
+            ({t: "y"}, "市场部"),
+        ]
+        return survey.id, choice.id, text.id, answers
+
+    def test_ingest_counts_blank_answers_in_denominator(self, db):
+        survey_id, q1, q2, answers = self._survey(db)
+        plan = build_scoring_plan(db, survey_id)
+        for data, department in answers:
+            answer = models.SurveyAnswer(survey_id=survey_id, answers=json.dumps(data), department=department)
+            db.add(answer)
+            db.flush()
+            items = build_answer_items(answer, data, plan)
+            db.add_all(items)
+            apply_answer_to_rollups(db, answer, items, plan)
+        db.commit()
+
+        assert question_submissions(db, survey_id) == {q1: 3, q2: 4}
+        assert question_submissions(db, survey_id, "department", "研发部") == {q1: 2, q2: 2}
+        scores = {s["question_id"]: s for s in get_per_question_scores(db, survey_id)}
+        # 旧实现逐条解析 JSON：Q1 的 3 份提交共 7 分，空回答也计入分母
+        assert (scores[q1]["response_count"], scores[q1]["avg_score"]) == (3, 2.33)
+        assert scores[q2]["response_count"] == 4
+        scores = {s["question_id"]: s for s in get_per_question_scores(db, survey_id, department="市场部")}
+        assert (scores[q1]["response_count"], scores[q1]["total_score"]) == (1, 0.0)
+
+    def test_rebuild_matches_ingest(self, db):
+        survey_id, q1, q2, answers = self._survey(db)
+        db.add_all([
+            models.SurveyAnswer(survey_id=survey_id, answers=json.dumps(data), department=department)
+            for data, department in answers
+        ])
+        db.commit()
+        rebuild_answer_items(db, survey_id)
+        rebuild_survey_rollups(db, survey_id)
+        db.commit()
+        assert question_submissions(db, survey_id, "position") == {q1: 3, q2: 4}
+
+    def test_rollup_scores_use_submitted_counts(self):
+        """合并取数以预聚合行中的提交份数为分母"""
+        rows = [_row(1, "", "研发部", 2, 4.0, submitted_count=3), _row(1, "A", "研发部", 1, 1.0), _row(1, "B", "研发部", 1, 3.0)]
+        scores = build_question_scores_from_rollups(QUESTIONS, rows, PLAN)
+        assert (scores[0]["response_count"], scores[0]["avg_score"]) == (3, 1.33)
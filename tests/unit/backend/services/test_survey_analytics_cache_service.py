@@ -0,0 +1,60 @@
+"""
+调研分析快照缓存单元测试：指纹校验、题目与问卷修改后的主动失效
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models
+from app.database import Base
+from app.models.question import QuestionType
+from app.schemas.question import QuestionUpdate
+from app.schemas.survey import SurveyCreate, SurveyUpdate
+from app.services import survey_analytics_cache_service as cache
+from app.services import survey_service
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    cache.invalidate_survey_analytics()
+    yield session
+    cache.invalidate_survey_analytics()
+    session.close()
+    engine.dispose()
+
+
+def _snapshot(survey_id, question_ids):
+    return {"survey_id": survey_id, "question_analytics": [{"question_id": qid} for qid in question_ids]}
+
+
+class TestSurveyAnalyticsCache:
+    """快照读取与失效测试"""
+
+    def test_fingerprint_mismatch_misses(self, db):
+        cache.store_analytics(1, 10, (3, 30), _snapshot(10, [1]))
+        assert cache.get_cached_analytics(1, 10, (3, 30)) == _snapshot(10, [1])
+        assert cache.get_cached_analytics(1, 10, (4, 31)) is None
+
+    def test_question_update_invalidates_surveys_using_it(self, db):
+        question = models.Question(text="Q", type=QuestionType.TEXT_INPUT)
+        db.add(question)
+        db.commit()
+        cache.store_analytics(1, 10, (1, 1), _snapshot(10, [question.id]))
+        cache.store_analytics(1, 11, (1, 1), _snapshot(11, [question.id + 1]))
+
+        crud.update_question(db, question.id, QuestionUpdate(text="Q2"))
+        assert cache.get_cached_analytics(1, 10, (1, 1)) is None
+        assert cache.get_cached_analytics(1, 11, (1, 1)) is not None
+
+        crud.delete_question(db, question.id + 1)  # 不存在的题目不影响缓存
+        assert cache.get_cached_analytics(1, 11, (1, 1)) is not None
+
+    def test_survey_question_list_change_invalidates(self, db):
+        survey = survey_service.create_survey(db, SurveyCreate(title="S", question_ids=[1]), user_id=1)
+        cache.store_analytics(1, survey.id, (0, 0), _snapshot(survey.id, [1]))
+        survey_service.update_survey(db, survey.id, SurveyUpdate(question_ids=[1, 2]))
+        assert cache.get_cached_analytics(1, survey.id, (0, 0)) is None
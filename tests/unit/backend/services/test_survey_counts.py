@@ -0,0 +1,136 @@
+"""
+问卷冗余计数单元测试：创建/更新时维护题目数、增量调整与核对修正
+"""
+from typing import Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base
+from app.schemas.survey import SurveyCreate, SurveyUpdate
+from app.services import survey_service
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _add_answers(db, survey_id, n):
+    db.add_all([models.SurveyAnswer(survey_id=survey_id, answers="{}") for _ in range(n)])
+
+
+class TestSurveyCounts:
+    """计数维护测试"""
+
+    def test_create_and_update_track_question_count(self, db):
+        survey = survey_service.create_survey(db, SurveyCreate(title="S", question_ids=[1, 2, 3]), user_id=1)
+        assert (survey.question_count, survey.response_count) == (3, 0)
+
+        survey = survey_service.update_survey(db, survey.id, SurveyUpdate(question_ids=[2]))
+        assert survey.question_count == 1
+
+    def test_adjust_is_incremental(self, db):
+        survey = survey_service.create_survey(db, SurveyCreate(title="S"), user_id=1)
+        _add_answers(db, survey.id, 2)
+        survey_service.adjust_survey_counts(db, survey.id, responses=2)
+        survey_service.adjust_survey_counts(db, survey.id, responses=1, questions=4)
+        db.commit()
+        db.refresh(survey)
+        assert (survey.response_count, survey.question_count) == (3, 4)
+
+    def test_reconcile_corrects_only_drifted_surveys(self, db):
+        drifted = survey_service.create_survey(db, SurveyCreate(title="A"), user_id=1)
+        correct = survey_service.create_survey(db, SurveyCreate(title="B", question_ids=[7]), user_id=1)
+        _add_answers(db, drifted.id, 5)
+        db.add(models.SurveyQuestion(survey_id=drifted.id, question_id=9, order=1))
+        db.commit()
+
+        assert survey_service.reconcile_survey_counts(db) == 1
+        db.refresh(drifted)
+        db.refresh(correct)
+        assert (drifted.response_count, drifted.question_count) == (5, 1)
+        assert (correct.response_count, correct.question_count) == (0, 1)
+        assert survey_service.reconcile_survey_counts(db) == 0
+
+    def test_reconcile_limited_to_given_surveys(self, db):
+        first = survey_service.create_survey(db, SurveyCreate(title="A"), user_id=1)
+        second = survey_service.create_survey(db, SurveyCreate(title="B"), user_id=1)
+        _add_answers(db, first.id, 1)
+        _add_answers(db, second.id, 1)
+        db.commit()
+
+        assert survey_service.reconcile_survey_counts(db, [second.id]) == 1
+        db.refresh(first)
+        db.refresh(second)
+        assert (first.response_count, second.response_count) == (0, 1)
+
+    def test_adding_question_rebuilds_rollups_only_with_responses(self, db, monkeypatch):
+        from app import crud
+        from app.schemas.question import QuestionCreate
+
+        rebuilt = []
+        monkeypatch.setattr(crud, "rebuild_survey_rollups", lambda db, survey_id: rebuilt.append(survey_id))
+        class TriggerQuestionCreate(QuestionCreate):
+            # crud.create_survey_question 读取关联题的 trigger_options
+            trigger_options: Optional[list] = None
+
+        survey = survey_service.create_survey(db, SurveyCreate(title="S"), user_id=1)
+        question = TriggerQuestionCreate(text="Q", type="text_input")
+
+        crud.create_survey_question(db, question, survey.id)
+        assert rebuilt == []
+
+        _add_answers(db, survey.id, 1)
+        survey_service.adjust_survey_counts(db, survey.id, responses=1)
+        crud.create_survey_question(db, question, survey.id)
+        assert rebuilt == [survey.id]
+        db.refresh(survey)
+        assert survey.question_count == 2
+
+
+class TestReconcileEndpoint:
+    """核对接口权限测试"""
+
+    def test_non_admin_forbidden(self, monkeypatch):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from app.api import survey_api
+        from app.security import get_current_user
+        from app.services.user_service import UserSnapshot
+
+        submitted = []
+
+        async def fake_enqueue(kind, params, **kwargs):
+            submitted.append(kind)
+            return {"corrected": 0}
+
+        monkeypatch.setattr(survey_api, "enqueue_and_wait", fake_enqueue)
+        user = {"value": UserSnapshot(1, "alice", "researcher", None)}
+        app = FastAPI()
+        app.include_router(survey_api.router)
+        app.dependency_overrides[get_current_user] = lambda: user["value"]
+        client = TestClient(app)
+
+        assert client.post("/surveys/maintenance/reconcile-counts").status_code == 403
+        assert submitted == []
+
+        # role 可由用户自行设置，不能据此放行
+        user["value"] = UserSnapshot(2, "root", "admin", None)
+        assert client.post("/surveys/maintenance/reconcile-counts").status_code == 403
+        assert submitted == []
+
+        from app.config import settings
+        monkeypatch.setattr(settings, "SYSTEM_ADMIN_USERNAMES", "ops")
+        user["value"] = UserSnapshot(3, "ops", "employee", None)
+        assert client.post("/surveys/maintenance/reconcile-counts").json() == {"corrected": 0}
+        assert submitted == [survey_api.RECONCILE_SURVEY_COUNTS_JOB]
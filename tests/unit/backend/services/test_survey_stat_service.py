@@ -0,0 +1,102 @@
+"""
+问卷统计预聚合服务单元测试
+"""
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.survey_stat import SurveyStatRollup
+from app.services import survey_stat_service
+from app.services.answer_item_service import QuestionType
+from app.services.survey_stat_service import collect_answer_deltas
+
+
+def _answer(**kwargs):
+    data = {
+        "survey_id": 1,
+        "department": "研发部",
+        "position": None,
+        "organization_id": None,
+        "organization_name": None,
+        "total_score": 8.0,
+        "answers": '{"1": ["A", "B"], "2": ""}',
+    }
+    data.update(kwargs)
+    return SimpleNamespace(**data)
+
+
+def _item(question_id, option_text, score=0.0):
+    return SimpleNamespace(question_id=question_id, option_text=option_text, score=score)
+
+
+class TestCollectAnswerDeltas:
+    """答卷增量计算测试"""
+
+    def setup_method(self):
+        self.plan = {
+            1: {"type": QuestionType.MULTI_CHOICE, "scores": {"A": 2.0, "B": 3.0}},
+            2: {"type": QuestionType.TEXT_INPUT, "scores": {}},
+        }
+
+    def test_survey_level_row_per_dimension(self):
+        """每个维度都生成一条问卷级汇总"""
+        deltas = collect_answer_deltas(_answer(), [], self.plan)
+        assert deltas[(0, "", "department", "研发部", 0)] == [1, 8.0, 0, 0]
+        assert deltas[(0, "", "position", "未知职位", 0)] == [1, 8.0, 0, 0]
+        assert deltas[(0, "", "organization", "未知组织", 0)] == [1, 8.0, 0, 0]
+
+    def test_choice_options_and_question_rows(self):
+        """选择题按选项计数，题目级行记录作答人数和得分"""
+        items = [_item(1, "A", 2.0), _item(1, "B", 3.0)]
+        deltas = collect_answer_deltas(_answer(), items, self.plan)
+        assert deltas[(1, "", "department", "研发部", 0)] == [1, 5.0, 0, 1]
+        assert deltas[(1, "A", "department", "研发部", 0)] == [1, 2.0, 0, 0]
+        assert deltas[(1, "B", "department", "研发部", 0)] == [1, 3.0, 0, 0]
+
+    def test_unanswered_question(self):
+        """未作答的题目累加未作答人数；答卷中包含该题（空回答）时仍计入提交份数"""
+        deltas = collect_answer_deltas(_answer(), [_item(1, "A")], self.plan)
+        assert deltas[(2, "", "department", "研发部", 0)] == [0, 0.0, 1, 1]
+        deltas = collect_answer_deltas(_answer(answers='{"1": "A"}'), [_item(1, "A")], self.plan)
+        assert deltas[(2, "", "department", "研发部", 0)] == [0, 0.0, 1, 0]
+
+    def test_text_answers_have_no_option_rows(self):
+        """填空题不生成选项级行"""
+        deltas = collect_answer_deltas(_answer(), [_item(2, "自由回答")], self.plan)
+        assert (2, "自由回答", "department", "研发部", 0) not in deltas
+        assert deltas[(2, "", "department", "研发部", 0)] == [1, 0.0, 0, 1]
+
+    def test_organization_key(self):
+        """按组织ID分桶，组织名作为分组名"""
+        deltas = collect_answer_deltas(
+            _answer(organization_id=7, organization_name="甲公司"), [], self.plan
+        )
+        assert deltas[(0, "", "organization", "甲公司", 7)] == [1, 8.0, 0, 0]
+
+
+class TestUpsertRollups:
+    """预聚合写入测试"""
+
+    def test_large_upsert_split_into_batches(self, monkeypatch):
+        monkeypatch.setattr(survey_stat_service, "ROLLUP_UPSERT_BATCH_SIZE", 500)
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        inserts = []
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT") else None)
+
+        deltas = {(qid, "", "department", "研发部", 0): [1, 2.0, 0, 1] for qid in range(1, 1202)}
+        survey_stat_service._upsert_rollups(db, 1, deltas)
+        survey_stat_service._upsert_rollups(db, 1, deltas)
+        db.commit()
+
+        assert len(inserts) == 6
+        assert db.query(func.count(SurveyStatRollup.id)).scalar() == 1201
+        assert db.query(func.sum(SurveyStatRollup.count)).scalar() == 2402
+        assert db.query(func.sum(SurveyStatRollup.submitted_count)).scalar() == 2402
+        db.close()
+        engine.dispose()
@@ -0,0 +1,102 @@
+"""
+问卷状态推导单元测试：读取时只推导不写库、按推导状态筛选、批量写回
+"""
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base
+from app.services import survey_service
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+HOUR = datetime.timedelta(hours=1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _survey(db, title, status="pending", start_time=None, end_time=None):
+    survey = models.Survey(title=title, status=status, created_by_user_id=1, start_time=start_time, end_time=end_time)
+    db.add(survey)
+    db.commit()
+    return survey.id
+
+
+def _stored_status(db, survey_id):
+    return db.execute(text("SELECT status FROM surveys WHERE id = :id"), {"id": survey_id}).scalar()
+
+
+class TestComputeStatus:
+    """状态推导规则测试"""
+
+    @pytest.mark.parametrize("start, end, expected", [
+        (None, None, "pending"),
+        (NOW - HOUR, None, "active"),
+        (NOW - HOUR, NOW + HOUR, "active"),
+        (NOW - 2 * HOUR, NOW - HOUR, "completed"),
+        (None, NOW - HOUR, "completed"),
+    ])
+    def test_rules(self, start, end, expected):
+        survey = models.Survey(start_time=start, end_time=end, status="pending")
+        assert survey_service.compute_survey_status(survey, NOW) == expected
+
+    def test_naive_times_treated_as_utc(self):
+        survey = models.Survey(start_time=None, end_time=(NOW - HOUR).replace(tzinfo=None))
+        assert survey_service.compute_survey_status(survey, NOW) == "completed"
+
+
+class TestReadPaths:
+    """读取接口无副作用测试"""
+
+    def test_get_survey_does_not_write(self, db):
+        survey_id = _survey(db, "expired", status="active", start_time=NOW - 2 * HOUR, end_time=NOW - HOUR)
+        db.expire_all()
+
+        survey = survey_service.get_survey(db, survey_id)
+        assert survey.status == "completed"
+        assert not db.dirty
+        db.commit()
+        assert _stored_status(db, survey_id) == "active"
+
+    def test_global_list_filters_by_derived_status(self, db):
+        expired = _survey(db, "expired", status="active", start_time=NOW - 2 * HOUR, end_time=NOW - HOUR)
+        _survey(db, "running", status="active", start_time=NOW - HOUR)
+
+        surveys = survey_service.get_global_surveys(db, status_filter="completed")
+        assert [s.id for s in surveys] == [expired]
+
+
+class TestExplicitStatus:
+    """显式设置状态测试"""
+
+    def test_status_matching_derived_value_is_persisted(self, db):
+        survey_id = _survey(db, "已开始", status="pending", start_time=NOW - HOUR)
+        # 与接口层一致：先经 get_survey 读取并持有（内存中已推导为 active），再显式设置同一状态
+        survey = survey_service.get_survey(db, survey_id)
+        assert survey.status == "active"
+        survey_service.update_survey_status(db, survey_id, "active")
+        assert _stored_status(db, survey_id) == "active"
+
+
+class TestSync:
+    """批量写回测试"""
+
+    def test_sync_updates_drifted_rows_once(self, db):
+        expired = _survey(db, "expired", status="active", start_time=NOW - 2 * HOUR, end_time=NOW - HOUR)
+        started = _survey(db, "started", status="pending", start_time=NOW - HOUR)
+        unchanged = _survey(db, "draft", status="pending")
+
+        assert survey_service.sync_survey_statuses(db) == 2
+        assert [_stored_status(db, i) for i in (expired, started, unchanged)] == ["completed", "active", "pending"]
+        assert survey_service.sync_survey_statuses(db) == 0
@@ -0,0 +1,67 @@
+"""
+认证用户快照缓存单元测试
+"""
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from backend.app.services import user_service
+from backend.app.services.user_service import get_user_snapshot, invalidate_user_snapshot
+
+
+def _db(row):
+    db = Mock()
+    db.query.return_value.filter.return_value.first.return_value = row
+    return db
+
+
+def _row(user_id=1, username="alice", role="researcher", organization_id=3):
+    return SimpleNamespace(id=user_id, username=username, role=role, organization_id=organization_id)
+
+
+class TestUserSnapshotCache:
+    """用户快照缓存测试"""
+
+    def setup_method(self):
+        invalidate_user_snapshot()
+
+    def test_snapshot_fields(self):
+        """快照只包含鉴权所需字段"""
+        snapshot = get_user_snapshot(_db(_row()), "alice")
+        assert (snapshot.id, snapshot.username, snapshot.role, snapshot.organization_id) == (1, "alice", "researcher", 3)
+
+    def test_cache_hit_skips_query(self):
+        """命中缓存时不再查询数据库"""
+        db = _db(_row())
+        get_user_snapshot(db, "alice")
+        get_user_snapshot(db, "alice")
+        assert db.query.call_count == 1
+
+    def test_missing_user_not_cached(self):
+        """不存在的用户不缓存"""
+        db = _db(None)
+        assert get_user_snapshot(db, "ghost") is None
+        assert get_user_snapshot(db, "ghost") is None
+        assert db.query.call_count == 2
+
+    def test_invalidate_by_user_id(self):
+        """按用户ID失效（覆盖改名前的用户名）"""
+        db = _db(_row())
+        get_user_snapshot(db, "alice")
+        invalidate_user_snapshot(user_id=1)
+        get_user_snapshot(db, "alice")
+        assert db.query.call_count == 2
+
+    def test_ttl_expiry(self, monkeypatch):
+        """超过 TTL 后重新查询"""
+        db = _db(_row())
+        get_user_snapshot(db, "alice")
+        monkeypatch.setattr(user_service, "USER_CACHE_TTL_SECONDS", 0)
+        get_user_snapshot(db, "alice")
+        assert db.query.call_count == 2
+
+    def test_bounded_size(self, monkeypatch):
+        """超过容量时淘汰最久未使用的条目"""
+        monkeypatch.setattr(user_service, "USER_CACHE_MAX_SIZE", 2)
+        for user_id, name in enumerate(["a", "b", "c"], start=1):
+            get_user_snapshot(_db(_row(user_id, name)), name)
+        assert list(user_service._user_cache) == ["b", "c"]
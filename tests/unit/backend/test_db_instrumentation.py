@@ -0,0 +1,73 @@
+"""
+按请求统计 SQL 的中间件单元测试：计数与响应头、疑似 N+1、测试模式下直接失败
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app import db_instrumentation
+from app.db_instrumentation import QueryBudgetExceeded, QueryInstrumentationMiddleware, fingerprint
+
+
+@pytest.fixture
+def client(monkeypatch):
+    settings = db_instrumentation.settings
+    monkeypatch.setattr(settings, "SQL_QUERY_BUDGET", 20)
+    monkeypatch.setattr(settings, "SQL_REPEAT_THRESHOLD", 5)
+    monkeypatch.setattr(settings, "SQL_BUDGET_ENFORCE", False)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    app = FastAPI()
+    app.add_middleware(QueryInstrumentationMiddleware)
+
+    @app.get("/loop/{n}")
+    def loop(n: int):
+        with engine.connect() as conn:
+            return [conn.execute(text("SELECT :v"), {"v": i}).scalar() for i in range(n)]
+
+    @app.get("/distinct/{n}")
+    def distinct(n: int):
+        with engine.connect() as conn:
+            return [conn.execute(text(f"SELECT {i} AS c{i}")).scalar() for i in range(n)]
+
+    yield TestClient(app)
+    engine.dispose()
+
+
+class TestFingerprint:
+    """语句指纹测试"""
+
+    def test_literals_and_in_lists_normalized(self):
+        assert fingerprint("SELECT *\n  FROM t WHERE id IN (?, ?, ?) AND name = 'x'") == \
+            fingerprint("SELECT * FROM t WHERE id IN (?) AND name = 'y'")
+        assert fingerprint("SELECT 1") == fingerprint("SELECT 2")
+
+
+class TestMiddleware:
+    """中间件测试"""
+
+    def test_headers_report_count(self, client):
+        response = client.get("/loop/3")
+        assert response.headers["x-db-query-count"] == "3"
+        assert response.headers["server-timing"].startswith("db;dur=")
+        assert "x-db-query-budget" not in response.headers
+
+    def test_repeated_statement_flagged(self, client, caplog):
+        before = db_instrumentation.get_query_totals()["flagged_requests"]
+        response = client.get("/loop/6")
+        assert response.headers["x-db-query-budget"] == "exceeded"
+        assert "疑似 N+1" in caplog.text
+        assert db_instrumentation.get_query_totals()["flagged_requests"] == before + 1
+
+    def test_budget_flagged_without_repeats(self, client):
+        assert client.get("/distinct/21").headers["x-db-query-budget"] == "exceeded"
+        assert "x-db-query-budget" not in client.get("/distinct/4").headers
+
+    def test_enforce_mode_fails_request(self, client, monkeypatch):
+        monkeypatch.setattr(db_instrumentation.settings, "SQL_BUDGET_ENFORCE", True)
+        with pytest.raises(QueryBudgetExceeded, match="/loop/"):
+            client.get("/loop/6")
+
+    def test_queries_outside_requests_not_counted(self):
+        assert db_instrumentation.current_query_stats() is None
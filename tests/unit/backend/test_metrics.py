@@ -0,0 +1,147 @@
+"""
+/metrics 指标单元测试：按路由模板统计请求、LLM 调用计数、缓存命中率、多进程快照合并与文本格式
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.services import llm_service
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics(monkeypatch):
+    monkeypatch.setattr(metrics.settings, "METRICS_MULTIPROC_DIR", "")
+    monkeypatch.setattr(metrics.settings, "METRICS_FLUSH_SECONDS", 10)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/metrics")
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.generate_latest(), media_type=metrics.CONTENT_TYPE)
+
+    return TestClient(app)
+
+
+class TestMiddleware:
+    """按路由模板统计请求测试"""
+
+    def test_requests_grouped_by_route_template(self, client):
+        for item_id in (1, 2, 3):
+            client.get(f"/items/{item_id}")
+        client.get("/items/abc")
+        client.get("/missing")
+
+        assert metrics.HTTP_REQUESTS.value("GET", "/items/{item_id}", 200) == 3
+        assert metrics.HTTP_REQUESTS.value("GET", "/items/{item_id}", 422) == 1
+        assert metrics.HTTP_REQUESTS.value("GET", metrics.UNMATCHED_ROUTE, 404) == 1
+        assert metrics.HTTP_IN_FLIGHT.value() == 0
+
+    def test_exposition_format(self, client):
+        client.get("/items/1")
+        response = client.get("/metrics")
+        assert response.headers["content-type"] == metrics.CONTENT_TYPE
+        body = response.text
+        assert "# TYPE survey_http_request_duration_seconds histogram" in body
+        assert 'survey_http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="+Inf"} 1' in body
+        assert 'survey_http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 1' in body
+        assert 'survey_http_requests_total{method="GET",route="/items/{item_id}",status="200"} 1' in body
+        # 抓取请求本身仍在进行中
+        assert "survey_http_requests_in_flight 1" in body
+
+
+class TestLLMCalls:
+    """LLM 调用计数测试"""
+
+    def test_outcomes_and_errors(self, monkeypatch):
+        results = iter([("文本", True), ("兜底", False)])
+
+        async def fake_request(prompt, model, system_message):
+            try:
+                return next(results)
+            except StopIteration:
+                raise RuntimeError("upstream down")
+
+        monkeypatch.setattr(llm_service, "_request_openrouter", fake_request)
+
+        async def calls():
+            await llm_service._call_openrouter("a", model="m", use_cache=False)
+            await llm_service._call_openrouter("b", model="m", use_cache=False)
+            with pytest.raises(RuntimeError):
+                await llm_service._call_openrouter("c", model="m", use_cache=False)
+
+        asyncio.run(calls())
+        families = metrics.collect()
+        counts = {tuple(labels): sum(value["counts"]) for labels, value in families["survey_llm_call_duration_seconds"]["samples"]}
+        assert counts == {("m", "ok"): 1, ("m", "fallback"): 1, ("m", "exception"): 1}
+        assert metrics.LLM_ERRORS.value("m", "fallback") == 1
+        assert metrics.LLM_ERRORS.value("m", "exception") == 1
+
+
+class TestCacheHitRatio:
+    """缓存命中率测试"""
+
+    def test_ratio_derived_from_lookups(self):
+        for hit in (True, True, True, False):
+            metrics.record_cache_lookup("user_snapshot", hit)
+        body = metrics.generate_latest()
+        assert 'survey_cache_lookups_total{cache="user_snapshot",result="hit"} 3' in body
+        assert 'survey_cache_hit_ratio{cache="user_snapshot"} 0.75' in body
+
+
+def worker_snapshot(pid, written_at, in_flight, latencies):
+    """构造另一个进程的快照：每个耗时记录一次请求"""
+    metrics.reset()
+    for seconds in latencies:
+        metrics.record_request("GET", "/items/{item_id}", 200, seconds)
+    metrics.HTTP_IN_FLIGHT.set(in_flight)
+    snapshot = metrics.local_snapshot()
+    snapshot.update(pid=pid, written_at=written_at)
+    metrics.reset()
+    return snapshot
+
+
+class TestMultiprocess:
+    """多进程快照合并测试"""
+
+    def test_counters_summed_and_stale_gauges_dropped(self):
+        now = time.time()
+        live = worker_snapshot(1, now, 3, [0.01, 0.2])
+        dead = worker_snapshot(2, now - 3600, 5, [0.01])
+        merged = metrics.merge_snapshots([live, dead], now=now)
+
+        requests = dict((tuple(labels), value) for labels, value in merged["survey_http_requests_total"]["samples"])
+        assert requests == {("GET", "/items/{item_id}", "200"): 3}
+        assert merged["survey_http_requests_in_flight"]["samples"] == [[[], 3]]
+        [[_, histogram]] = merged["survey_http_request_duration_seconds"]["samples"]
+        assert sum(histogram["counts"]) == 3
+        assert histogram["sum"] == pytest.approx(0.22)
+
+    def test_scrape_merges_worker_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(metrics.settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+        other = worker_snapshot(999999, time.time(), 0, [0.5])
+        (tmp_path / "metrics-999999.json").write_text(json.dumps(other))
+
+        metrics.reset()
+        metrics.record_request("GET", "/items/{item_id}", 200, 0.1)
+        body = metrics.generate_latest()
+
+        assert 'survey_http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in body
+        assert 'survey_http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="0.25"} 1' in body
+        assert len(list(tmp_path.glob("metrics-*.json"))) == 2
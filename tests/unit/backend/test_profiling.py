@@ -0,0 +1,158 @@
+"""
+慢请求调用栈采样单元测试：阈值与令牌触发、折叠栈内容、保留上限与文件名校验
+"""
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.profiling import ProfilingMiddleware
+
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    settings = profiling.settings
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_SLOW_REQUEST_SECONDS", 0.1)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_INTERVAL", 0.002)
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILING_MAX_FILES", 50)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/work/{seconds}")
+    def work(seconds: float):
+        return {"total": busy_work(seconds)}
+
+    return TestClient(app)
+
+
+def saved(tmp_path):
+    return sorted(tmp_path.glob("*.folded"))
+
+
+class TestTriggers:
+    """触发条件测试"""
+
+    def test_slow_request_saved_as_folded_stacks(self, client, tmp_path):
+        client.get("/work/0.4")
+        [path] = saved(tmp_path)
+        assert "-GET-work_seconds-" in path.name
+        lines = path.read_text().splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 10
+        functions = [frame.split(" (")[0] for frame in stack.split(";")]
+        assert functions[0].endswith(".work")
+        assert "busy_work" in functions
+        assert not profiling._active
+
+    def test_fast_request_not_saved(self, client, tmp_path):
+        client.get("/work/0.01")
+        assert saved(tmp_path) == []
+
+    def test_token_header_profiles_from_start(self, client, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling.settings, "PROFILING_SLOW_REQUEST_SECONDS", 0)
+        client.get("/work/0.05", headers={"X-Profile-Token": "wrong"})
+        assert saved(tmp_path) == []
+        client.get("/work/0.05", headers={"X-Profile-Token": "secret"})
+        assert len(saved(tmp_path)) == 1
+
+    def test_disabled_does_not_register(self, client, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling.settings, "PROFILING_ENABLED", False)
+        client.get("/work/0.2", headers={"X-Profile-Token": "secret"})
+        assert saved(tmp_path) == []
+
+
+class TestStorage:
+    """文件保留与下载校验测试"""
+
+    def test_retention_cap_keeps_newest(self, client, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling.settings, "PROFILING_MAX_FILES", 2)
+        for _ in range(3):
+            client.get("/work/0.15")
+        names = [p["name"] for p in profiling.list_profiles()]
+        assert len(names) == 2
+        assert names == sorted(names, reverse=True)
+
+    def test_profile_path_rejects_traversal(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling.settings, "PROFILING_DIR", str(tmp_path))
+        (tmp_path / "a.folded").write_text("x 1\n")
+        assert profiling.profile_path("a.folded") == str(tmp_path / "a.folded")
+        assert profiling.profile_path("../a.folded") is None
+        assert profiling.profile_path("missing.folded") is None
+
+
+class TestAdminAPI:
+    """采样文件接口权限测试"""
+
+    @pytest.fixture
+    def api(self, tmp_path, monkeypatch):
+        from app.api import profiling_api
+        from app.security import get_current_user
+        from app.services.user_service import UserSnapshot
+
+        monkeypatch.setattr(profiling.settings, "PROFILING_DIR", str(tmp_path))
+        monkeypatch.setattr(profiling.settings, "SYSTEM_ADMIN_USERNAMES", "ops")
+        (tmp_path / "a.folded").write_text("x 1\n")
+        user = {"value": None}
+        app = FastAPI()
+        app.include_router(profiling_api.router)
+        app.dependency_overrides[get_current_user] = lambda: user["value"]
+
+        def as_user(username, role):
+            user["value"] = UserSnapshot(1, username, role, None)
+            return TestClient(app)
+
+        return as_user
+
+    def test_non_admin_forbidden(self, api):
+        client = api("alice", "researcher")
+        assert client.get("/admin/profiles/").status_code == 403
+        assert client.get("/admin/profiles/a.folded").status_code == 403
+
+    def test_allowlist_grants_access(self, api):
+        assert api("ops", "researcher").get("/admin/profiles/").json()["profiles"][0]["name"] == "a.folded"
+        assert api("ops", "researcher").get("/admin/profiles/a.folded").text == "x 1\n"
+
+    def test_self_registered_admin_role_forbidden(self, tmp_path, monkeypatch):
+        """注册时自行填写 role=admin 不能获得管理员权限"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+
+        from app.api import profiling_api, user_api
+        from app.database import Base, get_db
+        from app.models.user import User
+        from app.security import get_current_user
+
+        monkeypatch.setattr(profiling.settings, "PROFILING_DIR", str(tmp_path))
+        monkeypatch.setattr(profiling.settings, "SYSTEM_ADMIN_USERNAMES", "ops")
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        app = FastAPI()
+        app.include_router(user_api.router)
+        app.include_router(profiling_api.router)
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_current_user] = lambda: db.query(User).filter(User.username == "mallory").one()
+        client = TestClient(app)
+        try:
+            registered = client.post("/users/register", json={
+                "username": "mallory", "email": "mallory@example.com", "password": "secret1", "role": "admin"
+            })
+            assert registered.json()["role"] == "admin"
+            assert client.get("/admin/profiles/").status_code == 403
+        finally:
+            db.close()
+            engine.dispose()